@@ -78,7 +78,6 @@ intersphinx_mapping = {
     'anyio': ('https://anyio.readthedocs.io/en/stable/', None),
     'bascom': ('https://bascom.readthedocs.io/en/latest/', None),
     'click': ('https://click.palletsprojects.com/en/latest/', None),
-    'psutil': ('https://psutil.readthedocs.io/stable/', None),
     'pyrate-limiter': ('https://pyratelimiter.readthedocs.io/en/latest/', None),
     'pyserial': ('https://pyserial.readthedocs.io/en/latest/', None),
     'python': ('https://docs.python.org/3', None),
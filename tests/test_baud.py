@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from vcrtool.baud import (
+    BaudRateStore,
+    default_store_path,
+    fastest_common_baud_rate,
+    supported_baud_rates,
+)
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def test_supported_baud_rates() -> None:
+    assert supported_baud_rates(0x21) == (9600, 19200)
+    assert supported_baud_rates(0x24) == (9600, 19200, 38400, 57600, 115200)
+
+
+def test_supported_baud_rates_unknown_code() -> None:
+    assert supported_baud_rates(0) == (9600,)
+
+
+def test_fastest_common_baud_rate() -> None:
+    assert fastest_common_baud_rate(0x24) == (0x24, 115200)
+    assert fastest_common_baud_rate(0x24, 57600) == (0x23, 57600)
+    assert fastest_common_baud_rate(0x22, 50000) == (0x22, 38400)
+    assert fastest_common_baud_rate(0x21, 1200) == (0x20, 9600)
+
+
+def test_default_store_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv('XDG_STATE_HOME', str(tmp_path))
+    assert default_store_path() == tmp_path / 'vcrtool' / 'baud-rates.json'
+    monkeypatch.delenv('XDG_STATE_HOME')
+    monkeypatch.setenv('HOME', str(tmp_path))
+    assert default_store_path() == tmp_path / '.local' / 'state' / 'vcrtool' / 'baud-rates.json'
+    assert BaudRateStore().path == default_store_path()
+
+
+def test_store(tmp_path: Path) -> None:
+    store = BaudRateStore(tmp_path / 'state' / 'baud-rates.json')
+    assert store.get('/dev/ttyUSB0', 1) is None
+    store.set('/dev/ttyUSB0', 1, 38400)
+    store.set('/dev/ttyUSB0', 2, 19200)
+    assert store.get('/dev/ttyUSB0', 1) == 38400
+    assert BaudRateStore(store.path).get('/dev/ttyUSB0', 2) == 19200
+    assert not store.path.with_name('baud-rates.json.part').exists()
+
+
+@pytest.mark.parametrize('content', ['not json', '[]'])
+def test_store_unreadable(tmp_path: Path, content: str) -> None:
+    path = tmp_path / 'baud-rates.json'
+    path.write_text(content)
+    store = BaudRateStore(path)
+    assert store.get('/dev/ttyUSB0', 1) is None
+    store.set('/dev/ttyUSB0', 1, 38400)
+    assert store.get('/dev/ttyUSB0', 1) == 38400
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import json
+
+from vcrtool.benchmark import (
+    BenchmarkResult,
+    Case,
+    compare,
+    main,
+    measure,
+    protocol_cases,
+    round_trip_cases,
+)
+from vcrtool.jlip import JLIPCommands, VTRMode, VTRModeResponse
+from vcrtool.sansio import JLIPCodec
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from click.testing import CliRunner
+    from pytest_mock import MockerFixture
+
+
+def test_measure() -> None:
+    calls = []
+    result = measure(Case('append', lambda: calls.append(bytearray(64)), 3), repeat=5)
+    assert len(calls) == 1 + 5 * 3 + 100
+    assert result.name == 'append'
+    assert result.ops_per_second > 0
+    assert 0 < result.p50 <= result.p99
+    assert result.peak_bytes >= 64
+
+
+def test_measure_keeps_tracing(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.benchmark.tracemalloc.is_tracing', return_value=True)
+    stop = mocker.patch('vcrtool.benchmark.tracemalloc.stop')
+    start = mocker.patch('vcrtool.benchmark.tracemalloc.start')
+    mocker.patch('vcrtool.benchmark.tracemalloc.get_traced_memory', return_value=(10, 30))
+    mocker.patch('vcrtool.benchmark.tracemalloc.reset_peak')
+    assert measure(Case('nothing', lambda: None), repeat=1).peak_bytes == 20
+    start.assert_not_called()
+    stop.assert_not_called()
+
+
+def test_protocol_cases() -> None:
+    cases = protocol_cases(2)
+    names = [case.name for case in cases]
+    assert names[:3] == ['build_command', 'checksum', 'validate_response']
+    assert 'VTRModeResponse.from_bytes' in names
+    assert 'DeviceNameResponse decode' in names
+    assert all(case.number == 2 for case in cases if 'validate_frames' not in case.name)
+    values = {case.name: case.call() for case in cases}
+    assert values['build_command'] == JLIPCommands.commands()['get_vtr_mode'].frame(1)
+    vtr_mode, device_name = values['VTRModeResponse decode'], values['DeviceNameResponse decode']
+    assert isinstance(vtr_mode, dict)
+    assert vtr_mode['vtr_mode'] == VTRMode.PLAY_FWD
+    assert isinstance(device_name, dict)
+    assert device_name['name'] == 'HR-S96'
+
+
+def test_protocol_cases_validate_frames(mocker: MockerFixture) -> None:
+    find_spec = mocker.patch('vcrtool.benchmark.importlib.util.find_spec', return_value=None)
+    cases = {case.name: case for case in protocol_cases(5000)}
+    find_spec.assert_called_once_with('numpy')
+    assert 'validate_frames NumPy x1000' not in cases
+    case = cases['validate_frames x1000']
+    assert case.number == 5
+    assert sum(case.call().valid) == 1000  # type: ignore[attr-defined]
+
+
+def test_round_trip_cases(mocker: MockerFixture) -> None:
+    response = JLIPCodec.build_command(1, 3, 1, 0, 0, 0, 0, 0)
+    simulator = mocker.patch('vcrtool.benchmark.PtySimulator')
+    simulator.return_value.__enter__.return_value.path = '/dev/pts/9'
+    sync = mocker.patch('vcrtool.benchmark._PtyJLIPTransport')
+    sync.return_value.send_frame.return_value = response
+    asynchronous = mocker.patch('vcrtool.benchmark.AsyncJLIPTransport')
+    asynchronous.return_value.send_frame = mocker.AsyncMock(return_value=response)
+    with round_trip_cases(0.01) as cases:
+        responses = [case.call() for case in cases]
+    assert len(responses) == 2
+    assert all(isinstance(r, VTRModeResponse) and r.vtr_mode == VTRMode.STOP for r in responses)
+    simulator.assert_called_once_with(latency=0.01)
+    sync.assert_called_once_with('/dev/pts/9')
+    sync.return_value.comm.close.assert_called_once_with()
+    asynchronous.return_value.comm.close.assert_called_once_with()
+
+
+def test_compare() -> None:
+    results = [
+        BenchmarkResult('fast', 1e6, 1e-6, 2e-6, 100),
+        BenchmarkResult('slow', 1e5, 1e-5, 2e-5, 100),
+        BenchmarkResult('big', 1e6, 1e-6, 2e-6, 300),
+        BenchmarkResult('new', 1e6, 1e-6, 2e-6, 100),
+    ]
+    baseline = {name: {'p50': 1e-6, 'peak_bytes': 100} for name in ('fast', 'slow', 'big')}
+    assert compare(results, baseline) == [
+        'slow: median 10.00 us, baseline 1.00 us.', 'big: peak 300 B, baseline 100 B.'
+    ]
+    assert compare(results, baseline, tolerance=10) == []
+
+
+def test_main_saves_and_compares(runner: CliRunner, tmp_path: Path) -> None:
+    baseline = tmp_path / 'baseline.json'
+    args = ['-k', 'checksum', '-n', '2', '--number', '2', '--no-round-trips', '-b', str(baseline)]
+    result = runner.invoke(main, [*args, '--save'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1].startswith('checksum ')
+    assert list(json.loads(baseline.read_text())['results']) == ['checksum']
+    assert runner.invoke(main, ['-t', '1000', *args]).exit_code == 0
+    data = json.loads(baseline.read_text())
+    data['results']['checksum']['p50'] = 1e-12
+    baseline.write_text(json.dumps(data))
+    result = runner.invoke(main, args)
+    assert result.exit_code == 1
+    assert 'checksum: median' in result.output
+
+
+def test_main_round_trips(runner: CliRunner, mocker: MockerFixture) -> None:
+    cases = mocker.patch('vcrtool.benchmark.round_trip_cases')
+    cases.return_value.__enter__.return_value = [Case('round trip', lambda: None)]
+    result = runner.invoke(main, ['-k', 'round*', '-n', '1'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1].startswith('round trip ')
+
+
+def test_main_save_requires_baseline(runner: CliRunner) -> None:
+    result = runner.invoke(main, ['--save', '--no-round-trips'])
+    assert result.exit_code == 2
+    assert '--save requires --baseline.' in result.output
+
+
+def test_main_no_matches(runner: CliRunner) -> None:
+    result = runner.invoke(main, ['-k', 'missing', '--no-round-trips'])
+    assert result.exit_code == 0
+    assert result.output.split() == ['case', 'ops/s', 'p50', 'us', 'p99', 'us', 'peak', 'B']
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import asyncio
+
+from vcrtool.bus import JLIPBus, JLIPDevice
+from vcrtool.deck_state import poller_for
+from vcrtool.jlip import AsyncJLIPTransport, VTRMode
+from vcrtool.sansio import JLIPCodec, checksum
+import pytest
+
+if TYPE_CHECKING:
+    from unittest.mock import MagicMock
+
+    from pytest_mock import MockerFixture
+
+
+def _response(jlip_id: int, status: int = 0x03, *data: int) -> bytes:
+    frame = [0xFF, 0xFF, jlip_id, status, *data, *([0] * (6 - len(data)))]
+    return bytes([*frame, checksum(frame)])
+
+
+@pytest.fixture
+def mock_serial(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch('serial.Serial')
+
+
+@pytest.fixture
+def bus(mock_serial: MagicMock, mocker: MockerFixture) -> JLIPBus:
+    bus = JLIPBus('/dev/ttyS0')
+    sent: list[bytes] = []
+
+    async def send_frame(frame: bytes) -> bytes:
+        sent.append(frame)
+        await asyncio.sleep(0)
+        if frame[2] == 9:
+            msg = 'No response.'
+            raise TimeoutError(msg)
+        return _response(frame[2], 0x03, 0x01)
+
+    mocker.patch.object(bus.port, 'send_frame', side_effect=send_frame)
+    bus.sent = sent  # type: ignore[attr-defined]
+    return bus
+
+
+def test_bus_opens_the_port_once(mock_serial: MagicMock) -> None:
+    bus = JLIPBus('/dev/ttyS0', raise_on_error_response=False)
+    first = bus.device(1)
+    assert bus.device(1) is first
+    second = bus.device(2)
+    assert isinstance(second, JLIPDevice)
+    assert isinstance(second, AsyncJLIPTransport)
+    assert first.comm is second.comm is bus.port.comm
+    assert not second.raise_on_error_response
+    mock_serial.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_bus_devices_take_turns(bus: JLIPBus) -> None:
+    busy, idle = bus.device(1), bus.device(2)
+    frame = busy.commands()['nop'].frame(1)
+    busy_tasks = [asyncio.create_task(busy.send_frame(frame)) for _ in range(3)]
+    idle_task = asyncio.create_task(idle.get_vtr_mode())
+    await asyncio.gather(*busy_tasks)
+    assert (await idle_task).vtr_mode == VTRMode.STOP
+    assert [frame[2] for frame in bus.sent] == [1, 2, 1, 1]  # type: ignore[attr-defined]
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_device_validates_with_its_own_settings(bus: JLIPBus,
+                                                          mocker: MockerFixture) -> None:
+    mocker.patch.object(bus.port, 'send_frame', return_value=_response(1, 0x05))
+    strict = bus.device(1)
+    with pytest.raises(ValueError, match='Command status'):
+        await strict.send_frame(JLIPCodec.build_command(1, 0x08))
+    strict.raise_on_error_response = False
+    assert (await strict.send_frame(JLIPCodec.build_command(1, 0x08)))[3] == 0x05
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_passes_exceptions_and_timeout(bus: JLIPBus) -> None:
+    device = bus.device(9)
+    device.response_timeout = 0.25
+    with pytest.raises(TimeoutError):
+        await device.nop()
+    assert bus.port.response_timeout == pytest.approx(0.25)
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_discover(bus: JLIPBus) -> None:
+    assert await bus.discover((1, 9, 3)) == [1, 3]
+    assert bus.sent == [  # type: ignore[attr-defined]
+        JLIPCodec.build_command(jlip_id, 0x7C, 0x4E, 0x20) for jlip_id in (1, 9, 3)
+    ]
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_close_cancels_queued_requests(bus: JLIPBus) -> None:
+    async with bus:
+        device = bus.device(1)
+        first = asyncio.create_task(device.nop())
+        second = asyncio.create_task(device.nop())
+        await asyncio.sleep(0)
+        second.cancel()
+        await asyncio.sleep(0)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    bus.port.comm.close.assert_called_once_with()  # type: ignore[attr-defined]
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_skips_cancelled_requests(bus: JLIPBus) -> None:
+    device = bus.device(1)
+    frame = device.commands()['nop'].frame(1)
+    first, second, third = (asyncio.create_task(device.send_frame(frame)) for _ in range(3))
+    await asyncio.sleep(0)
+    second.cancel()
+    await asyncio.gather(first, third)
+    assert len(bus.sent) == 2  # type: ignore[attr-defined]
+    await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_device_shares_poller(bus: JLIPBus) -> None:
+    device = bus.device(1)
+    assert poller_for(device) is poller_for(device)
+    assert poller_for(device) is not poller_for(bus.device(2))
+    await bus.close()
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, cast
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+
+from vcrtool.capture_batch import (
+    CPUBudget,
+    CaptureJob,
+    DeckProgress,
+    DeckState,
+    _a_run,  # ruff:ignore[import-private-name]
+    _capture,  # ruff:ignore[import-private-name]
+    _run_deck,  # ruff:ignore[import-private-name]
+    load_manifest,
+    main,
+)
+from vcrtool.deck_state import poller_for
+import click
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from click.testing import CliRunner
+    from pytest_mock import MockerFixture
+
+_HEADER = 'serial,video_device,audio_device,output,vbi_device,input_index,timespan\n'
+
+
+def _job(serial: str = '/dev/ttyUSB0', output: str = 'tape.mkv') -> CaptureJob:
+    return CaptureJob(serial, '/dev/video0', 'hw:1,0', output, 60)
+
+
+def _run_coroutine(ret: Any) -> Callable[..., Any]:
+    def _side_effect(coro: object, **_: object) -> Any:
+        if hasattr(coro, 'close'):
+            cast('Any', coro).close()
+        return ret
+
+    return _side_effect
+
+
+def test_load_manifest(tmp_path: Path) -> None:
+    manifest = tmp_path / 'jobs.csv'
+    manifest.write_text(
+        f'{_HEADER}'
+        '/dev/ttyUSB0,/dev/video0,"hw:1,0",a.mkv,/dev/vbi0,3,2h\n'
+        '/dev/ttyUSB1,/dev/video2,"hw:2,0",b.mkv,,,\n',
+        encoding='utf-8')
+    assert load_manifest(manifest) == [
+        CaptureJob('/dev/ttyUSB0', '/dev/video0', 'hw:1,0', 'a.mkv', 7200, '/dev/vbi0', 3),
+        CaptureJob('/dev/ttyUSB1', '/dev/video2', 'hw:2,0', 'b.mkv', 372 * 60, None, 2),
+    ]
+
+
+@pytest.mark.parametrize(('row', 'message'), [
+    ('/dev/ttyUSB0,,"hw:1,0",a.mkv,,,\n', r'Line 2: missing video_device\.'),
+    ('/dev/ttyUSB0,/dev/video0,"hw:1,0",a.mkv,,,invalid\n', r'Line 2: timespan is invalid\.'),
+    ('/dev/ttyUSB0,/dev/video0,"hw:1,0",a.mkv,,x,\n', r'Line 2: input index is invalid\.'),
+])
+def test_load_manifest_invalid(tmp_path: Path, row: str, message: str) -> None:
+    manifest = tmp_path / 'jobs.csv'
+    manifest.write_text(f'{_HEADER}{row}', encoding='utf-8')
+    with pytest.raises(ValueError, match=message):
+        load_manifest(manifest)
+
+
+@pytest.mark.asyncio
+async def test_cpu_budget_limits_concurrency() -> None:
+    budget = CPUBudget(4)
+    running = 0
+    peak = 0
+
+    async def _encode() -> None:
+        nonlocal running, peak
+        async with budget.reserve(2):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(_encode() for _ in range(5)))
+    assert peak == 2
+    assert budget.available == 4
+
+
+@pytest.mark.asyncio
+async def test_cpu_budget_clamps_oversized_reservation() -> None:
+    budget = CPUBudget(2)
+    async with budget.reserve(8) as cores:
+        assert cores == 2
+        assert budget.available == 0
+    assert budget.available == 2
+
+
+def test_deck_progress_str(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch.monotonic', side_effect=[10, 25])
+    progress = DeckProgress('/dev/ttyUSB0', 3, completed=1, failed=['a.mkv'], output='b.mkv')
+    progress.set_state(DeckState.CAPTURING)
+    assert str(progress) == 'capturing `b.mkv` for 15 s (2/3, 1 failed)'
+
+
+@pytest.mark.asyncio
+async def test_capture(mocker: MockerFixture) -> None:
+    mock_release = mocker.patch('vcrtool.capture_batch._release_audio_device',
+                                return_value=('wpctl', 'name', '42'))
+    mock_restore = mocker.patch('vcrtool.capture_batch._restore_audio_device')
+    mock_prepare = mocker.patch('vcrtool.capture_batch._prepare_vcr', new_callable=AsyncMock)
+    mock_rewind_wait = mocker.patch('vcrtool.capture_batch.rewind_wait', new_callable=AsyncMock)
+    mock_a_main = mocker.patch('vcrtool.capture_batch._a_main', AsyncMock(return_value=0))
+    vcr = MagicMock()
+    budget = CPUBudget(4)
+    progress = DeckProgress('/dev/ttyUSB0', 1)
+    ret = await _capture(_job(),
+                         vcr,
+                         budget,
+                         progress,
+                         cores_per_capture=2,
+                         poll_interval=0.1,
+                         max_poll_interval=1)
+    assert ret == 0
+    mock_release.assert_called_once_with('hw:1,0')
+    mock_prepare.assert_awaited_once_with(vcr)
+    mock_a_main.assert_awaited_once_with('/dev/video0',
+                                         'hw:1,0',
+                                         60,
+                                         'tape.mkv',
+                                         2,
+                                         None,
+                                         vcr,
+                                         poll_interval=0.1,
+                                         max_poll_interval=1,
+                                         threads=2,
+                                         encoder='x265-lossless',
+                                         metrics=None)
+    mock_restore.assert_called_once_with('wpctl', 'name', '42')
+    mock_rewind_wait.assert_awaited_once_with(vcr)
+    assert progress.state == DeckState.REWINDING
+    assert budget.available == 4
+
+
+@pytest.mark.asyncio
+async def test_capture_restores_on_failure(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch._release_audio_device',
+                 return_value=('wpctl', 'name', '42'))
+    mock_restore = mocker.patch('vcrtool.capture_batch._restore_audio_device')
+    mocker.patch('vcrtool.capture_batch._prepare_vcr', AsyncMock(side_effect=click.Abort))
+    mock_rewind_wait = mocker.patch('vcrtool.capture_batch.rewind_wait', new_callable=AsyncMock)
+    mock_a_main = mocker.patch('vcrtool.capture_batch._a_main', new_callable=AsyncMock)
+    vcr = MagicMock()
+    with pytest.raises(click.Abort):
+        await _capture(_job(),
+                       vcr,
+                       CPUBudget(4),
+                       DeckProgress('/dev/ttyUSB0', 1),
+                       cores_per_capture=2,
+                       poll_interval=0.1,
+                       max_poll_interval=1)
+    mock_a_main.assert_not_awaited()
+    mock_restore.assert_called_once()
+    mock_rewind_wait.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_capture_rewinds_on_capture_failure(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch._release_audio_device',
+                 return_value=('wpctl', 'name', '42'))
+    mock_restore = mocker.patch('vcrtool.capture_batch._restore_audio_device')
+    mocker.patch('vcrtool.capture_batch._prepare_vcr', new_callable=AsyncMock)
+    mock_rewind_wait = mocker.patch('vcrtool.capture_batch.rewind_wait', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_batch._a_main', AsyncMock(side_effect=OSError('capture')))
+    vcr = MagicMock()
+    progress = DeckProgress('/dev/ttyUSB0', 1)
+    with pytest.raises(OSError, match='capture'):
+        await _capture(_job(),
+                       vcr,
+                       CPUBudget(4),
+                       progress,
+                       cores_per_capture=2,
+                       poll_interval=0.1,
+                       max_poll_interval=1)
+    mock_restore.assert_called_once()
+    mock_rewind_wait.assert_awaited_once_with(vcr)
+    assert progress.state == DeckState.REWINDING
+
+
+@pytest.mark.asyncio
+async def test_run_deck(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch.asyncio.sleep', new_callable=AsyncMock)
+    mock_transport = mocker.patch('vcrtool.capture_batch.AsyncJLIPTransport')
+    mock_eject_wait = mocker.patch('vcrtool.capture_batch.eject_wait', new_callable=AsyncMock)
+    vcr = mock_transport.return_value
+    vcr.get_vtr_mode.side_effect = lambda **_: MagicMock(tape_inserted=vcr.get_vtr_mode.call_count >
+                                                         1)
+    mock_capture = mocker.patch('vcrtool.capture_batch._capture',
+                                AsyncMock(side_effect=[0, RuntimeError]))
+    progress = DeckProgress('/dev/ttyUSB0', 2)
+    await _run_deck([_job(output='a.mkv'), _job(output='b.mkv')],
+                    CPUBudget(4),
+                    progress,
+                    cores_per_capture=2,
+                    poll_interval=0.1,
+                    max_poll_interval=1)
+    mock_transport.assert_called_once_with('/dev/ttyUSB0', metrics=None)
+    assert mock_capture.await_count == 2
+    mock_eject_wait.assert_awaited_once_with(vcr)
+    vcr.get_vtr_mode.assert_called_with(fast=True)
+    poller = poller_for(vcr)
+    assert poller.max_poll_interval == 1
+    assert not poller.running
+    assert progress.completed == 1
+    assert progress.failed == ['b.mkv']
+    assert progress.state == DeckState.DONE
+
+
+@pytest.mark.asyncio
+async def test_run_deck_nonzero_exit(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_batch._capture', AsyncMock(return_value=1))
+    progress = DeckProgress('/dev/ttyUSB0', 1)
+    await _run_deck([_job()],
+                    CPUBudget(4),
+                    progress,
+                    cores_per_capture=2,
+                    poll_interval=0.1,
+                    max_poll_interval=1)
+    assert progress.failed == ['tape.mkv']
+
+
+@pytest.mark.asyncio
+async def test_run_deck_open_failure(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch.AsyncJLIPTransport', side_effect=OSError)
+    mock_capture = mocker.patch('vcrtool.capture_batch._capture', new_callable=AsyncMock)
+    progress = DeckProgress('/dev/ttyUSB0', 2)
+    await _run_deck([_job(output='a.mkv'), _job(output='b.mkv')],
+                    CPUBudget(4),
+                    progress,
+                    cores_per_capture=2,
+                    poll_interval=0.1,
+                    max_poll_interval=1)
+    mock_capture.assert_not_awaited()
+    assert progress.failed == ['a.mkv', 'b.mkv']
+    assert progress.state == DeckState.DONE
+
+
+@pytest.mark.asyncio
+async def test_run_deck_eject_failure(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_batch.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_batch.eject_wait', AsyncMock(side_effect=TimeoutError))
+    mocker.patch('vcrtool.capture_batch._capture', AsyncMock(return_value=0))
+    progress = DeckProgress('/dev/ttyUSB0', 2)
+    await _run_deck([_job(output='a.mkv'), _job(output='b.mkv')],
+                    CPUBudget(4),
+                    progress,
+                    cores_per_capture=2,
+                    poll_interval=0.1,
+                    max_poll_interval=1)
+    assert progress.completed == 1
+    assert progress.failed == ['b.mkv']
+
+
+@pytest.mark.asyncio
+async def test_a_run_isolates_deck_failures(mocker: MockerFixture) -> None:
+    def _transport(serial: str, **_: object) -> MagicMock:
+        if serial == '/dev/ttyUSB1':
+            raise OSError
+        return MagicMock()
+
+    mocker.patch('vcrtool.capture_batch.AsyncJLIPTransport', side_effect=_transport)
+    mock_capture = mocker.patch('vcrtool.capture_batch._capture', AsyncMock(return_value=0))
+    progress = await _a_run(
+        [_job(output='a.mkv'), _job('/dev/ttyUSB1', 'b.mkv')],
+        cpu_budget=4,
+        cores_per_capture=2,
+        progress_interval=60,
+        poll_interval=0.1,
+        max_poll_interval=1)
+    mock_capture.assert_awaited_once()
+    assert [deck.serial for deck in progress] == ['/dev/ttyUSB0', '/dev/ttyUSB1']
+    assert progress[0].completed == 1
+    assert not progress[0].failed
+    assert progress[1].failed == ['b.mkv']
+    assert all(deck.state == DeckState.DONE for deck in progress)
+
+
+def test_main(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    manifest = tmp_path / 'jobs.csv'
+    manifest.write_text(f'{_HEADER}/dev/ttyUSB0,/dev/video0,"hw:1,0",a.mkv,,,\n', encoding='utf-8')
+    mock_run = mocker.patch('vcrtool.capture_batch.asyncio.run',
+                            side_effect=_run_coroutine([DeckProgress('/dev/ttyUSB0', 1, 1)]))
+    result = runner.invoke(main, ['-c', '8', '-C', '2', str(manifest)])
+    assert result.exit_code == 0
+    mock_run.assert_called_once()
+
+
+def test_main_failures(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    manifest = tmp_path / 'jobs.csv'
+    manifest.write_text(f'{_HEADER}/dev/ttyUSB0,/dev/video0,"hw:1,0",a.mkv,,,\n', encoding='utf-8')
+    mocker.patch('vcrtool.capture_batch.asyncio.run',
+                 side_effect=_run_coroutine([DeckProgress('/dev/ttyUSB0', 1, failed=['a.mkv'])]))
+    result = runner.invoke(main, [str(manifest)])
+    assert result.exit_code == 1
+    assert '1 of 1 captures failed: a.mkv.' in result.output
+
+
+def test_main_empty_manifest(runner: CliRunner, tmp_path: Path) -> None:
+    manifest = tmp_path / 'jobs.csv'
+    manifest.write_text(_HEADER, encoding='utf-8')
+    result = runner.invoke(main, [str(manifest)])
+    assert result.exit_code == 1
+    assert 'Manifest has no jobs.' in result.output
+
+
+def test_main_invalid_manifest(runner: CliRunner, tmp_path: Path) -> None:
+    manifest = tmp_path / 'jobs.csv'
+    manifest.write_text(f'{_HEADER}/dev/ttyUSB0,,,,,,\n', encoding='utf-8')
+    result = runner.invoke(main, [str(manifest)])
+    assert result.exit_code == 2
+    assert 'missing video_device, audio_device, output' in result.output
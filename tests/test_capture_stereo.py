@@ -1,20 +1,54 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast
 from unittest.mock import AsyncMock, MagicMock
-
-from vcrtool.capture_stereo import _a_main, main  # ruff:ignore[import-private-name]
-from vcrtool.jlip import VTRMode
+import asyncio
+
+from vcrtool.capture_stereo import (
+    _a_capture,  # ruff:ignore[import-private-name]
+    _a_main,  # ruff:ignore[import-private-name]
+    _prepare_vcr,  # ruff:ignore[import-private-name]
+    _tape_position,  # ruff:ignore[import-private-name]
+    _wait_for_vcr_stop,  # ruff:ignore[import-private-name]
+    main,
+)
+from vcrtool.deck_state import DeckStatePoller, poller_for
+from vcrtool.jlip import AsyncJLIPTransport, VTRMode
+from vcrtool.metrics import CaptureMetrics
+from vcrtool.progress import CaptureFellBehindError
+from vcrtool.segments import DEFAULT_SEGMENT_LENGTH, SegmentError, SegmentedOutput
+from vcrtool.transcode import TranscodeError, TranscodeJob
 import click
 import pytest
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import AsyncIterator, Callable
 
     from click.testing import CliRunner
     from pytest_mock import MockerFixture
 
 
+def _ffmpeg_proc_exiting_on_terminate(ret: int = 0) -> MagicMock:
+    terminated = asyncio.Event()
+
+    async def _wait() -> int:
+        await terminated.wait()
+        return ret
+
+    proc = MagicMock()
+    proc.pid = 1234
+    proc.terminate = MagicMock(side_effect=terminated.set)
+    proc.wait = AsyncMock(side_effect=_wait)
+    return proc
+
+
+async def _progress(*, drop_frames: int) -> AsyncIterator[bytes]:
+    for line in ('frame=300', f'drop_frames={drop_frames}', 'speed=1.0x', 'progress=continue'):
+        await asyncio.sleep(0)
+        yield f'{line}\n'.encode()
+
+
 def _close_coroutine(ret: int = 0) -> Callable[..., int]:
     def _side_effect(coro: object, **_: object) -> int:
         if hasattr(coro, 'close'):
@@ -28,7 +62,6 @@ def _close_coroutine(ret: int = 0) -> Callable[..., int]:
 async def test_a_main_success(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', side_effect=[True, False])
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_v4l2_ctl_proc = AsyncMock()
@@ -40,7 +73,7 @@ async def test_a_main_success(mocker: MockerFixture) -> None:
     mock_ffmpeg_proc.wait = AsyncMock(return_value=0)
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_v4l2_ctl_proc])
-    mock_vcr = MagicMock()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
     mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
     result = await _a_main(video_device='video_device',
                            audio_device='audio_device',
@@ -55,11 +88,145 @@ async def test_a_main_success(mocker: MockerFixture) -> None:
     mock_ffmpeg_proc.terminate.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_a_main_end_of_tape_cadence(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mock_cadence = mocker.patch('vcrtool.capture_stereo.end_of_tape_cadence')
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    poller = poller_for(mock_vcr)
+    mock_add_cadence = mocker.patch.object(poller, 'add_cadence')
+    mocker.patch('vcrtool.capture_stereo._set_input_and_play', return_value=0)
+    assert await _a_main(video_device='video_device',
+                         audio_device='audio_device',
+                         length=3600,
+                         output='output',
+                         input_index=1,
+                         vbi_device=None,
+                         vcr=mock_vcr) == 0
+    mock_cadence.assert_called_once_with(3600)
+    mock_add_cadence.assert_called_once_with(mock_cadence.return_value)
+    mock_add_cadence.return_value.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_a_main_threads(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mock_proc = AsyncMock()
+    mock_proc.returncode = 0
+    mock_proc.wait = AsyncMock(return_value=0)
+    mock_exec = mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                             return_value=mock_proc)
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    result = await _a_main(video_device='video_device',
+                           audio_device='audio_device',
+                           length=10,
+                           output='output',
+                           input_index=1,
+                           vbi_device=None,
+                           vcr=mock_vcr,
+                           threads=3)
+    assert result == 0
+    ffmpeg_args = mock_exec.call_args_list[0].args
+    assert ffmpeg_args[ffmpeg_args.index('-threads') + 1] == '3'
+    assert ffmpeg_args[ffmpeg_args.index('-x265-params') + 1] == 'lossless=1:pools=3'
+
+
+@pytest.mark.asyncio
+async def test_a_main_encoder(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mocker.patch('vcrtool.encoders.available_cores', return_value=2)
+    mock_proc = AsyncMock()
+    mock_proc.returncode = 0
+    mock_proc.wait = AsyncMock(return_value=0)
+    mock_exec = mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                             return_value=mock_proc)
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    result = await _a_main(video_device='video_device',
+                           audio_device='audio_device',
+                           length=10,
+                           output='output',
+                           input_index=1,
+                           vbi_device=None,
+                           vcr=mock_vcr,
+                           encoder='auto')
+    assert result == 0
+    ffmpeg_args = mock_exec.call_args_list[0].args
+    assert ffmpeg_args[ffmpeg_args.index('-c:v') + 1] == 'ffv1'
+    assert 'libx265' not in ffmpeg_args
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('abort_when_behind', [False, True])
+async def test_a_main_monitors_progress(mocker: MockerFixture, *, abort_when_behind: bool) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.end_of_tape_cadence', return_value=lambda _: None)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mock_v4l2_ctl_proc = AsyncMock()
+    mock_v4l2_ctl_proc.returncode = 0
+    ffmpeg_proc = _ffmpeg_proc_exiting_on_terminate(255)
+    if not abort_when_behind:
+        ffmpeg_proc.wait = AsyncMock(return_value=0)
+    ffmpeg_proc.stdout = _progress(drop_frames=100)
+    mock_exec = mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                             side_effect=[ffmpeg_proc, mock_v4l2_ctl_proc])
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    coro = _a_main(video_device='video_device',
+                   audio_device='audio_device',
+                   length=10,
+                   output='output',
+                   input_index=1,
+                   vbi_device=None,
+                   vcr=mock_vcr,
+                   abort_when_behind=abort_when_behind)
+    if abort_when_behind:
+        with pytest.raises(CaptureFellBehindError, match='100 frames dropped'):
+            await coro
+        ffmpeg_proc.terminate.assert_called_once_with()
+    else:
+        assert await coro == 0
+        ffmpeg_proc.terminate.assert_not_called()
+    ffmpeg_args = mock_exec.call_args_list[0].args
+    assert ffmpeg_args[ffmpeg_args.index('-progress') + 1] == 'pipe:1'
+
+
+@pytest.mark.asyncio
+async def test_a_main_intermediate(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mock_proc = MagicMock()
+    mock_proc.returncode = 0
+    mock_proc.wait = AsyncMock(return_value=0)
+    mock_exec = mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                             return_value=mock_proc)
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    result = await _a_main(video_device='video_device',
+                           audio_device='audio_device',
+                           length=10,
+                           output='tape.mkv',
+                           input_index=1,
+                           vbi_device='vbi_device',
+                           vcr=mock_vcr,
+                           intermediate='raw')
+    assert result == 0
+    ffmpeg_args = mock_exec.call_args_list[0].args
+    assert ffmpeg_args[ffmpeg_args.index('-c:v') + 1] == 'rawvideo'
+    assert ffmpeg_args[-1] == 'tape.intermediate.mkv'
+    assert mock_exec.call_args_list[0].kwargs['env'] == {'FFREPORT': 'file=tape.log:level=40'}
+    vbi_args = mock_exec.call_args_list[1].args
+    assert vbi_args[vbi_args.index('-o') + 1] == 'tape.vbi'
+
+
 @pytest.mark.asyncio
 async def test_a_main_vbi_device(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', side_effect=[False, True])
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_v4l2_ctl_proc = AsyncMock()
@@ -74,7 +241,7 @@ async def test_a_main_vbi_device(mocker: MockerFixture) -> None:
     mock_vbi_proc.wait = AsyncMock(return_value=0)
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_vbi_proc, mock_v4l2_ctl_proc])
-    mock_vcr = MagicMock()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
     mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
     result = await _a_main(video_device='video_device',
                            audio_device='audio_device',
@@ -88,24 +255,103 @@ async def test_a_main_vbi_device(mocker: MockerFixture) -> None:
     mock_vbi_proc.terminate.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_a_main_metrics(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.end_of_tape_cadence', return_value=lambda _: None)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mock_v4l2_ctl_proc = AsyncMock()
+    mock_v4l2_ctl_proc.returncode = 0
+    mock_ffmpeg_proc = MagicMock()
+    mock_ffmpeg_proc.wait = AsyncMock(return_value=0)
+    mock_ffmpeg_proc.stdout = _progress(drop_frames=0)
+    mock_vbi_proc = MagicMock()
+    mock_vbi_proc.wait = AsyncMock(return_value=0)
+    mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                 side_effect=[mock_ffmpeg_proc, mock_vbi_proc, mock_v4l2_ctl_proc])
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    metrics = MagicMock()
+    result = await _a_main(video_device='video_device',
+                           audio_device='audio_device',
+                           length=10,
+                           output='output.mkv',
+                           input_index=1,
+                           vbi_device='vbi_device',
+                           vcr=mock_vcr,
+                           metrics=metrics)
+    assert result == 0
+    metrics.observe_progress.assert_called_once_with('output.mkv', mocker.ANY)
+    assert metrics.observe_progress.call_args.args[1].frame == 300
+    metrics.track_file.assert_called_once_with('output.mkv', 'zvbi2raw', 'output.vbi')
+    metrics.track_file.return_value.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_a_main_segments(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.end_of_tape_cadence', return_value=lambda _: None)
+    mocker.patch('vcrtool.capture_stereo._tape_position', return_value=160.0)
+    mock_v4l2_ctl_proc = AsyncMock()
+    mock_v4l2_ctl_proc.returncode = 0
+    mock_ffmpeg_proc = MagicMock()
+    mock_ffmpeg_proc.wait = AsyncMock(return_value=0)
+    mock_ffmpeg_proc.stdout = _progress(drop_frames=0)
+    mock_vbi_proc = MagicMock()
+    mock_vbi_proc.wait = AsyncMock(return_value=0)
+    mock_exec = mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                             side_effect=[mock_ffmpeg_proc, mock_vbi_proc, mock_v4l2_ctl_proc])
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    segments = SegmentedOutput(tmp_path / 'output.mkv', 60)
+    result = await _a_main(video_device='video_device',
+                           audio_device='audio_device',
+                           length=400,
+                           output=str(tmp_path / 'output.mkv'),
+                           input_index=1,
+                           vbi_device='vbi_device',
+                           vcr=mock_vcr,
+                           segments=segments,
+                           resume_at=100.0)
+    assert result == 0
+    ffmpeg_args = mock_exec.call_args_list[0].args
+    assert ffmpeg_args[ffmpeg_args.index('-t') + 1] == '315'
+    assert ffmpeg_args[-len(segments.ffmpeg_args(segments.runs[0])):] == segments.ffmpeg_args(
+        segments.runs[0])
+    vbi_args = mock_exec.call_args_list[1].args
+    assert vbi_args[vbi_args.index('-o') + 1] == str(segments.vbi_path(segments.runs[0]))
+    assert segments.runs[0].offset == pytest.approx(160.0)
+    mock_vcr.reset_counter.assert_not_called()
+    mock_vcr.play.assert_called_once_with()
+
+
+def test_tape_position(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.monotonic', return_value=12.5)
+    poller = DeckStatePoller(MagicMock())
+    assert _tape_position(poller) is None
+    poller.state = MagicMock(vtr_mode=VTRMode.PLAY_FWD, hour=0, minute=1, second=40, frame=0)
+    poller.state.framerate = 30
+    poller.updated_at = 12.0
+    poller.previous_state = MagicMock(vtr_mode=VTRMode.STOP)
+    assert _tape_position(poller) is None
+    poller.previous_state = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    assert _tape_position(poller) == pytest.approx(100.5)
+
+
 @pytest.mark.asyncio
 async def test_a_main_vcr_not_playing(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', side_effect=[True, False])
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_v4l2_ctl_proc = AsyncMock()
     mock_v4l2_ctl_proc.pid = 1234
     mock_v4l2_ctl_proc.returncode = 0
     mock_v4l2_ctl_proc.wait = AsyncMock(return_value=0)
-    mock_ffmpeg_proc = AsyncMock()
-    mock_ffmpeg_proc.pid = 1234
-    mock_ffmpeg_proc.terminate = MagicMock()
-    mock_ffmpeg_proc.wait = AsyncMock(return_value=0)
+    mock_ffmpeg_proc = _ffmpeg_proc_exiting_on_terminate()
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_v4l2_ctl_proc])
-    mock_vcr = MagicMock()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
     mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.STOP)
     result = await _a_main(video_device='video_device',
                            audio_device='audio_device',
@@ -122,7 +368,6 @@ async def test_a_main_vcr_not_playing(mocker: MockerFixture) -> None:
 async def test_a_main_ffmpeg_error(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', side_effect=[True, False])
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_v4l2_ctl_proc = AsyncMock()
@@ -134,7 +379,7 @@ async def test_a_main_ffmpeg_error(mocker: MockerFixture) -> None:
     mock_ffmpeg_proc.wait = AsyncMock(return_value=1)
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_v4l2_ctl_proc])
-    mock_vcr = MagicMock()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
     mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
     result = await _a_main(video_device='video_device',
                            audio_device='audio_device',
@@ -150,7 +395,6 @@ async def test_a_main_ffmpeg_error(mocker: MockerFixture) -> None:
 async def test_a_main_change_input_proc_error(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', return_value=False)
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_ffmpeg_proc = AsyncMock()
@@ -162,7 +406,7 @@ async def test_a_main_change_input_proc_error(mocker: MockerFixture) -> None:
     mock_change_input_proc.wait = AsyncMock(return_value=1)
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_change_input_proc])
-    mock_vcr = MagicMock()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
     mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
     with pytest.raises(click.Abort):
         await _a_main(video_device='video_device',
@@ -182,33 +426,73 @@ async def test_a_main_change_input_proc_error(mocker: MockerFixture) -> None:
 async def test_a_main_keyboard_interrupt(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', side_effect=[True])
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_v4l2_ctl_proc = AsyncMock()
     mock_v4l2_ctl_proc.pid = 1234
     mock_v4l2_ctl_proc.returncode = 0
     mock_v4l2_ctl_proc.wait = AsyncMock(return_value=0)
-    mock_ffmpeg_proc = AsyncMock()
-    mock_ffmpeg_proc.pid = 1234
-    mock_ffmpeg_proc.terminate = MagicMock()
-    mock_ffmpeg_proc.wait = AsyncMock(return_value=0)
+    mock_ffmpeg_proc = _ffmpeg_proc_exiting_on_terminate(255)
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_v4l2_ctl_proc])
-    mock_vcr = MagicMock()
-    mock_vcr.get_vtr_mode.side_effect = KeyboardInterrupt  # Simulate KeyboardInterrupt
-    mock_vcr.reset_counter = MagicMock()
-    mock_vcr.play = MagicMock()
-    result = await _a_main(video_device='video_device',
-                           audio_device='audio_device',
-                           length=10,
-                           output='output',
-                           input_index=1,
-                           vbi_device=None,
-                           vcr=mock_vcr)
-    assert result == 0
-    mock_vcr.reset_counter.assert_called_once()
-    mock_vcr.play.assert_called_once()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
+    task = asyncio.create_task(
+        _a_main(video_device='video_device',
+                audio_device='audio_device',
+                length=10,
+                output='output',
+                input_index=1,
+                vbi_device=None,
+                vcr=mock_vcr,
+                poll_interval=0.001))
+    while not mock_vcr.get_vtr_mode.called:  # ruff:ignore[async-busy-wait]
+        await asyncio.sleep(0.001)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    mock_vcr.reset_counter.assert_awaited_once()
+    mock_vcr.play.assert_awaited_once()
+    mock_ffmpeg_proc.terminate.assert_called_once()
+    mock_ffmpeg_proc.wait.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_a_main_vcr_poll_error(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.Path.unlink')
+    mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
+    mock_v4l2_ctl_proc = AsyncMock()
+    mock_v4l2_ctl_proc.pid = 1234
+    mock_v4l2_ctl_proc.returncode = 0
+    mock_v4l2_ctl_proc.wait = AsyncMock(return_value=0)
+    mock_ffmpeg_proc = _ffmpeg_proc_exiting_on_terminate()
+    mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
+                 side_effect=[mock_ffmpeg_proc, mock_v4l2_ctl_proc])
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.side_effect = TimeoutError
+    with pytest.raises(TimeoutError):
+        await _a_main(video_device='video_device',
+                      audio_device='audio_device',
+                      length=10,
+                      output='output',
+                      input_index=1,
+                      vbi_device=None,
+                      vcr=mock_vcr)
+    mock_ffmpeg_proc.terminate.assert_called_once()
+    mock_ffmpeg_proc.wait.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_vcr_stop() -> None:
+    mock_ffmpeg_proc = MagicMock()
+    mock_poller = MagicMock()
+    mock_poller.wait_for = AsyncMock(return_value=MagicMock(vtr_mode=VTRMode.STOP))
+    await _wait_for_vcr_stop(mock_poller, mock_ffmpeg_proc)
+    predicate = mock_poller.wait_for.await_args.args[0]
+    assert predicate(MagicMock(vtr_mode=VTRMode.STOP))
+    assert not predicate(MagicMock(vtr_mode=VTRMode.PLAY_FWD))
     mock_ffmpeg_proc.terminate.assert_called_once()
 
 
@@ -216,7 +500,6 @@ async def test_a_main_keyboard_interrupt(mocker: MockerFixture) -> None:
 async def test_a_main_vbi_proc_terminate_error(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec', new_callable=AsyncMock)
     mocker.patch('vcrtool.capture_stereo.adebug_sleep', new_callable=AsyncMock)
-    mocker.patch('vcrtool.capture_stereo.psutil.pid_exists', side_effect=[True, False])
     mocker.patch('vcrtool.capture_stereo.Path.unlink')
     mocker.patch('vcrtool.capture_stereo.Path.stem', return_value='output_base')
     mock_v4l2_ctl_proc = AsyncMock()
@@ -230,7 +513,7 @@ async def test_a_main_vbi_proc_terminate_error(mocker: MockerFixture) -> None:
     mock_vbi_proc.terminate = MagicMock(side_effect=ProcessLookupError)
     mocker.patch('vcrtool.capture_stereo.adebug_create_subprocess_exec',
                  side_effect=[mock_ffmpeg_proc, mock_vbi_proc, mock_v4l2_ctl_proc])
-    mock_vcr = MagicMock()
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
     mock_vcr.get_vtr_mode.return_value = MagicMock(vtr_mode=VTRMode.PLAY_FWD)
     result = await _a_main(video_device='video_device',
                            audio_device='audio_device',
@@ -248,7 +531,25 @@ async def test_a_main_vbi_proc_terminate_error(mocker: MockerFixture) -> None:
     (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', 'output'], 0),
     (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-t', 'invalid', 'output'], 1),
     (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-b', 'vbi_device', 'output'], 0),
-    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-i', '3', 'output'], 0)
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-i', '3', 'output'], 0),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-e', 'ffv1', 'output'], 0),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-e', 'h266', 'output'], 2),
+    ([
+        '-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-I', 'ffv1', '-w', '4',
+        'output'
+    ], 0),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-I', 'x265-lossless', 'output'
+      ], 2),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-w', '0', 'output'], 2),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-R', '2', 'output'], 0),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-R', '-1', 'output'], 2),
+    ([
+        '-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-m', '9100', '-M',
+        'vcrtool.prom', 'output'
+    ], 0),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-m', '70000', 'output'], 2),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-S', '60', 'output'], 0),
+    (['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '-S', '0.5', 'output'], 2),
 ])
 def test_main_success(mocker: MockerFixture, runner: CliRunner, args: list[str],
                       expected_exit_code: int) -> None:
@@ -258,38 +559,343 @@ def test_main_success(mocker: MockerFixture, runner: CliRunner, args: list[str],
     mocker.patch('vcrtool.capture_stereo.sp.run')
     mocker.patch('vcrtool.capture_stereo.debug_sleep')
     mocker.patch('vcrtool.capture_stereo.shutil.which', return_value='/usr/bin/wpctl')
-    mock_vcr = mocker.patch('vcrtool.capture_stereo.JLIPTransport')
-    mock_vcr_instance = mock_vcr.return_value
-    mock_vcr_instance.get_vtr_mode.return_value = MagicMock(tape_inserted=True)
-    mock_vcr_instance.rewind_wait = MagicMock()
-    mock_vcr_instance.turn_on = MagicMock()
-    mocker.patch('vcrtool.capture_stereo.asyncio.run', side_effect=_close_coroutine(0))
+    mock_run = mocker.patch('vcrtool.capture_stereo.asyncio.run', side_effect=_close_coroutine(0))
 
     result = runner.invoke(main, args)
 
     assert result.exit_code == expected_exit_code
     if expected_exit_code == 0:
-        mock_vcr_instance.turn_on.assert_called_once()
-        mock_vcr_instance.rewind_wait.assert_called()
+        mock_run.assert_called_once()
 
 
-def test_main_no_tape_inserted(mocker: MockerFixture, runner: CliRunner) -> None:
+def test_main_resume_segment_length(mocker: MockerFixture, runner: CliRunner) -> None:
     mocker.patch('vcrtool.capture_stereo.get_pipewire_audio_device_node_id',
                  return_value=('audio_device_name', 'audio_node_id'))
     mocker.patch('vcrtool.capture_stereo.audio_device_is_available', return_value=True)
     mocker.patch('vcrtool.capture_stereo.sp.run')
     mocker.patch('vcrtool.capture_stereo.debug_sleep')
     mocker.patch('vcrtool.capture_stereo.shutil.which', return_value='/usr/bin/wpctl')
-    mock_vcr = mocker.patch('vcrtool.capture_stereo.JLIPTransport')
-    mock_vcr_instance = mock_vcr.return_value
-    mock_vcr_instance.get_vtr_mode.return_value = MagicMock(tape_inserted=False)
-    mock_vcr_instance.turn_on = MagicMock()
+    mocker.patch('vcrtool.capture_stereo.asyncio.run', return_value=0)
+    mock_a_capture = mocker.patch('vcrtool.capture_stereo._a_capture', new=MagicMock())
+    result = runner.invoke(
+        main, ['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', '--resume', 'output'])
+    assert result.exit_code == 0
+    assert mock_a_capture.call_args.kwargs['segment_length'] == pytest.approx(
+        DEFAULT_SEGMENT_LENGTH)
+    assert mock_a_capture.call_args.kwargs['resume']
+
+
+def test_main_keyboard_interrupt(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('vcrtool.capture_stereo.get_pipewire_audio_device_node_id',
+                 return_value=('audio_device_name', 'audio_node_id'))
+    mocker.patch('vcrtool.capture_stereo.audio_device_is_available', return_value=True)
+    mock_sp_run = mocker.patch('vcrtool.capture_stereo.sp.run')
+    mocker.patch('vcrtool.capture_stereo.debug_sleep')
+    mocker.patch('vcrtool.capture_stereo.shutil.which', return_value='/usr/bin/wpctl')
+
+    def _interrupt(coro: object) -> int:
+        cast('Any', coro).close()
+        raise KeyboardInterrupt
+
+    mocker.patch('vcrtool.capture_stereo.asyncio.run', side_effect=_interrupt)
 
     result = runner.invoke(main,
                            ['-a', 'audio_device', '-v', 'video_device', '-s', 'serial', 'output'])
 
-    assert result.exit_code == 1
-    mock_vcr_instance.turn_on.assert_called_once()
+    assert result.exit_code == 0
+    mock_sp_run.assert_any_call(('/usr/bin/wpctl', 'set-profile', 'audio_node_id', '1'), check=True)
+
+
+@pytest.mark.asyncio
+async def test_prepare_vcr(mocker: MockerFixture) -> None:
+    mock_rewind_wait = mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(tape_inserted=True)
+    await _prepare_vcr(mock_vcr)
+    mock_vcr.turn_on.assert_awaited_once()
+    mock_rewind_wait.assert_awaited_once_with(mock_vcr)
+
+
+@pytest.mark.asyncio
+async def test_prepare_vcr_no_tape_inserted(mocker: MockerFixture) -> None:
+    mock_rewind_wait = mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_vcr = MagicMock(spec=AsyncJLIPTransport)
+    mock_vcr.get_vtr_mode.return_value = MagicMock(tape_inserted=False)
+    with pytest.raises(click.Abort):
+        await _prepare_vcr(mock_vcr)
+    mock_vcr.turn_on.assert_awaited_once()
+    mock_rewind_wait.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('interrupted', [False, True])
+async def test_a_capture(mocker: MockerFixture, *, interrupted: bool) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mock_prepare = mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mock_rewind_wait = mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_a_main = mocker.patch(
+        'vcrtool.capture_stereo._a_main',
+        AsyncMock(side_effect=asyncio.CancelledError if interrupted else None, return_value=1))
+    ret = await _a_capture('serial',
+                           'video_device',
+                           'audio_device',
+                           10,
+                           'output',
+                           2,
+                           None,
+                           poll_interval=0.5)
+    assert ret == (0 if interrupted else 1)
+    mock_transport.assert_called_once_with('serial', recorder=None, metrics=None)
+    assert poller_for(mock_transport.return_value).poll_interval == pytest.approx(0.5)
+    mock_prepare.assert_awaited_once_with(mock_transport.return_value)
+    mock_a_main.assert_awaited_once()
+    mock_rewind_wait.assert_awaited_once_with(mock_transport.return_value)
+
+
+@pytest.mark.asyncio
+async def test_a_capture_records_jlip(mocker: MockerFixture) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mock_recorder = mocker.patch('vcrtool.capture_stereo.TrafficRecorder')
+    mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait',
+                 new_callable=AsyncMock,
+                 side_effect=OSError('rewind'))
+    mocker.patch('vcrtool.capture_stereo._a_main', new_callable=AsyncMock, return_value=0)
+    with pytest.raises(OSError, match='rewind'):
+        await _a_capture('serial',
+                         'video_device',
+                         'audio_device',
+                         10,
+                         'output',
+                         2,
+                         None,
+                         record_jlip='traffic.bin')
+    mock_recorder.assert_called_once_with('traffic.bin')
+    mock_transport.assert_called_once_with('serial',
+                                           recorder=mock_recorder.return_value,
+                                           metrics=None)
+    mock_recorder.return_value.close.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_a_capture_metrics(mocker: MockerFixture, tmp_path: Path) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_a_main = mocker.patch('vcrtool.capture_stereo._a_main',
+                               new_callable=AsyncMock,
+                               return_value=0)
+    textfile = tmp_path / 'vcrtool.prom'
+    assert await _a_capture('serial',
+                            'video_device',
+                            'audio_device',
+                            10,
+                            'output',
+                            2,
+                            None,
+                            metrics_textfile=str(textfile)) == 0
+    metrics = mock_transport.call_args.kwargs['metrics']
+    assert isinstance(metrics, CaptureMetrics)
+    assert mock_a_main.call_args.kwargs['metrics'] is metrics
+    assert '# TYPE vcrtool_jlip_commands_total counter' in textfile.read_text(encoding='utf-8')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(('error', 'expected'), [(None, 0), (TranscodeError('bad'), 1)])
+async def test_a_capture_intermediate(mocker: MockerFixture, error: Exception | None,
+                                      expected: int) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mock_rewind_wait = mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_a_main = mocker.patch('vcrtool.capture_stereo._a_main',
+                               new_callable=AsyncMock,
+                               return_value=0)
+    mock_transcode = mocker.patch('vcrtool.capture_stereo.transcode',
+                                  new_callable=AsyncMock,
+                                  side_effect=error)
+    ret = await _a_capture('serial',
+                           'video_device',
+                           'audio_device',
+                           10,
+                           'tape.mkv',
+                           2,
+                           None,
+                           encoder='x264-lossless',
+                           intermediate='ffv1',
+                           transcode_workers=3)
+    assert ret == expected
+    assert mock_a_main.call_args.kwargs['intermediate'] == 'ffv1'
+    mock_transcode.assert_awaited_once_with(TranscodeJob(Path('tape.intermediate.mkv'),
+                                                         Path('tape.mkv'), 'x264-lossless',
+                                                         ('-top', '1', '-aspect', '4/3')),
+                                            workers=3)
+    mock_rewind_wait.assert_awaited_once_with(mock_transport.return_value)
+
+
+@pytest.mark.asyncio
+async def test_a_capture_intermediate_capture_failed(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo._a_main', new_callable=AsyncMock, return_value=1)
+    mock_transcode = mocker.patch('vcrtool.capture_stereo.transcode', new_callable=AsyncMock)
+    ret = await _a_capture('serial',
+                           'video_device',
+                           'audio_device',
+                           10,
+                           'tape.mkv',
+                           2,
+                           None,
+                           intermediate='ffv1')
+    assert ret == 1
+    mock_transcode.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(('intermediate', 'expected'),
+                         [(None, ('x265-lossless', 'ffv1', 'x264-lossless')),
+                          ('ffv1', ('ffv1', 'raw', 'raw'))])
+async def test_a_capture_retries_when_behind(mocker: MockerFixture, intermediate: str | None,
+                                             expected: tuple[str, ...]) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mock_transport.return_value = MagicMock(spec=AsyncJLIPTransport)
+    mock_prepare = mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.transcode', new_callable=AsyncMock)
+    mock_a_main = mocker.patch(
+        'vcrtool.capture_stereo._a_main',
+        new_callable=AsyncMock,
+        side_effect=[CaptureFellBehindError('slow'),
+                     CaptureFellBehindError('slow'), 0])
+    ret = await _a_capture('serial',
+                           'video_device',
+                           'audio_device',
+                           10,
+                           'tape.mkv',
+                           2,
+                           None,
+                           intermediate=intermediate,
+                           retries=2)
+    assert ret == 0
+    assert tuple(call.kwargs['intermediate'] or call.kwargs['encoder']
+                 for call in mock_a_main.call_args_list) == expected
+    assert [call.kwargs['abort_when_behind']
+            for call in mock_a_main.call_args_list] == [True, True, False]
+    assert mock_transport.return_value.stop.await_count == 2
+    assert mock_prepare.await_count == 3
+
+
+def _mock_segments(mocker: MockerFixture, *, positions: list[float | None]) -> MagicMock:
+    mock_segments = mocker.patch('vcrtool.capture_stereo.SegmentedOutput')
+    mock_segments.return_value.resume_position.side_effect = positions
+    mock_segments.return_value.join = AsyncMock()
+    return mock_segments
+
+
+@pytest.mark.asyncio
+async def test_a_capture_resume(mocker: MockerFixture) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mock_transport.return_value = MagicMock(spec=AsyncJLIPTransport)
+    mock_prepare = mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_seek_wait = mocker.patch('vcrtool.capture_stereo.seek_wait', new_callable=AsyncMock)
+    mock_segments = _mock_segments(mocker, positions=[117.0])
+    mock_a_main = mocker.patch('vcrtool.capture_stereo._a_main',
+                               new_callable=AsyncMock,
+                               return_value=0)
+    assert await _a_capture('serial',
+                            'video_device',
+                            'audio_device',
+                            600,
+                            'tape.mkv',
+                            2,
+                            'vbi_device',
+                            segment_length=60,
+                            resume=True) == 0
+    mock_segments.assert_called_once_with('tape.mkv', 60)
+    mock_prepare.assert_awaited_once_with(mock_transport.return_value)
+    mock_transport.return_value.reset_counter.assert_awaited_once_with()
+    mock_seek_wait.assert_awaited_once_with(mock_transport.return_value, 117.0)
+    assert mock_a_main.call_args.kwargs['segments'] is mock_segments.return_value
+    assert mock_a_main.call_args.kwargs['resume_at'] == pytest.approx(117.0)
+    mock_segments.return_value.clear.assert_not_called()
+    mock_segments.return_value.join.assert_awaited_once_with(vbi='tape.vbi')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('position', [50.0, None])
+async def test_a_capture_segments_resume_after_failure(mocker: MockerFixture,
+                                                       position: float | None) -> None:
+    mock_transport = mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mock_transport.return_value = MagicMock(spec=AsyncJLIPTransport)
+    mock_prepare = mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_seek_wait = mocker.patch('vcrtool.capture_stereo.seek_wait', new_callable=AsyncMock)
+    mock_segments = _mock_segments(mocker, positions=[position])
+    mock_a_main = mocker.patch('vcrtool.capture_stereo._a_main',
+                               new_callable=AsyncMock,
+                               side_effect=[OSError('capture device lost'), 0])
+    assert await _a_capture('serial',
+                            'video_device',
+                            'audio_device',
+                            600,
+                            'tape.mkv',
+                            2,
+                            None,
+                            retries=1,
+                            segment_length=60) == 0
+    assert [call.kwargs['resume_at'] for call in mock_a_main.call_args_list] == [None, position]
+    mock_transport.return_value.reset_counter.assert_not_called()
+    mock_transport.return_value.stop.assert_awaited_once_with()
+    assert mock_seek_wait.await_count == (1 if position else 0)
+    assert mock_prepare.await_count == (1 if position else 2)
+    assert mock_segments.return_value.clear.call_count == (1 if position else 2)
+    mock_segments.return_value.join.assert_awaited_once_with(vbi=None)
+
+
+@pytest.mark.asyncio
+async def test_a_capture_segments_last_attempt_fails(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_segments = _mock_segments(mocker, positions=[])
+    mocker.patch('vcrtool.capture_stereo._a_main',
+                 new_callable=AsyncMock,
+                 side_effect=OSError('capture device lost'))
+    with pytest.raises(OSError, match='capture device lost'):
+        await _a_capture('serial',
+                         'video_device',
+                         'audio_device',
+                         600,
+                         'tape.mkv',
+                         2,
+                         None,
+                         segment_length=60)
+    mock_segments.return_value.join.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_a_capture_segments_join_fails(mocker: MockerFixture,
+                                             caplog: pytest.LogCaptureFixture) -> None:
+    mocker.patch('vcrtool.capture_stereo.AsyncJLIPTransport')
+    mocker.patch('vcrtool.capture_stereo._prepare_vcr', new_callable=AsyncMock)
+    mocker.patch('vcrtool.capture_stereo.rewind_wait', new_callable=AsyncMock)
+    mock_segments = _mock_segments(mocker, positions=[])
+    mock_segments.return_value.join.side_effect = SegmentError('No complete segments.')
+    mocker.patch('vcrtool.capture_stereo._a_main', new_callable=AsyncMock, return_value=0)
+    mock_transcode = mocker.patch('vcrtool.capture_stereo.transcode', new_callable=AsyncMock)
+    assert await _a_capture('serial',
+                            'video_device',
+                            'audio_device',
+                            600,
+                            'tape.mkv',
+                            2,
+                            None,
+                            intermediate='ffv1',
+                            segment_length=60) == 1
+    mock_segments.assert_called_once_with(Path('tape.intermediate.mkv'), 60)
+    mock_transcode.assert_not_called()
+    assert 'Joining the segments failed.' in caplog.text
 
 
 def test_main_audio_device_unavailable(mocker: MockerFixture, runner: CliRunner) -> None:
@@ -332,11 +938,6 @@ def test_main_wpctl_resolved_path_used(mocker: MockerFixture, runner: CliRunner)
     mock_sp_run = mocker.patch('vcrtool.capture_stereo.sp.run')
     mocker.patch('vcrtool.capture_stereo.debug_sleep')
     mocker.patch('vcrtool.capture_stereo.shutil.which', return_value='/usr/bin/wpctl')
-    mock_vcr = mocker.patch('vcrtool.capture_stereo.JLIPTransport')
-    mock_vcr_instance = mock_vcr.return_value
-    mock_vcr_instance.get_vtr_mode.return_value = MagicMock(tape_inserted=True)
-    mock_vcr_instance.rewind_wait = MagicMock()
-    mock_vcr_instance.turn_on = MagicMock()
     mocker.patch('vcrtool.capture_stereo.asyncio.run', side_effect=_close_coroutine(0))
 
     result = runner.invoke(main,
@@ -355,11 +956,6 @@ def test_main_recording_failed(mocker: MockerFixture, runner: CliRunner) -> None
     mocker.patch('vcrtool.capture_stereo.sp.run')
     mocker.patch('vcrtool.capture_stereo.debug_sleep')
     mocker.patch('vcrtool.capture_stereo.shutil.which', return_value='/usr/bin/wpctl')
-    mock_vcr = mocker.patch('vcrtool.capture_stereo.JLIPTransport')
-    mock_vcr_instance = mock_vcr.return_value
-    mock_vcr_instance.get_vtr_mode.return_value = MagicMock(tape_inserted=True)
-    mock_vcr_instance.rewind_wait = MagicMock()
-    mock_vcr_instance.turn_on = MagicMock()
     mocker.patch('vcrtool.capture_stereo.asyncio.run', side_effect=_close_coroutine(1))
 
     result = runner.invoke(main,
@@ -367,5 +963,3 @@ def test_main_recording_failed(mocker: MockerFixture, runner: CliRunner) -> None
 
     assert result.exit_code == 1
     assert 'Recording failed.' in result.output
-    mock_vcr_instance.turn_on.assert_called_once()
-    mock_vcr_instance.rewind_wait.assert_called()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import io
+import json
+
+from vcrtool.client import DaemonError, default_socket_path, send_request
+import pytest
+
+if TYPE_CHECKING:
+    from unittest.mock import Mock
+
+    from pytest_mock import MockerFixture
+
+
+def test_default_socket_path_runtime_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1000')
+    assert default_socket_path() == '/run/user/1000/vcrtool-jlip.sock'
+
+
+def test_default_socket_path_temp_dir(monkeypatch: pytest.MonkeyPatch,
+                                      mocker: MockerFixture) -> None:
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    mocker.patch('vcrtool.client.tempfile.gettempdir', return_value='/scratch')
+    mocker.patch('vcrtool.client.os.getuid', return_value=1000)
+    assert default_socket_path() == '/scratch/vcrtool-jlip-1000.sock'
+
+
+def _mock_socket(mocker: MockerFixture, reply: bytes) -> Mock:
+    mock_socket = mocker.patch('vcrtool.client.socket.socket')
+    sock: Mock = mock_socket.return_value.__enter__.return_value
+    sock.makefile.return_value = io.BytesIO(reply)
+    return sock
+
+
+def test_send_request(mocker: MockerFixture) -> None:
+    sock = _mock_socket(mocker, b'{"result": {"vtr_mode": 1}}\n')
+    assert send_request('/s.sock', '/dev/ttyUSB0', 'set-input', 1, 2, timeout=3) == {'vtr_mode': 1}
+    sock.settimeout.assert_called_once_with(3)
+    sock.connect.assert_called_once_with('/s.sock')
+    sent = sock.sendall.call_args.args[0]
+    assert sent.endswith(b'\n')
+    assert json.loads(sent) == {'serial': '/dev/ttyUSB0', 'command': 'set-input', 'args': [1, 2]}
+
+
+def test_send_request_error(mocker: MockerFixture) -> None:
+    _mock_socket(mocker, b'{"error": "Invalid command `x`."}\n')
+    with pytest.raises(DaemonError, match='Invalid command'):
+        send_request('/s.sock', '/dev/ttyUSB0', 'x')
+
+
+def test_send_request_no_answer(mocker: MockerFixture) -> None:
+    _mock_socket(mocker, b'')
+    with pytest.raises(DaemonError, match='without answering'):
+        send_request('/s.sock', '/dev/ttyUSB0', 'nop')
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+import asyncio
+import stat
+
+from vcrtool.client import DaemonError, send_request
+from vcrtool.daemon import JLIPDaemon, main
+from vcrtool.jlip import VTRMode, VTRModeResponse
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from unittest.mock import Mock
+
+    from click.testing import CliRunner
+    from pytest_mock import MockerFixture
+
+STOP_FRAME = bytes((0xFF, 0xFF, 0x01, 0x03, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00))
+
+
+def _daemon(mocker: MockerFixture, socket_path: str = '/s.sock') -> tuple[JLIPDaemon, Mock]:
+    vcr = mocker.Mock()
+    vcr.get_vtr_mode = mocker.AsyncMock(return_value=VTRModeResponse(STOP_FRAME))
+    factory = mocker.Mock(return_value=vcr)
+    return JLIPDaemon(socket_path, factory), factory
+
+
+@pytest.mark.asyncio
+async def test_execute(mocker: MockerFixture) -> None:
+    daemon, factory = _daemon(mocker)
+    response = await daemon.execute({'serial': '/dev/ttyUSB0', 'command': 'get-vtr-mode'})
+    assert response['result']['raw'] == STOP_FRAME.hex()
+    await daemon.execute({'serial': '/dev/ttyUSB0', 'command': 'get-vtr-mode', 'args': []})
+    factory.assert_called_once_with('/dev/ttyUSB0')
+
+
+@pytest.mark.asyncio
+async def test_execute_passes_args(mocker: MockerFixture) -> None:
+    daemon, factory = _daemon(mocker)
+    factory.return_value.set_input = mocker.AsyncMock(return_value=b'\x01')
+    assert await daemon.execute({
+        'serial': '/dev/ttyUSB0',
+        'command': 'set-input',
+        'args': [1, 2]
+    }) == {
+        'result': '01'
+    }
+    factory.return_value.set_input.assert_awaited_once_with(1, 2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('request_', [
+    [],
+    {
+        'command': 'nop'
+    },
+    {
+        'serial': '/dev/ttyUSB0',
+        'command': 'nop',
+        'args': ['1']
+    },
+    {
+        'serial': '/dev/ttyUSB0',
+        'command': 'nop',
+        'args': 1
+    },
+])
+async def test_execute_malformed(mocker: MockerFixture, request_: Any) -> None:
+    daemon, _ = _daemon(mocker)
+    assert await daemon.execute(request_) == {'error': 'Malformed request.'}
+
+
+@pytest.mark.asyncio
+async def test_execute_invalid_command(mocker: MockerFixture) -> None:
+    daemon, factory = _daemon(mocker)
+    assert await daemon.execute({
+        'serial': '/dev/ttyUSB0',
+        'command': '__init__'
+    }) == {
+        'error': 'Invalid command `__init__`.'
+    }
+    factory.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_execute_open_failure(mocker: MockerFixture) -> None:
+    daemon, factory = _daemon(mocker)
+    factory.side_effect = OSError('no such device')
+    response = await daemon.execute({'serial': '/dev/ttyUSB9', 'command': 'nop'})
+    assert response == {'error': 'Cannot open `/dev/ttyUSB9`: no such device'}
+    assert not daemon.transports
+
+
+@pytest.mark.asyncio
+async def test_execute_command_failure(mocker: MockerFixture) -> None:
+    daemon, factory = _daemon(mocker)
+    factory.return_value.nop = mocker.AsyncMock(side_effect=TimeoutError)
+    assert await daemon.execute({
+        'serial': '/dev/ttyUSB0',
+        'command': 'nop'
+    }) == {
+        'error': 'TimeoutError'
+    }
+
+
+@pytest.mark.asyncio
+async def test_serve_roundtrip(mocker: MockerFixture, tmp_path: Path) -> None:
+    socket_path = str(tmp_path / 'd.sock')
+    daemon, factory = _daemon(mocker, socket_path)
+    started = asyncio.Event()
+    task = asyncio.create_task(daemon.serve(started))
+    await started.wait()
+    assert stat.S_IMODE((tmp_path / 'd.sock').stat().st_mode) == 0o600
+    result = await asyncio.to_thread(send_request, socket_path, '/dev/ttyUSB0', 'get-vtr-mode')
+    assert result['vtr_mode'] == VTRMode.STOP
+    with pytest.raises(DaemonError, match='Invalid command'):
+        await asyncio.to_thread(send_request, socket_path, '/dev/ttyUSB0', 'bad')
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(b'not json\n{"serial": "/dev/ttyUSB0", "command": "get-vtr-mode"}\n')
+    assert await reader.readline() == b'{"error": "Malformed request."}\n'
+    assert b'"result"' in await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+    with pytest.raises(RuntimeError, match='already listening'):
+        await JLIPDaemon(socket_path).serve()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not (tmp_path / 'd.sock').exists()
+    factory.return_value.comm.close.assert_called_once_with()
+    assert not daemon.transports
+
+
+def test_main(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_setup_logging = mocker.patch('vcrtool.daemon.setup_logging')
+    mock_daemon = mocker.patch('vcrtool.daemon.JLIPDaemon')
+    mock_run = mocker.patch('vcrtool.daemon.asyncio.run', side_effect=KeyboardInterrupt)
+    result = runner.invoke(main, ['--socket', '/s.sock', '--debug'])
+    assert result.exit_code == 0
+    mock_setup_logging.assert_called_once_with(debug=True, loggers=mocker.ANY)
+    mock_daemon.assert_called_once_with('/s.sock')
+    mock_run.assert_called_once_with(mock_daemon.return_value.serve.return_value)
+
+
+def test_main_already_running(runner: CliRunner, mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.daemon.setup_logging')
+    mocker.patch('vcrtool.daemon.JLIPDaemon')
+    mocker.patch('vcrtool.daemon.asyncio.run', side_effect=RuntimeError('already listening'))
+    result = runner.invoke(main, ['--socket', '/s.sock'])
+    assert result.exit_code != 0
+    assert 'already listening' in result.output
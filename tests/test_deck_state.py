@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+
+from vcrtool.deck_state import (
+    DeckStateChange,
+    DeckStatePoller,
+    counter_seconds,
+    diff_state,
+    eject_wait,
+    end_of_tape_cadence,
+    estimate_seconds_left,
+    eta_cadence,
+    poller_for,
+    rewind_wait,
+    seek_wait,
+)
+from vcrtool.jlip import AsyncJLIPTransport, VTRMode
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from pytest_mock import MockerFixture
+
+
+def _state(mode: VTRMode = VTRMode.PLAY_FWD,
+           counter: tuple[int, int, int, int] = (0, 0, 0, 0),
+           *,
+           tape_inserted: bool = True) -> MagicMock:
+    hour, minute, second, frame = counter
+    return MagicMock(vtr_mode=mode,
+                     hour=hour,
+                     minute=minute,
+                     second=second,
+                     frame=frame,
+                     tape_inserted=tape_inserted)
+
+
+def _vcr_returning(states: Iterable[MagicMock]) -> MagicMock:
+    states = list(states)
+    vcr = MagicMock()
+    vcr.get_vtr_mode.side_effect = lambda **_: states[min(vcr.get_vtr_mode.call_count, len(states))
+                                                      - 1]
+    return vcr
+
+
+def test_diff_state() -> None:
+    assert diff_state(None, _state()) == DeckStateChange.ALL
+    assert diff_state(_state(), _state()) == DeckStateChange.NONE
+    assert diff_state(_state(), _state(counter=(0, 0, 1, 0))) == DeckStateChange.COUNTER
+    assert diff_state(_state(), _state(
+        VTRMode.EJECT, tape_inserted=False)) == DeckStateChange.MODE | DeckStateChange.TAPE
+
+
+@pytest.mark.asyncio
+async def test_poller_backs_off_until_mode_changes(mocker: MockerFixture) -> None:
+    slept_enough = asyncio.Event()
+    mock_sleep = mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+
+    def _sleep(_: float) -> None:
+        if mock_sleep.await_count >= 6:
+            slept_enough.set()
+
+    mock_sleep.side_effect = _sleep
+    vcr = _vcr_returning([*(_state() for _ in range(4)), _state(VTRMode.STOP)])
+    async with DeckStatePoller(vcr, poll_interval=0.1, max_poll_interval=0.3, backoff=2) as poller:
+        state = await poller.wait_for(lambda s: s.vtr_mode == VTRMode.STOP)
+        await slept_enough.wait()
+    assert state.vtr_mode == VTRMode.STOP
+    assert [c.args[0] for c in mock_sleep.await_args_list[:6]] == pytest.approx(
+        [0.1, 0.2, 0.3, 0.3, 0.1, 0.2])
+    vcr.get_vtr_mode.assert_called_with(fast=True)
+    assert not poller.running
+
+
+@pytest.mark.asyncio
+async def test_poller_subscribe(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.deck_state.monotonic', return_value=123.0)
+    states = [_state(), _state(counter=(0, 0, 1, 0)), _state(VTRMode.STOP, (0, 0, 1, 0))]
+    poller = DeckStatePoller(_vcr_returning(states))
+    on_any = MagicMock()
+    on_mode = MagicMock()
+    failing = MagicMock(side_effect=RuntimeError)
+    poller.subscribe(failing)
+    poller.subscribe(on_any)
+    unsubscribe = poller.subscribe(on_mode, DeckStateChange.MODE)
+    await poller.poll()
+    await poller.poll()
+    unsubscribe()
+    unsubscribe()
+    await poller.poll()
+    assert poller.state is states[2]
+    assert poller.updated_at == pytest.approx(123)
+    assert [c.args[2] for c in on_any.call_args_list] == [
+        DeckStateChange.ALL, DeckStateChange.COUNTER, DeckStateChange.MODE
+    ]
+    on_mode.assert_called_once_with(None, states[0], DeckStateChange.ALL)
+    assert failing.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_poller_wait_for_cached_and_fresh(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+    states = [_state(VTRMode.STOP), _state(VTRMode.REW), _state(VTRMode.STOP)]
+    vcr = _vcr_returning(states)
+    poller = DeckStatePoller(vcr)
+    await poller.poll()
+    assert await poller.wait_for(lambda s: s.vtr_mode == VTRMode.STOP) is states[0]
+    assert not poller.running
+    try:
+        assert await poller.wait_for(lambda s: s.vtr_mode == VTRMode.STOP, fresh=True) is states[2]
+    finally:
+        await poller.stop()
+    assert vcr.get_vtr_mode.call_count >= 3
+
+
+@pytest.mark.asyncio
+async def test_poller_wait_for_timeout() -> None:
+    poller = DeckStatePoller(_vcr_returning([_state()]), poll_interval=0.001)
+    try:
+        with pytest.raises(TimeoutError, match=r'within 0\.01 seconds'):
+            await poller.wait_for(lambda s: s.vtr_mode == VTRMode.STOP, timeout=0.01)
+    finally:
+        await poller.stop()
+
+
+@pytest.mark.asyncio
+async def test_poller_error_raised_to_waiters() -> None:
+    vcr = MagicMock()
+    vcr.get_vtr_mode.side_effect = TimeoutError('No response')
+    poller = DeckStatePoller(vcr)
+    with pytest.raises(TimeoutError, match='No response'):
+        await poller.wait_for(lambda s: s.vtr_mode == VTRMode.STOP)
+    assert not poller.running
+    with pytest.raises(TimeoutError, match='No response'):
+        await poller.wait_for(lambda s: s.vtr_mode == VTRMode.STOP)
+    await poller.stop()
+    await poller.stop()
+
+
+@pytest.mark.asyncio
+async def test_poller_async_transport() -> None:
+    vcr = MagicMock(spec=AsyncJLIPTransport)
+    vcr.get_vtr_mode = AsyncMock(return_value=_state(VTRMode.STOP))
+    poller = DeckStatePoller(vcr, fast=False)
+    assert (await poller.poll()).vtr_mode == VTRMode.STOP
+    vcr.get_vtr_mode.assert_awaited_once_with(fast=False)
+
+
+def _counter_state(mode: VTRMode, seconds: int) -> MagicMock:
+    state = _state(mode, (seconds // 3600, seconds // 60 % 60, seconds % 60, 15))
+    state.framerate = 30
+    return state
+
+
+def test_counter_seconds() -> None:
+    assert counter_seconds(_counter_state(VTRMode.REW, 3723)) == pytest.approx(3723.5)
+
+
+@pytest.mark.parametrize(('previous', 'current', 'expected'), [
+    (None, 100, None),
+    (120, 100, 5.025),
+    (100, 120, None),
+    (100, 100, None),
+])
+def test_estimate_seconds_left(previous: int | None, current: int, expected: float | None) -> None:
+    poller = DeckStatePoller(MagicMock())
+    poller.state, poller.updated_at = _counter_state(VTRMode.REW, current), 11.0
+    if previous is not None:
+        poller.previous_state = _counter_state(VTRMode.REW, previous)
+        poller.previous_updated_at = 10.0
+    assert estimate_seconds_left(poller) == (None if expected is None else pytest.approx(expected))
+
+
+@pytest.mark.parametrize(('left', 'expected'), [(None, None), (100.0, 5.0), (4.0, 2.0),
+                                                (0.01, 0.1)])
+def test_eta_cadence(mocker: MockerFixture, left: float | None, expected: float | None) -> None:
+    mocker.patch('vcrtool.deck_state.estimate_seconds_left', return_value=left)
+    assert eta_cadence(max_interval=5)(
+        MagicMock()) == (None if expected is None else pytest.approx(expected))
+
+
+@pytest.mark.parametrize(('previous', 'current', 'expected'), [
+    (None, _counter_state(VTRMode.PLAY_FWD, 3590), None),
+    (_counter_state(VTRMode.STOP, 0), _counter_state(VTRMode.PLAY_FWD, 3590), None),
+    (_counter_state(VTRMode.PLAY_FWD, 3500), _counter_state(VTRMode.PLAY_FWD, 3530), None),
+    (_counter_state(VTRMode.PLAY_FWD, 3560), _counter_state(VTRMode.PLAY_FWD, 3590), 0.25),
+    (_counter_state(VTRMode.PLAY_FWD, 3590), _counter_state(VTRMode.STOP, 3590), None),
+])
+def test_end_of_tape_cadence(previous: MagicMock | None, current: MagicMock,
+                             expected: float | None) -> None:
+    poller = DeckStatePoller(MagicMock(), poll_interval=0.25)
+    poller.previous_state, poller.state = previous, current
+    assert end_of_tape_cadence(3600, window=60)(poller) == expected
+
+
+def test_end_of_tape_cadence_past_end() -> None:
+    poller = DeckStatePoller(MagicMock())
+    poller.previous_state = _counter_state(VTRMode.PLAY_FWD, 3700)
+    poller.state = _counter_state(VTRMode.PLAY_FWD, 3701)
+    assert end_of_tape_cadence(3600, interval=0.5)(poller) == pytest.approx(0.5)
+    assert end_of_tape_cadence(3600)(poller) == poller.poll_interval
+
+
+@pytest.mark.asyncio
+async def test_poller_cadence_overrides_backoff(mocker: MockerFixture) -> None:
+    slept = asyncio.Event()
+    mock_sleep = mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+    mock_sleep.side_effect = lambda _: slept.set()
+    poller = DeckStatePoller(_vcr_returning([_state()]))
+    poller.add_cadence(lambda _: None)
+    poller.add_cadence(lambda _: 3.0)
+    remove = poller.add_cadence(lambda _: 2.0)
+    async with poller:
+        await slept.wait()
+    remove()
+    remove()
+    mock_sleep.assert_awaited_with(2.0)
+
+
+@pytest.mark.asyncio
+async def test_rewind_wait(mocker: MockerFixture) -> None:
+    mock_sleep = mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+    vcr = _vcr_returning([
+        _counter_state(VTRMode.REW, 120),
+        _counter_state(VTRMode.REW, 100),
+        _counter_state(VTRMode.STOP, 0)
+    ])
+    state = await rewind_wait(vcr)
+    assert state.vtr_mode == VTRMode.STOP
+    vcr.stop.assert_called_once_with()
+    vcr.rewind.assert_called_once_with()
+    mock_sleep.assert_any_await(1.0)
+    assert poller_for(vcr).state is state
+    assert not poller_for(vcr).running
+
+
+@pytest.mark.asyncio
+async def test_rewind_wait_timeout_stops_deck() -> None:
+    vcr = _vcr_returning([_state(VTRMode.REW)])
+    with pytest.raises(TimeoutError, match=r'`rewind` within 0\.01 seconds'):
+        await rewind_wait(vcr, timeout=0.01)
+    assert vcr.stop.call_count == 2
+    vcr.rewind.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_rewind_wait_cancelled_stops_deck(caplog: pytest.LogCaptureFixture) -> None:
+    vcr = _vcr_returning([_state(VTRMode.REW)])
+    vcr.stop.side_effect = [None, RuntimeError]
+    task = asyncio.create_task(rewind_wait(vcr))
+    while not vcr.stop.called:  # ruff:ignore[async-busy-wait]
+        await asyncio.sleep(0.001)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert vcr.stop.call_count == 2
+    assert 'Failed to stop the deck.' in caplog.text
+
+
+def _winding_vcr(position: int, winds: Iterable[Iterable[int]]) -> MagicMock:
+    paths = [iter(path) for path in winds]
+    deck = MagicMock(mode=VTRMode.STOP, position=position)
+    vcr = MagicMock()
+
+    def _wind(mode: VTRMode) -> None:
+        deck.mode, deck.path = mode, paths.pop(0)
+
+    def _stop() -> None:
+        deck.mode = VTRMode.STOP
+
+    def _get_vtr_mode(**_: object) -> MagicMock:
+        if deck.mode != VTRMode.STOP:
+            deck.position = next(deck.path, deck.position)
+        return _counter_state(deck.mode, deck.position)
+
+    vcr.get_vtr_mode.side_effect = _get_vtr_mode
+    vcr.fast_forward.side_effect = lambda: _wind(VTRMode.FF)
+    vcr.rewind.side_effect = lambda: _wind(VTRMode.REW)
+    vcr.stop.side_effect = _stop
+    return vcr
+
+
+@pytest.mark.asyncio
+async def test_seek_wait_already_there() -> None:
+    vcr = _winding_vcr(295, [])
+    state = await seek_wait(vcr, 300)
+    assert counter_seconds(state) == pytest.approx(295.5)
+    vcr.fast_forward.assert_not_called()
+    vcr.rewind.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_seek_wait_fast_forwards(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+    vcr = _winding_vcr(0, [[100, 200, 296]])
+    state = await seek_wait(vcr, 300)
+    assert state.vtr_mode == VTRMode.STOP
+    assert counter_seconds(state) == pytest.approx(296.5)
+    vcr.fast_forward.assert_called_once_with()
+    vcr.rewind.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_seek_wait_winds_back_after_overshoot(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+    vcr = _winding_vcr(0, [[200, 350], [320, 294]])
+    state = await seek_wait(vcr, 300)
+    assert counter_seconds(state) == pytest.approx(294.5)
+    vcr.fast_forward.assert_called_once_with()
+    vcr.rewind.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_seek_wait_gives_up(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.deck_state.asyncio.sleep', new_callable=AsyncMock)
+    vcr = _winding_vcr(0, [[350], [250]])
+    with pytest.raises(TimeoutError, match=r'before 300\.0 seconds after 2 attempts'):
+        await seek_wait(vcr, 300, attempts=2)
+    assert vcr.fast_forward.call_count == 1
+    assert vcr.rewind.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_eject_wait_shared_poller(mocker: MockerFixture) -> None:
+    real_sleep = asyncio.sleep
+
+    async def _sleep(_: float) -> None:
+        await real_sleep(0)
+
+    mocker.patch('vcrtool.deck_state.asyncio.sleep', side_effect=_sleep)
+    vcr = MagicMock(spec=AsyncJLIPTransport)
+    vcr.stop = AsyncMock()
+    vcr.eject = AsyncMock()
+    vcr.get_vtr_mode = AsyncMock(side_effect=lambda **_: _state(
+        VTRMode.STOP if vcr.get_vtr_mode.await_count == 1 else VTRMode.EJECT))
+    poller = DeckStatePoller(vcr)
+    await poller.poll()
+    poller.start()
+    try:
+        state = await eject_wait(vcr, poller)
+        assert state.vtr_mode == VTRMode.EJECT
+        assert poller.running
+    finally:
+        await poller.stop()
+    vcr.eject.assert_awaited_once_with()
+
+
+def test_poller_for_is_shared() -> None:
+    vcr = MagicMock(spec=AsyncJLIPTransport)
+    poller = poller_for(vcr, poll_interval=0.5)
+    assert poller_for(vcr, poll_interval=2) is poller
+    assert poller.poll_interval == pytest.approx(0.5)
+    assert poller_for(MagicMock(spec=AsyncJLIPTransport)) is not poller
+
+
+@pytest.mark.asyncio
+async def test_poller_context_is_reference_counted() -> None:
+    poller = DeckStatePoller(_vcr_returning([_state()]))
+    running = []
+    async with poller:
+        async with poller:
+            running.append(poller.running)
+        running.append(poller.running)
+    running.append(poller.running)
+    assert running == [True, True, False]
+    poller.start()
+    async with poller:
+        pass
+    assert poller.running
+    await poller.stop()
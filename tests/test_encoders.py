@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from vcrtool.encoders import (
+    ENCODER_PROFILES,
+    available_cores,
+    cheaper_encoder,
+    pick_encoder,
+    resolve_encoder,
+)
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def test_x265_lossless_args() -> None:
+    profile = ENCODER_PROFILES['x265-lossless']
+    assert profile.video_args(None) == ('-c:v', 'libx265', '-x265-params', 'lossless=1', '-preset',
+                                        'superfast', '-flags', '+ilme+ildct')
+    assert profile.video_args(3) == ('-c:v', 'libx265', '-threads', '3', '-x265-params',
+                                     'lossless=1:pools=3', '-preset', 'superfast', '-flags',
+                                     '+ilme+ildct')
+
+
+def test_ffv1_args() -> None:
+    assert ENCODER_PROFILES['ffv1'].video_args(2) == ('-c:v', 'ffv1', '-threads', '2', '-level',
+                                                      '3', '-slices', '16', '-slicecrc', '1', '-g',
+                                                      '1')
+
+
+def test_x264_lossless_args() -> None:
+    assert ENCODER_PROFILES['x264-lossless'].video_args(None) == ('-c:v', 'libx264', '-qp', '0',
+                                                                  '-preset', 'ultrafast', '-flags',
+                                                                  '+ilme+ildct')
+
+
+def test_raw_args() -> None:
+    assert ENCODER_PROFILES['raw'].video_args(4) == ('-c:v', 'rawvideo')
+
+
+def test_profiles_are_ordered_by_cost() -> None:
+    costs = [profile.cores for profile in ENCODER_PROFILES.values()]
+    assert costs == sorted(costs, reverse=True)
+
+
+@pytest.mark.parametrize(('cores', 'expected'), [(16, 'x265-lossless'), (4, 'x265-lossless'),
+                                                 (3, 'ffv1'), (1.5, 'x264-lossless'), (1, 'raw'),
+                                                 (0.1, 'raw')])
+def test_pick_encoder(cores: float, expected: str) -> None:
+    assert pick_encoder(cores).name == expected
+
+
+def test_resolve_encoder(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.encoders.available_cores', return_value=2)
+    assert resolve_encoder('raw') is ENCODER_PROFILES['raw']
+    assert resolve_encoder('auto').name == 'ffv1'
+    assert resolve_encoder('auto', 8).name == 'x265-lossless'
+    with pytest.raises(KeyError):
+        resolve_encoder('unknown')
+
+
+@pytest.mark.parametrize(('name', 'names', 'expected'),
+                         [('x265-lossless', ENCODER_PROFILES, 'ffv1'),
+                          ('x264-lossless', ENCODER_PROFILES, 'raw'),
+                          ('raw', ENCODER_PROFILES, 'raw'), ('ffv1', ('ffv1', 'raw'), 'raw')])
+def test_cheaper_encoder(name: str, names: tuple[str, ...], expected: str) -> None:
+    assert cheaper_encoder(name, names) == expected
+
+
+def test_available_cores(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.encoders.os.sched_getaffinity', return_value={0, 1, 2}, create=True)
+    assert available_cores() == 3
+
+
+def test_available_cores_without_affinity(monkeypatch: pytest.MonkeyPatch,
+                                          mocker: MockerFixture) -> None:
+    monkeypatch.delattr('vcrtool.encoders.os.sched_getaffinity', raising=False)
+    mocker.patch('vcrtool.encoders.os.cpu_count', return_value=None)
+    assert available_cores() == 1
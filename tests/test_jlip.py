@@ -1,26 +1,41 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+import dataclasses
+import inspect
+import json
+import os
 import sys
 
+from vcrtool.baud import BAUD_RATES, BaudRateError, BaudRateStore
 from vcrtool.jlip import (
     NTSC_FRAMERATE,
+    AsyncJLIPTransport,
     BandInfo,
     CommandResponse,
     CommandResponseTuple,
     CommandStatus,
     DeviceNameResponse,
+    JLIPCommand,
+    JLIPCommands,
+    JLIPRateLimits,
     JLIPTransport,
     PowerStateResponse,
+    RateLimitExceeded,
     VTRMode,
     VTRModeResponse,
     VTUModeResponse,
+    to_jsonable,
 )
-from vcrtool.sansio import checksum
+from vcrtool.sansio import JLIPCodec, checksum
 import pytest
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
     from pytest_mock import MockerFixture
 
 
@@ -34,44 +49,49 @@ def jlip(mock_serial: MagicMock) -> JLIPTransport:
     return JLIPTransport(serial_path='/dev/ttyS0')
 
 
+@pytest.fixture
+def async_jlip(mock_serial: MagicMock) -> AsyncJLIPTransport:
+    return AsyncJLIPTransport(serial_path='/dev/ttyS0')
+
+
 def test_eject(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.eject, 'response_type', mock_response)
     response = jlip.eject()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x41, 0x60)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x41, 0x60))
 
 
 def test_get_power_state(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.PowerStateResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_power_state, 'response_type', mock_response)
     response = jlip.get_power_state()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x3E, 0x4E, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x3E, 0x4E, 0x20))
 
 
 def test_get_device_name(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.DeviceNameResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_device_name, 'response_type', mock_response)
     response = jlip.get_device_name()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x7C, 0x4C)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x7C, 0x4C))
 
 
 def test_get_vtr_mode(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.VTRModeResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_vtr_mode, 'response_type', mock_response)
     response = jlip.get_vtr_mode()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x4E, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x4E, 0x20))
 
 
 def test_set_jlip_id_invalid(jlip: MagicMock) -> None:
@@ -80,123 +100,124 @@ def test_set_jlip_id_invalid(jlip: MagicMock) -> None:
 
 
 def test_set_jlip_id_valid(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.set_jlip_id, 'response_type', mock_response)
     response = jlip.set_jlip_id(10)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x7C, 0x41, 10)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(10, 0x7C, 0x41, 10))
 
 
 def test_turn_on(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.turn_on, 'response_type', mock_response)
     response = jlip.turn_on()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x3E, 0x40, 0x70)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x3E, 0x40, 0x70))
 
 
 def test_turn_off(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.turn_off, 'response_type', mock_response)
     response = jlip.turn_off()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x3E, 0x40, 0x60)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x3E, 0x40, 0x60))
 
 
 def test_fast_forward(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.fast_forward, 'response_type', mock_response)
     response = jlip.fast_forward()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x44, 0x75)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x44, 0x75))
 
 
 def test_rewind(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.rewind, 'response_type', mock_response)
     response = jlip.rewind()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x44, 0x65)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x44, 0x65))
 
 
 def test_pause(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.pause, 'response_type', mock_response)
     response = jlip.pause()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x43, 0x6d)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x43, 0x6d))
 
 
 def test_play(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.play, 'response_type', mock_response)
     response = jlip.play()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x43, 0x75)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x43, 0x75))
 
 
 def test_record(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.record, 'response_type', mock_response)
     response = jlip.record()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x42, 0x70)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x42, 0x70))
 
 
 def test_stop(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.stop, 'response_type', mock_response)
     response = jlip.stop()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x44, 0x60)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x44, 0x60))
 
 
 def test_set_channel(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.set_channel, 'response_type', mock_response)
     response = jlip.set_channel(5)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0a, 0x44, 0x71, 0, 5, 0x7E)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0a, 0x44, 0x71, 0, 5,
+                                                                    0x7E))
 
 
 def test_set_record_mode(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.set_record_mode, 'response_type', mock_response)
     response = jlip.set_record_mode(3)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x48, 0x43, 3)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x48, 0x43, 3))
 
 
 def test_set_record_speed(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.set_record_speed, 'response_type', mock_response)
     response = jlip.set_record_speed(2)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x48, 0x42, 2)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x48, 0x42, 2))
 
 
 def test_eject_wait(jlip: MagicMock, mocker: MockerFixture) -> None:
@@ -232,83 +253,83 @@ def test_rewind_wait(jlip: MagicMock, mocker: MockerFixture) -> None:
 
 
 def test_fast_play_forward(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.fast_play_forward, 'response_type', mock_response)
     response = jlip.fast_play_forward()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x43, 0x21)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x43, 0x21))
 
 
 def test_fast_play_backward(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.fast_play_backward, 'response_type', mock_response)
     response = jlip.fast_play_backward()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x43, 0x25)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x43, 0x25))
 
 
 def test_frame_step(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.frame_step, 'response_type', mock_response)
     response = jlip.frame_step()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x48, 0x46, 0x75, 0x01)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x48, 0x46, 0x75, 0x01))
 
 
 def test_frame_step_back(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.frame_step_back, 'response_type', mock_response)
     response = jlip.frame_step_back()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x48, 0x46, 0x65, 0x01)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x48, 0x46, 0x65, 0x01))
 
 
 def test_get_baud_rate_supported(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_baud_rate_supported, 'response_type', mock_response)
     response = jlip.get_baud_rate_supported()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x7C, 0x48, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x7C, 0x48, 0x20))
 
 
 def test_get_device_code(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_device_code, 'response_type', mock_response)
     response = jlip.get_device_code()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x7C, 0x49)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x7C, 0x49))
 
 
 def test_get_machine_code(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_machine_code, 'response_type', mock_response)
     response = jlip.get_machine_code()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x7C, 0x45)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x7C, 0x45))
 
 
 def test_get_play_speed(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_play_speed, 'response_type', mock_response)
     response = jlip.get_play_speed()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x48, 0x4E, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x48, 0x4E, 0x20))
 
 
 def test_checksum_valid(mocker: MockerFixture) -> None:
@@ -343,7 +364,7 @@ def test_send_command_base_valid_checksum(jlip: MagicMock, mocker: MockerFixture
     response = jlip.send_command_base(0x01, 0x02, 0x03)
     mock_serial_write.assert_called_once_with(bytearray([255, 255, 1, 1, 2, 3, 0, 0, 0, 0, 124]))
     mock_serial_read.assert_called_once_with(11)
-    mock_checksum.assert_called_with([255, 255, 1, 3, 0, 0, 0, 0, 0, 0])
+    mock_checksum.assert_called_with(mock_serial_read.return_value)
     assert response == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
 
 
@@ -359,7 +380,7 @@ def test_send_command_base_invalid_checksum(jlip: MagicMock, mocker: MockerFixtu
 
     mock_serial_write.assert_called_once_with(bytearray([255, 255, 1, 1, 2, 3, 0, 0, 0, 0, 124]))
     mock_serial_read.assert_called_once_with(11)
-    mock_checksum.assert_called_with([255, 255, 1, 3, 0, 0, 0, 0, 0, 0])
+    mock_checksum.assert_called_with(mock_serial_read.return_value)
 
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
@@ -374,7 +395,7 @@ def test_send_command_base_invalid_status(jlip: MagicMock, mocker: MockerFixture
 
     mock_serial_write.assert_called_once_with(bytearray([255, 255, 1, 1, 2, 3, 0, 0, 0, 0, 124]))
     mock_serial_read.assert_called_once_with(11)
-    mock_checksum.assert_called_with([255, 255, 1, 5, 0, 0, 0, 0, 0, 0])
+    mock_checksum.assert_called_with(mock_serial_read.return_value)
 
 
 def test_send_command_base_status_not_raised(jlip: MagicMock, mocker: MockerFixture) -> None:
@@ -388,142 +409,203 @@ def test_send_command_base_status_not_raised(jlip: MagicMock, mocker: MockerFixt
 
     mock_serial_write.assert_called_once_with(bytearray([255, 255, 1, 1, 2, 3, 0, 0, 0, 0, 124]))
     mock_serial_read.assert_called_once_with(11)
-    mock_checksum.assert_called_with([255, 255, 1, 5, 0, 0, 0, 0, 0, 0])
+    mock_checksum.assert_called_with(mock_serial_read.return_value)
     assert response == b'\xFF\xFF\x01\x05\x00\x00\x00\x00\x00\x00\x7C'
 
 
+def test_send_command_base_skips_leading_garbage(jlip: MagicMock, mocker: MockerFixture) -> None:
+    mocker.patch.object(jlip.comm, 'write')
+    mock_serial_read = mocker.patch.object(
+        jlip.comm,
+        'read',
+        side_effect=[b'\x00\x00\xFF\xFF\x01\x03\x00\x00\x00\x00\x00', b'\x00\x7C'])
+    mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+    response = jlip.send_command_base(0x01, 0x02, 0x03)
+    assert mock_serial_read.call_args_list == [mocker.call(11), mocker.call(2)]
+    assert response == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+
+
+def test_send_command_base_timeout(jlip: MagicMock, mocker: MockerFixture) -> None:
+    mocker.patch.object(jlip.comm, 'write')
+    mock_serial_read = mocker.patch.object(jlip.comm, 'read', return_value=b'')
+    mocker.patch('vcrtool.jlip.monotonic', side_effect=[0, 0, 1.5, 2.5])
+    with pytest.raises(TimeoutError, match='No response within 2 seconds'):
+        jlip.send_command_base(0x01, 0x02, 0x03)
+    assert mock_serial_read.call_count == 2
+    assert jlip.comm.timeout == pytest.approx(0.5)
+
+
+def test_send_frame_records(jlip: MagicMock, mocker: MockerFixture) -> None:
+    response = b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+    jlip.recorder = mocker.MagicMock()
+    mocker.patch.object(jlip.comm, 'write')
+    mocker.patch.object(jlip.comm, 'read', return_value=response)
+    mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+    mocker.patch('vcrtool.jlip.monotonic', side_effect=[1, 1, 1.25])
+    jlip.send_frame(b'frame')
+    jlip.recorder.record.assert_called_once_with(b'frame', response, 1, 1.25)
+
+
+def test_send_frame_records_timeout(jlip: MagicMock, mocker: MockerFixture) -> None:
+    jlip.recorder = mocker.MagicMock()
+    mocker.patch.object(jlip.comm, 'write')
+    mocker.patch.object(jlip.comm, 'read', return_value=b'')
+    mocker.patch('vcrtool.jlip.monotonic', side_effect=[0, 0, 1.5, 2.5, 2.5])
+    with pytest.raises(TimeoutError):
+        jlip.send_frame(b'frame')
+    jlip.recorder.record.assert_called_once_with(b'frame', None, 0, 2.5)
+
+
+def test_send_frame_metrics(jlip: MagicMock, mocker: MockerFixture) -> None:
+    response = b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+    jlip.metrics = mocker.MagicMock()
+    mocker.patch.object(jlip.comm, 'write')
+    mocker.patch.object(jlip.comm, 'read', return_value=response)
+    mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+    mocker.patch('vcrtool.jlip.monotonic', side_effect=[1, 1, 1.25])
+    jlip.send_frame(b'frame')
+    jlip.metrics.observe_exchange.assert_called_once_with('/dev/ttyS0', b'frame', response, 1, 1.25)
+
+
+def test_send_command_metrics_rate_limit(mock_serial: MagicMock, mocker: MockerFixture) -> None:
+    metrics = mocker.MagicMock()
+    jlip = JLIPTransport('/dev/ttyS0',
+                         rate_limits=JLIPRateLimits(commands_per_second=1),
+                         wait_for_rate_limit=False,
+                         metrics=metrics)
+    mocker.patch.object(jlip, 'send_command_base', return_value=b'\x00' * 11)
+    jlip.send_command(0x01)
+    with pytest.raises(RateLimitExceeded):
+        jlip.send_command(0x01)
+    assert [call.kwargs['acquired']
+            for call in metrics.observe_rate_limit.call_args_list] == [True, False]
+    assert all(call.args[:2] == ('/dev/ttyS0', 'command')
+               for call in metrics.observe_rate_limit.call_args_list)
+
+
 def test_get_input(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_input, 'response_type', mock_response)
     response = jlip.get_input()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x58, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x58, 0x20))
 
 
 def test_get_tuner_mode(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.VTUModeResponse', mock_response)
+    mocker.patch.object(JLIPCommands.get_tuner_mode, 'response_type', mock_response)
     response = jlip.get_tuner_mode()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x4E, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x4E, 0x20))
 
 
 def test_nop(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.nop, 'response_type', mock_response)
     response = jlip.nop()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x7C, 0x4E, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x7C, 0x4E, 0x20))
 
 
 def test_pause_recording(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.pause_recording, 'response_type', mock_response)
     response = jlip.pause_recording()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x42, 0x6d)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x42, 0x6d))
 
 
 def test_select_band(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.select_band, 'response_type', mock_response)
     response = jlip.select_band(3)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x40, 0x71, 3)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x40, 0x71, 3))
 
 
 def test_select_preset_channel(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.select_preset_channel, 'response_type', mock_response)
     response = jlip.select_preset_channel(1, 2, 3)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x44, 1, 2, 3, 0x7E)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x44, 1, 2, 3, 0x7E))
 
 
 def test_select_real_channel(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.select_real_channel, 'response_type', mock_response)
     response = jlip.select_real_channel(1, 2, 3)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x42, 1, 2, 3, 0x44)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x42, 1, 2, 3, 0x44))
 
 
 def test_slow_play_backward(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.slow_play_backward, 'response_type', mock_response)
     response = jlip.slow_play_backward()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x43, 0x24)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x43, 0x24))
 
 
 def test_slow_play_forward(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.slow_play_forward, 'response_type', mock_response)
     response = jlip.slow_play_forward()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x43, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x43, 0x20))
 
 
 def test_reset_counter(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.reset_counter, 'response_type', mock_response)
     response = jlip.reset_counter()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x48, 0x4D, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x48, 0x4D, 0x20))
 
 
 def test_presence_check(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.presence_check, 'response_type', mock_response)
     response = jlip.presence_check()
     assert response == mock_response
 
-    jlip.send_command.assert_called_once_with(0x7C, 0x4E, 0x20)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x7C, 0x4E, 0x20))
 
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_command_response_tuple_repr() -> None:
-    response_tuple = CommandResponseTuple(jlip_id=1,
-                                          command_status=CommandStatus.COMMAND_ACCEPTED,
-                                          return_data=b'\x01\x02\x03')
+    response_tuple = CommandResponseTuple(b'\xFF\xFF\x01\x03\x01\x02\x03\x00\x00\x00\x7C')
     expected_repr = ('<CommandResponseTuple jlip_id=1, '
                      'command_status=3, '
-                     'return_data=[0x2, 0x3]>')
+                     'return_data=[0x2, 0x3, 0x0, 0x0, 0x0]>')
     assert repr(response_tuple) == expected_repr
 
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_command_response_repr() -> None:
-    response = CommandResponse(checksum=0x7C,
-                               raw=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C',
-                               return_data=b'\x03\x00\x00\x00\x00\x00\x00',
-                               status=CommandStatus.COMMAND_ACCEPTED,
-                               tuple=CommandResponseTuple(
-                                   jlip_id=1,
-                                   command_status=CommandStatus.COMMAND_ACCEPTED,
-                                   return_data=b'\x00\x00\x00\x00\x00\x00'))
+    response = CommandResponse(b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
     expected_repr = ('<CommandResponse checksum=0x7c '
                      'return_data=[0x00, 0x00, 0x00, 0x00, 0x00, 0x00] '
                      'status=3>')
@@ -532,25 +614,7 @@ def test_command_response_repr() -> None:
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_vtr_mode_response_repr() -> None:
-    response = VTRModeResponse(checksum=0x7C,
-                               raw=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C',
-                               return_data=b'\x03\x00\x00\x00\x00\x00\x00',
-                               status=CommandStatus.COMMAND_ACCEPTED,
-                               tuple=CommandResponseTuple(
-                                   jlip_id=1,
-                                   command_status=CommandStatus.COMMAND_ACCEPTED,
-                                   return_data=b'\x00\x00\x00\x00\x00\x00'),
-                               drop_frame_mode_enabled=True,
-                               framerate=30,
-                               hour=1,
-                               minute=2,
-                               second=3,
-                               frame=4,
-                               is_ntsc=True,
-                               is_pal=False,
-                               recordable=True,
-                               tape_inserted=True,
-                               vtr_mode=VTRMode.PLAY_FWD)
+    response = VTRModeResponse(b'\xFF\xFF\x01\x03\x06\x01\x01\x02\x03\x04\x7C')
     expected_repr = ('<VTRModeResponse checksum=0x7c '
                      'counter="01:02:03:000004" '
                      'drop_framerate_mode_enabled=True '
@@ -558,7 +622,7 @@ def test_vtr_mode_response_repr() -> None:
                      'is_ntsc=True '
                      'is_pal=False '
                      'recordable=True '
-                     'return_data=[0x00, 0x00, 0x00, 0x00, 0x00, 0x00] '
+                     'return_data=[0x06, 0x01, 0x01, 0x02, 0x03, 0x04] '
                      'status=3 '
                      'tape_inserted=True '
                      'vtr_mode=6>')
@@ -567,66 +631,91 @@ def test_vtr_mode_response_repr() -> None:
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_vtu_mode_response_repr() -> None:
-    response = VTUModeResponse(checksum=0x7C,
-                               raw=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C',
-                               return_data=b'\x03\x00\x00\x00\x00\x00\x00',
-                               status=CommandStatus.COMMAND_ACCEPTED,
-                               tuple=CommandResponseTuple(
-                                   jlip_id=1,
-                                   command_status=CommandStatus.COMMAND_ACCEPTED,
-                                   return_data=b'\x00\x00\x00\x00\x00\x00'),
-                               band_info=BandInfo.TERRESTRIAL_BROADCAST,
-                               bank_number=None,
-                               channel_number_by_bank=None,
-                               channel_number_non_bank=5,
-                               real_channel=105)
+    response = VTUModeResponse(b'\xFF\xFF\x01\x03\x30\x51\x00\x05\x00\x00\x7C')
     expected_repr = ('<VTUModeResponse band_info=48 '
                      'bank_number=None '
                      'channel_number_by_bank=None '
                      'channel_number_non_bank=5 '
                      'checksum=0x7c '
-                     'real_channel=105 '
-                     'return_data=[0x00, 0x00, 0x00, 0x00, 0x00, 0x00] '
+                     'real_channel=81 '
+                     'return_data=[0x30, 0x51, 0x00, 0x05, 0x00, 0x00] '
                      'status=3>')
     assert repr(response) == expected_repr
 
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_power_state_response_repr() -> None:
-    response = PowerStateResponse(checksum=0x7C,
-                                  raw=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C',
-                                  return_data=b'\x03\x00\x00\x00\x00\x00\x00',
-                                  status=CommandStatus.COMMAND_ACCEPTED,
-                                  tuple=CommandResponseTuple(
-                                      jlip_id=1,
-                                      command_status=CommandStatus.COMMAND_ACCEPTED,
-                                      return_data=b'\x00\x00\x00\x00\x00\x00'),
-                                  is_on=True)
+    response = PowerStateResponse(b'\xFF\xFF\x01\x03\x01\x00\x00\x00\x00\x00\x7C')
     expected_repr = ('<PowerStateResponse checksum=0x7c '
                      'is_on=True '
-                     'return_data=[0x00, 0x00, 0x00, 0x00, 0x00, 0x00] '
+                     'return_data=[0x01, 0x00, 0x00, 0x00, 0x00, 0x00] '
                      'status=3>')
     assert repr(response) == expected_repr
 
 
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_device_name_response_repr() -> None:
-    response = DeviceNameResponse(checksum=0x7C,
-                                  raw=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C',
-                                  return_data=b'\x03\x00\x00\x00\x00\x00\x00',
-                                  status=CommandStatus.COMMAND_ACCEPTED,
-                                  tuple=CommandResponseTuple(
-                                      jlip_id=1,
-                                      command_status=CommandStatus.COMMAND_ACCEPTED,
-                                      return_data=b'\x00\x00\x00\x00\x00\x00'),
-                                  name='TestDevice')
+    response = DeviceNameResponse(b'\xFF\xFF\x01\x03\x54\x65\x73\x74\x44\x65\x7C')
     expected_repr = ('<DeviceNameResponse checksum=0x7c '
-                     'name="TestDevice" '
-                     'return_data=[0x00, 0x00, 0x00, 0x00, 0x00, 0x00] '
+                     'name="TestDe" '
+                     'return_data=[0x54, 0x65, 0x73, 0x74, 0x44, 0x65] '
                      'status=3>')
     assert repr(response) == expected_repr
 
 
+def test_response_is_slotted_and_lazy() -> None:
+    raw_data = b'\xFF\xFF\x01\x03\x06\x01\x01\x02\x03\x04\x7C'
+    response = VTRModeResponse.from_bytes(raw_data)
+    assert not hasattr(response, '__dict__')
+    assert response.raw is raw_data
+    with pytest.raises(AttributeError):
+        response.extra = 1  # type: ignore[attr-defined]
+
+
+def test_response_asdict() -> None:
+    raw_data = b'\xFF\xFF\x01\x03\x06\x01\x01\x02\x03\x04\x7C'
+    assert dataclasses.asdict(VTRModeResponse.from_bytes(raw_data)) == {
+        'checksum': 0x7C,
+        'raw': raw_data,
+        'return_data': b'\x03\x06\x01\x01\x02\x03\x04',
+        'status': CommandStatus.COMMAND_ACCEPTED,
+        'tuple': {
+            'jlip_id': 1,
+            'command_status': CommandStatus.COMMAND_ACCEPTED,
+            'return_data': b'\x06\x01\x01\x02\x03\x04'
+        },
+        'drop_frame_mode_enabled': True,
+        'framerate': NTSC_FRAMERATE,
+        'hour': 1,
+        'minute': 2,
+        'second': 3,
+        'frame': 4,
+        'is_ntsc': True,
+        'is_pal': False,
+        'recordable': True,
+        'tape_inserted': True,
+        'vtr_mode': VTRMode.PLAY_FWD
+    }
+
+
+def test_to_jsonable() -> None:
+    raw_data = b'\xFF\xFF\x01\x03\x06\x01\x01\x02\x03\x04\x7C'
+    value = to_jsonable(VTRModeResponse.from_bytes(raw_data))
+    assert value['raw'] == raw_data.hex()
+    assert value['tuple']['return_data'] == '060101020304'
+    assert value['status'] == CommandStatus.COMMAND_ACCEPTED
+    assert json.loads(json.dumps(value))['hour'] == 1
+    assert to_jsonable(b'\x01\x02') == '0102'
+    assert to_jsonable(None) is None
+
+
+def test_response_eq() -> None:
+    raw_data = b'\xFF\xFF\x01\x03\x01\x00\x00\x00\x00\x00\x7C'
+    assert PowerStateResponse(raw_data) == PowerStateResponse(bytes(raw_data))
+    assert PowerStateResponse(raw_data) != PowerStateResponse(
+        b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
+
+
 @pytest.mark.skipif(sys.version_info < (3, 11), reason='Requires Python 3.11.')
 def test_jlip_repr(mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.jlip.serial.Serial')
@@ -636,72 +725,108 @@ def test_jlip_repr(mocker: MockerFixture) -> None:
 
 
 def test_set_input_valid(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.set_input, 'response_type', mock_response)
     response = jlip.set_input(1, 2)
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x08, 0x59, 1, 2, 0x7F)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x59, 1, 2, 0x7F))
 
 
 def test_preset_channel_up(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.preset_channel_up, 'response_type', mock_response)
     response = jlip.preset_channel_up()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x44, 0x73, 0, 0, 0x7E)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x44, 0x73, 0, 0,
+                                                                    0x7E))
 
 
 def test_preset_channel_down(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.preset_channel_down, 'response_type', mock_response)
     response = jlip.preset_channel_down()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x44, 0x63, 0, 0, 0x7E)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x44, 0x63, 0, 0,
+                                                                    0x7E))
 
 
 def test_real_channel_up(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.real_channel_up, 'response_type', mock_response)
     response = jlip.real_channel_up()
     assert response == mock_response
-    jlip.send_command.assert_called_once_with(0x0A, 0x42, 0x73, 0, 0, 0x44)
+    jlip.send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x0A, 0x42, 0x73, 0, 0,
+                                                                    0x44))
 
 
 def test_real_channel_down(jlip: MagicMock, mocker: MockerFixture) -> None:
-    mocker.patch.object(jlip, 'send_command', return_value=b'\x00' * 11)
+    mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
     mock_response = MagicMock()
     mock_response.from_bytes.return_value = mock_response
-    mocker.patch('vcrtool.jlip.CommandResponse', mock_response)
+    mocker.patch.object(JLIPCommands.real_channel_down, 'response_type', mock_response)
     response = jlip.real_channel_down()
     assert response == mock_response
 
 
 def test_send_command(jlip: MagicMock, mocker: MockerFixture) -> None:
     mocker.patch.object(jlip, 'send_command_base', return_value=b'\x00' * 11)
-    mock_limiter = mocker.patch('vcrtool.jlip.limiter.try_acquire')
+    mock_limiter = mocker.patch.object(jlip.limiter, 'try_acquire', return_value=True)
     response = jlip.send_command(0x01, 0x02, 0x03)
     assert response == b'\x00' * 11
-    mock_limiter.assert_called_once_with('command')
+    mock_limiter.assert_called_once_with('command', blocking=True)
     jlip.send_command_base.assert_called_once_with(0x01, 0x02, 0x03)
 
 
 def test_send_command_fast(jlip: MagicMock, mocker: MockerFixture) -> None:
     mocker.patch.object(jlip, 'send_command_base', return_value=b'\x00' * 11)
-    mock_fast_limiter = mocker.patch('vcrtool.jlip.fast_limiter.try_acquire')
+    mock_fast_limiter = mocker.patch.object(jlip.fast_limiter, 'try_acquire', return_value=True)
     response = jlip.send_command_fast(0x01, 0x02, 0x03)
     assert response == b'\x00' * 11
-    mock_fast_limiter.assert_called_once_with('command_fast')
+    mock_fast_limiter.assert_called_once_with('command_fast', blocking=True)
     jlip.send_command_base.assert_called_once_with(0x01, 0x02, 0x03)
 
 
+def test_send_command_rate_limit_exceeded(mock_serial: MagicMock, mocker: MockerFixture) -> None:
+    jlip = JLIPTransport('/dev/ttyS0',
+                         rate_limits=JLIPRateLimits(commands_per_second=1),
+                         wait_for_rate_limit=False)
+    mocker.patch.object(jlip, 'send_command_base', return_value=b'\x00' * 11)
+    jlip.send_command(0x01)
+    with pytest.raises(RateLimitExceeded):
+        jlip.send_command(0x01)
+
+
+def test_transports_have_independent_limiters(mock_serial: MagicMock,
+                                              mocker: MockerFixture) -> None:
+    first = JLIPTransport('/dev/ttyS0',
+                          rate_limits=JLIPRateLimits(commands_per_second=1),
+                          wait_for_rate_limit=False)
+    second = JLIPTransport('/dev/ttyS1',
+                           rate_limits=JLIPRateLimits(commands_per_second=1),
+                           wait_for_rate_limit=False)
+    mocker.patch.object(first, 'send_command_base', return_value=b'\x00' * 11)
+    mocker.patch.object(second, 'send_command_base', return_value=b'\x00' * 11)
+    first.send_command(0x01)
+    second.send_command(0x01)
+    assert first.limiter is not second.limiter
+
+
+def test_transport_uses_injected_limiters(mock_serial: MagicMock) -> None:
+    limiter = MagicMock()
+    fast_limiter = MagicMock()
+    jlip = JLIPTransport('/dev/ttyS0', limiter=limiter, fast_limiter=fast_limiter)
+    assert jlip.limiter is limiter
+    assert jlip.fast_limiter is fast_limiter
+
+
 def test_command_response_from_bytes(mocker: MockerFixture) -> None:
     raw_data = b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
     response = CommandResponse.from_bytes(raw_data)
@@ -777,3 +902,398 @@ def test_device_name_response_from_bytes() -> None:
     assert response.tuple.command_status == CommandStatus.COMMAND_ACCEPTED
     assert response.tuple.return_data == b'\x54\x65\x73\x74\x44\x65'
     assert response.name == 'TestDe'
+
+
+_ASYNC_WAIT_METHODS = {'eject_wait', 'rewind_wait'}
+_COMMAND_ARGS = {
+    'select_band': (0x30,),
+    'select_preset_channel': (1, 2, 3),
+    'select_real_channel': (1, 2, 3),
+    'set_baud_rate': (0x21,),
+    'set_channel': (4,),
+    'set_input': (1, 2),
+    'set_jlip_id': (5,),
+    'set_record_mode': (1,),
+    'set_record_speed': (1,),
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('name', JLIPCommands.commands())
+async def test_async_commands_match_sync(jlip: JLIPTransport, async_jlip: AsyncJLIPTransport,
+                                         mocker: MockerFixture, name: str) -> None:
+    raw = b'\xFF\xFF\x01\x03\x30\x00\x00\x00\x00\x00\x7C'
+    sync_send = mocker.patch.object(jlip, 'send_frame', return_value=raw)
+    async_send = mocker.patch.object(async_jlip, 'send_frame', AsyncMock(return_value=raw))
+    args = _COMMAND_ARGS.get(name, ())
+    sync_response = getattr(jlip, name)(*args)
+    async_response = await getattr(async_jlip, name)(*args)
+    assert async_send.call_args == sync_send.call_args
+    assert async_response == sync_response
+
+
+@pytest.mark.asyncio
+async def test_async_get_vtr_mode_fast(async_jlip: MagicMock, mocker: MockerFixture) -> None:
+    mocker.patch.object(async_jlip, 'send_frame',
+                        AsyncMock(return_value=b'\xFF\xFF\x01\x03\x06\x00\x00\x00\x00\x00\x7C'))
+    mock_fast_limiter = mocker.patch.object(async_jlip, 'fast_limiter')
+    mock_fast_limiter.try_acquire_async = AsyncMock(return_value=True)
+    mock_limiter = mocker.patch.object(async_jlip, 'limiter')
+    response = await async_jlip.get_vtr_mode(fast=True)
+    assert response.vtr_mode == VTRMode.PLAY_FWD
+    async_jlip.send_frame.assert_awaited_once_with(JLIPCodec.build_command(1, 0x08, 0x4E, 0x20))
+    mock_fast_limiter.try_acquire_async.assert_awaited_once_with('command_fast', blocking=True)
+    mock_limiter.try_acquire_async.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_send_command_base(async_jlip: AsyncJLIPTransport,
+                                       mocker: MockerFixture) -> None:
+    mock_serial_write = mocker.patch.object(async_jlip.comm, 'write')
+    mocker.patch.object(async_jlip.comm,
+                        'read',
+                        return_value=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
+    mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+    response = await async_jlip.send_command_base(0x01, 0x02, 0x03)
+    mock_serial_write.assert_called_once_with(bytearray([255, 255, 1, 1, 2, 3, 0, 0, 0, 0, 124]))
+    assert response == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+
+
+@pytest.mark.asyncio
+async def test_async_send_command_base_waits_for_readable(async_jlip: AsyncJLIPTransport,
+                                                          mocker: MockerFixture) -> None:
+    read_fd, write_fd = os.pipe()
+    try:
+        mocker.patch.object(async_jlip.comm, 'write')
+        mocker.patch.object(async_jlip.comm, 'fileno', return_value=read_fd)
+        mocker.patch.object(async_jlip.comm,
+                            'read',
+                            side_effect=[b'', b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'])
+        mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+        asyncio.get_running_loop().call_soon(os.write, write_fd, b'\x00')
+        response = await async_jlip.send_command_base(0x01, 0x02, 0x03)
+        assert response == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.asyncio
+async def test_async_send_command_base_timeout(async_jlip: AsyncJLIPTransport,
+                                               mocker: MockerFixture) -> None:
+    read_fd, write_fd = os.pipe()
+    try:
+        async_jlip.response_timeout = 0.01
+        mocker.patch.object(async_jlip.comm, 'write')
+        mocker.patch.object(async_jlip.comm, 'fileno', return_value=read_fd)
+        mocker.patch.object(async_jlip.comm, 'read', return_value=b'')
+        with pytest.raises(TimeoutError, match=r'No response within 0\.01 seconds'):
+            await async_jlip.send_command_base(0x01, 0x02, 0x03)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.asyncio
+async def test_async_send_frame_records(async_jlip: AsyncJLIPTransport,
+                                        mocker: MockerFixture) -> None:
+    response = b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+    recorder = async_jlip.recorder = mocker.MagicMock()
+    mocker.patch.object(async_jlip.comm, 'write')
+    mocker.patch.object(async_jlip.comm, 'read', return_value=response)
+    mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+    await async_jlip.send_frame(b'frame')
+    recorder.record.assert_called_once_with(b'frame', response, mocker.ANY, mocker.ANY)
+
+
+@pytest.mark.asyncio
+async def test_async_send_frame_records_timeout(async_jlip: AsyncJLIPTransport,
+                                                mocker: MockerFixture) -> None:
+    read_fd, write_fd = os.pipe()
+    try:
+        async_jlip.response_timeout = 0.01
+        recorder = async_jlip.recorder = mocker.MagicMock()
+        mocker.patch.object(async_jlip.comm, 'write')
+        mocker.patch.object(async_jlip.comm, 'fileno', return_value=read_fd)
+        mocker.patch.object(async_jlip.comm, 'read', return_value=b'')
+        with pytest.raises(TimeoutError):
+            await async_jlip.send_frame(b'frame')
+        recorder.record.assert_called_once_with(b'frame', None, mocker.ANY, mocker.ANY)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.asyncio
+async def test_async_send_frame_metrics(async_jlip: AsyncJLIPTransport,
+                                        mocker: MockerFixture) -> None:
+    response = b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+    metrics = async_jlip.metrics = mocker.MagicMock()
+    mocker.patch.object(async_jlip.comm, 'write')
+    mocker.patch.object(async_jlip.comm, 'read', return_value=response)
+    mocker.patch('vcrtool.sansio.checksum', side_effect=lambda _: 0x7C)
+    await async_jlip.send_frame(b'frame')
+    metrics.observe_exchange.assert_called_once_with('/dev/ttyS0', b'frame', response, mocker.ANY,
+                                                     mocker.ANY)
+
+
+@pytest.mark.asyncio
+async def test_async_send_command_metrics(async_jlip: AsyncJLIPTransport,
+                                          mocker: MockerFixture) -> None:
+    metrics = async_jlip.metrics = mocker.MagicMock()
+    mocker.patch.object(async_jlip, 'send_command_base', AsyncMock(return_value=b'\x00' * 11))
+    mocker.patch.object(async_jlip.fast_limiter, 'try_acquire_async', AsyncMock(return_value=True))
+    await async_jlip.send_command_fast(0x01)
+    metrics.observe_rate_limit.assert_called_once_with('/dev/ttyS0',
+                                                       'command_fast',
+                                                       mocker.ANY,
+                                                       acquired=True)
+
+
+@pytest.mark.asyncio
+async def test_async_send_command(async_jlip: MagicMock, mocker: MockerFixture) -> None:
+    mocker.patch.object(async_jlip, 'send_command_base', AsyncMock(return_value=b'\x00' * 11))
+    mock_limiter = mocker.patch.object(async_jlip.limiter, 'try_acquire_async',
+                                       AsyncMock(return_value=True))
+    await async_jlip.send_command(0x01, 0x02, 0x03)
+    mock_limiter.assert_awaited_once_with('command', blocking=True)
+    async_jlip.send_command_base.assert_awaited_once_with(0x01, 0x02, 0x03)
+
+
+@pytest.mark.asyncio
+async def test_async_send_command_fast(async_jlip: MagicMock, mocker: MockerFixture) -> None:
+    mocker.patch.object(async_jlip, 'send_command_base', AsyncMock(return_value=b'\x00' * 11))
+    mock_limiter = mocker.patch.object(async_jlip.fast_limiter, 'try_acquire_async',
+                                       AsyncMock(return_value=True))
+    await async_jlip.send_command_fast(0x01, 0x02, 0x03)
+    mock_limiter.assert_awaited_once_with('command_fast', blocking=True)
+    async_jlip.send_command_base.assert_awaited_once_with(0x01, 0x02, 0x03)
+
+
+@pytest.mark.asyncio
+async def test_async_send_command_rate_limit_exceeded(mock_serial: MagicMock,
+                                                      mocker: MockerFixture) -> None:
+    async_jlip = AsyncJLIPTransport('/dev/ttyS0',
+                                    rate_limits=JLIPRateLimits(fast_commands_per_second=1),
+                                    wait_for_rate_limit=False)
+    mocker.patch.object(async_jlip, 'send_command_base', AsyncMock(return_value=b'\x00' * 11))
+    await async_jlip.send_command_fast(0x01)
+    with pytest.raises(RateLimitExceeded):
+        await async_jlip.send_command_fast(0x01)
+
+
+@pytest.mark.asyncio
+async def test_async_eject_wait(async_jlip: AsyncJLIPTransport, mocker: MockerFixture) -> None:
+    mock_eject_wait = mocker.patch('vcrtool.deck_state.eject_wait', new_callable=AsyncMock)
+    assert await async_jlip.eject_wait() == mock_eject_wait.return_value
+    mock_eject_wait.assert_awaited_once_with(async_jlip)
+
+
+@pytest.mark.asyncio
+async def test_async_rewind_wait(async_jlip: AsyncJLIPTransport, mocker: MockerFixture) -> None:
+    mock_rewind_wait = mocker.patch('vcrtool.deck_state.rewind_wait', new_callable=AsyncMock)
+    assert await async_jlip.rewind_wait() == mock_rewind_wait.return_value
+    mock_rewind_wait.assert_awaited_once_with(async_jlip)
+
+
+def test_command_signature() -> None:
+    signature = inspect.signature(JLIPTransport.select_preset_channel)
+    assert list(signature.parameters) == ['self', 'n', 'nn', 'nnn', 'fast']
+    assert signature.return_annotation is CommandResponse
+    assert JLIPTransport.get_vtr_mode.__qualname__ == 'JLIPTransport.get_vtr_mode'
+    assert 'VTR mode response.' in (AsyncJLIPTransport.get_vtr_mode.__doc__ or '')
+    assert inspect.iscoroutinefunction(AsyncJLIPTransport.get_vtr_mode)
+    assert isinstance(JLIPCommands.get_vtr_mode, JLIPCommand)
+
+
+def test_command_wrong_argument_count(jlip: JLIPTransport) -> None:
+    with pytest.raises(TypeError, match=r'set_channel\(\) takes 1 arguments but 0 were given\.'):
+        jlip.set_channel()
+
+
+def test_command_fast_override(jlip: JLIPTransport, mocker: MockerFixture) -> None:
+    mock_send_frame = mocker.patch.object(
+        jlip, 'send_frame', return_value=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
+    mock_fast_limiter = mocker.patch.object(jlip, 'fast_limiter')
+    mock_limiter = mocker.patch.object(jlip, 'limiter')
+    jlip.stop(fast=True)
+    mock_send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x08, 0x44, 0x60))
+    mock_fast_limiter.try_acquire.assert_called_once_with('command_fast', blocking=True)
+    mock_limiter.try_acquire.assert_not_called()
+
+
+def test_command_rate_limit_exceeded(mock_serial: MagicMock, mocker: MockerFixture) -> None:
+    jlip = JLIPTransport('/dev/ttyS0',
+                         rate_limits=JLIPRateLimits(commands_per_second=1),
+                         wait_for_rate_limit=False)
+    mock_send_frame = mocker.patch.object(
+        jlip, 'send_frame', return_value=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
+    jlip.stop()
+    with pytest.raises(RateLimitExceeded):
+        jlip.stop()
+    mock_send_frame.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_command_rate_limit_exceeded(mock_serial: MagicMock,
+                                                 mocker: MockerFixture) -> None:
+    async_jlip = AsyncJLIPTransport('/dev/ttyS0',
+                                    rate_limits=JLIPRateLimits(commands_per_second=1),
+                                    wait_for_rate_limit=False)
+    mocker.patch.object(async_jlip, 'send_frame',
+                        AsyncMock(return_value=b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'))
+    await async_jlip.stop()
+    with pytest.raises(RateLimitExceeded):
+        await async_jlip.stop()
+
+
+def test_command_frame_is_cached_per_jlip_id() -> None:
+    frame = JLIPCommands.stop.frame(1)
+    assert frame == JLIPCodec.build_command(1, 0x08, 0x44, 0x60)
+    assert JLIPCommands.stop.frame(1) is frame
+    assert JLIPCommands.stop.frame(2) == JLIPCodec.build_command(2, 0x08, 0x44, 0x60)
+    assert JLIPCommands.set_channel.frame(1, 4) == JLIPCodec.build_command(
+        1, 0x0A, 0x44, 0x71, 0, 4, 0x7E)
+
+
+def test_send_command_base_builds_frame(jlip: JLIPTransport, mocker: MockerFixture) -> None:
+    mock_send_frame = mocker.patch.object(jlip, 'send_frame', return_value=b'\x00' * 11)
+    assert jlip.send_command_base(0x01, 0x02) == b'\x00' * 11
+    mock_send_frame.assert_called_once_with(JLIPCodec.build_command(1, 0x01, 0x02))
+
+
+def test_commands_table() -> None:
+    commands = JLIPCommands.commands()
+    assert commands['get_vtr_mode'] is JLIPCommands.get_vtr_mode
+    assert commands['get_vtr_mode'].response_type is VTRModeResponse
+    assert all(callable(getattr(JLIPTransport, name)) for name in commands)
+    assert all(callable(getattr(AsyncJLIPTransport, name)) for name in commands)
+
+
+def test_async_jlip_repr(async_jlip: AsyncJLIPTransport) -> None:
+    assert repr(async_jlip) == '<AsyncJLIPTransport jlip_id=1 raise_on_error=True>'
+
+
+def _baud_rate_device(vcr: JLIPCommands,
+                      *,
+                      code: int = 0x22,
+                      rate: int = 9600,
+                      switches: bool = True,
+                      dies: bool = False) -> Callable[[bytes], bytes]:
+    state = {'rate': rate, 'alive': True}
+
+    def send_frame(frame: bytes) -> bytes:
+        if not state['alive'] or vcr.baud_rate != state['rate']:
+            msg = 'No response.'
+            raise TimeoutError(msg)
+        if frame[3:6] == b'\x7C\x48\x20':
+            return JLIPCodec.build_command(1, CommandStatus.COMMAND_ACCEPTED, code)
+        if frame[3:5] == b'\x7C\x48':
+            if switches:
+                state['rate'] = BAUD_RATES[frame[5]]
+            state['alive'] = not dies
+        return JLIPCodec.build_command(1, CommandStatus.COMMAND_ACCEPTED)
+
+    return send_frame
+
+
+def test_negotiate_baud_rate(jlip: JLIPTransport, mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mocker.patch.object(jlip, 'send_frame', side_effect=_baud_rate_device(jlip))
+    store = BaudRateStore(tmp_path / 'baud-rates.json')
+    assert jlip.negotiate_baud_rate(store=store) == 38400
+    assert jlip.baud_rate == 38400
+    assert jlip.comm.baudrate == 38400
+    assert store.get('/dev/ttyS0', 1) == 38400
+
+
+def test_negotiate_baud_rate_max(jlip: JLIPTransport, mocker: MockerFixture) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mocker.patch.object(jlip, 'send_frame', side_effect=_baud_rate_device(jlip))
+    assert jlip.negotiate_baud_rate(19200) == 19200
+
+
+def test_negotiate_baud_rate_unknown_code(jlip: JLIPTransport, mocker: MockerFixture) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mock_send_frame = mocker.patch.object(jlip,
+                                          'send_frame',
+                                          side_effect=_baud_rate_device(jlip, code=0))
+    assert jlip.negotiate_baud_rate() == 9600
+    mock_send_frame.assert_called_once_with(JLIPCommands.get_baud_rate_supported.frame(1))
+
+
+def test_negotiate_baud_rate_falls_back(jlip: JLIPTransport, mocker: MockerFixture,
+                                        tmp_path: Path) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mocker.patch.object(jlip, 'send_frame', side_effect=_baud_rate_device(jlip, switches=False))
+    store = BaudRateStore(tmp_path / 'baud-rates.json')
+    assert jlip.negotiate_baud_rate(store=store) == 9600
+    assert jlip.comm.baudrate == 9600
+    assert store.get('/dev/ttyS0', 1) == 9600
+
+
+def test_negotiate_baud_rate_no_answer(jlip: JLIPTransport, mocker: MockerFixture) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mocker.patch.object(jlip, 'send_frame', side_effect=_baud_rate_device(jlip, dies=True))
+    with pytest.raises(BaudRateError, match='does not answer at 38400 or 9600 baud'):
+        jlip.negotiate_baud_rate()
+
+
+def test_negotiate_baud_rate_stored(jlip: JLIPTransport, mocker: MockerFixture,
+                                    tmp_path: Path) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mock_send_frame = mocker.patch.object(jlip,
+                                          'send_frame',
+                                          side_effect=_baud_rate_device(jlip, rate=38400))
+    store = BaudRateStore(tmp_path / 'baud-rates.json')
+    store.set('/dev/ttyS0', 1, 38400)
+    assert jlip.negotiate_baud_rate(store=store) == 38400
+    mock_send_frame.assert_called_once_with(JLIPCommands.presence_check.frame(1))
+
+
+def test_negotiate_baud_rate_stored_stale(jlip: JLIPTransport, mocker: MockerFixture,
+                                          tmp_path: Path) -> None:
+    mocker.patch.object(jlip, '_acquire', return_value=True)
+    mocker.patch.object(jlip, 'send_frame', side_effect=_baud_rate_device(jlip, code=0x21))
+    store = BaudRateStore(tmp_path / 'baud-rates.json')
+    store.set('/dev/ttyS0', 1, 38400)
+    assert jlip.negotiate_baud_rate(store=store) == 19200
+    assert store.get('/dev/ttyS0', 1) == 19200
+
+
+@pytest.mark.asyncio
+async def test_async_negotiate_baud_rate(async_jlip: AsyncJLIPTransport, mocker: MockerFixture,
+                                         tmp_path: Path) -> None:
+    mocker.patch.object(async_jlip, '_acquire', AsyncMock(return_value=True))
+    mocker.patch.object(async_jlip, 'send_frame',
+                        AsyncMock(side_effect=_baud_rate_device(async_jlip, code=0x24)))
+    store = BaudRateStore(tmp_path / 'baud-rates.json')
+    assert await async_jlip.negotiate_baud_rate(store=store) == 115200
+    assert async_jlip.comm.baudrate == 115200
+    assert store.get('/dev/ttyS0', 1) == 115200
+
+
+@pytest.mark.asyncio
+async def test_async_negotiate_baud_rate_falls_back(async_jlip: AsyncJLIPTransport,
+                                                    mocker: MockerFixture) -> None:
+    mocker.patch.object(async_jlip, '_acquire', AsyncMock(return_value=True))
+    mocker.patch.object(async_jlip, 'send_frame',
+                        AsyncMock(side_effect=_baud_rate_device(async_jlip, switches=False)))
+    assert await async_jlip.negotiate_baud_rate() == 9600
+
+
+@pytest.mark.asyncio
+async def test_async_negotiate_baud_rate_no_answer(async_jlip: AsyncJLIPTransport,
+                                                   mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch.object(async_jlip, '_acquire', AsyncMock(return_value=True))
+    mocker.patch.object(async_jlip, 'send_frame',
+                        AsyncMock(side_effect=_baud_rate_device(async_jlip, dies=True)))
+    store = BaudRateStore(tmp_path / 'baud-rates.json')
+    store.set('/dev/ttyS0', 1, 19200)
+    with pytest.raises(BaudRateError):
+        await async_jlip.negotiate_baud_rate(store=store)
+
+
+def test_set_baud_rate_invalid(jlip: JLIPTransport) -> None:
+    with pytest.raises(ValueError, match='1'):
+        jlip.set_baud_rate(1)
@@ -3,8 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 import json
+import subprocess as sp
+import sys
 
-from vcrtool.main import VALID_COMMANDS, jlip
+from vcrtool.jlip import JLIPTransport
+from vcrtool.main import EXTRA_COMMANDS, VALID_COMMANDS, jlip
 import pytest
 
 if TYPE_CHECKING:
@@ -30,9 +33,14 @@ class _FakeDataclass:
     success: bool = True
 
 
+@dataclass
+class _FakeVTRMode:
+    vtr_mode: int
+
+
 @pytest.mark.parametrize('command', VALID_COMMANDS)
 def test_jlip_valid_command(runner: CliRunner, mocker: MockerFixture, command: str) -> None:
-    mock_jlip = mocker.patch('vcrtool.main.JLIPTransport')
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
     mock_instance = mock_jlip.return_value
     mock_method = mocker.Mock(return_value=_FakeDataclass())
     setattr(mock_instance, command.replace('-', '_'), mock_method)
@@ -45,11 +53,133 @@ def test_jlip_valid_command(runner: CliRunner, mocker: MockerFixture, command: s
 
 def test_jlip_debug_logging(runner: CliRunner, mocker: MockerFixture) -> None:
     mocker.patch('vcrtool.main.VALID_COMMANDS', ['valid-command'])
-    mock_setup_logging = mocker.patch('vcrtool.main.setup_logging')
-    mock_jlip = mocker.patch('vcrtool.main.JLIPTransport')
+    mock_setup_logging = mocker.patch('bascom.setup_logging')
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
     mock_instance = mock_jlip.return_value
     mock_method = mocker.Mock(return_value=_FakeDataclass())
     mock_instance.valid_command = mock_method
     result = runner.invoke(jlip, ['serial_device', 'valid-command', '--debug'])
     assert result.exit_code == 0
     mock_setup_logging.assert_called_once_with(debug=True, loggers=mocker.ANY)
+
+
+def test_jlip_negotiate_baud_rate(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_store = mocker.patch('vcrtool.baud.BaudRateStore')
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
+    mock_instance = mock_jlip.return_value
+    mock_instance.nop.return_value = _FakeDataclass()
+    result = runner.invoke(jlip, ['serial_device', 'nop', '--negotiate-baud-rate'])
+    assert result.exit_code == 0
+    mock_instance.negotiate_baud_rate.assert_called_once_with(store=mock_store.return_value)
+
+
+def test_valid_commands_match_command_table() -> None:
+    assert list(VALID_COMMANDS) == sorted(
+        name.replace('_', '-') for name in (*JLIPTransport.commands(), *EXTRA_COMMANDS))
+
+
+def test_jlip_startup_is_lazy() -> None:
+    heavy = ('bascom', 'pyrate_limiter', 'serial', 'vcrtool.jlip')
+    code = ('import sys\n'
+            'from vcrtool.main import jlip\n'
+            'try:\n'
+            "    jlip(['serial_device', 'invalid-command'])\n"
+            'except SystemExit:\n'
+            '    pass\n'
+            f'print(*(name for name in {heavy!r} if name in sys.modules))')
+    result = sp.run((sys.executable, '-c', code), capture_output=True, check=True, text=True)
+    assert not result.stdout.strip()
+    assert 'Invalid command' in result.stderr
+
+
+def test_jlip_socket(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_send = mocker.patch('vcrtool.client.send_request', return_value={'vtr_mode': 3})
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
+    result = runner.invoke(jlip, ['--socket', '/s.sock', 'serial_device', 'set-input', '1', '2'])
+    assert result.exit_code == 0
+    mock_send.assert_called_once_with('/s.sock', 'serial_device', 'set-input', 1, 2)
+    mock_jlip.assert_not_called()
+    assert json.loads(result.output) == {'vtr_mode': 3}
+
+
+def test_jlip_socket_error(runner: CliRunner, mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.client.send_request', side_effect=ConnectionRefusedError('refused'))
+    result = runner.invoke(jlip, ['serial_device', 'nop'], env={'JLIP_SOCKET': '/s.sock'})
+    assert result.exit_code != 0
+    assert 'refused' in result.output
+
+
+def test_jlip_bytes_result(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
+    mock_jlip.return_value.send_command.return_value = b'\xff\xfe'
+    result = runner.invoke(jlip, ['serial_device', 'send-command', '1'])
+    assert result.exit_code == 0
+    assert json.loads(result.output) == 'fffe'
+
+
+def test_jlip_script(runner: CliRunner, mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.script.sleep')
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
+    mock_instance = mock_jlip.return_value
+    mock_instance.rewind.return_value = _FakeDataclass()
+    mock_instance.get_vtr_mode.side_effect = [_FakeVTRMode(vtr_mode=3), _FakeVTRMode(vtr_mode=1)]
+    result = runner.invoke(jlip, ['serial_device', '--script', '-'],
+                           input='rewind\nuntil vtr_mode == STOP\nwait 1\n')
+    assert result.exit_code == 0
+    mock_jlip.assert_called_once_with('serial_device', raise_on_error_response=False)
+    assert [json.loads(line) for line in result.output.splitlines()] == [
+        {
+            'line': 1,
+            'command': 'rewind',
+            'args': [],
+            'result': {
+                'success': True
+            }
+        },
+        {
+            'line': 2,
+            'until': 'vtr_mode == 1',
+            'result': {
+                'vtr_mode': 1
+            }
+        },
+        {
+            'line': 3,
+            'wait': 1.0
+        },
+    ]
+
+
+def test_jlip_script_socket(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_send = mocker.patch('vcrtool.client.send_request', return_value={'vtr_mode': 1})
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
+    result = runner.invoke(jlip, ['-s', '/s.sock', '-f', '-', 'serial_device'],
+                           input='set-input 1 2\nuntil vtr_mode == STOP\n')
+    assert result.exit_code == 0
+    assert mock_send.call_args_list == [
+        mocker.call('/s.sock', 'serial_device', 'set-input', 1, 2),
+        mocker.call('/s.sock', 'serial_device', 'get-vtr-mode'),
+    ]
+    mock_jlip.assert_not_called()
+    assert len(result.output.splitlines()) == 2
+
+
+def test_jlip_script_with_command(runner: CliRunner) -> None:
+    result = runner.invoke(jlip, ['serial_device', 'nop', '--script', '-'], input='nop\n')
+    assert result.exit_code != 0
+    assert 'Commands cannot be given with --script.' in result.output
+
+
+def test_jlip_script_parse_error(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_jlip = mocker.patch('vcrtool.jlip.JLIPTransport')
+    result = runner.invoke(jlip, ['serial_device', '--script', '-'], input='nop\nspin\n')
+    assert result.exit_code != 0
+    assert 'Line 2: Invalid command `spin`.' in result.output
+    mock_jlip.assert_not_called()
+
+
+def test_jlip_script_daemon_error(runner: CliRunner, mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.client.send_request', side_effect=FileNotFoundError('missing'))
+    result = runner.invoke(jlip, ['-s', '/s.sock', '-f', '-', 'serial_device'], input='nop\n')
+    assert result.exit_code != 0
+    assert 'Cannot reach the daemon at `/s.sock`: missing' in result.output
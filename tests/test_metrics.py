@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import asyncio
+import math
+
+from vcrtool.jlip import VTRMode
+from vcrtool.metrics import (
+    CONTENT_TYPE,
+    CaptureMetrics,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    export_metrics,
+    serve_metrics,
+)
+from vcrtool.progress import CaptureProgress
+from vcrtool.sansio import JLIPCodec, checksum
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+GET_VTR_MODE = JLIPCodec.build_command(1, 0x08, 0x4E, 0x20)
+PLAY = JLIPCodec.build_command(1, 0x08, 0x43, 0x75)
+
+
+def _response(*data: int) -> bytes:
+    return bytes(data) + bytes((checksum(data),))
+
+
+async def _get(port: int, request: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+
+def test_counter_render() -> None:
+    counter = Counter('requests_total', 'Requests "served".\n', ('path',))
+    counter.inc(path='/b')
+    counter.inc(2.5, path='/a\\"')
+    counter.inc(path='/b')
+    assert counter.get(path='/b') == 2
+    assert counter.get(path='/c') == 0
+    assert counter.render() == ('# HELP requests_total Requests \\"served\\".\\n\n'
+                                '# TYPE requests_total counter\n'
+                                'requests_total{path="/a\\\\\\""} 2.5\n'
+                                'requests_total{path="/b"} 2\n')
+
+
+def test_counter_wrong_labels() -> None:
+    counter = Counter('requests_total', 'Requests.', ('path',))
+    with pytest.raises(ValueError, match='takes labels path'):
+        counter.inc(method='GET')
+
+
+def test_gauge() -> None:
+    gauge = Gauge('temperature', 'Temperature.', ('room',))
+    gauge.set(21, room='a')
+    gauge.set(-math.inf, room='b')
+    gauge.set(math.nan, room='c')
+    gauge.set(19.5, room='a')
+    gauge.remove(room='c')
+    gauge.remove(room='d')
+    assert gauge.render().splitlines()[2:] == [
+        'temperature{room="a"} 19.5', 'temperature{room="b"} -Inf'
+    ]
+
+
+def test_histogram() -> None:
+    histogram = Histogram('latency_seconds', 'Latency.', buckets=(0.5, 0.1, math.inf))
+    assert histogram.buckets == (0.1, 0.5)
+    for value in (0.05, 0.1, 0.3, 2):
+        histogram.observe(value)
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2', 'latency_seconds_bucket{le="0.5"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4', 'latency_seconds_sum 2.45', 'latency_seconds_count 4'
+    ]
+
+
+def test_registry() -> None:
+    registry = MetricsRegistry()
+    gauge = Gauge('size_bytes', 'Size.')
+    registry.register(gauge)
+    registry.register(Counter('events_total', 'Events.'))
+    with pytest.raises(ValueError, match='already registered'):
+        registry.register(Counter('events_total', 'Events.'))
+    remove = registry.add_collector(lambda: gauge.set(42))
+    assert registry.render() == ('# HELP size_bytes Size.\n# TYPE size_bytes gauge\nsize_bytes 42\n'
+                                 '# HELP events_total Events.\n# TYPE events_total counter\n')
+    remove()
+    remove()
+    gauge.set(1)
+    assert 'size_bytes 1\n' in registry.render()
+
+
+def test_registry_collector_fails(caplog: pytest.LogCaptureFixture) -> None:
+    registry = MetricsRegistry()
+    registry.register(Counter('events_total', 'Events.'))
+
+    def _fail() -> None:
+        raise OSError
+
+    registry.add_collector(_fail)
+    assert 'events_total' in registry.render()
+    assert 'Metrics collector failed.' in caplog.text
+
+
+def test_write_textfile(tmp_path: Path) -> None:
+    registry = MetricsRegistry()
+    counter = Counter('events_total', 'Events.')
+    registry.register(counter)
+    counter.inc()
+    path = tmp_path / 'vcrtool.prom'
+    registry.write_textfile(path)
+    assert path.read_text(encoding='utf-8').endswith('events_total 1\n')
+    assert not (tmp_path / 'vcrtool.prom.part').exists()
+
+
+def test_observe_exchange() -> None:
+    metrics = CaptureMetrics()
+    metrics.observe_exchange('/dev/ttyS0', PLAY, _response(0xFF, 0xFF, 1, 3, 0, 0, 0, 0, 0, 0), 1.0,
+                             1.2)
+    metrics.observe_exchange('/dev/ttyS0', PLAY, None, 2.0, 4.0)
+    metrics.observe_exchange('/dev/ttyS0', PLAY, b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x00',
+                             5.0, 5.1)
+    assert metrics.jlip_commands.get(port='/dev/ttyS0', command='play') == 3
+    assert metrics.jlip_timeouts.get(port='/dev/ttyS0', command='play') == 1
+    assert metrics.jlip_checksum_failures.get(port='/dev/ttyS0') == 1
+    rendered = metrics.registry.render()
+    assert ('vcrtool_jlip_command_duration_seconds_count{port="/dev/ttyS0",command="play"} 2'
+            in rendered)
+    assert not list(metrics.vtr_mode.samples())
+
+
+def test_observe_exchange_unknown_command() -> None:
+    metrics = CaptureMetrics()
+    metrics.observe_exchange('/dev/ttyS0', JLIPCodec.build_command(1, 0x55, 0x01), None, 0, 1)
+    assert metrics.jlip_commands.get(port='/dev/ttyS0', command='55 01 00 00 00 00 00') == 1
+
+
+def test_observe_exchange_vtr_mode() -> None:
+    metrics = CaptureMetrics()
+    metrics.observe_exchange('/dev/ttyS0', GET_VTR_MODE,
+                             _response(0xFF, 0xFF, 1, 3, VTRMode.PLAY_FWD, 0, 0, 1, 2, 15), 0, 0.05)
+    assert metrics.vtr_mode.get(port='/dev/ttyS0', jlip_id='1', mode='PLAY_FWD') == 1
+    assert metrics.vtr_mode.get(port='/dev/ttyS0', jlip_id='1', mode='STOP') == 0
+    assert metrics.tape_counter.get(port='/dev/ttyS0', jlip_id='1') == pytest.approx(62.5)
+
+
+def test_observe_exchange_invalid_vtr_mode() -> None:
+    metrics = CaptureMetrics()
+    metrics.observe_exchange('/dev/ttyS0', GET_VTR_MODE,
+                             _response(0xFF, 0xFF, 1, 3, 0b1000, 0, 0, 0, 0, 0), 0, 0.05)
+    assert metrics.jlip_commands.get(port='/dev/ttyS0', command='get_vtr_mode') == 1
+    assert metrics.tape_counter.get(port='/dev/ttyS0', jlip_id='1') == 0
+
+
+def test_observe_rate_limit() -> None:
+    metrics = CaptureMetrics()
+    metrics.observe_rate_limit('/dev/ttyS0', 'command', 0.25, acquired=True)
+    metrics.observe_rate_limit('/dev/ttyS0', 'command', 0.5, acquired=False)
+    assert metrics.rate_limit_wait.get(port='/dev/ttyS0', limiter='command') == pytest.approx(0.75)
+    assert metrics.rate_limit_rejections.get(port='/dev/ttyS0', limiter='command') == 1
+
+
+def test_observe_progress() -> None:
+    metrics = CaptureMetrics()
+    metrics.observe_progress(
+        'tape.mkv',
+        CaptureProgress(frame=300, fps=29.97, total_size=1024, drop_frames=2, dup_frames=1))
+    assert metrics.ffmpeg_fps.get(output='tape.mkv') == pytest.approx(29.97)
+    assert metrics.ffmpeg_speed.get(output='tape.mkv') == 0
+    assert metrics.ffmpeg_frames.get(output='tape.mkv') == 300
+    assert metrics.ffmpeg_dropped_frames.get(output='tape.mkv') == 2
+    assert metrics.ffmpeg_duplicated_frames.get(output='tape.mkv') == 1
+    assert metrics.written_bytes.get(output='tape.mkv', process='ffmpeg') == 1024
+
+
+def test_track_file(tmp_path: Path) -> None:
+    metrics = CaptureMetrics()
+    path = tmp_path / 'tape.vbi'
+    stop = metrics.track_file('tape.mkv', 'zvbi2raw', path)
+    metrics.registry.render()
+    assert metrics.written_bytes.get(output='tape.mkv', process='zvbi2raw') == 0
+    path.write_bytes(b'vbi')
+    metrics.registry.render()
+    assert metrics.written_bytes.get(output='tape.mkv', process='zvbi2raw') == len(b'vbi')
+    stop()
+    path.write_bytes(b'vbi data')
+    metrics.registry.render()
+    assert metrics.written_bytes.get(output='tape.mkv', process='zvbi2raw') == len(b'vbi')
+
+
+@pytest.mark.asyncio
+async def test_serve_metrics() -> None:
+    registry = MetricsRegistry()
+    counter = Counter('events_total', 'Events.')
+    registry.register(counter)
+    counter.inc()
+    server = await serve_metrics(registry, 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        response = await _get(port, b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        head = await _get(port, b'HEAD /metrics?name=x HTTP/1.1\r\n\r\n')
+        missing = await _get(port, b'GET /other HTTP/1.1\r\n\r\n')
+        wrong_method = await _get(port, b'POST /metrics HTTP/1.1\r\n\r\n')
+    finally:
+        server.close()
+        await server.wait_closed()
+    assert response.startswith(b'HTTP/1.1 200 OK\r\n')
+    assert f'Content-Type: {CONTENT_TYPE}\r\n'.encode() in response
+    assert response.endswith(b'\r\n\r\n' + registry.render().encode())
+    assert head.startswith(b'HTTP/1.1 200 OK\r\n')
+    assert head.endswith(b'\r\n\r\n')
+    assert missing.startswith(b'HTTP/1.1 404 Not Found\r\n')
+    assert wrong_method.startswith(b'HTTP/1.1 405 Method Not Allowed\r\n')
+
+
+@pytest.mark.asyncio
+async def test_export_metrics(tmp_path: Path) -> None:
+    registry = MetricsRegistry()
+    counter = Counter('events_total', 'Events.')
+    registry.register(counter)
+    path = tmp_path / 'vcrtool.prom'
+    async with export_metrics(registry, port=0, textfile=path, interval=60):
+        await asyncio.sleep(0.05)
+        assert path.read_text(encoding='utf-8').endswith('# TYPE events_total counter\n')
+        counter.inc()
+    assert path.read_text(encoding='utf-8').endswith('events_total 1\n')
+
+
+@pytest.mark.asyncio
+async def test_export_metrics_textfile_fails(mocker: MockerFixture, tmp_path: Path,
+                                             caplog: pytest.LogCaptureFixture) -> None:
+    registry = MetricsRegistry()
+    mocker.patch.object(registry, 'write_textfile', side_effect=OSError)
+    async with export_metrics(registry, textfile=tmp_path / 'vcrtool.prom', interval=60):
+        await asyncio.sleep(0.05)
+    assert 'Writing metrics to' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_export_metrics_nothing(mocker: MockerFixture) -> None:
+    mock_serve = mocker.patch('vcrtool.metrics.serve_metrics')
+    async with export_metrics(MetricsRegistry()):
+        pass
+    mock_serve.assert_not_called()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import asyncio
+
+from vcrtool.jlip import AsyncJLIPTransport, JLIPRateLimits, RateLimitExceeded, VTRMode
+from vcrtool.pipeline import JLIPPipeline
+from vcrtool.sansio import JLIPCodec, checksum
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def _response(jlip_id: int, *data: int) -> bytes:
+    frame = [0xFF, 0xFF, jlip_id, 0x03, *data, *([0] * (6 - len(data)))]
+    return bytes([*frame, checksum(frame)])
+
+
+class _FakeLine:
+    """Queues a response for every request written, released when the test says so."""
+    def __init__(self) -> None:
+        self.written: list[bytes] = []
+        self.responses: asyncio.Queue[bytes] = asyncio.Queue()
+
+    def write(self, frame: bytes) -> None:
+        self.written.append(frame)
+
+    async def read_frame(self) -> bytes:
+        return await self.responses.get()
+
+
+@pytest.fixture
+def line(mocker: MockerFixture) -> _FakeLine:
+    mocker.patch('serial.Serial')
+    return _FakeLine()
+
+
+@pytest.fixture
+def vcr(line: _FakeLine, mocker: MockerFixture) -> AsyncJLIPTransport:
+    vcr = AsyncJLIPTransport('/dev/ttyS0', response_timeout=0.5)
+    mocker.patch.object(vcr.comm, 'write', side_effect=line.write)
+    mocker.patch.object(vcr, '_read_frame', line.read_frame)
+    return vcr
+
+
+@pytest.mark.asyncio
+async def test_pipeline_keeps_several_requests_in_flight(vcr: AsyncJLIPTransport,
+                                                         line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr) as pipeline:
+        first = asyncio.create_task(pipeline.send_frame(JLIPCodec.build_command(1, 0x08, 0x44)))
+        second = asyncio.create_task(pipeline.send_frame(JLIPCodec.build_command(2, 0x08, 0x44)))
+        await asyncio.sleep(0)
+        assert len(line.written) == 2
+        assert pipeline.in_flight == 2
+        await line.responses.put(_response(2, 0x02))
+        await line.responses.put(_response(1, 0x01))
+        assert (await first)[4] == 1
+        assert (await second)[4] == 2
+        assert pipeline.in_flight == 0
+        assert [t.jlip_id for t in pipeline.history] == [2, 1]
+        assert pipeline.history[0].request == line.written[1]
+        assert all(t.seconds >= 0 for t in pipeline.history)
+        assert pipeline.mean_turnaround() is not None
+        assert pipeline.mean_turnaround(3) is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_limits_requests_per_id(vcr: AsyncJLIPTransport, line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr, max_in_flight_per_id=1) as pipeline:
+        frame = JLIPCodec.build_command(1, 0x08, 0x44)
+        first = asyncio.create_task(pipeline.send_frame(frame))
+        second = asyncio.create_task(pipeline.send_frame(frame))
+        await asyncio.sleep(0)
+        assert len(line.written) == 1
+        await line.responses.put(_response(1, 0x01))
+        await first
+        await asyncio.sleep(0)
+        assert len(line.written) == 2
+        await line.responses.put(_response(1, 0x02))
+        assert (await second)[4] == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_limits_requests_on_the_line(vcr: AsyncJLIPTransport,
+                                                    line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr, max_in_flight=1, max_in_flight_per_id=2) as pipeline:
+        tasks = [
+            asyncio.create_task(pipeline.send_frame(JLIPCodec.build_command(jlip_id, 0x08)))
+            for jlip_id in (1, 2)
+        ]
+        await asyncio.sleep(0)
+        assert len(line.written) == 1
+        await line.responses.put(_response(1))
+        await tasks[0]
+        await asyncio.sleep(0)
+        assert len(line.written) == 2
+        await line.responses.put(_response(2))
+        await tasks[1]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_drops_unmatched_responses(vcr: AsyncJLIPTransport, line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr) as pipeline:
+        await line.responses.put(_response(5))
+        task = asyncio.create_task(pipeline.send_frame(JLIPCodec.build_command(1, 0x08)))
+        await asyncio.sleep(0)
+        await line.responses.put(_response(1, 0x07))
+        assert (await task)[4] == 7
+
+
+@pytest.mark.asyncio
+async def test_pipeline_timeout(vcr: AsyncJLIPTransport) -> None:
+    vcr.response_timeout = 0.01
+    async with JLIPPipeline(vcr) as pipeline:
+        with pytest.raises(TimeoutError, match=r'No response within 0\.01 seconds\.'):
+            await pipeline.send_frame(JLIPCodec.build_command(1, 0x08))
+        assert pipeline.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_late_response_after_timeout(vcr: AsyncJLIPTransport,
+                                                    line: _FakeLine) -> None:
+    vcr.response_timeout = 0.01
+    async with JLIPPipeline(vcr) as pipeline:
+        with pytest.raises(TimeoutError):
+            await pipeline.send_frame(JLIPCodec.build_command(1, 0x08, 0xAA))
+        vcr.response_timeout = 0.5
+        second = asyncio.create_task(pipeline.send_frame(JLIPCodec.build_command(1, 0x08, 0xBB)))
+        await asyncio.sleep(0)
+        await line.responses.put(_response(1, 0xAA))
+        await line.responses.put(_response(1, 0xBB))
+        assert (await second)[4] == 0xBB
+        assert pipeline.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_validates_responses(vcr: AsyncJLIPTransport, line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr) as pipeline:
+        await line.responses.put(_response(1)[:-1] + b'\x00')
+        with pytest.raises(ValueError, match='Checksum did not match'):
+            await pipeline.send_frame(JLIPCodec.build_command(1, 0x08))
+
+
+@pytest.mark.asyncio
+async def test_pipeline_not_running(vcr: AsyncJLIPTransport) -> None:
+    with pytest.raises(RuntimeError, match='not running'):
+        await JLIPPipeline(vcr).send_frame(JLIPCodec.build_command(1, 0x08))
+
+
+@pytest.mark.asyncio
+async def test_pipeline_holds_transport_lock(vcr: AsyncJLIPTransport, line: _FakeLine) -> None:
+    pipeline = JLIPPipeline(vcr)
+    await pipeline.start()
+    await pipeline.start()
+    running = [pipeline.running]
+    direct = asyncio.create_task(vcr.send_frame(JLIPCodec.build_command(1, 0x08)))
+    await asyncio.sleep(0)
+    assert not line.written
+    await pipeline.stop()
+    await pipeline.stop()
+    running.append(pipeline.running)
+    assert running == [True, False]
+    await line.responses.put(_response(1))
+    await direct
+    assert len(line.written) == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stop_cancels_outstanding(vcr: AsyncJLIPTransport) -> None:
+    pipeline = JLIPPipeline(vcr)
+    await pipeline.start()
+    task = asyncio.create_task(pipeline.send_frame(JLIPCodec.build_command(1, 0x08)))
+    await asyncio.sleep(0)
+    await pipeline.stop()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_pipeline_command(vcr: AsyncJLIPTransport, line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr) as pipeline:
+        await line.responses.put(_response(3, 0x01))
+        response = await pipeline.command('get_vtr_mode', jlip_id=3)
+        assert response.vtr_mode == VTRMode.STOP  # type: ignore[attr-defined]
+        assert line.written == [JLIPCodec.build_command(3, 0x08, 0x4E, 0x20)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_command_runs_prepare(vcr: AsyncJLIPTransport, line: _FakeLine) -> None:
+    async with JLIPPipeline(vcr) as pipeline:
+        await line.responses.put(_response(10))
+        await pipeline.command('set_jlip_id', 10)
+        assert vcr.jlip_id == 10
+        assert line.written[0][2] == 10
+
+
+@pytest.mark.asyncio
+async def test_pipeline_command_rate_limit_exceeded(line: _FakeLine, mocker: MockerFixture) -> None:
+    vcr = AsyncJLIPTransport('/dev/ttyS0',
+                             rate_limits=JLIPRateLimits(commands_per_second=1),
+                             wait_for_rate_limit=False)
+    mocker.patch.object(vcr.comm, 'write', side_effect=line.write)
+    mocker.patch.object(vcr, '_read_frame', line.read_frame)
+    async with JLIPPipeline(vcr) as pipeline:
+        await line.responses.put(_response(1))
+        await pipeline.command('stop')
+        with pytest.raises(RateLimitExceeded):
+            await pipeline.command('stop')
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+import asyncio
+import logging
+
+from vcrtool.progress import (
+    CaptureMonitor,
+    CaptureProgress,
+    ProgressParser,
+    ProgressThresholds,
+)
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from pytest_mock import MockerFixture
+
+BLOCK = """frame=300
+fps=29.97
+stream_0_0_q=-0.0
+bitrate=46123.4kbits/s
+total_size=57671680
+out_time_us=10010000
+out_time_ms=10010000
+out_time=00:00:10.010000
+dup_frames=1
+drop_frames=2
+speed=1.01x
+progress=continue
+"""
+
+
+def _block(**fields: object) -> str:
+    lines = dict(line.split('=', 1) for line in BLOCK.splitlines())
+    lines.update({key: str(value) for key, value in fields.items()})
+    return ''.join(f'{key}={value}\n' for key, value in lines.items())
+
+
+async def _lines(text: str) -> AsyncIterator[bytes]:
+    for line in text.splitlines(keepends=True):
+        await asyncio.sleep(0)
+        yield line.encode()
+
+
+def test_parser() -> None:
+    parser = ProgressParser()
+    results = [parser.feed(line) for line in BLOCK.splitlines()]
+    assert results[:-1] == [None] * (len(results) - 1)
+    progress = results[-1]
+    assert progress is not None
+    assert (progress.frame, progress.total_size, progress.dup_frames,
+            progress.drop_frames) == (300, 57671680, 1, 2)
+    assert progress.fps == pytest.approx(29.97)
+    assert progress.bitrate == pytest.approx(46123.4)
+    assert progress.out_time == pytest.approx(10.01)
+    assert progress.speed == pytest.approx(1.01)
+    assert not progress.finished
+    assert parser.progress is results[-1]
+
+
+def test_parser_not_available() -> None:
+    parser = ProgressParser()
+    for line in BLOCK.splitlines():
+        parser.feed(line)
+    progress = None
+    for line in _block(bitrate='N/A',
+                       speed='N/A',
+                       out_time_us='N/A',
+                       frame='garbage',
+                       progress='end').splitlines():
+        progress = parser.feed(line)
+    assert progress is not None
+    assert progress.bitrate is None
+    assert progress.speed is None
+    assert progress.frame == 300
+    assert progress.out_time == pytest.approx(10.01)
+    assert progress.finished
+
+
+def test_parser_ignores_other_lines() -> None:
+    parser = ProgressParser()
+    assert parser.feed('\n') is None
+    assert parser.feed('not a field') is None
+
+
+def test_monitor_alerts(mocker: MockerFixture, caplog: pytest.LogCaptureFixture) -> None:
+    mock_monotonic = mocker.patch('vcrtool.progress.monotonic', return_value=0.0)
+    monitor = CaptureMonitor(ProgressThresholds(alert_interval=10))
+    with caplog.at_level(logging.WARNING):
+        monitor.update(CaptureProgress(drop_frames=2, dup_frames=1, speed=0.5))
+        mock_monotonic.return_value = 5.0
+        monitor.update(CaptureProgress(drop_frames=3, dup_frames=1, speed=0.5))
+        mock_monotonic.return_value = 10.0
+        monitor.update(CaptureProgress(drop_frames=5, dup_frames=1, speed=1.0))
+    assert [record.getMessage() for record in caplog.records] == [
+        'ffmpeg dropped 2 frames (2 in total).',
+        'ffmpeg duplicated 1 frames (1 in total).',
+        'ffmpeg is running at 0.500x, below 0.980x.',
+        'ffmpeg dropped 2 frames (5 in total).',
+    ]
+    assert monitor.updates == 3
+    assert monitor.fell_behind is None
+
+
+def test_monitor_slow_for_grace(mocker: MockerFixture) -> None:
+    mock_monotonic = mocker.patch('vcrtool.progress.monotonic', return_value=0.0)
+    on_behind = MagicMock()
+    monitor = CaptureMonitor(ProgressThresholds(slow_grace=30), on_behind=on_behind)
+    monitor.update(CaptureProgress(speed=0.9))
+    mock_monotonic.return_value = 20.0
+    monitor.update(CaptureProgress(speed=1.0))
+    mock_monotonic.return_value = 25.0
+    monitor.update(CaptureProgress(speed=0.9))
+    mock_monotonic.return_value = 50.0
+    monitor.update(CaptureProgress(speed=0.9))
+    on_behind.assert_not_called()
+    mock_monotonic.return_value = 55.0
+    monitor.update(CaptureProgress(speed=0.9))
+    monitor.update(CaptureProgress(speed=0.8))
+    on_behind.assert_called_once_with()
+    assert monitor.fell_behind == 'speed has been below 0.980x for 30 seconds.'
+
+
+def test_monitor_on_update() -> None:
+    on_update = MagicMock()
+    monitor = CaptureMonitor(on_update=on_update)
+    progress = CaptureProgress(frame=30, speed=1.0)
+    monitor.update(progress)
+    on_update.assert_called_once_with(progress)
+
+
+def test_monitor_too_many_drops() -> None:
+    on_behind = MagicMock()
+    monitor = CaptureMonitor(ProgressThresholds(max_drop_frames=10), on_behind=on_behind)
+    monitor.update(CaptureProgress(drop_frames=10))
+    on_behind.assert_not_called()
+    monitor.update(CaptureProgress(drop_frames=11))
+    on_behind.assert_called_once_with()
+    assert monitor.fell_behind == '11 frames dropped.'
+
+
+@pytest.mark.asyncio
+async def test_monitor_run() -> None:
+    monitor = CaptureMonitor()
+    await monitor.run(_lines(BLOCK + _block(frame=600, progress='end')))
+    assert monitor.updates == 2
+    assert monitor.progress.frame == 600
+    assert monitor.progress.finished
@@ -10,6 +10,7 @@ from vcrtool.sansio import (
     ZERO_MARK_US,
     CommandStatus,
     JLIPCodec,
+    JLIPResponseFramer,
     Pulse,
     SIRCSCodec,
     SIRCSCommand,
@@ -190,3 +191,96 @@ def test_validate_response_status_not_raised(jlip_codec: JLIPCodec, mocker: Mock
     data = b'\xFF\xFF\x01\x05\x00\x00\x00\x00\x00\x00\x7C'
     assert jlip_codec.validate_response(data, raise_on_error=False) == data
     assert CommandStatus(data[3] & 0b111) == CommandStatus.COMMAND_NOT_POSSIBLE
+
+
+def _capture() -> bytes:
+    good = [JLIPCodec.build_command(1, status, mode) for status in range(8) for mode in range(16)]
+    bad_checksum = good[0][:10] + bytes((good[0][10] ^ 1,))
+    bad_header = b'\xfe' + good[1][1:]
+    return b''.join([*good, bad_checksum, bad_header, bytes(11), b'\xff' * 11])
+
+
+def _reference(data: bytes) -> list[tuple[bool, int, int]]:
+    results = []
+    for i in range(0, len(data), 11):
+        frame = data[i:i + 11]
+        results.append((frame[:2] == b'\xff\xff'
+                        and frame[10] == checksum(frame), frame[3] & 0b111, frame[4] & 0xF))
+    return results
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_validate_frames(*, use_numpy: bool) -> None:
+    if use_numpy:
+        pytest.importorskip('numpy')
+    data = _capture()
+    checks = JLIPCodec.validate_frames(bytearray(data), use_numpy=use_numpy)
+    assert [(bool(v), int(s), int(m))
+            for v, s, m in zip(checks.valid, checks.status, checks.vtr_mode, strict=True)
+            ] == _reference(data)
+    assert sum(checks.valid) == 128
+
+
+def test_validate_frames_empty() -> None:
+    assert [len(x) for x in JLIPCodec.validate_frames(b'', use_numpy=False)] == [0, 0, 0]
+
+
+def test_validate_frames_rejects_partial_frame() -> None:
+    with pytest.raises(ValueError, match='12 bytes is not a whole number'):
+        JLIPCodec.validate_frames(bytes(12))
+
+
+def test_validate_frames_without_numpy(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.sansio.importlib.import_module', side_effect=ImportError)
+    data = _capture()
+    assert JLIPCodec.validate_frames(data).status == bytes(b & 0b111 for b in data[3::11])
+    with pytest.raises(ImportError):
+        JLIPCodec.validate_frames(data, use_numpy=True)
+
+
+def test_framer_returns_complete_frame() -> None:
+    framer = JLIPResponseFramer()
+    assert framer.needed == 11
+    framer.feed(b'\xFF\xFF\x01\x03\x00')
+    assert framer.next_frame() is None
+    assert framer.needed == 6
+    framer.feed(b'\x00\x00\x00\x00\x00\x7C')
+    assert framer.next_frame() == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+    assert framer.next_frame() is None
+
+
+def test_framer_discards_bytes_before_header() -> None:
+    framer = JLIPResponseFramer()
+    framer.feed(b'\x12\x34\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
+    assert framer.next_frame() == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+
+
+def test_framer_keeps_partial_header() -> None:
+    framer = JLIPResponseFramer()
+    framer.feed(b'\x12\xFF')
+    assert framer.next_frame() is None
+    assert framer.needed == 10
+    framer.feed(b'\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C')
+    assert framer.next_frame() == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7C'
+
+
+def test_framer_discards_garbage_without_header() -> None:
+    framer = JLIPResponseFramer()
+    framer.feed(b'\x12\x34')
+    assert framer.next_frame() is None
+    assert framer.needed == 11
+
+
+def test_framer_resyncs_on_checksum_mismatch() -> None:
+    framer = JLIPResponseFramer()
+    framer.feed(b'\x12\xFF\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00')
+    assert framer.next_frame() is None
+    framer.feed(b'\x7E')
+    assert framer.next_frame() == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7E'
+    assert framer.next_frame() is None
+
+
+def test_framer_returns_bad_checksum_without_other_header() -> None:
+    framer = JLIPResponseFramer()
+    framer.feed(b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7D')
+    assert framer.next_frame() == b'\xFF\xFF\x01\x03\x00\x00\x00\x00\x00\x00\x7D'
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from vcrtool.jlip import VTRMode
+from vcrtool.script import Command, ScriptError, Until, Wait, parse_script, run_script
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def test_parse_script() -> None:
+    assert parse_script([
+        '# Rewind then play.\n',
+        'rewind\n',
+        '\n',
+        'until vtr_mode == STOP timeout 600  # Done rewinding.\n',
+        'wait 1.5\n',
+        'set-input 1 0x2\n',
+        'until tape_inserted != false\n',
+        'until hour >= 1\n',
+    ]) == [
+        Command(2, 'rewind'),
+        Until(4, 'vtr_mode', '==', VTRMode.STOP, 600),
+        Wait(5, 1.5),
+        Command(6, 'set-input', (1, 2)),
+        Until(7, 'tape_inserted', '!=', 0),
+        Until(8, 'hour', '>=', 1),
+    ]
+
+
+@pytest.mark.parametrize(('text', 'message'), [
+    ('bad-command', 'Line 1: Invalid command `bad-command`.'),
+    ('set-input x 1', "Line 1: invalid literal for int() with base 0: 'x'"),
+    ('wait', 'Line 1: Expected `wait SECONDS`.'),
+    ('wait 1 2', 'Line 1: Expected `wait SECONDS`.'),
+    ('until vtr_mode ==', 'Line 1: Expected `until FIELD OP VALUE [timeout SECONDS]`.'),
+    ('until vtr_mode == STOP after 5',
+     'Line 1: Expected `until FIELD OP VALUE [timeout SECONDS]`.'),
+    ('until colour == 1', 'Line 1: Unknown field `colour`.'),
+    ('until vtr_mode ~ 1', 'Line 1: Unknown operator `~`.'),
+    ('until vtr_mode == SPIN', "Line 1: invalid literal for int() with base 0: 'SPIN'"),
+    ("play 'x", 'Line 1: No closing quotation'),
+    ('set-input 1', 'Line 1: `set-input` takes 2 arguments but 1 were given.'),
+    ('rewind-wait 1', 'Line 1: `rewind-wait` takes 0 arguments but 1 were given.'),
+])
+def test_parse_script_invalid(text: str, message: str) -> None:
+    with pytest.raises(ScriptError) as exc_info:
+        parse_script(['nop', text])
+    assert str(exc_info.value) == message.replace('Line 1', 'Line 2')
+    assert exc_info.value.line == 2
+
+
+def test_run_script(mocker: MockerFixture) -> None:
+    mock_sleep = mocker.patch('vcrtool.script.sleep')
+    states = [{'vtr_mode': VTRMode.REW}, {'vtr_mode': VTRMode.REW}, {'vtr_mode': VTRMode.STOP}]
+
+    def call(command: str, *args: int) -> Any:
+        if command == 'get-vtr-mode':
+            return states.pop(0)
+        return {'command': command, 'args': args}
+
+    records = run_script(parse_script(
+        ['rewind', 'until vtr_mode == STOP', 'wait 2', 'set-input 1 2']),
+                         call,
+                         poll_interval=0.25)
+    assert next(records) == {
+        'line': 1,
+        'command': 'rewind',
+        'args': [],
+        'result': {
+            'command': 'rewind',
+            'args': ()
+        }
+    }
+    assert next(records) == {
+        'line': 2,
+        'until': 'vtr_mode == 1',
+        'result': {
+            'vtr_mode': VTRMode.STOP
+        }
+    }
+    assert mock_sleep.call_args_list == [mocker.call(0.25), mocker.call(0.25)]
+    assert next(records) == {'line': 3, 'wait': 2.0}
+    mock_sleep.assert_called_with(2.0)
+    assert next(records)['args'] == [1, 2]
+    assert next(records, None) is None
+
+
+def test_run_script_until_timeout(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.script.sleep')
+    mocker.patch('vcrtool.script.monotonic', side_effect=[0, 1, 5, 11])
+    call = mocker.Mock(return_value={'vtr_mode': VTRMode.REW})
+    with pytest.raises(ScriptError, match=r'Line 1: Timed out waiting for `vtr_mode == 1`\.'):
+        list(run_script(parse_script(['until vtr_mode == STOP timeout 10']), call))
+    assert call.call_count == 3
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock, MagicMock
+import json
+
+from vcrtool.segments import CaptureRun, Segment, SegmentError, SegmentedOutput
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def _proc(returncode: int = 0, stderr: str = '') -> MagicMock:
+    proc = MagicMock()
+    proc.returncode = returncode
+    proc.communicate = AsyncMock(return_value=(b'', stderr.encode()))
+    return proc
+
+
+def _write_run(output: SegmentedOutput, run: CaptureRun, rows: list[tuple[int, float, float]], *,
+               offset: float) -> None:
+    output.anchor(run, 10.0, 10.0 + offset)
+    for index, _, _ in rows:
+        (output.directory / f'segment-{index:05d}.mkv').write_bytes(b'segment')
+    output.index_path(run).write_text(''.join(
+        f'segment-{index:05d}.mkv,{start},{end}\n' for index, start, end in rows),
+                                      encoding='utf-8')
+
+
+def test_start_run(tmp_path: Path) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv', 60)
+    assert output.directory == tmp_path / 'tape.mkv.segments'
+    first = output.start_run()
+    assert first == CaptureRun(0, 0)
+    (output.directory / 'segment-00000.mkv').write_bytes(b'')
+    (output.directory / 'segment-00001.mkv').write_bytes(b'')
+    second = output.start_run()
+    assert second == CaptureRun(1, 2)
+    assert output.ffmpeg_args(second) == ('-f', 'segment', '-segment_time', '60.000',
+                                          '-segment_start_number', '2', '-segment_list',
+                                          str(output.directory / 'run-001.csv'),
+                                          '-segment_list_type', 'csv', '-reset_timestamps', '1',
+                                          str(output.directory / 'segment-%05d.mkv'))
+    assert output.vbi_path(second) == output.directory / 'run-001.vbi'
+    assert SegmentedOutput(tmp_path / 'tape.mkv').runs == [CaptureRun(0, 0), CaptureRun(1, 2)]
+
+
+def test_anchor_saved_once(tmp_path: Path) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv')
+    run = output.start_run()
+    output.anchor(run, 3.0, 0.5)
+    output.anchor(run, 10.0, 7.5)
+    assert run.offset == pytest.approx(-2.5)
+    assert json.loads(output.runs_path.read_text(encoding='utf-8')) == [{
+        'index': 0,
+        'first_segment': 0,
+        'offset': -2.5
+    }]
+    assert not output.runs_path.with_name('runs.json.part').exists()
+
+
+@pytest.mark.parametrize('content', ['{', '[{"run": 1}]'])
+def test_invalid_runs(tmp_path: Path, content: str) -> None:
+    directory = tmp_path / 'tape.mkv.segments'
+    directory.mkdir()
+    (directory / 'runs.json').write_text(content, encoding='utf-8')
+    with pytest.raises(SegmentError, match=r'runs\.json'):
+        SegmentedOutput(tmp_path / 'tape.mkv')
+
+
+def test_segments_and_resume_position(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv', 60)
+    assert output.resume_position() is None
+    first = output.start_run()
+    _write_run(output, first, [(0, 0.0, 60.0), (1, 60.0, 120.0)], offset=-3.0)
+    with output.index_path(first).open('a', encoding='utf-8') as f:
+        f.write('segment-00002.mkv,120.0,180.0\nnot a segment\n')
+    unmapped = output.start_run()
+    (output.directory / 'segment-00003.mkv').write_bytes(b'segment')
+    output.index_path(unmapped).write_text('segment-00003.mkv,0.0,60.0\n', encoding='utf-8')
+    assert output.segments() == [
+        Segment(output.directory / 'segment-00000.mkv', 0, -3.0, 57.0),
+        Segment(output.directory / 'segment-00001.mkv', 0, 57.0, 117.0),
+    ]
+    assert output.resume_position() == pytest.approx(117.0)
+    assert 'Ignoring invalid line' in caplog.text
+
+
+def test_concat_list(tmp_path: Path) -> None:
+    segments = [
+        Segment(tmp_path / 'segment-00000.mkv', 0, -3.0, 57.0),
+        Segment(tmp_path / 'segment-00001.mkv', 0, 57.0, 117.0),
+        Segment(tmp_path / 'segment-00002.mkv', 1, 100.0, 110.0),
+        Segment(tmp_path / 'segment-00003.mkv', 1, 110.0, 170.0),
+        Segment(tmp_path / 'segment-00004.mkv', 1, 170.0, 230.0),
+        Segment(tmp_path / 'segment-00005.mkv', 2, 240.0, 300.0),
+    ]
+    assert SegmentedOutput.concat_list(segments).splitlines() == [
+        "file 'segment-00000.mkv'", "file 'segment-00001.mkv'", "file 'segment-00003.mkv'",
+        'inpoint 7.000', "file 'segment-00004.mkv'", "file 'segment-00005.mkv'"
+    ]
+
+
+def test_clear(tmp_path: Path) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv')
+    output.start_run()
+    output.clear()
+    assert not output.directory.exists()
+    assert output.runs == []
+
+
+@pytest.mark.asyncio
+async def test_join(mocker: MockerFixture, tmp_path: Path) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv', 60)
+    first = output.start_run()
+    _write_run(output, first, [(0, 0.0, 60.0)], offset=0.0)
+    output.vbi_path(first).write_bytes(b'first')
+    second = output.start_run()
+    _write_run(output, second, [(1, 0.0, 60.0)], offset=55.0)
+    output.vbi_path(second).write_bytes(b'second')
+    concat_lists = []
+
+    def _ffmpeg(*args: str, **_: object) -> MagicMock:
+        concat_lists.append((output.directory / 'concat.txt').read_text(encoding='utf-8'))
+        return _proc()
+
+    mock_exec = mocker.patch('vcrtool.segments.adebug_create_subprocess_exec', side_effect=_ffmpeg)
+    vbi = tmp_path / 'tape.vbi'
+    await output.join(vbi=vbi)
+    args = mock_exec.call_args.args
+    assert args[args.index('-i') + 1] == str(output.directory / 'concat.txt')
+    assert args[-1] == str(tmp_path / 'tape.mkv')
+    assert concat_lists == ["file 'segment-00000.mkv'\nfile 'segment-00001.mkv'\ninpoint 5.000\n"]
+    assert vbi.read_bytes() == b'firstsecond'
+    assert not output.directory.exists()
+    assert output.runs == []
+
+
+@pytest.mark.asyncio
+async def test_join_no_segments(tmp_path: Path) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv')
+    output.start_run()
+    with pytest.raises(SegmentError, match='No complete segments'):
+        await output.join()
+
+
+@pytest.mark.asyncio
+async def test_join_fails(mocker: MockerFixture, tmp_path: Path) -> None:
+    output = SegmentedOutput(tmp_path / 'tape.mkv')
+    _write_run(output, output.start_run(), [(0, 0.0, 60.0)], offset=0.0)
+    mocker.patch('vcrtool.segments.adebug_create_subprocess_exec',
+                 return_value=_proc(1, 'Invalid data'))
+    with pytest.raises(SegmentError, match='failed with code 1: Invalid data'):
+        await output.join()
+    assert (output.directory / 'segment-00000.mkv').exists()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import os
+import select
+import time
+import tty
+
+from vcrtool.jlip import (
+    CommandResponse,
+    JLIPCommands,
+    VTRMode,
+    VTRModeResponse,
+)
+from vcrtool.sansio import CommandStatus, JLIPCodec
+from vcrtool.simulator import DeckSimulator, PtySimulator, main
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from click.testing import CliRunner
+    from pytest_mock import MockerFixture
+
+_FRAME_LENGTH = 11
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _send(deck: DeckSimulator, name: str, *args: int, jlip_id: int = 1) -> bytes | None:
+    return deck.handle(JLIPCommands.commands()[name].frame(jlip_id, *args))
+
+
+def _state(deck: DeckSimulator) -> VTRModeResponse:
+    response = _send(deck, 'get_vtr_mode')
+    assert response is not None
+    return VTRModeResponse(response)
+
+
+def test_deck_plays_in_real_time() -> None:
+    clock = _Clock()
+    deck = DeckSimulator(clock=clock)
+    assert _state(deck).vtr_mode == VTRMode.STOP
+    assert _send(deck, 'play') == JLIPCodec.build_command(1, CommandStatus.COMMAND_ACCEPTED)
+    clock.now = 3723.5
+    state = _state(deck)
+    assert state.vtr_mode == VTRMode.PLAY_FWD
+    assert (state.hour, state.minute, state.second, state.frame) == (1, 2, 3, 15)
+    assert state.tape_inserted
+    _send(deck, 'reset_counter')
+    clock.now += 1
+    assert _state(deck).second == 1
+    assert deck.requests == 5
+
+
+def test_deck_rewind_stops_at_the_start() -> None:
+    clock = _Clock()
+    deck = DeckSimulator(clock=clock)
+    deck.insert_tape(400)
+    _send(deck, 'rewind')
+    clock.now = 5
+    assert _state(deck).vtr_mode == VTRMode.REW
+    assert deck.position == pytest.approx(200)
+    clock.now = 20
+    assert _state(deck).vtr_mode == VTRMode.STOP
+    assert deck.position == 0
+
+
+def test_deck_fast_forward_stops_at_the_end() -> None:
+    clock = _Clock()
+    deck = DeckSimulator(tape_length=100, clock=clock)
+    _send(deck, 'fast_forward')
+    clock.now = 10
+    assert _state(deck).vtr_mode == VTRMode.STOP
+    assert deck.position == 100
+
+
+def test_deck_eject_and_power() -> None:
+    deck = DeckSimulator()
+    _send(deck, 'eject')
+    state = _state(deck)
+    assert state.vtr_mode == VTRMode.EJECT
+    assert not state.tape_inserted
+    assert CommandResponse(_send(deck, 'play') or b'').status == CommandStatus.COMMAND_NOT_POSSIBLE
+    deck.insert_tape()
+    _send(deck, 'turn_off')
+    assert not deck.is_on
+    assert _send(deck, 'get_power_state') == JLIPCodec.build_command(1, 3, 0)
+    assert CommandResponse(_send(deck, 'play') or b'').status == CommandStatus.COMMAND_NOT_POSSIBLE
+    _send(deck, 'turn_on')
+    assert _send(deck, 'get_power_state') == JLIPCodec.build_command(1, 3, 1)
+
+
+def test_deck_device_name_and_jlip_id() -> None:
+    deck = DeckSimulator(name='SIM')
+    response = _send(deck, 'get_device_name')
+    assert response is not None
+    assert response[4:10] == b'SIM\x00\x00\x00'
+    _send(deck, 'set_jlip_id', 7)
+    assert deck.jlip_id == 7
+    assert _send(deck, 'nop') is None
+    assert _send(deck, 'nop', jlip_id=7) is not None
+
+
+def test_deck_ignores_invalid_frames() -> None:
+    deck = DeckSimulator()
+    frame = JLIPCommands.commands()['nop'].frame(1)
+    assert deck.handle(frame[:-1] + b'\x00') is None
+    assert deck.handle(JLIPCodec.build_command(1, 0x55, 0x55)) == JLIPCodec.build_command(
+        1, CommandStatus.COMMAND_NOT_IMPLEMENTED)
+    assert _send(deck, 'select_band', 1) == JLIPCodec.build_command(1, 3)
+
+
+def test_deck_fault_injection() -> None:
+    assert _send(DeckSimulator(drop_rate=1), 'nop') is None
+    rejected = _send(DeckSimulator(reject_rate=1), 'play')
+    assert rejected == JLIPCodec.build_command(1, CommandStatus.COMMAND_NOT_POSSIBLE)
+    corrupt = _send(DeckSimulator(corrupt_rate=1), 'nop')
+    assert corrupt is not None
+    with pytest.raises(ValueError, match='Checksum'):
+        JLIPCodec.validate_response(corrupt)
+    deck = DeckSimulator(drop_rate=0.5, seed=1)
+    answered = sum(_send(deck, 'nop') is not None for _ in range(200))
+    assert 60 < answered < 140
+
+
+@pytest.fixture
+def pty_simulator() -> Iterator[tuple[PtySimulator, int]]:
+    with PtySimulator(latency=0.01) as simulator:
+        fd = os.open(simulator.path, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(fd)
+        try:
+            yield simulator, fd
+        finally:
+            os.close(fd)
+
+
+def _exchange(fd: int, frame: bytes, timeout: float = 1) -> bytes:
+    # poll() rather than select() as earlier tests can leave descriptors numbered past 1024 open.
+    os.write(fd, frame)
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+    response = b''
+    while len(response) < _FRAME_LENGTH and poller.poll(timeout * 1000):
+        response += os.read(fd, _FRAME_LENGTH - len(response))
+    return response
+
+
+def test_pty_simulator_answers(pty_simulator: tuple[PtySimulator, int]) -> None:
+    simulator, fd = pty_simulator
+    commands = JLIPCommands.commands()
+    start = time.monotonic()
+    response = _exchange(fd, commands['get_vtr_mode'].frame(1))
+    assert time.monotonic() - start >= 0.01
+    assert VTRModeResponse(response).vtr_mode == VTRMode.STOP
+    _exchange(fd, commands['play'].frame(1))
+    assert simulator.deck.mode == VTRMode.PLAY_FWD
+    frame = commands['nop'].frame(1)
+    os.write(fd, frame[:5])
+    assert _exchange(fd, frame[5:]) == JLIPCodec.build_command(1, 3)
+
+
+def test_pty_simulator_ignores_other_ids_and_drops(pty_simulator: tuple[PtySimulator, int]) -> None:
+    simulator, fd = pty_simulator
+    nop = JLIPCommands.commands()['nop']
+    assert _exchange(fd, nop.frame(2), 0.1) == b''
+    assert simulator.deck.requests == 0
+    simulator.deck.drop_rate = 1
+    assert _exchange(fd, nop.frame(1), 0.1) == b''
+    assert simulator.deck.requests == 1
+
+
+def test_pty_simulator_close_without_start() -> None:
+    simulator = PtySimulator()
+    simulator.close()
+    simulator.close()
+
+
+def test_main(runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_pty = mocker.patch('vcrtool.simulator.PtySimulator')
+    mock_pty.return_value.__enter__.return_value.path = '/dev/pts/9'
+    mocker.patch('vcrtool.simulator.threading.Event', side_effect=KeyboardInterrupt)
+    result = runner.invoke(main, ['--jlip-id', '3', '--latency', '0.1', '--drop-rate', '0.5'])
+    assert result.exit_code == 0
+    assert result.output == '/dev/pts/9\n'
+    deck = mock_pty.call_args.args[0]
+    assert deck.jlip_id == 3
+    assert deck.drop_rate == pytest.approx(0.5)
+    assert mock_pty.call_args.kwargs == {'latency': pytest.approx(0.1)}
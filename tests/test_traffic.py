@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+import io
+
+from vcrtool.capture_stereo import _wait_for_vcr_stop  # ruff:ignore[import-private-name]
+from vcrtool.deck_state import DeckStatePoller
+from vcrtool.jlip import JLIPCommands, VTRMode
+from vcrtool.sansio import CommandStatus, JLIPCodec
+from vcrtool.traffic import (
+    TRAFFIC_MAGIC,
+    AsyncReplayTransport,
+    ReplayError,
+    ReplayTransport,
+    TrafficRecord,
+    TrafficRecorder,
+    read_traffic,
+)
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+GET_VTR_MODE = JLIPCommands.commands()['get_vtr_mode'].frame(1)
+PLAY = JLIPCommands.commands()['play'].frame(1)
+ACCEPTED = JLIPCodec.build_command(1, CommandStatus.COMMAND_ACCEPTED)
+
+
+def _vtr_mode(mode: VTRMode) -> bytes:
+    return JLIPCodec.build_command(1, CommandStatus.COMMAND_ACCEPTED, mode, 0, 0, 0, 1, 0)
+
+
+def test_recorder_round_trip(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.traffic.monotonic', return_value=10.0)
+    buffer = io.BytesIO()
+    recorder = TrafficRecorder(buffer)
+    recorder.record(PLAY, ACCEPTED, 10.5, 10.52)
+    recorder.record(GET_VTR_MODE, None, 11.0, 13.0)
+    recorder.close()
+    assert not buffer.closed
+    assert buffer.getvalue().startswith(TRAFFIC_MAGIC + b'\x01')
+    buffer.seek(0)
+    first, second = read_traffic(buffer)
+    assert first == TrafficRecord(0.5, PLAY, ACCEPTED, 0.02)
+    assert second == TrafficRecord(1.0, GET_VTR_MODE, None, 2.0)
+
+
+def test_recorder_path(tmp_path: Path) -> None:
+    path = tmp_path / 'traffic.bin'
+    with TrafficRecorder(path) as recorder:
+        recorder.record(PLAY, ACCEPTED, recorder.started_at, recorder.started_at)
+    assert recorder.file.closed
+    records = list(read_traffic(path))
+    assert len(records) == 1
+    assert records[0].request == PLAY
+    assert records[0].response == ACCEPTED
+
+
+def test_read_traffic_bad_magic() -> None:
+    with pytest.raises(ValueError, match='Not a supported'):
+        list(read_traffic(io.BytesIO(b'JLIPTRAX\x01')))
+
+
+def test_read_traffic_bad_version() -> None:
+    with pytest.raises(ValueError, match='Not a supported'):
+        list(read_traffic(io.BytesIO(TRAFFIC_MAGIC + b'\x02')))
+
+
+def test_read_traffic_truncated() -> None:
+    buffer = io.BytesIO()
+    TrafficRecorder(buffer).record(PLAY, ACCEPTED, 0, 0)
+    for length in (len(buffer.getvalue()) - 1, len(buffer.getvalue()) - 12):
+        with pytest.raises(ValueError, match='ends inside a record'):
+            list(read_traffic(io.BytesIO(buffer.getvalue()[:length])))
+
+
+def test_replay_transport() -> None:
+    records = [
+        TrafficRecord(0, PLAY, ACCEPTED, 0.01),
+        TrafficRecord(0.1, GET_VTR_MODE, _vtr_mode(VTRMode.PLAY_FWD), 0.01),
+    ]
+    vcr = ReplayTransport(records)
+    assert vcr.play().status == CommandStatus.COMMAND_ACCEPTED
+    assert vcr.get_vtr_mode().vtr_mode == VTRMode.PLAY_FWD
+    with pytest.raises(ReplayError, match='no more records'):
+        vcr.get_vtr_mode()
+
+
+def test_replay_transport_from_path(tmp_path: Path) -> None:
+    path = tmp_path / 'traffic.bin'
+    with TrafficRecorder(path) as recorder:
+        recorder.record(PLAY, ACCEPTED, 0, 0)
+    assert ReplayTransport(path).send_frame(PLAY) == ACCEPTED
+
+
+def test_replay_transport_strict() -> None:
+    vcr = ReplayTransport([TrafficRecord(0, PLAY, ACCEPTED, 0)])
+    with pytest.raises(ReplayError, match='Expected request'):
+        vcr.send_frame(GET_VTR_MODE)
+
+
+def test_replay_transport_not_strict() -> None:
+    vcr = ReplayTransport([TrafficRecord(0, PLAY, ACCEPTED, 0)], strict=False)
+    assert vcr.send_frame(GET_VTR_MODE) == ACCEPTED
+
+
+def test_replay_transport_timeout() -> None:
+    vcr = ReplayTransport([TrafficRecord(0, PLAY, None, 2)])
+    with pytest.raises(TimeoutError, match='No response within 2 seconds'):
+        vcr.send_frame(PLAY)
+
+
+def test_replay_transport_time_scale(mocker: MockerFixture) -> None:
+    mock_sleep = mocker.patch('vcrtool.traffic.sleep')
+    vcr = ReplayTransport([TrafficRecord(0, PLAY, ACCEPTED, 0.04)], time_scale=0.5)
+    vcr.send_frame(PLAY)
+    mock_sleep.assert_called_once_with(pytest.approx(0.02))
+
+
+@pytest.mark.asyncio
+async def test_async_replay_transport() -> None:
+    vcr = AsyncReplayTransport([
+        TrafficRecord(0, PLAY, ACCEPTED, 0),
+        TrafficRecord(0, GET_VTR_MODE, None, 0),
+    ])
+    assert await vcr.send_frame(PLAY) == ACCEPTED
+    with pytest.raises(TimeoutError):
+        await vcr.send_frame(GET_VTR_MODE)
+    with pytest.raises(ReplayError):
+        await vcr.send_frame(GET_VTR_MODE)
+
+
+@pytest.mark.asyncio
+async def test_async_replay_drives_wait_for_vcr_stop() -> None:
+    records = [
+        TrafficRecord(i * 0.5, GET_VTR_MODE, _vtr_mode(mode), 0.01)
+        for i, mode in enumerate((VTRMode.PLAY_FWD, VTRMode.PLAY_FWD, VTRMode.STOP))
+    ]
+    poller = DeckStatePoller(AsyncReplayTransport(records), poll_interval=0, max_poll_interval=0)
+    ffmpeg_proc = MagicMock()
+    async with poller:
+        await _wait_for_vcr_stop(poller, ffmpeg_proc)
+    ffmpeg_proc.terminate.assert_called_once_with()
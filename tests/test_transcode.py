@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+
+from vcrtool.transcode import (
+    TranscodeError,
+    TranscodeJob,
+    intermediate_path,
+    probe_duration,
+    transcode,
+)
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def _proc(stdout: str = '', returncode: int = 0, stderr: str = '') -> MagicMock:
+    proc = MagicMock()
+    proc.returncode = returncode
+    proc.communicate = AsyncMock(return_value=(stdout.encode(), stderr.encode()))
+    proc.wait = AsyncMock(return_value=returncode)
+    return proc
+
+
+class _FakeFFmpeg:
+    def __init__(self, *, segments: int = 3, output_duration: float = 100.0) -> None:
+        self.segments = segments
+        self.output_duration = output_duration
+        self.calls: list[tuple[str, ...]] = []
+        self.concat_list = ''
+
+    def __call__(self, *args: str, **_: object) -> MagicMock:
+        self.calls.append(args)
+        command = args[3:]
+        if command[0] == 'ffprobe':
+            return _proc(f'{100.0 if "intermediate" in command[-1] else self.output_duration}\n')
+        target = Path(command[-1])
+        if '-segment_time' in command:
+            for i in range(self.segments):
+                Path(str(target) % i).write_bytes(b'segment')
+        elif '-f' in command and 'concat' in command:
+            self.concat_list = Path(command[command.index('-i') + 1]).read_text(encoding='utf-8')
+            target.write_bytes(b'output')
+        else:
+            target.write_bytes(b'encoded')
+        return _proc()
+
+
+def test_intermediate_path() -> None:
+    assert intermediate_path('/tapes/tape.mkv') == Path('/tapes/tape.intermediate.mkv')
+
+
+@pytest.mark.asyncio
+async def test_probe_duration(mocker: MockerFixture) -> None:
+    mock_exec = mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec',
+                             return_value=_proc('12.5\n'))
+    assert await probe_duration('a.mkv', niceness=5) == pytest.approx(12.5)
+    assert mock_exec.call_args.args[:4] == ('nice', '-n', '5', 'ffprobe')
+
+
+@pytest.mark.asyncio
+async def test_probe_duration_no_duration(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec', return_value=_proc('N/A\n'))
+    with pytest.raises(TranscodeError, match='No duration'):
+        await probe_duration('a.mkv')
+
+
+@pytest.mark.asyncio
+async def test_probe_duration_fails(mocker: MockerFixture) -> None:
+    mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec',
+                 return_value=_proc(returncode=1, stderr='a.mkv: No such file\n'))
+    with pytest.raises(TranscodeError, match=r'exited with code 1: a\.mkv: No such file'):
+        await probe_duration('a.mkv')
+
+
+@pytest.mark.asyncio
+async def test_probe_duration_cancelled(mocker: MockerFixture) -> None:
+    proc = _proc()
+    proc.communicate = AsyncMock(side_effect=asyncio.CancelledError)
+    proc.kill = MagicMock(side_effect=ProcessLookupError)
+    mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec', return_value=proc)
+    with pytest.raises(asyncio.CancelledError):
+        await probe_duration('a.mkv')
+    proc.kill.assert_called_once_with()
+    proc.wait.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_transcode(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('vcrtool.transcode.available_cores', return_value=4)
+    fake = _FakeFFmpeg()
+    mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec', side_effect=fake)
+    source = tmp_path / 'tape.intermediate.mkv'
+    source.write_bytes(b'intermediate')
+    output = tmp_path / 'tape.mkv'
+    await transcode(TranscodeJob(source, output, 'x265-lossless', ('-top', '1')), workers=2)
+    assert output.read_bytes() == b'output'
+    assert not source.exists()
+    assert not (tmp_path / 'tape.mkv.parts').exists()
+    assert all(call[:3] == ('nice', '-n', '10') for call in fake.calls)
+    split = fake.calls[1]
+    assert split[split.index('-segment_time') + 1] == '30.000'
+    encodes = [call for call in fake.calls if 'libx265' in call]
+    assert len(encodes) == 3
+    assert all(call[call.index('-threads') + 1] == '2' for call in encodes)
+    assert all(call[-3:-1] == ('-top', '1') for call in encodes)
+    assert fake.concat_list.splitlines() == [
+        f"file 'encoded-segment-{i:05d}.mkv'" for i in range(3)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_transcode_duration_mismatch(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('vcrtool.transcode.available_cores', return_value=2)
+    mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec',
+                 side_effect=_FakeFFmpeg(output_duration=90.0))
+    source = tmp_path / 'tape.intermediate.mkv'
+    source.write_bytes(b'intermediate')
+    with pytest.raises(TranscodeError, match=r'is 90\.000 seconds but the intermediate'):
+        await transcode(TranscodeJob(source, tmp_path / 'tape.mkv'))
+    assert source.exists()
+    assert not (tmp_path / 'tape.mkv.parts').exists()
+
+
+@pytest.mark.asyncio
+async def test_transcode_segment_fails(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('vcrtool.transcode.available_cores', return_value=2)
+    fake = _FakeFFmpeg()
+    failed = _proc(returncode=1, stderr='encoder failed')
+    blocked = _proc()
+    blocked.communicate = AsyncMock(side_effect=asyncio.Event().wait)
+    blocked.kill = MagicMock()
+
+    def _exec(*args: str, **kwargs: object) -> MagicMock:
+        if 'encoded-segment-00000.mkv' in args[-1]:
+            return failed
+        if 'encoded-segment-00001.mkv' in args[-1]:
+            return blocked
+        return fake(*args, **kwargs)
+
+    mocker.patch('vcrtool.transcode.adebug_create_subprocess_exec', side_effect=_exec)
+    source = tmp_path / 'tape.intermediate.mkv'
+    source.write_bytes(b'intermediate')
+    with pytest.raises(TranscodeError, match='encoder failed'):
+        await transcode(TranscodeJob(source, tmp_path / 'tape.mkv', 'ffv1'))
+    blocked.kill.assert_called_once_with()
+    assert source.exists()
+    assert not (tmp_path / 'tape.mkv').exists()
@@ -0,0 +1,156 @@
+"""Serial baud rates of JLIP devices and a store of the rates negotiated with them."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+import json
+import logging
+import os
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+__all__ = ('BAUD_RATES', 'DEFAULT_BAUD_RATE', 'MAX_BAUD_RATE', 'BaudRateError', 'BaudRateStore',
+           'default_store_path', 'fastest_common_baud_rate', 'supported_baud_rates')
+
+BAUD_RATES = {0x20: 9600, 0x21: 19200, 0x22: 38400, 0x23: 57600, 0x24: 115200}
+"""Baud rate for each code in the first data byte of a ``get_baud_rate_supported`` response, and
+the code ``set_baud_rate`` takes to switch to it."""
+DEFAULT_BAUD_RATE = 9600
+"""Baud rate JLIP devices use after power on."""
+MAX_BAUD_RATE = 115200
+"""Fastest baud rate tried by default."""
+
+log = logging.getLogger(__name__)
+
+
+class BaudRateError(Exception):
+    """Raised when a device answers at neither the new nor the previous baud rate."""
+
+
+def supported_baud_rates(code: int) -> tuple[int, ...]:
+    """
+    Get the baud rates a device supports.
+
+    Devices report their fastest rate. Every slower rate in :py:data:`BAUD_RATES` is assumed to
+    work too. An unknown code means only :py:data:`DEFAULT_BAUD_RATE`.
+
+    Parameters
+    ----------
+    code : int
+        First data byte of the ``get_baud_rate_supported`` response.
+
+    Returns
+    -------
+    tuple[int, ...]
+        Supported rates, slowest first.
+    """
+    if (fastest := BAUD_RATES.get(code)) is None:
+        return (DEFAULT_BAUD_RATE,)
+    return tuple(rate for rate in BAUD_RATES.values() if rate <= fastest)
+
+
+def fastest_common_baud_rate(code: int, max_baud_rate: int = MAX_BAUD_RATE) -> tuple[int, int]:
+    """
+    Pick the fastest rate both the device and the host support.
+
+    Parameters
+    ----------
+    code : int
+        First data byte of the ``get_baud_rate_supported`` response.
+    max_baud_rate : int
+        Fastest rate the host's serial adapter supports.
+
+    Returns
+    -------
+    tuple[int, int]
+        The ``set_baud_rate`` code and the rate.
+    """
+    rate = max((rate for rate in supported_baud_rates(code) if rate <= max_baud_rate),
+               default=DEFAULT_BAUD_RATE)
+    return next(code for code, value in BAUD_RATES.items() if value == rate), rate
+
+
+def default_store_path() -> Path:
+    """
+    Get the default location of the :py:class:`BaudRateStore` file.
+
+    Returns
+    -------
+    Path
+        ``vcrtool/baud-rates.json`` under ``$XDG_STATE_HOME``, or ``~/.local/state`` if it is not
+        set.
+    """
+    state_home = os.environ.get('XDG_STATE_HOME') or Path.home() / '.local' / 'state'
+    return Path(state_home) / 'vcrtool' / 'baud-rates.json'
+
+
+class BaudRateStore:
+    """
+    Negotiated baud rates kept in a JSON file, by serial port and JLIP ID.
+
+    A device that was switched to a faster rate stays there until it is powered off, so trying the
+    stored rate first saves a negotiation on the next run.
+    """
+    def __init__(self, path: str | os.PathLike[str] | None = None) -> None:
+        """
+        Initialise the store. The file is read on every lookup and created on the first save.
+
+        Parameters
+        ----------
+        path : str | os.PathLike[str] | None
+            File to use. Defaults to :py:func:`default_store_path`.
+        """
+        self.path = Path(path) if path is not None else default_store_path()
+        """File the rates are kept in."""
+
+    @staticmethod
+    def _key(serial_path: str, jlip_id: int) -> str:
+        return f'{serial_path}#{jlip_id}'
+
+    def _load(self) -> Mapping[str, int]:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            log.warning('Ignoring unreadable baud rate store `%s`.', self.path)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, serial_path: str, jlip_id: int) -> int | None:
+        """
+        Get the rate last negotiated with a device.
+
+        Parameters
+        ----------
+        serial_path : str
+            Path to the serial port.
+        jlip_id : int
+            JLIP ID of the device.
+
+        Returns
+        -------
+        int | None
+            The rate, or ``None`` if none was stored.
+        """
+        return self._load().get(self._key(serial_path, jlip_id))
+
+    def set(self, serial_path: str, jlip_id: int, baud_rate: int) -> None:
+        """
+        Store the rate negotiated with a device.
+
+        Parameters
+        ----------
+        serial_path : str
+            Path to the serial port.
+        jlip_id : int
+            JLIP ID of the device.
+        baud_rate : int
+            The rate.
+        """
+        data = {**self._load(), self._key(serial_path, jlip_id): baud_rate}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(f'{self.path.name}.part')
+        partial.write_text(json.dumps(data, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+        partial.replace(self.path)
@@ -0,0 +1,349 @@
+"""
+Benchmarks for the JLIP protocol layer.
+
+Run ``python -m vcrtool.benchmark`` from a checkout. Pass ``--baseline benchmarks/baseline.json``
+to compare against the stored results and ``--save`` to replace them.
+"""
+# ruff:file-ignore[docstring-missing-exception]
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+import asyncio
+import contextlib
+import fnmatch
+import importlib.util
+import json
+import platform
+import tracemalloc
+
+from typing_extensions import override
+import click
+import serial
+
+from .jlip import (
+    AsyncJLIPTransport,
+    CommandResponse,
+    DeviceNameResponse,
+    JLIPCommands,
+    JLIPTransport,
+    PowerStateResponse,
+    VTRModeResponse,
+    VTUModeResponse,
+)
+from .sansio import CommandStatus, JLIPCodec, checksum
+from .simulator import PtySimulator
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Mapping
+
+__all__ = ('DEFAULT_NUMBER', 'DEFAULT_REPEAT', 'DEFAULT_TOLERANCE', 'BenchmarkResult', 'Case',
+           'compare', 'measure', 'protocol_cases', 'round_trip_cases')
+
+DEFAULT_NUMBER = 1000
+"""Default number of calls timed together for each sample of a protocol case."""
+DEFAULT_REPEAT = 100
+"""Default number of samples per case."""
+DEFAULT_TOLERANCE = 0.5
+"""Default fraction by which a result may be worse than the baseline before it is a regression."""
+_ALLOCATION_CALLS = 100
+_CAPTURE_FRAMES = 1000
+_ACCEPTED = CommandStatus.COMMAND_ACCEPTED
+_SAMPLE_RESPONSES: tuple[tuple[type[CommandResponse], bytes], ...] = (
+    (CommandResponse, JLIPCodec.build_command(1, _ACCEPTED)),
+    (VTRModeResponse, JLIPCodec.build_command(1, _ACCEPTED, 0x06, 0, 1, 2, 3, 4)),
+    (VTUModeResponse, JLIPCodec.build_command(1, _ACCEPTED, 0x30, 0x51, 1, 2)),
+    (PowerStateResponse, JLIPCodec.build_command(1, _ACCEPTED, 1)),
+    (DeviceNameResponse, JLIPCodec.build_command(1, _ACCEPTED, *b'HR-S96')),
+)
+
+
+@dataclass(frozen=True)
+class Case:
+    """A callable to benchmark."""
+    name: str
+    """Name shown in reports and used as the key in baselines."""
+    call: Callable[[], object]
+    """Function under test."""
+    number: int = 1
+    """Calls timed together for each sample. Use more than one for calls shorter than the timer's
+    resolution."""
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """Measurements for one :py:class:`Case`."""
+    name: str
+    """Case name."""
+    ops_per_second: float
+    """Mean calls per second."""
+    p50: float
+    """Median seconds per call."""
+    p99: float
+    """99th percentile of seconds per call."""
+    peak_bytes: float
+    """Mean peak of memory allocated during one call, in bytes."""
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _peak_bytes(call: Callable[[], object]) -> float:
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(_ALLOCATION_CALLS):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call()
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return total / _ALLOCATION_CALLS
+
+
+def measure(case: Case, repeat: int = DEFAULT_REPEAT) -> BenchmarkResult:
+    """
+    Time a case and measure its allocations.
+
+    The case is called once to warm up, then ``repeat`` samples of :py:attr:`Case.number` calls
+    each are timed. Allocations are measured separately with :py:mod:`tracemalloc` so tracing does
+    not slow the timed calls.
+
+    Parameters
+    ----------
+    case : Case
+        Case to run.
+    repeat : int
+        Number of timed samples.
+
+    Returns
+    -------
+    BenchmarkResult
+        The measurements.
+    """
+    call, number = case.call, case.number
+    call()
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            call()
+        samples.append((perf_counter() - start) / number)
+    samples.sort()
+    return BenchmarkResult(case.name,
+                           len(samples) / sum(samples), _percentile(samples, 0.5),
+                           _percentile(samples, 0.99), _peak_bytes(call))
+
+
+def _decode(cls: type[CommandResponse], frame: bytes) -> dict[str, Any]:
+    return asdict(cls.from_bytes(frame))
+
+
+def protocol_cases(number: int = DEFAULT_NUMBER) -> list[Case]:
+    """
+    Get the cases for frame building, validation and response parsing.
+
+    Bulk validation with :py:meth:`vcrtool.sansio.JLIPCodec.validate_frames` is measured on a
+    buffer of a thousand frames, with NumPy too if it is installed. Each response class is measured
+    twice: ``from_bytes`` alone, which only wraps the frame, and a
+    full decode of every field as done by :py:func:`dataclasses.asdict`.
+
+    Parameters
+    ----------
+    number : int
+        Calls timed together for each sample.
+
+    Returns
+    -------
+    list[Case]
+        The cases.
+    """
+    request = JLIPCommands.commands()['get_vtr_mode'].frame(1)
+    command = tuple(request[3:10])
+    status = _SAMPLE_RESPONSES[1][1]
+    cases = [
+        Case('build_command', lambda: JLIPCodec.build_command(1, *command), number),
+        Case('checksum', lambda: checksum(request[:10]), number),
+        Case('validate_response', lambda: JLIPCodec.validate_response(status), number),
+    ]
+    capture = status * _CAPTURE_FRAMES
+    batches = max(1, number // _CAPTURE_FRAMES)
+    cases.append(
+        Case(f'validate_frames x{_CAPTURE_FRAMES}',
+             partial(JLIPCodec.validate_frames, capture, use_numpy=False), batches))
+    if importlib.util.find_spec('numpy'):
+        cases.append(
+            Case(f'validate_frames NumPy x{_CAPTURE_FRAMES}',
+                 partial(JLIPCodec.validate_frames, capture, use_numpy=True), batches))
+    for cls, frame in _SAMPLE_RESPONSES:
+        cases += [
+            Case(f'{cls.__name__}.from_bytes', partial(cls.from_bytes, frame), number),
+            Case(f'{cls.__name__} decode', partial(_decode, cls, frame), number)
+        ]
+    return cases
+
+
+class _PtyJLIPTransport(JLIPTransport):
+    @override
+    def _open_serial(self, serial_path: str) -> serial.Serial:
+        # Linux refuses to reconfigure a pseudo-terminal opened with parity, which this transport
+        # does to apply each read timeout. Parity means nothing on a pseudo-terminal anyway.
+        return serial.Serial(serial_path, rtscts=True, timeout=self.response_timeout)
+
+
+@contextlib.contextmanager
+def round_trip_cases(latency: float = 0) -> Iterator[list[Case]]:
+    """
+    Get cases for status polls through both transports against a simulated deck.
+
+    The deck answers on a pseudo-terminal from :py:class:`vcrtool.simulator.PtySimulator`. Each
+    call sends a ``get_vtr_mode`` frame and parses the response, bypassing the rate limiters. The
+    asyncio case includes the cost of running the event loop for each call.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds the simulated deck waits before answering.
+
+    Yields
+    ------
+    list[Case]
+        The cases. The transports are closed on exit.
+    """
+    frame = JLIPCommands.commands()['get_vtr_mode'].frame(1)
+    with PtySimulator(latency=latency) as simulator, contextlib.ExitStack() as stack:
+        vcr = _PtyJLIPTransport(simulator.path)
+        stack.callback(vcr.comm.close)
+        async_vcr = AsyncJLIPTransport(simulator.path)
+        stack.callback(async_vcr.comm.close)
+        loop = asyncio.new_event_loop()
+        stack.callback(loop.close)
+
+        async def poll() -> VTRModeResponse:
+            return VTRModeResponse.from_bytes(await async_vcr.send_frame(frame))
+
+        yield [
+            Case('JLIPTransport round trip',
+                 lambda: VTRModeResponse.from_bytes(vcr.send_frame(frame))),
+            Case('AsyncJLIPTransport round trip', lambda: loop.run_until_complete(poll())),
+        ]
+
+
+def compare(results: Iterable[BenchmarkResult],
+            baseline: Mapping[str, Mapping[str, Any]],
+            tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Find results that are worse than a baseline.
+
+    A result regresses if its median time per call or its peak allocation is more than
+    ``tolerance`` above the baseline. Cases missing from the baseline are skipped.
+
+    Parameters
+    ----------
+    results : Iterable[BenchmarkResult]
+        New results.
+    baseline : Mapping[str, Mapping[str, Any]]
+        Earlier results by case name, as saved by ``--save``.
+    tolerance : float
+        Allowed fraction above the baseline.
+
+    Returns
+    -------
+    list[str]
+        A description of each regression.
+    """
+    regressions = []
+    for result in results:
+        if (old := baseline.get(result.name)) is None:
+            continue
+        if result.p50 > old['p50'] * (1 + tolerance):
+            regressions.append(f'{result.name}: median {result.p50 * 1e6:.2f} us, baseline '
+                               f'{old["p50"] * 1e6:.2f} us.')
+        if result.peak_bytes > old['peak_bytes'] * (1 + tolerance):
+            regressions.append(f'{result.name}: peak {result.peak_bytes:.0f} B, baseline '
+                               f'{old["peak_bytes"]:.0f} B.')
+    return regressions
+
+
+@click.command(context_settings={'help_option_names': ['-h', '--help']})
+@click.option('-k',
+              '--filter',
+              'pattern',
+              default='*',
+              help='Only run cases whose name matches this glob pattern.')
+@click.option('-n',
+              '--repeat',
+              default=DEFAULT_REPEAT,
+              type=click.IntRange(1),
+              help='Samples per case.')
+@click.option('--number',
+              default=DEFAULT_NUMBER,
+              type=click.IntRange(1),
+              help='Calls per sample for protocol cases.')
+@click.option('--round-trips/--no-round-trips',
+              default=True,
+              help='Run the transport round trips against a simulated deck.')
+@click.option('-b',
+              '--baseline',
+              type=click.Path(dir_okay=False, path_type=Path),
+              help='Baseline file to compare against.')
+@click.option('--save', is_flag=True, help='Write the results to the baseline file.')
+@click.option('-t',
+              '--tolerance',
+              default=DEFAULT_TOLERANCE,
+              type=click.FloatRange(0),
+              help='Allowed fraction above the baseline.')
+def main(pattern: str,
+         repeat: int,
+         number: int,
+         baseline: Path | None,
+         tolerance: float,
+         *,
+         round_trips: bool = True,
+         save: bool = False) -> None:
+    """Benchmark the JLIP protocol layer."""
+    if save and baseline is None:
+        msg = '--save requires --baseline.'
+        raise click.UsageError(msg)
+    with contextlib.ExitStack() as stack:
+        cases = protocol_cases(number)
+        if round_trips:
+            cases += stack.enter_context(round_trip_cases())
+        results = [measure(case, repeat) for case in cases if fnmatch.fnmatch(case.name, pattern)]
+    width = max((len(result.name) for result in results), default=0)
+    click.echo(f'{"case":{width}}  {"ops/s":>12}  {"p50 us":>9}  {"p99 us":>9}  {"peak B":>7}')
+    for result in results:
+        click.echo(
+            f'{result.name:{width}}  {result.ops_per_second:12,.0f}  {result.p50 * 1e6:9.2f}  '
+            f'{result.p99 * 1e6:9.2f}  {result.peak_bytes:7.0f}')
+    if baseline is None:
+        return
+    if save:
+        baseline.write_text(
+            json.dumps(
+                {
+                    'machine': platform.machine(),
+                    'python': platform.python_version(),
+                    'results': {
+                        result.name: asdict(result)
+                        for result in results
+                    }
+                },
+                indent=2) + '\n')
+        return
+    if regressions := compare(results,
+                              json.loads(baseline.read_text())['results'],
+                              tolerance=tolerance):
+        raise click.ClickException('Regressions:\n' + '\n'.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
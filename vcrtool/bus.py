@@ -0,0 +1,249 @@
+"""Several JLIP devices daisy-chained on one serial port."""
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING, Any
+import asyncio
+import contextlib
+import logging
+
+from typing_extensions import override
+
+from .jlip import AsyncJLIPTransport
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+    from typing_extensions import Self
+    import serial
+
+__all__ = ('DEFAULT_SCAN_TIMEOUT', 'JLIPBus', 'JLIPDevice')
+
+DEFAULT_SCAN_TIMEOUT = 0.2
+"""Default number of seconds :py:meth:`JLIPBus.discover` waits for each ID to answer."""
+
+log = logging.getLogger(__name__)
+
+
+class JLIPDevice(AsyncJLIPTransport):
+    """
+    One device on a :py:class:`JLIPBus`.
+
+    This is a full :py:class:`vcrtool.jlip.AsyncJLIPTransport`, so it works anywhere a transport
+    does, including :py:func:`vcrtool.deck_state.poller_for`. It does not open the port itself;
+    every exchange is queued on the bus, which takes turns between devices. Rate limits and error
+    handling remain per device.
+    """
+    def __init__(self, bus: JLIPBus, jlip_id: int, **kwargs: Any) -> None:
+        """
+        Initialise the device handle.
+
+        Parameters
+        ----------
+        bus : JLIPBus
+            Bus that owns the port.
+        jlip_id : int
+            JLIP ID of the device.
+        **kwargs : Any
+            Other keyword arguments for :py:class:`vcrtool.jlip.AsyncJLIPTransport`.
+        """
+        self.bus = bus
+        """Bus that owns the port."""
+        super().__init__(bus.serial_path, jlip_id=jlip_id, **kwargs)
+
+    @override
+    def _open_serial(self, serial_path: str) -> serial.Serial:
+        return self.bus.port.comm
+
+    @override
+    async def send_frame(self, frame: bytes) -> bytes:
+        """
+        Queue a frame on the bus and wait for the response.
+
+        Like the transport's own method this raises :py:class:`TimeoutError` if no complete frame
+        arrives within :py:attr:`response_timeout` seconds.
+
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
+
+        Returns
+        -------
+        bytes
+            Raw response bytes.
+        """
+        response = await self.bus.exchange(frame, self.response_timeout)
+        return self.codec.validate_response(response, raise_on_error=self.raise_on_error_response)
+
+
+class JLIPBus:
+    """
+    Own a serial port shared by several daisy-chained JLIP devices.
+
+    Opening one port from several transports lets their frames interleave on the line. The bus
+    opens the port once and hands out a :py:class:`JLIPDevice` per JLIP ID. Exchanges still happen
+    one at a time, but devices take turns: a scheduler task serves one queued request from each ID
+    that has work before serving the same ID again, so a device polled in a tight loop cannot
+    starve the others.
+    """
+    def __init__(self, serial_path: str, **kwargs: Any) -> None:
+        """
+        Open the port.
+
+        Parameters
+        ----------
+        serial_path : str
+            Path to the serial port.
+        **kwargs : Any
+            Keyword arguments for every :py:class:`JLIPDevice`, such as ``raise_on_error_response``
+            or ``rate_limits``.
+        """
+        self.serial_path = serial_path
+        """Path to the serial port."""
+        self.port = AsyncJLIPTransport(serial_path, raise_on_error_response=False)
+        """Transport that performs the exchanges. Its own commands bypass the scheduler."""
+        self.devices: dict[int, JLIPDevice] = {}
+        """Device handles by the JLIP ID they were created with."""
+        self._device_kwargs = kwargs
+        self._queues: dict[int, deque[tuple[bytes, float, asyncio.Future[bytes]]]] = {}
+        self._turns: deque[int] = deque()
+        self._work = asyncio.Event()
+        self._scheduler: asyncio.Task[None] | None = None
+
+    def device(self, jlip_id: int) -> JLIPDevice:
+        """
+        Get the handle for a JLIP ID, creating it if needed.
+
+        Parameters
+        ----------
+        jlip_id : int
+            JLIP ID of the device.
+
+        Returns
+        -------
+        JLIPDevice
+            The device handle.
+        """
+        if (device := self.devices.get(jlip_id)) is None:
+            device = self.devices[jlip_id] = JLIPDevice(self, jlip_id, **self._device_kwargs)
+        return device
+
+    async def exchange(self, frame: bytes, timeout: float) -> bytes:
+        """
+        Queue a frame and wait for its turn and its response.
+
+        Requests are queued by the JLIP ID in the frame. The response is not validated beyond its
+        checksum.
+
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
+        timeout : float
+            Seconds to wait for the response once the frame is sent.
+
+        Returns
+        -------
+        bytes
+            The response frame.
+        """
+        if self._scheduler is None:
+            self._scheduler = asyncio.create_task(self._schedule())
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        jlip_id = frame[2]
+        if not (queue := self._queues.setdefault(jlip_id, deque())):
+            self._turns.append(jlip_id)
+        queue.append((frame, timeout, future))
+        self._work.set()
+        return await future
+
+    async def _schedule(self) -> None:
+        while True:
+            await self._work.wait()
+            jlip_id = self._turns.popleft()
+            queue = self._queues[jlip_id]
+            frame, timeout, future = queue.popleft()
+            if queue:
+                self._turns.append(jlip_id)
+            if not self._turns:
+                self._work.clear()
+            if future.cancelled():
+                continue
+            # Exchanges are serialised here, so the port's timeout can follow each request.
+            self.port.response_timeout = timeout
+            try:
+                response = await self.port.send_frame(frame)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:  # ruff:ignore[blind-except]
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(response)
+
+    async def discover(self,
+                       jlip_ids: Iterable[int] = range(1, 100),
+                       timeout: float = DEFAULT_SCAN_TIMEOUT) -> list[int]:
+        """
+        Find the JLIP IDs that answer on the bus.
+
+        A presence check is sent to each ID in turn. Use ``set_jlip_id`` on a found device to give
+        it a free ID.
+
+        Parameters
+        ----------
+        jlip_ids : Iterable[int]
+            IDs to try.
+        timeout : float
+            Seconds to wait for each ID to answer.
+
+        Returns
+        -------
+        list[int]
+            IDs that answered.
+        """
+        found = []
+        for jlip_id in jlip_ids:
+            frame = AsyncJLIPTransport.commands()['presence_check'].frame(jlip_id)
+            try:
+                await self.exchange(frame, timeout)
+            except (TimeoutError, ValueError):
+                continue
+            log.debug('Found a device with JLIP ID %d.', jlip_id)
+            found.append(jlip_id)
+        return found
+
+    async def close(self) -> None:
+        """Stop the scheduler, cancel queued requests and close the port."""
+        if (scheduler := self._scheduler) is not None:
+            self._scheduler = None
+            scheduler.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await scheduler
+        for queue in self._queues.values():
+            for _, _, future in queue:
+                future.cancel()
+        self._queues.clear()
+        self._turns.clear()
+        self._work.clear()
+        self.port.comm.close()
+
+    async def __aenter__(self) -> Self:
+        """
+        Use the bus as a context that closes it on exit.
+
+        Returns
+        -------
+        Self
+            This bus.
+        """
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None,
+                        tb: TracebackType | None) -> None:
+        """Close the bus."""
+        await self.close()
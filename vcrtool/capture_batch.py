@@ -0,0 +1,452 @@
+"""Capture many tapes from several JLIP VCRs in parallel."""
+# ruff:file-ignore[docstring-missing-exception]
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING
+import asyncio
+import csv
+import enum
+import logging
+import os
+import sys
+
+from pytimeparse2 import parse as timeparse  # type: ignore[import-untyped]
+from typing_extensions import override
+import click
+
+from .capture_stereo import (
+    DEFAULT_TIMESPAN,
+    _a_main,
+    _prepare_vcr,
+    _release_audio_device,
+    _restore_audio_device,
+)
+from .deck_state import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    eject_wait,
+    poller_for,
+    rewind_wait,
+)
+from .encoders import AUTO_ENCODER, DEFAULT_ENCODER, ENCODER_PROFILES
+from .jlip import AsyncJLIPTransport
+from .metrics import DEFAULT_METRICS_HOST, CaptureMetrics, export_metrics
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Sequence
+    from contextlib import AbstractAsyncContextManager
+
+__all__ = ('CPUBudget', 'CaptureJob', 'DeckProgress', 'DeckState', 'load_manifest', 'main')
+
+DEFAULT_CORES_PER_CAPTURE = 4.0
+DEFAULT_INPUT_INDEX = 2
+DEFAULT_PROGRESS_INTERVAL = 30.0
+TAPE_POLL_INTERVAL = 2.0
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CaptureJob:
+    """A single tape to capture, as described by one row of the manifest."""
+    serial: str
+    """Serial device path for JLIP. Rows sharing it are captured one after another."""
+    video_device: str
+    """Video capture device path."""
+    audio_device: str
+    """ALSA device name."""
+    output: str
+    """Output file."""
+    length: int
+    """Number of seconds to record."""
+    vbi_device: str | None = None
+    """VBI device path."""
+    input_index: int = DEFAULT_INPUT_INDEX
+    """Input index for ``v4l2-ctl``."""
+
+
+def load_manifest(path: Path) -> list[CaptureJob]:
+    """
+    Load capture jobs from a CSV manifest.
+
+    The manifest must have a header row. The ``serial``, ``video_device``, ``audio_device`` and
+    ``output`` columns are required, while ``vbi_device``, ``input_index`` and ``timespan`` are
+    optional.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the manifest.
+
+    Returns
+    -------
+    list[CaptureJob]
+        The jobs in manifest order.
+
+    Raises
+    ------
+    ValueError
+        If a required column is missing or a value is invalid.
+    """
+    jobs = []
+    with path.open(newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            missing = [
+                key for key in ('serial', 'video_device', 'audio_device', 'output')
+                if not row.get(key)
+            ]
+            if missing:
+                msg = f'Line {line}: missing {", ".join(missing)}.'
+                raise ValueError(msg)
+            length = timeparse(row.get('timespan') or DEFAULT_TIMESPAN)
+            if not length:
+                msg = f'Line {line}: timespan is invalid.'
+                raise ValueError(msg)
+            try:
+                input_index = int(row.get('input_index') or DEFAULT_INPUT_INDEX)
+            except ValueError as e:
+                msg = f'Line {line}: input index is invalid.'
+                raise ValueError(msg) from e
+            jobs.append(
+                CaptureJob(row['serial'], row['video_device'], row['audio_device'], row['output'],
+                           int(length),
+                           row.get('vbi_device') or None, input_index))
+    return jobs
+
+
+class CPUBudget:
+    """
+    Weighted semaphore that caps the CPU cores reserved by concurrently running encoders.
+
+    A reservation larger than the whole budget is clamped to it so it can still run on its own. The
+    budget only decides when an encoder may start; the holder is expected to size its thread pools
+    to the cores it reserved.
+    """
+    def __init__(self, cores: float) -> None:
+        """
+        Initialise the budget.
+
+        Parameters
+        ----------
+        cores : float
+            Total number of cores the encoders may use.
+        """
+        self.cores = cores
+        """Total number of cores the encoders may use."""
+        self.available = cores
+        """Number of cores not currently reserved."""
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, cores: float) -> AsyncIterator[float]:
+        """
+        Reserve cores for the duration of the context, waiting until enough are free.
+
+        Parameters
+        ----------
+        cores : float
+            Number of cores to reserve.
+
+        Yields
+        ------
+        float
+            Number of cores actually reserved, after clamping to the budget.
+        """
+        cores = min(cores, self.cores)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.available >= cores)
+            self.available -= cores
+        try:
+            yield cores
+        finally:
+            async with self._condition:
+                self.available += cores
+                self._condition.notify_all()
+
+
+class DeckState(enum.Enum):
+    """What a deck is currently doing."""
+    CAPTURING = 'capturing'
+    """Recording a tape."""
+    DONE = 'done'
+    """All jobs for the deck have finished."""
+    PREPARING = 'preparing'
+    """Turning on and rewinding before a capture."""
+    QUEUED = 'queued'
+    """Waiting for CPU budget before capturing."""
+    REWINDING = 'rewinding'
+    """Rewinding after a capture."""
+    WAITING_FOR_TAPE = 'waiting for tape'
+    """The previous tape was ejected and the next one has not been inserted yet."""
+
+
+@dataclass
+class DeckProgress:
+    """Progress of all jobs assigned to one deck."""
+    serial: str
+    """Serial device path of the deck."""
+    total: int
+    """Number of jobs assigned to the deck."""
+    completed: int = 0
+    """Number of jobs that finished successfully."""
+    failed: list[str] = field(default_factory=list)
+    """Outputs of the jobs that failed."""
+    state: DeckState = DeckState.QUEUED
+    """Current state."""
+    output: str | None = None
+    """Output of the current job."""
+    started_at: float | None = None
+    """Monotonic time the current state was entered."""
+    def set_state(self, state: DeckState) -> None:
+        """Enter a new state and log it."""
+        self.state = state
+        self.started_at = monotonic()
+        log.info('%s: %s.', self.serial, self)
+
+    @override
+    def __str__(self) -> str:
+        elapsed = '' if self.started_at is None else f' for {monotonic() - self.started_at:.0f} s'
+        current = f' `{self.output}`' if self.output and self.state != DeckState.DONE else ''
+        return (f'{self.state.value}{current}{elapsed} '
+                f'({self.completed + len(self.failed)}/{self.total}, {len(self.failed)} failed)')
+
+
+async def _wait_for_tape(vcr: AsyncJLIPTransport) -> None:
+    poller = poller_for(vcr)
+    remove_cadence = poller.add_cadence(lambda _: TAPE_POLL_INTERVAL)
+    try:
+        async with poller:
+            await poller.wait_for(lambda state: state.tape_inserted)
+    finally:
+        remove_cadence()
+
+
+async def _capture(job: CaptureJob,
+                   vcr: AsyncJLIPTransport,
+                   budget: CPUBudget,
+                   progress: DeckProgress,
+                   *,
+                   cores_per_capture: float,
+                   poll_interval: float,
+                   max_poll_interval: float,
+                   encoder: str = DEFAULT_ENCODER,
+                   metrics: CaptureMetrics | None = None) -> int:
+    progress.set_state(DeckState.PREPARING)
+    wpctl, audio_device_name, audio_node_id = await asyncio.to_thread(_release_audio_device,
+                                                                      job.audio_device)
+    try:
+        await _prepare_vcr(vcr)
+        try:
+            progress.set_state(DeckState.QUEUED)
+            async with budget.reserve(cores_per_capture) as cores:
+                progress.set_state(DeckState.CAPTURING)
+                return await _a_main(job.video_device,
+                                     job.audio_device,
+                                     job.length,
+                                     job.output,
+                                     job.input_index,
+                                     job.vbi_device,
+                                     vcr,
+                                     poll_interval=poll_interval,
+                                     max_poll_interval=max_poll_interval,
+                                     threads=max(1, int(cores)),
+                                     encoder=encoder,
+                                     metrics=metrics)
+        finally:
+            progress.set_state(DeckState.REWINDING)
+            await rewind_wait(vcr)
+    finally:
+        await asyncio.to_thread(_restore_audio_device, wpctl, audio_device_name, audio_node_id)
+
+
+async def _change_tape(vcr: AsyncJLIPTransport, progress: DeckProgress) -> None:
+    log.debug('%s: ejecting tape.', progress.serial)
+    await eject_wait(vcr)
+    progress.set_state(DeckState.WAITING_FOR_TAPE)
+    await _wait_for_tape(vcr)
+
+
+async def _run_deck(jobs: Sequence[CaptureJob],
+                    budget: CPUBudget,
+                    progress: DeckProgress,
+                    *,
+                    cores_per_capture: float,
+                    poll_interval: float,
+                    max_poll_interval: float,
+                    encoder: str = DEFAULT_ENCODER,
+                    metrics: CaptureMetrics | None = None) -> None:
+    try:
+        vcr = await asyncio.to_thread(AsyncJLIPTransport, progress.serial, metrics=metrics)
+    except Exception:
+        log.exception('%s: cannot open the deck.', progress.serial)
+        progress.failed.extend(job.output for job in jobs)
+        progress.set_state(DeckState.DONE)
+        return
+    poller_for(vcr, poll_interval=poll_interval, max_poll_interval=max_poll_interval)
+    for index, job in enumerate(jobs):
+        progress.output = job.output
+        try:
+            if index > 0:
+                await _change_tape(vcr, progress)
+            ret = await _capture(job,
+                                 vcr,
+                                 budget,
+                                 progress,
+                                 cores_per_capture=cores_per_capture,
+                                 poll_interval=poll_interval,
+                                 max_poll_interval=max_poll_interval,
+                                 encoder=encoder,
+                                 metrics=metrics)
+        except Exception:
+            log.exception('%s: capture of `%s` failed.', progress.serial, job.output)
+            ret = 1
+        if ret == 0:
+            progress.completed += 1
+        else:
+            progress.failed.append(job.output)
+    progress.set_state(DeckState.DONE)
+
+
+async def _report_progress(progress: Sequence[DeckProgress], interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        for deck in progress:
+            click.echo(f'{deck.serial}: {deck}', err=True)
+
+
+async def _a_run(jobs: Sequence[CaptureJob],
+                 *,
+                 cpu_budget: float,
+                 cores_per_capture: float,
+                 progress_interval: float,
+                 poll_interval: float,
+                 max_poll_interval: float,
+                 encoder: str = DEFAULT_ENCODER,
+                 metrics_port: int | None = None,
+                 metrics_host: str = DEFAULT_METRICS_HOST,
+                 metrics_textfile: str | None = None) -> list[DeckProgress]:
+    by_deck: dict[str, list[CaptureJob]] = defaultdict(list)
+    for job in jobs:
+        by_deck[job.serial].append(job)
+    budget = CPUBudget(cpu_budget)
+    progress = [DeckProgress(serial, len(deck_jobs)) for serial, deck_jobs in by_deck.items()]
+    metrics = CaptureMetrics() if metrics_port is not None or metrics_textfile else None
+    exporter: AbstractAsyncContextManager[None] = nullcontext()
+    if metrics:
+        exporter = export_metrics(metrics.registry,
+                                  port=metrics_port,
+                                  host=metrics_host,
+                                  textfile=metrics_textfile)
+    reporter = asyncio.create_task(_report_progress(progress, progress_interval))
+    try:
+        async with exporter:
+            await asyncio.gather(*(_run_deck(by_deck[deck.serial],
+                                             budget,
+                                             deck,
+                                             cores_per_capture=cores_per_capture,
+                                             poll_interval=poll_interval,
+                                             max_poll_interval=max_poll_interval,
+                                             encoder=encoder,
+                                             metrics=metrics) for deck in progress))
+    finally:
+        reporter.cancel()
+    return progress
+
+
+@click.command(context_settings={'help_option_names': ['-h', '--help']})
+@click.option('-c',
+              '--cpu-budget',
+              default=float(os.cpu_count() or 1),
+              type=float,
+              help='Number of CPU cores shared by all encoders.')
+@click.option('-C',
+              '--cores-per-capture',
+              default=DEFAULT_CORES_PER_CAPTURE,
+              type=float,
+              help='Number of CPU cores reserved by each running capture.')
+@click.option('-e',
+              '--encoder',
+              default=DEFAULT_ENCODER,
+              envvar='VCRTOOL_ENCODER',
+              type=click.Choice((*ENCODER_PROFILES, AUTO_ENCODER)),
+              help='Video encoder profile. auto picks the best one the reserved cores sustain.')
+@click.option('-m',
+              '--metrics-port',
+              type=click.IntRange(0, 65535),
+              help='Serve Prometheus metrics over HTTP on this port while capturing.')
+@click.option('--metrics-host',
+              default=DEFAULT_METRICS_HOST,
+              help='Address the metrics endpoint listens on.')
+@click.option('-M',
+              '--metrics-textfile',
+              type=click.Path(dir_okay=False),
+              help='Write Prometheus metrics to this file for the node_exporter textfile '
+              'collector while capturing.')
+@click.option('-p',
+              '--poll-interval',
+              default=DEFAULT_POLL_INTERVAL,
+              type=float,
+              help='Initial delay in seconds between VCR status polls.')
+@click.option('-P',
+              '--max-poll-interval',
+              default=DEFAULT_MAX_POLL_INTERVAL,
+              type=float,
+              help='Maximum delay in seconds between VCR status polls.')
+@click.option('-r',
+              '--progress-interval',
+              default=DEFAULT_PROGRESS_INTERVAL,
+              type=float,
+              help='Seconds between progress reports.')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def main(manifest: Path,
+         cpu_budget: float,
+         cores_per_capture: float,
+         progress_interval: float,
+         poll_interval: float = DEFAULT_POLL_INTERVAL,
+         max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+         encoder: str = DEFAULT_ENCODER,
+         metrics_port: int | None = None,
+         metrics_host: str = DEFAULT_METRICS_HOST,
+         metrics_textfile: str | None = None) -> None:
+    """
+    Capture the tapes listed in a CSV manifest, running each deck in parallel.
+
+    Each row describes one tape. Rows with the same ``serial`` are captured in order on that deck,
+    which ejects the previous tape and waits for the next one to be inserted. The ``video_device``,
+    ``audio_device`` and ``output`` columns are also required; ``vbi_device``, ``input_index`` and
+    ``timespan`` are optional.
+
+    With ``--encoder auto``, each capture uses the best encoder profile that the cores it reserved
+    can run in real time.
+
+    ``--metrics-port`` serves Prometheus metrics for every deck while the batch runs, labelled by
+    serial port and output file. ``--metrics-textfile`` writes them to a file for node_exporter's
+    textfile collector instead.
+    """
+    try:
+        jobs = load_manifest(manifest)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='MANIFEST') from e
+    if not jobs:
+        click.secho('Manifest has no jobs.', file=sys.stderr)
+        raise click.Abort
+    progress = asyncio.run(
+        _a_run(jobs,
+               cpu_budget=cpu_budget,
+               cores_per_capture=cores_per_capture,
+               progress_interval=progress_interval,
+               poll_interval=poll_interval,
+               max_poll_interval=max_poll_interval,
+               encoder=encoder,
+               metrics_port=metrics_port,
+               metrics_host=metrics_host,
+               metrics_textfile=metrics_textfile))
+    if failed := [output for deck in progress for output in deck.failed]:
+        click.secho(f'{len(failed)} of {len(jobs)} captures failed: {", ".join(failed)}.',
+                    file=sys.stderr)
+        raise click.Abort
@@ -3,8 +3,10 @@
 from __future__ import annotations
 
 from collections.abc import Callable
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Any, ParamSpec, TypeVar, cast
+from time import monotonic
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar, cast
 import asyncio
 import asyncio.subprocess as asp
 import logging
@@ -15,9 +17,36 @@ import sys
 from pytimeparse2 import parse as timeparse  # type: ignore[import-untyped]
 import anyio
 import click
-import psutil
 
-from .jlip import JLIPTransport, VTRMode
+from .deck_state import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DeckStatePoller,
+    counter_seconds,
+    end_of_tape_cadence,
+    poller_for,
+    rewind_wait,
+    seek_wait,
+)
+from .encoders import (
+    AUTO_ENCODER,
+    DEFAULT_ENCODER,
+    ENCODER_PROFILES,
+    cheaper_encoder,
+    resolve_encoder,
+)
+from .jlip import AsyncJLIPTransport, VTRMode
+from .metrics import DEFAULT_METRICS_HOST, CaptureMetrics, export_metrics
+from .progress import CaptureFellBehindError, CaptureMonitor, ProgressThresholds
+from .segments import DEFAULT_SEGMENT_LENGTH, SegmentError, SegmentedOutput
+from .traffic import TrafficRecorder
+from .transcode import (
+    INTERMEDIATE_ENCODERS,
+    TranscodeError,
+    TranscodeJob,
+    intermediate_path,
+    transcode,
+)
 from .utils import (
     adebug_create_subprocess_exec,
     adebug_sleep,
@@ -26,7 +55,13 @@ from .utils import (
     get_pipewire_audio_device_node_id,
 )
 
+if TYPE_CHECKING:
+    from contextlib import AbstractAsyncContextManager
+
+    from .progress import CaptureProgress
+
 DEFAULT_TIMESPAN = '372m'
+FIELD_ARGS = ('-top', '1', '-aspect', '4/3')
 THREAD_QUEUE_SIZE = 2048
 
 P = ParamSpec('P')
@@ -36,38 +71,100 @@ C = TypeVar('C', bound=Callable[..., Any])
 log = logging.getLogger(__name__)
 
 
-def _wait_for_vcr_stop(vcr: JLIPTransport, ffmpeg_proc: asp.Process) -> None:
+async def _wait_for_vcr_stop(poller: DeckStatePoller, ffmpeg_proc: asp.Process) -> None:
     """
-    Poll the VCR until it stops playing forward, then terminate ffmpeg.
+    Wait until the VCR stops playing forward, then terminate ffmpeg.
 
     Parameters
     ----------
-    vcr : JLIPTransport
-        The VCR device to monitor.
+    poller : DeckStatePoller
+        Poller watching the VCR.
     ffmpeg_proc : asyncio.subprocess.Process
         The ffmpeg process to terminate once playback stops.
     """
-    ffmpeg_pid = ffmpeg_proc.pid
-    while psutil.pid_exists(ffmpeg_pid):
-        data = vcr.get_vtr_mode(fast=True)
-        if data.vtr_mode != VTRMode.PLAY_FWD:
-            log.debug('Detected VCR is no longer playing (mode = %s). Terminating ffmpeg.',
-                      data.vtr_mode)
+    data = await poller.wait_for(lambda state: state.vtr_mode != VTRMode.PLAY_FWD)
+    log.debug('Detected VCR is no longer playing (mode = %s). Terminating ffmpeg.', data.vtr_mode)
+    ffmpeg_proc.terminate()
+
+
+async def _wait_for_ffmpeg_or_vcr_stop(poller: DeckStatePoller, ffmpeg_proc: asp.Process) -> int:
+    """
+    Wait for ffmpeg to exit, terminating it early if the VCR stops playing.
+
+    The VCR watcher and ffmpeg race each other and whichever finishes first ends the wait. The VCR
+    is polled in the background by the deck's :py:class:`DeckStatePoller`, so the event loop keeps
+    servicing the ffmpeg and zvbi2raw pipes. If polling the VCR fails, ffmpeg is terminated and
+    the error is re-raised once it has exited. If the wait is cancelled, ffmpeg is terminated and
+    the cancellation is passed on once it has exited.
+
+    Returns
+    -------
+    int
+        The exit code of ffmpeg.
+    """
+    async with poller:
+        watcher = asyncio.create_task(_wait_for_vcr_stop(poller, ffmpeg_proc))
+        ffmpeg_wait = asyncio.create_task(ffmpeg_proc.wait())
+        done: set[asyncio.Task[Any]] = set()
+        try:
+            done, _ = await asyncio.wait((watcher, ffmpeg_wait),
+                                         return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            log.info('Capture cancelled. Terminating ffmpeg.')
             ffmpeg_proc.terminate()
-            break
+            await ffmpeg_wait
+            raise
+        finally:
+            watcher.cancel()
+    if watcher in done and (exc := watcher.exception()) is not None:
+        log.error('Polling the VCR failed. Terminating ffmpeg.')
+        ffmpeg_proc.terminate()
+        await ffmpeg_wait
+        raise exc
+    # Waiting is required to avoid 'Loop that handles pid ... is closed'
+    return await ffmpeg_wait
 
 
-async def _a_main(video_device: str, audio_device: str, length: int, output: str, input_index: int,
-                  vbi_device: str | None, vcr: JLIPTransport) -> int:
+async def _a_main(video_device: str,
+                  audio_device: str,
+                  length: int,
+                  output: str,
+                  input_index: int,
+                  vbi_device: str | None,
+                  vcr: AsyncJLIPTransport,
+                  *,
+                  poll_interval: float = DEFAULT_POLL_INTERVAL,
+                  max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+                  threads: int | None = None,
+                  encoder: str = DEFAULT_ENCODER,
+                  intermediate: str | None = None,
+                  thresholds: ProgressThresholds | None = None,
+                  abort_when_behind: bool = False,
+                  metrics: CaptureMetrics | None = None,
+                  segments: SegmentedOutput | None = None,
+                  resume_at: float | None = None) -> int:
     log.debug('Starting ffmpeg.')
-    length = int(length) + 15
+    timespan = length
+    length = int(max(length - (resume_at or 0), 0)) + 15
     log.debug('Will record for %s seconds.', length)
     output_base = Path(output).stem
+    if intermediate:
+        output = str(intermediate_path(output))
+        log.debug('Capturing to intermediate `%s`.', output)
+    run = segments.start_run() if segments else None
+    if segments and run:
+        log.debug('Writing run %d of segments to `%s`.', run.index, segments.directory)
+    profile = resolve_encoder(intermediate or encoder, threads)
+    log.debug('Encoding video with `%s`, expected to need %.2f cores.', profile.name, profile.cores)
+    if threads:
+        log.debug('Limiting the encoder to %d threads.', threads)
     ffmpeg_proc = await adebug_create_subprocess_exec(
         'ffmpeg',
         '-hide_banner',
         '-loglevel',
         'warning',
+        '-progress',
+        'pipe:1',
         '-y',
         '-thread_queue_size',
         str(THREAD_QUEUE_SIZE),
@@ -85,27 +182,19 @@ async def _a_main(video_device: str, audio_device: str, length: int, output: str
         'flac',
         '-ac',
         '2',
-        '-c:v',
-        'libx265',
-        '-x265-params',
-        'lossless=1',
-        '-preset',
-        'superfast',
-        '-flags',
-        '+ilme+ildct',
-        '-top',
-        '1',
-        '-aspect',
-        '4/3',
+        *profile.video_args(threads),
+        *FIELD_ARGS,
         '-t',
         str(length),
-        output,
+        *(segments.ffmpeg_args(run) if segments and run else (output,)),
         env={'FFREPORT': f'file={output_base}.log:level=40'},
-        stdin=asp.PIPE)
+        stdin=asp.PIPE,
+        stdout=asp.PIPE)
     log.debug('ffmpeg PID: %s', ffmpeg_proc.pid)
     vbi_proc = None
+    stop_tracking_vbi = None
     if vbi_device:
-        output_vbi = f'{output_base}.vbi'
+        output_vbi = str(segments.vbi_path(run)) if segments and run else f'{output_base}.vbi'
         await anyio.Path(output_vbi).unlink(missing_ok=True)
         log.debug('Starting zvbi2raw with device `%s` and outputting to `%s`.', vbi_device,
                   output_vbi)
@@ -113,13 +202,76 @@ async def _a_main(video_device: str, audio_device: str, length: int, output: str
                                                        '-d',
                                                        vbi_device,
                                                        '-o',
-                                                       f'{output_base}.vbi',
+                                                       output_vbi,
                                                        stdout=asp.PIPE,
                                                        stderr=asp.PIPE,
                                                        stdin=asp.PIPE)
         log.debug('zvbi2raw PID: %d', vbi_proc.pid)
+        if metrics:
+            stop_tracking_vbi = metrics.track_file(output, 'zvbi2raw', output_vbi)
     else:
         log.debug('VBI device not specified.')
+    poller = poller_for(vcr, poll_interval=poll_interval, max_poll_interval=max_poll_interval)
+    # Polls back off during steady playback and speed up again as the tape nears its end.
+    remove_cadence = poller.add_cadence(end_of_tape_cadence(timespan))
+
+    def _on_update(progress: CaptureProgress) -> None:
+        if metrics:
+            metrics.observe_progress(output, progress)
+        if segments and run and (position := _tape_position(poller)) is not None:
+            segments.anchor(run, progress.out_time, position)
+
+    monitor = CaptureMonitor(thresholds,
+                             on_behind=ffmpeg_proc.terminate if abort_when_behind else None,
+                             on_update=_on_update)
+    monitor_task = asyncio.create_task(monitor.run(cast('asyncio.StreamReader',
+                                                        ffmpeg_proc.stdout)))
+    try:
+        ffmpeg_proc_return = await _set_input_and_play(video_device,
+                                                       input_index,
+                                                       poller,
+                                                       ffmpeg_proc,
+                                                       reset_counter=resume_at is None)
+        await monitor_task
+    finally:
+        monitor_task.cancel()
+        remove_cadence()
+        if vbi_proc:
+            await _stop_vbi(vbi_proc)
+        if stop_tracking_vbi:
+            stop_tracking_vbi()
+    log.debug('ffmpeg exited with code %d.', ffmpeg_proc_return)
+    if abort_when_behind and monitor.fell_behind:
+        raise CaptureFellBehindError(monitor.fell_behind)
+    # ffmpeg always sets 255 if interrupted, but generally makes the file ready for use
+    if ffmpeg_proc_return not in {0, 255}:
+        log.warning('ffmpeg did not exit cleanly.')
+        return 1
+    return 0
+
+
+def _tape_position(poller: DeckStatePoller) -> float | None:
+    """
+    Get the tape counter now from the last poll, if the deck has been playing since the poll before.
+
+    Returns
+    -------
+    float | None
+        Counter position in seconds, or ``None`` if the deck is not playing steadily.
+    """
+    state, previous = poller.state, poller.previous_state
+    if (state is None or previous is None or poller.updated_at is None
+            or state.vtr_mode != VTRMode.PLAY_FWD or previous.vtr_mode != VTRMode.PLAY_FWD):
+        return None
+    return counter_seconds(state) + monotonic() - poller.updated_at
+
+
+async def _set_input_and_play(video_device: str,
+                              input_index: int,
+                              poller: DeckStatePoller,
+                              ffmpeg_proc: asp.Process,
+                              *,
+                              reset_counter: bool = True) -> int:
     await adebug_sleep(2)
     log.debug('Setting device `%s` input to `%s`.', video_device, input_index)
     change_input_proc = await adebug_create_subprocess_exec('v4l2-ctl',
@@ -137,61 +289,41 @@ async def _a_main(video_device: str, audio_device: str, length: int, output: str
         log.error('Failed to set input.')
         raise click.Abort
     await adebug_sleep(0.25)
-    log.debug('Resetting VCR counter.')
-    vcr.reset_counter()
+    if reset_counter:
+        log.debug('Resetting VCR counter.')
+        await poller.command('reset_counter')
     await adebug_sleep(1)
     log.debug('Starting VCR playback.')
-    vcr.play()
-    try:
-        _wait_for_vcr_stop(vcr, ffmpeg_proc)
-    except KeyboardInterrupt:
-        log.info('Received keyboard interrupt. Terminating ffmpeg.')
-        ffmpeg_proc.terminate()
-    # Waiting is required to avoid 'Loop that handles pid ... is closed'
-    ffmpeg_proc_return = await ffmpeg_proc.wait()
-    log.debug('ffmpeg exited with code %d.', ffmpeg_proc_return)
-    # ffmpeg always sets 255 if interrupted, but generally makes the file ready for use
-    if ffmpeg_proc_return not in {0, 255}:
-        log.warning('ffmpeg did not exit cleanly.')
-        return 1
+    await poller.command('play')
+    return await _wait_for_ffmpeg_or_vcr_stop(poller, ffmpeg_proc)
+
+
+async def _stop_vbi(vbi_proc: asp.Process) -> None:
     vbi_proc_return = None
-    if vbi_proc:
-        try:
-            log.debug('Terminating zvbi2raw.')
-            vbi_proc.terminate()
-            vbi_proc_return = await vbi_proc.wait()
-        except ProcessLookupError:
-            pass
-        log.debug('zvbi2raw exited with code %d. Ignoring.', vbi_proc_return or vbi_proc.returncode)
-    return 0
+    try:
+        log.debug('Terminating zvbi2raw.')
+        vbi_proc.terminate()
+        vbi_proc_return = await vbi_proc.wait()
+    except ProcessLookupError:
+        pass
+    log.debug('zvbi2raw exited with code %d. Ignoring.', vbi_proc_return or vbi_proc.returncode)
 
 
-@click.command(context_settings={'help_option_names': ['-h', '--help']})
-@click.option('-a', '--audio-device', required=True, help='ALSA device name.')
-@click.option('-b', '--vbi-device', help='VBI device path.')
-@click.option('-i', '--input-index', default=2, type=int, help='Input index for v4l2-ctl.')
-@click.option('-s', '--serial', required=True, help='Serial device path for JLIP.')
-@click.option('-t', '--timespan', default=DEFAULT_TIMESPAN, help='Timespan to record.')
-@click.option('-v', '--video-device', required=True, help='Video capture device path.')
-@click.argument('output')
-def main(serial: str, audio_device: str, video_device: str, vbi_device: str | None,
-         timespan: str | None, output: str, input_index: int) -> None:
+def _release_audio_device(audio_device: str) -> tuple[str, str, str]:
     """
-    Capture video, stereo audio, and VBI data from a JLIP VCR.
+    Switch the Pipewire profile of an ALSA device off so ffmpeg can open the device directly.
 
-    This command is highly-opinionated in capturing video. The most important functionality is to
-    capture VBI data. Audio is captured in FLAC format and video in H.265 format.
+    Returns
+    -------
+    tuple[str, str, str]
+        The path to ``wpctl``, the device name and its Pipewire node ID.
     """
-    timespan_seconds = timeparse(timespan or DEFAULT_TIMESPAN)
-    if not timespan_seconds:
-        click.secho('Timespan is invalid.', file=sys.stderr)
-        raise click.Abort
     wpctl = shutil.which('wpctl')
     if not wpctl:
         click.secho('wpctl not found.', file=sys.stderr)
         raise click.Abort
     audio_device_name, audio_node_id = get_pipewire_audio_device_node_id(audio_device)
-    if not audio_node_id:
+    if not audio_device_name or not audio_node_id:
         click.secho('Unable to find audio node ID.', file=sys.stderr)
         raise click.Abort
     log.debug('Setting Pipewire device "%s" to Off.', audio_device_name)
@@ -200,23 +332,362 @@ def main(serial: str, audio_device: str, video_device: str, vbi_device: str | No
     if not audio_device_is_available(audio_device):
         click.secho('Cannot use audio device.', file=sys.stderr)
         raise click.Abort
-    vcr = JLIPTransport(serial)
+    return wpctl, audio_device_name, audio_node_id
+
+
+def _restore_audio_device(wpctl: str, audio_device_name: str, audio_node_id: str) -> None:
+    """Switch the Pipewire profile of an ALSA device back on."""
+    log.debug('Setting Pipewire device "%s" to On.', audio_device_name)
+    sp.run((wpctl, 'set-profile', audio_node_id, '1'), check=True)
+
+
+async def _prepare_vcr(vcr: AsyncJLIPTransport) -> None:
+    """Turn the VCR on, check a tape is inserted and rewind it."""
     log.debug('Turning VCR on.')
-    vcr.turn_on()
-    if not vcr.get_vtr_mode().tape_inserted:
+    poller = poller_for(vcr)
+    await poller.command('turn_on')
+    if not (await poller.poll()).tape_inserted:
         log.error('No tape inserted.')
         raise click.Abort
     log.debug('Rewinding tape.')
-    vcr.rewind_wait()
+    await rewind_wait(vcr)
+
+
+async def _resume_segments(vcr: AsyncJLIPTransport, segments: SegmentedOutput, *,
+                           resume: bool) -> float | None:
+    """
+    Wind the tape to the end of the last complete segment, or delete the segments.
+
+    Returns
+    -------
+    float | None
+        Counter position in seconds to resume from, or ``None`` if the capture starts again from
+        the beginning of the tape.
+    """
+    position = await anyio.to_thread.run_sync(segments.resume_position) if resume else None
+    if position is None:
+        if resume:
+            log.warning('No complete segments in `%s`. Capturing from the start.',
+                        segments.directory)
+        await anyio.to_thread.run_sync(segments.clear)
+        return None
+    log.info('Resuming the capture from %.1f seconds into the tape.', position)
+    await seek_wait(vcr, position)
+    return position
+
+
+async def _join_segments(segments: SegmentedOutput, vbi: str | None) -> int:
+    """
+    Join the segments of a capture.
+
+    Returns
+    -------
+    int
+        ``0`` if the segments were joined, ``1`` if joining failed and the segments were kept.
+    """
+    try:
+        await segments.join(vbi=vbi)
+    except SegmentError:
+        log.exception('Joining the segments failed. They were kept in `%s`.', segments.directory)
+        return 1
+    return 0
+
+
+async def _finish_transcode(task: asyncio.Task[None]) -> int:
+    """
+    Wait for a background transcode.
+
+    Returns
+    -------
+    int
+        ``0`` if the output was verified, ``1`` if the transcode failed and the intermediate was
+        kept.
+    """
+    try:
+        await task
+    except TranscodeError:
+        log.exception('Transcoding failed. The intermediate was kept.')
+        return 1
+    return 0
+
+
+async def _a_capture(serial: str,
+                     video_device: str,
+                     audio_device: str,
+                     length: int,
+                     output: str,
+                     input_index: int,
+                     vbi_device: str | None,
+                     *,
+                     poll_interval: float = DEFAULT_POLL_INTERVAL,
+                     max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+                     record_jlip: str | None = None,
+                     encoder: str = DEFAULT_ENCODER,
+                     intermediate: str | None = None,
+                     transcode_workers: int | None = None,
+                     retries: int = 0,
+                     metrics_port: int | None = None,
+                     metrics_host: str = DEFAULT_METRICS_HOST,
+                     metrics_textfile: str | None = None,
+                     segment_length: float | None = None,
+                     resume: bool = False) -> int:
+    """
+    Prepare the VCR, capture one tape and rewind it.
+
+    An interrupted capture counts as finished: ffmpeg has already been stopped and the output is
+    usable, so the tape is still rewound. If ``record_jlip`` is given, every JLIP exchange is
+    recorded to that file. If ``intermediate`` is given, the tape is captured with that profile to
+    an intermediate file, which is transcoded to ``output`` with ``encoder`` while the tape
+    rewinds. A capture that falls behind is stopped and started again from the beginning of the
+    tape with the next cheaper profile up to ``retries`` times. The last attempt always runs to
+    the end. With ``metrics_port`` or ``metrics_textfile``, JLIP traffic, the deck state and
+    ffmpeg's progress are exported as Prometheus metrics while the capture runs.
+
+    With ``segment_length``, the capture is written as segments of that many seconds and joined
+    once it has finished. A capture that fails is then resumed from the end of its last complete
+    segment up to ``retries`` times, and with ``resume`` an earlier capture of the same output that
+    did not finish is resumed instead of starting again.
+
+    Returns
+    -------
+    int
+        ``0`` on success.
+    """
+    recorder = TrafficRecorder(record_jlip) if record_jlip else None
+    metrics = CaptureMetrics() if metrics_port is not None or metrics_textfile else None
+    capture_path = intermediate_path(output) if intermediate else output
+    segments = SegmentedOutput(capture_path, segment_length) if segment_length else None
+    vcr = AsyncJLIPTransport(serial, recorder=recorder, metrics=metrics)
+    exporter: AbstractAsyncContextManager[None] = nullcontext()
+    if metrics:
+        exporter = export_metrics(metrics.registry,
+                                  port=metrics_port,
+                                  host=metrics_host,
+                                  textfile=metrics_textfile)
+    poller = poller_for(vcr, poll_interval=poll_interval, max_poll_interval=max_poll_interval)
+    transcode_task = None
+    ret = 1
+    try:
+        async with exporter:
+            await _prepare_vcr(vcr)
+            resume_at = None
+            if segments:
+                if resume:
+                    # The tape is at its start, where the capture being resumed reset the counter.
+                    await poller.command('reset_counter')
+                resume_at = await _resume_segments(vcr, segments, resume=resume)
+            for attempt in range(retries + 1):
+                try:
+                    ret = await _a_main(video_device,
+                                        audio_device,
+                                        length,
+                                        output,
+                                        input_index,
+                                        vbi_device,
+                                        vcr,
+                                        poll_interval=poll_interval,
+                                        max_poll_interval=max_poll_interval,
+                                        encoder=encoder,
+                                        intermediate=intermediate,
+                                        abort_when_behind=attempt < retries,
+                                        metrics=metrics,
+                                        segments=segments,
+                                        resume_at=resume_at)
+                except asyncio.CancelledError:
+                    log.info('Capture interrupted.')
+                    ret = 0
+                except CaptureFellBehindError:
+                    if intermediate:
+                        intermediate = cheaper_encoder(intermediate, INTERMEDIATE_ENCODERS)
+                    else:
+                        encoder = cheaper_encoder(encoder)
+                    log.warning('Retrying the capture with `%s` (%d of %d).', intermediate
+                                or encoder, attempt + 1, retries)
+                    await poller.command('stop')
+                    await _prepare_vcr(vcr)
+                    if segments:
+                        resume_at = await _resume_segments(vcr, segments, resume=False)
+                    continue
+                except Exception:
+                    if not segments or attempt == retries:
+                        raise
+                    log.exception('Capture failed.')
+                    ret = 1
+                if ret != 0 and segments and attempt < retries:
+                    log.warning('Resuming the capture (%d of %d).', attempt + 1, retries)
+                    await poller.command('stop')
+                    if (resume_at := await _resume_segments(vcr, segments, resume=True)) is None:
+                        await _prepare_vcr(vcr)
+                    continue
+                break
+            if segments and ret == 0:
+                ret = await _join_segments(segments,
+                                           f'{Path(output).stem}.vbi' if vbi_device else None)
+            if intermediate and ret == 0:
+                transcode_task = asyncio.create_task(
+                    transcode(TranscodeJob(intermediate_path(output), Path(output), encoder,
+                                           FIELD_ARGS),
+                              workers=transcode_workers))
+            log.debug('Rewinding tape.')
+            await rewind_wait(vcr)
+    finally:
+        if transcode_task:
+            ret = await _finish_transcode(transcode_task)
+        if recorder:
+            recorder.close()
+    return ret
+
+
+@click.command(context_settings={'help_option_names': ['-h', '--help']})
+@click.option('-a', '--audio-device', required=True, help='ALSA device name.')
+@click.option('-b', '--vbi-device', help='VBI device path.')
+@click.option('-e',
+              '--encoder',
+              default=DEFAULT_ENCODER,
+              envvar='VCRTOOL_ENCODER',
+              type=click.Choice((*ENCODER_PROFILES, AUTO_ENCODER)),
+              help='Video encoder profile. auto picks the best one that keeps up on this machine.')
+@click.option('-i', '--input-index', default=2, type=int, help='Input index for v4l2-ctl.')
+@click.option('-I',
+              '--intermediate',
+              type=click.Choice(INTERMEDIATE_ENCODERS),
+              help='Capture to an intermediate with this encoder, then transcode it with the '
+              '--encoder profile.')
+@click.option('-m',
+              '--metrics-port',
+              type=click.IntRange(0, 65535),
+              help='Serve Prometheus metrics over HTTP on this port while capturing.')
+@click.option('--metrics-host',
+              default=DEFAULT_METRICS_HOST,
+              help='Address the metrics endpoint listens on.')
+@click.option('-M',
+              '--metrics-textfile',
+              type=click.Path(dir_okay=False),
+              help='Write Prometheus metrics to this file for the node_exporter textfile '
+              'collector while capturing.')
+@click.option('-p',
+              '--poll-interval',
+              default=DEFAULT_POLL_INTERVAL,
+              type=float,
+              help='Initial delay in seconds between VCR status polls.')
+@click.option('-P',
+              '--max-poll-interval',
+              default=DEFAULT_MAX_POLL_INTERVAL,
+              type=float,
+              help='Maximum delay in seconds between VCR status polls.')
+@click.option('-R',
+              '--retries',
+              default=0,
+              type=click.IntRange(0),
+              help='Stop a capture that falls behind and retry it from the start with a cheaper '
+              'encoder up to this many times.')
+@click.option('-r',
+              '--record-jlip',
+              type=click.Path(dir_okay=False),
+              help='Record JLIP traffic to this file for debugging.')
+@click.option('--resume',
+              is_flag=True,
+              help='Resume an earlier segmented capture of OUTPUT from its last complete segment.')
+@click.option('-S',
+              '--segment-length',
+              type=click.FloatRange(1),
+              help='Write the capture as segments of this many seconds so a failed capture can be '
+              f'resumed. --resume uses {DEFAULT_SEGMENT_LENGTH:.0f} seconds by default.')
+@click.option('-s', '--serial', required=True, help='Serial device path for JLIP.')
+@click.option('-t', '--timespan', default=DEFAULT_TIMESPAN, help='Timespan to record.')
+@click.option('-v', '--video-device', required=True, help='Video capture device path.')
+@click.option('-w',
+              '--transcode-workers',
+              type=click.IntRange(1),
+              help='Number of ffmpeg processes transcoding the intermediate at once. Defaults to '
+              'the number of CPU cores.')
+@click.argument('output')
+def main(serial: str,
+         audio_device: str,
+         video_device: str,
+         vbi_device: str | None,
+         timespan: str | None,
+         output: str,
+         input_index: int,
+         poll_interval: float = DEFAULT_POLL_INTERVAL,
+         max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+         record_jlip: str | None = None,
+         encoder: str = DEFAULT_ENCODER,
+         intermediate: str | None = None,
+         transcode_workers: int | None = None,
+         retries: int = 0,
+         *,
+         metrics_port: int | None = None,
+         metrics_host: str = DEFAULT_METRICS_HOST,
+         metrics_textfile: str | None = None,
+         segment_length: float | None = None,
+         resume: bool = False) -> None:
+    """
+    Capture video, stereo audio, and VBI data from a JLIP VCR.
+
+    This command is highly-opinionated in capturing video. The most important functionality is to
+    capture VBI data. Audio is captured in FLAC format and video in lossless H.265 format by
+    default. If the machine cannot encode H.265 in real time, choose a cheaper ``--encoder``:
+    ``ffv1``, ``x264-lossless`` or ``raw``. ``auto`` picks the first of those that the available
+    CPU cores can sustain. The ``VCRTOOL_ENCODER`` environment variable sets the default.
+
+    With ``--intermediate``, the capture itself only writes an intra-only ``ffv1`` or ``raw``
+    intermediate so capture never waits on the encoder. Once the tape has finished, the
+    intermediate is transcoded with the ``--encoder`` profile by a pool of ffmpeg processes at a
+    lower priority while the tape rewinds. The intermediate is deleted after the output is
+    verified and kept if the transcode fails.
+
+    ffmpeg's progress is watched throughout the capture. Dropped and duplicated frames and encoding
+    slower than real time are logged as warnings. With ``--retries``, a capture that keeps falling
+    behind is stopped, the tape is rewound and the capture starts again with the next cheaper
+    encoder.
+
+    ``--metrics-port`` serves Prometheus metrics while the capture runs: JLIP commands, latencies,
+    rate limit waits and checksum failures, the deck's mode and counter, ffmpeg's frame rate,
+    speed and dropped frames and the bytes written by ffmpeg and zvbi2raw. ``--metrics-textfile``
+    writes the same metrics to a file for node_exporter's textfile collector instead.
+
+    With ``--segment-length``, ffmpeg writes the capture as a series of segments that are safe on
+    disk as soon as each one is complete, and the tape counter is saved so each segment maps to a
+    position on the tape. The segments are joined into OUTPUT when the capture finishes. With
+    ``--retries``, a capture that fails winds the tape back to the end of the last complete segment
+    and records only the rest. After a crash, run the same command with ``--resume`` to do the
+    same.
+    """
+    timespan_seconds = timeparse(timespan or DEFAULT_TIMESPAN)
+    if not timespan_seconds:
+        click.secho('Timespan is invalid.', file=sys.stderr)
+        raise click.Abort
+    wpctl, audio_device_name, audio_node_id = _release_audio_device(audio_device)
     log.debug('Entering async.')
-    ret = asyncio.run(
-        _a_main(video_device, audio_device, cast('int', timespan_seconds), output, input_index,
-                vbi_device, vcr))
+    try:
+        ret = asyncio.run(
+            _a_capture(serial,
+                       video_device,
+                       audio_device,
+                       cast('int', timespan_seconds),
+                       output,
+                       input_index,
+                       vbi_device,
+                       poll_interval=poll_interval,
+                       max_poll_interval=max_poll_interval,
+                       record_jlip=record_jlip,
+                       encoder=encoder,
+                       intermediate=intermediate,
+                       transcode_workers=transcode_workers,
+                       retries=retries,
+                       metrics_port=metrics_port,
+                       metrics_host=metrics_host,
+                       metrics_textfile=metrics_textfile,
+                       segment_length=segment_length
+                       or (DEFAULT_SEGMENT_LENGTH if resume else None),
+                       resume=resume))
+    except KeyboardInterrupt:
+        # Python 3.10 re-raises the interrupt after the capture has been wound down.
+        log.info('Capture interrupted.')
+        ret = 0
     log.debug('Exiting async.')
-    log.debug('Setting Pipewire device "%s" to On.', audio_device_name)
-    sp.run((wpctl, 'set-profile', audio_node_id, '1'), check=True)
-    log.debug('Rewinding tape.')
-    vcr.rewind_wait()
+    _restore_audio_device(wpctl, audio_device_name, audio_node_id)
     if ret != 0:
         click.secho('Recording failed.', file=sys.stderr)
         raise click.Abort
@@ -0,0 +1,81 @@
+"""Client for the JLIP daemon started by ``jlipd``."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+import json
+import os
+import socket
+import tempfile
+
+__all__ = ('DaemonError', 'default_socket_path', 'send_request')
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon rejects a request or the command fails."""
+
+
+def default_socket_path() -> str:
+    """
+    Get the socket path used when none is given.
+
+    Returns
+    -------
+    str
+        ``vcrtool-jlip.sock`` in ``$XDG_RUNTIME_DIR``, or a per-user name in the temporary
+        directory if that is not set.
+    """
+    if runtime_dir := os.environ.get('XDG_RUNTIME_DIR'):
+        return str(Path(runtime_dir) / 'vcrtool-jlip.sock')
+    return str(Path(tempfile.gettempdir()) / f'vcrtool-jlip-{os.getuid()}.sock')
+
+
+def send_request(socket_path: str,
+                 serial_path: str,
+                 command: str,
+                 *args: int,
+                 timeout: float | None = None) -> Any:
+    """
+    Ask the daemon to run a command and wait for the result.
+
+    Requests and responses are single lines of JSON. A request names the serial port, the command
+    as given to ``jlip`` and its integer arguments. The response holds either ``result``, the
+    command's response as ``jlip`` would print it, or ``error``.
+
+    Parameters
+    ----------
+    socket_path : str
+        Path to the daemon's Unix socket.
+    serial_path : str
+        Serial port of the device.
+    command : str
+        Command name, such as ``get-vtr-mode``.
+    *args : int
+        Command arguments.
+    timeout : float | None
+        Maximum number of seconds to wait for the connection and the response.
+
+    Returns
+    -------
+    Any
+        The decoded result.
+
+    Raises
+    ------
+    DaemonError
+        If the daemon reports an error or closes the connection without answering.
+    """
+    request = {'serial': serial_path, 'command': command, 'args': list(args)}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        msg = 'The daemon closed the connection without answering.'
+        raise DaemonError(msg)
+    response = json.loads(line)
+    if 'error' in response:
+        raise DaemonError(response['error'])
+    return response['result']
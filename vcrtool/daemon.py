@@ -0,0 +1,191 @@
+"""Daemon that keeps JLIP serial ports open and serves commands over a Unix socket."""
+# ruff:file-ignore[docstring-missing-exception]
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+import asyncio
+import contextlib
+import json
+import logging
+import socket
+
+from bascom import setup_logging
+import click
+
+from .client import default_socket_path
+from .jlip import AsyncJLIPTransport, to_jsonable
+from .main import VALID_COMMANDS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+__all__ = ('JLIPDaemon', 'main')
+
+log = logging.getLogger(__name__)
+
+
+class JLIPDaemon:
+    """
+    Serve JLIP commands for any number of devices over one Unix socket.
+
+    Each serial port is opened the first time a request names it and stays open until the daemon
+    stops, so clients skip the cost of opening the port and building a transport on every command.
+    The protocol is the one described in :py:func:`vcrtool.client.send_request`. A connection may
+    send any number of requests; responses come back in the same order.
+    """
+    def __init__(self,
+                 socket_path: str,
+                 transport_factory: Callable[[str], AsyncJLIPTransport] | None = None) -> None:
+        """
+        Initialise the daemon.
+
+        Parameters
+        ----------
+        socket_path : str
+            Path of the Unix socket to listen on.
+        transport_factory : Callable[[str], AsyncJLIPTransport] | None
+            Builds the transport for a serial port. Defaults to an :py:class:`AsyncJLIPTransport`
+            that does not raise on error responses, matching ``jlip``.
+        """
+        self.socket_path = socket_path
+        self.transport_factory = transport_factory or (
+            lambda serial_path: AsyncJLIPTransport(serial_path, raise_on_error_response=False))
+        self.transports: dict[str, AsyncJLIPTransport] = {}
+        self._open_lock = asyncio.Lock()
+
+    async def transport(self, serial_path: str) -> AsyncJLIPTransport:
+        """
+        Get the transport for a serial port, opening it if needed.
+
+        Parameters
+        ----------
+        serial_path : str
+            Serial port of the device.
+
+        Returns
+        -------
+        AsyncJLIPTransport
+            The open transport.
+        """
+        async with self._open_lock:
+            if (vcr := self.transports.get(serial_path)) is None:
+                log.debug('Opening `%s`.', serial_path)
+                vcr = self.transports[serial_path] = await asyncio.to_thread(
+                    self.transport_factory, serial_path)
+            return vcr
+
+    async def execute(self, request: Any) -> dict[str, Any]:
+        """
+        Run one decoded request.
+
+        Parameters
+        ----------
+        request : Any
+            The decoded request.
+
+        Returns
+        -------
+        dict[str, Any]
+            The response, holding either ``result`` or ``error``.
+        """
+        if (not isinstance(request, dict) or not isinstance(request.get('serial'), str)
+                or not isinstance(args := request.get('args', []), list)
+                or not all(isinstance(x, int) for x in args)):
+            return {'error': 'Malformed request.'}
+        if (command := request.get('command')) not in VALID_COMMANDS:
+            return {'error': f'Invalid command `{command}`.'}
+        try:
+            vcr = await self.transport(request['serial'])
+        except OSError as e:
+            return {'error': f'Cannot open `{request["serial"]}`: {e}'}
+        method: Callable[..., Coroutine[Any, Any, Any]] = getattr(vcr, command.replace('-', '_'))
+        try:
+            return {'result': to_jsonable(await method(*args))}
+        except Exception as e:  # ruff:ignore[blind-except]
+            log.debug('`%s` failed: %s', command, e)
+            return {'error': str(e) or type(e).__name__}
+
+    async def _respond(self, line: bytes) -> bytes:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response: dict[str, Any] = {'error': 'Malformed request.'}
+        else:
+            response = await self.execute(request)
+        return json.dumps(response).encode() + b'\n'
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                writer.write(await self._respond(line))
+                await writer.drain()
+        except ConnectionError:
+            log.debug('Client disconnected.')
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def _is_running(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                return False
+        return True
+
+    async def serve(self, started: asyncio.Event | None = None) -> None:
+        """
+        Listen on the socket until cancelled, then close every serial port.
+
+        Parameters
+        ----------
+        started : asyncio.Event | None
+            Set once the socket accepts connections.
+
+        Raises
+        ------
+        RuntimeError
+            If another daemon is already listening on the socket.
+        """
+        if self._is_running():
+            msg = f'A daemon is already listening on `{self.socket_path}`.'
+            raise RuntimeError(msg)
+        path = Path(self.socket_path)
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        await asyncio.to_thread(path.chmod, 0o600)
+        log.debug('Listening on `%s`.', self.socket_path)
+        try:
+            async with server:
+                if started:
+                    started.set()
+                await server.serve_forever()
+        finally:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+            for vcr in self.transports.values():
+                vcr.comm.close()
+            self.transports.clear()
+
+
+@click.command(context_settings={'help_option_names': ['-h', '--help']})
+@click.option('-s',
+              '--socket',
+              'socket_path',
+              default=default_socket_path,
+              envvar='JLIP_SOCKET',
+              help='Unix socket to listen on.')
+@click.option('-d', '--debug', is_flag=True, help='Enable debug logging.')
+def main(socket_path: str, *, debug: bool = False) -> None:
+    """
+    Serve JLIP commands over a Unix socket.
+
+    Pass the same socket to ``jlip --socket`` to run commands through the daemon.
+    """
+    setup_logging(debug=debug, loggers={'vcrtool': {'handlers': ('console',), 'propagate': False}})
+    try:
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(JLIPDaemon(socket_path).serve())
+    except RuntimeError as e:
+        raise click.ClickException(str(e)) from e
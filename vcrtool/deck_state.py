@@ -0,0 +1,729 @@
+"""Shared, cached view of a JLIP deck's status and the waits built on it."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from time import monotonic
+from typing import TYPE_CHECKING, Any, cast
+import asyncio
+import contextlib
+import enum
+import logging
+import weakref
+
+from .jlip import AsyncJLIPTransport, VTRMode, VTRModeResponse
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+    from .jlip import JLIPTransport
+
+__all__ = ('DEFAULT_EJECT_TIMEOUT', 'DEFAULT_END_OF_TAPE_WINDOW', 'DEFAULT_MAX_POLL_INTERVAL',
+           'DEFAULT_POLL_INTERVAL', 'DEFAULT_REWIND_MAX_POLL_INTERVAL', 'DEFAULT_REWIND_TIMEOUT',
+           'POLL_BACKOFF', 'Cadence', 'DeckStateChange', 'DeckStatePoller', 'StateCallback',
+           'counter_seconds', 'diff_state', 'eject_wait', 'end_of_tape_cadence',
+           'estimate_seconds_left', 'eta_cadence', 'poller_for', 'rewind_wait', 'seek_wait')
+
+DEFAULT_EJECT_TIMEOUT = 60.0
+"""Default number of seconds :py:func:`eject_wait` waits for the tape to come out."""
+DEFAULT_END_OF_TAPE_WINDOW = 60.0
+"""Default number of seconds before the expected end of the tape in which
+:py:func:`end_of_tape_cadence` polls quickly."""
+DEFAULT_MAX_POLL_INTERVAL = 1.0
+"""Default upper bound on the delay between polls in seconds."""
+DEFAULT_POLL_INTERVAL = 0.1
+"""Default initial delay between polls in seconds."""
+DEFAULT_REWIND_MAX_POLL_INTERVAL = 5.0
+"""Default upper bound on the delay between polls while rewinding, in seconds."""
+DEFAULT_REWIND_TIMEOUT = 600.0
+"""Default number of seconds :py:func:`rewind_wait` waits for the rewind to finish."""
+DEFAULT_SEEK_ATTEMPTS = 3
+"""Default number of times :py:func:`seek_wait` winds the tape before giving up."""
+DEFAULT_SEEK_TOLERANCE = 10.0
+"""Default number of seconds before the target :py:func:`seek_wait` may stop the tape."""
+EJECT_SETTLE_TIME = 0.5
+"""Seconds to wait after stopping before ejecting."""
+POLL_BACKOFF = 1.5
+"""Default factor the delay between polls grows by while the deck's mode stays the same."""
+REWIND_SETTLE_TIME = 1.0
+"""Seconds to wait after stopping before rewinding."""
+
+log = logging.getLogger(__name__)
+
+
+class DeckStateChange(enum.Flag):
+    """Parts of the deck status that changed between two polls."""
+    NONE = 0
+    """Nothing changed."""
+    COUNTER = enum.auto()
+    """The tape counter moved."""
+    MODE = enum.auto()
+    """The VTR mode changed."""
+    TAPE = enum.auto()
+    """A tape was inserted or removed."""
+    ALL = COUNTER | MODE | TAPE
+    """Every part."""
+
+
+StateCallback = Callable[[VTRModeResponse | None, VTRModeResponse, DeckStateChange], None]
+"""Subscriber called with the previous state, the new state and what changed."""
+Cadence = Callable[['DeckStatePoller'], 'float | None']
+"""Returns the delay in seconds before the next poll, or ``None`` to leave it to the poller."""
+
+
+async def _call(vcr: AsyncJLIPTransport | JLIPTransport, command: str, **kwargs: Any) -> Any:
+    method = getattr(vcr, command)
+    if isinstance(vcr, AsyncJLIPTransport):
+        return await method(**kwargs)
+    return await asyncio.to_thread(method, **kwargs)
+
+
+def diff_state(previous: VTRModeResponse | None, current: VTRModeResponse) -> DeckStateChange:
+    """
+    Compare two deck states.
+
+    Parameters
+    ----------
+    previous : VTRModeResponse | None
+        Earlier state. ``None`` is treated as everything having changed.
+    current : VTRModeResponse
+        Later state.
+
+    Returns
+    -------
+    DeckStateChange
+        The parts that differ.
+    """
+    if previous is None:
+        return DeckStateChange.ALL
+    changes = DeckStateChange.NONE
+    if ((previous.hour, previous.minute, previous.second, previous.frame)
+            != (current.hour, current.minute, current.second, current.frame)):
+        changes |= DeckStateChange.COUNTER
+    if previous.vtr_mode != current.vtr_mode:
+        changes |= DeckStateChange.MODE
+    if previous.tape_inserted != current.tape_inserted:
+        changes |= DeckStateChange.TAPE
+    return changes
+
+
+class DeckStatePoller:
+    """
+    Background task that polls a deck's VTR mode and caches the latest response.
+
+    Share one poller between everything that needs to watch a deck so serial traffic scales with
+    the poll rate rather than with the number of consumers. Consumers either read :py:attr:`state`,
+    register a callback with :py:meth:`subscribe` or await a condition with :py:meth:`wait_for`.
+
+    The delay between polls starts at ``poll_interval`` and grows by ``backoff`` while the mode and
+    tape presence stay the same, up to ``max_poll_interval``, which bounds how stale the cached
+    state can get. Consumers that know better, such as :py:func:`rewind_wait`, can override the
+    delay with :py:meth:`add_cadence`. If a poll fails, the poller stops and the error is raised to
+    every waiter until it is started again.
+
+    Use :py:func:`poller_for` to get the poller shared by everything watching a transport, and send
+    commands through :py:meth:`command` so they never interleave with a poll. Used as an async
+    context manager, the poller keeps polling while at least one context is open.
+    """
+    def __init__(self,
+                 vcr: AsyncJLIPTransport | JLIPTransport,
+                 *,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+                 backoff: float = POLL_BACKOFF,
+                 fast: bool = True) -> None:
+        """
+        Initialise the poller. It does not poll until started.
+
+        Parameters
+        ----------
+        vcr : AsyncJLIPTransport | JLIPTransport
+            The deck to poll. Synchronous transports are polled in a worker thread.
+        poll_interval : float
+            Initial delay between polls in seconds.
+        max_poll_interval : float
+            Upper bound on the delay between polls in seconds.
+        backoff : float
+            Factor the delay is multiplied by after each poll that sees no mode or tape change.
+        fast : bool
+            Use the transport's faster rate limit.
+        """
+        self.vcr = vcr
+        """The deck being polled."""
+        self.poll_interval = poll_interval
+        """Initial delay between polls in seconds."""
+        self.max_poll_interval = max_poll_interval
+        """Upper bound on the delay between polls in seconds."""
+        self.backoff = backoff
+        """Factor the delay is multiplied by after each poll."""
+        self.fast = fast
+        """Use the transport's faster rate limit."""
+        self.state: VTRModeResponse | None = None
+        """Latest response, or ``None`` before the first poll."""
+        self.updated_at: float | None = None
+        """Monotonic time :py:attr:`state` was received."""
+        self.previous_state: VTRModeResponse | None = None
+        """Response before :py:attr:`state`."""
+        self.previous_updated_at: float | None = None
+        """Monotonic time :py:attr:`previous_state` was received."""
+        self._cadences: list[Cadence] = []
+        self._condition = asyncio.Condition()
+        self._error: Exception | None = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._stop_on_exit = False
+        self._subscribers: list[tuple[StateCallback, DeckStateChange]] = []
+        self._task: asyncio.Task[None] | None = None
+        self._watchers = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the background task is polling."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling in the background if not already doing so."""
+        if not self.running:
+            self._error = None
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling and wait for the background task to finish."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def command(self, command: str, **kwargs: Any) -> Any:
+        """
+        Send a transport command without interleaving it with the poller's own requests.
+
+        Parameters
+        ----------
+        command : str
+            Name of the transport method, such as ``'stop'``.
+        **kwargs : Any
+            Keyword arguments for the method.
+
+        Returns
+        -------
+        Any
+            What the transport method returns.
+        """
+        async with self._lock:
+            return await _call(self.vcr, command, **kwargs)
+
+    def add_cadence(self, cadence: Cadence) -> Callable[[], None]:
+        """
+        Let ``cadence`` choose the delay before each poll.
+
+        When several cadences have an opinion the shortest delay wins.
+
+        Parameters
+        ----------
+        cadence : Cadence
+            Called with this poller after each poll.
+
+        Returns
+        -------
+        Callable[[], None]
+            Function that removes the cadence.
+        """
+        self._cadences.append(cadence)
+
+        def remove() -> None:
+            with contextlib.suppress(ValueError):
+                self._cadences.remove(cadence)
+
+        return remove
+
+    async def poll(self) -> VTRModeResponse:
+        """
+        Poll the deck now, updating the cache and notifying subscribers.
+
+        Returns
+        -------
+        VTRModeResponse
+            The new state.
+        """
+        state, _ = await self._poll()
+        return state
+
+    def subscribe(self,
+                  callback: StateCallback,
+                  changes: DeckStateChange = DeckStateChange.ALL) -> Callable[[], None]:
+        """
+        Call ``callback`` whenever a poll sees one of ``changes``.
+
+        Callbacks run on the event loop and must not block.
+
+        Parameters
+        ----------
+        callback : StateCallback
+            Called with the previous state, the new state and what changed.
+        changes : DeckStateChange
+            Changes to be notified about.
+
+        Returns
+        -------
+        Callable[[], None]
+            Function that removes the subscription.
+        """
+        entry = (callback, changes)
+        self._subscribers.append(entry)
+
+        def unsubscribe() -> None:
+            with contextlib.suppress(ValueError):
+                self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    async def wait_for(self,
+                       predicate: Callable[[VTRModeResponse], bool],
+                       *,
+                       fresh: bool = False,
+                       timeout: float | None = None) -> VTRModeResponse:
+        """
+        Wait until the cached state satisfies ``predicate``, starting the poller if necessary.
+
+        Parameters
+        ----------
+        predicate : Callable[[VTRModeResponse], bool]
+            Condition to wait for.
+        fresh : bool
+            Ignore the state cached when called. Use this after sending a command so the answer
+            reflects it.
+        timeout : float | None
+            Maximum number of seconds to wait.
+
+        Returns
+        -------
+        VTRModeResponse
+            The first state satisfying ``predicate``.
+
+        Raises
+        ------
+        TimeoutError
+            If ``timeout`` elapses first.
+        """
+        generation = self._generation if fresh else -1
+
+        def _ready() -> bool:
+            return self._error is not None or (self.state is not None
+                                               and self._generation > generation
+                                               and predicate(self.state))
+
+        async def _wait() -> None:
+            async with self._condition:
+                await self._condition.wait_for(_ready)
+
+        if self._error is None and not _ready():
+            self.start()
+        try:
+            await asyncio.wait_for(_wait(), timeout)
+        except asyncio.TimeoutError as e:
+            msg = f'Deck state not reached within {timeout} seconds.'
+            raise TimeoutError(msg) from e
+        if self._error is not None:
+            raise self._error
+        return cast('VTRModeResponse', self.state)
+
+    async def _poll(self) -> tuple[VTRModeResponse, DeckStateChange]:
+        state: VTRModeResponse = await self.command('get_vtr_mode', fast=self.fast)
+        previous = self.previous_state = self.state
+        self.previous_updated_at = self.updated_at
+        self.state, self.updated_at = state, monotonic()
+        self._generation += 1
+        changes = diff_state(previous, state)
+        for callback, wanted in tuple(self._subscribers):
+            if changes & wanted:
+                try:
+                    callback(previous, state, changes)
+                except Exception:
+                    log.exception('Deck state subscriber failed.')
+        async with self._condition:
+            self._condition.notify_all()
+        return state, changes
+
+    async def _poll_forever(self) -> None:
+        interval = self.poll_interval
+        while True:
+            _, changes = await self._poll()
+            if changes & (DeckStateChange.MODE | DeckStateChange.TAPE):
+                interval = self.poll_interval
+            hints = [
+                delay for cadence in tuple(self._cadences) if (delay := cadence(self)) is not None
+            ]
+            await asyncio.sleep(min(hints) if hints else interval)
+            interval = min(interval * self.backoff, self.max_poll_interval)
+
+    async def _run(self) -> None:
+        try:
+            await self._poll_forever()
+        except Exception as e:  # ruff:ignore[blind-except]
+            log.debug('Polling the deck failed: %s', e)
+            self._error = e
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def __aenter__(self) -> Self:
+        """
+        Start polling if not already doing so.
+
+        Returns
+        -------
+        Self
+            This poller.
+        """
+        if not self._watchers:
+            self._stop_on_exit = not self.running
+        self._watchers += 1
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None,
+                        tb: TracebackType | None) -> None:
+        """Stop polling when the last context exits, unless polling was started elsewhere."""
+        self._watchers -= 1
+        if not self._watchers and self._stop_on_exit:
+            await self.stop()
+
+
+_pollers: weakref.WeakKeyDictionary[AsyncJLIPTransport | JLIPTransport,
+                                    DeckStatePoller] = weakref.WeakKeyDictionary()
+
+
+def poller_for(vcr: AsyncJLIPTransport | JLIPTransport, **kwargs: Any) -> DeckStatePoller:
+    """
+    Get the poller shared by everything watching ``vcr``, creating it on first use.
+
+    Parameters
+    ----------
+    vcr : AsyncJLIPTransport | JLIPTransport
+        The deck.
+    **kwargs : Any
+        Keyword arguments for :py:class:`DeckStatePoller`. They only apply when the poller is
+        created, so the first caller decides the poll intervals.
+
+    Returns
+    -------
+    DeckStatePoller
+        The deck's poller.
+    """
+    if (poller := _pollers.get(vcr)) is None:
+        poller = _pollers[vcr] = DeckStatePoller(vcr, **kwargs)
+    return poller
+
+
+def counter_seconds(state: VTRModeResponse) -> float:
+    """
+    Convert a state's tape counter to seconds.
+
+    Parameters
+    ----------
+    state : VTRModeResponse
+        Deck state.
+
+    Returns
+    -------
+    float
+        Counter position in seconds.
+    """
+    return state.hour * 3600 + state.minute * 60 + state.second + state.frame / state.framerate
+
+
+def estimate_seconds_left(poller: DeckStatePoller, target: float = 0) -> float | None:
+    """
+    Estimate how long until the counter reaches ``target`` from its last two readings.
+
+    Parameters
+    ----------
+    poller : DeckStatePoller
+        Poller holding the readings.
+    target : float
+        Counter position in seconds.
+
+    Returns
+    -------
+    float | None
+        Seconds left, or ``None`` if the counter is not moving towards ``target``.
+    """
+    if (poller.state is None or poller.previous_state is None or poller.updated_at is None
+            or poller.previous_updated_at is None):
+        return None
+    elapsed = poller.updated_at - poller.previous_updated_at
+    before = abs(counter_seconds(poller.previous_state) - target)
+    after = abs(counter_seconds(poller.state) - target)
+    if elapsed <= 0 or before <= after:
+        return None
+    return after * elapsed / (before - after)
+
+
+def eta_cadence(*,
+                target: float = 0,
+                min_interval: float = DEFAULT_POLL_INTERVAL,
+                max_interval: float = DEFAULT_REWIND_MAX_POLL_INTERVAL) -> Cadence:
+    """
+    Make a cadence that polls about twice before the counter is expected to reach ``target``.
+
+    Parameters
+    ----------
+    target : float
+        Counter position in seconds.
+    min_interval : float
+        Shortest delay in seconds.
+    max_interval : float
+        Longest delay in seconds.
+
+    Returns
+    -------
+    Cadence
+        The cadence, for :py:meth:`DeckStatePoller.add_cadence`.
+    """
+    def cadence(poller: DeckStatePoller) -> float | None:
+        if (left := estimate_seconds_left(poller, target)) is None:
+            return None
+        return min(max(left / 2, min_interval), max_interval)
+
+    return cadence
+
+
+def end_of_tape_cadence(end: float,
+                        *,
+                        window: float = DEFAULT_END_OF_TAPE_WINDOW,
+                        interval: float | None = None) -> Cadence:
+    """
+    Make a cadence that polls quickly while playback nears the expected end of the tape.
+
+    Steady playback is left to the poller's back-off, which stretches the delay up to its
+    ``max_poll_interval``. Once the counter is within ``window`` seconds of ``end`` the deck is
+    likely to stop at any moment, so the delay drops to ``interval`` to notice quickly. Right after
+    a mode change the cadence also stays out of the way so the poller's reset to its
+    ``poll_interval`` applies.
+
+    Parameters
+    ----------
+    end : float
+        Counter position in seconds where the tape is expected to end, such as the length being
+        captured.
+    window : float
+        Seconds before ``end`` from which to poll quickly.
+    interval : float | None
+        Delay in seconds near the end. Defaults to the poller's ``poll_interval``.
+
+    Returns
+    -------
+    Cadence
+        The cadence, for :py:meth:`DeckStatePoller.add_cadence`.
+    """
+    def cadence(poller: DeckStatePoller) -> float | None:
+        if (state := poller.state) is None or state.vtr_mode != VTRMode.PLAY_FWD:
+            return None
+        if (previous := poller.previous_state) is None or previous.vtr_mode != state.vtr_mode:
+            return None
+        if end - counter_seconds(state) > window:
+            return None
+        return poller.poll_interval if interval is None else interval
+
+    return cadence
+
+
+async def _stop_quietly(poller: DeckStatePoller) -> None:
+    try:
+        await poller.command('stop')
+    except Exception:
+        log.exception('Failed to stop the deck.')
+
+
+async def _finish_or_stop(poller: DeckStatePoller, task: asyncio.Future[VTRModeResponse],
+                          command: str, timeout: float | None) -> VTRModeResponse:
+    try:
+        done, _ = await asyncio.wait((task,), timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        await _stop_quietly(poller)
+        raise
+    if not done:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await _stop_quietly(poller)
+        msg = f'Deck did not finish `{command}` within {timeout} seconds.'
+        raise TimeoutError(msg)
+    return task.result()
+
+
+async def _command_wait(vcr: AsyncJLIPTransport | JLIPTransport, poller: DeckStatePoller | None,
+                        command: str, predicate: Callable[[VTRModeResponse],
+                                                          bool], *, cadence: Cadence | None,
+                        settle: float, timeout: float | None) -> VTRModeResponse:
+    watcher = poller_for(vcr) if poller is None else poller
+    remove_cadence = watcher.add_cadence(cadence) if cadence else None
+
+    async def _run() -> VTRModeResponse:
+        await watcher.command('stop')
+        await asyncio.sleep(settle)
+        await watcher.command(command)
+        return await watcher.wait_for(predicate, fresh=True)
+
+    try:
+        async with watcher:
+            return await _finish_or_stop(watcher, asyncio.ensure_future(_run()), command, timeout)
+    finally:
+        if remove_cadence:
+            remove_cadence()
+
+
+async def rewind_wait(vcr: AsyncJLIPTransport | JLIPTransport,
+                      poller: DeckStatePoller | None = None,
+                      *,
+                      max_poll_interval: float = DEFAULT_REWIND_MAX_POLL_INTERVAL,
+                      timeout: float | None = DEFAULT_REWIND_TIMEOUT) -> VTRModeResponse:
+    """
+    Rewind the tape and wait until it is done without blocking the event loop.
+
+    While rewinding, the delay between polls follows the estimated time left, worked out from how
+    fast the counter is moving towards zero. If the wait is cancelled or times out, the deck is
+    stopped and, for a timeout, :py:class:`TimeoutError` is raised.
+
+    Parameters
+    ----------
+    vcr : AsyncJLIPTransport | JLIPTransport
+        The deck.
+    poller : DeckStatePoller | None
+        Poller watching the deck. Defaults to the one from :py:func:`poller_for`.
+    max_poll_interval : float
+        Longest delay between polls in seconds.
+    timeout : float | None
+        Maximum number of seconds to wait.
+
+    Returns
+    -------
+    VTRModeResponse
+        The first state after rewinding stopped.
+    """
+    return await _command_wait(vcr,
+                               poller,
+                               'rewind',
+                               lambda state: state.vtr_mode != VTRMode.REW,
+                               cadence=eta_cadence(max_interval=max_poll_interval),
+                               settle=REWIND_SETTLE_TIME,
+                               timeout=timeout)
+
+
+async def eject_wait(vcr: AsyncJLIPTransport | JLIPTransport,
+                     poller: DeckStatePoller | None = None,
+                     *,
+                     timeout: float | None = DEFAULT_EJECT_TIMEOUT) -> VTRModeResponse:
+    """
+    Eject the tape and wait until it is done without blocking the event loop.
+
+    If the wait is cancelled or times out, the deck is stopped and, for a timeout,
+    :py:class:`TimeoutError` is raised.
+
+    Parameters
+    ----------
+    vcr : AsyncJLIPTransport | JLIPTransport
+        The deck.
+    poller : DeckStatePoller | None
+        Poller watching the deck. Defaults to the one from :py:func:`poller_for`.
+    timeout : float | None
+        Maximum number of seconds to wait.
+
+    Returns
+    -------
+    VTRModeResponse
+        The first state in eject mode.
+    """
+    return await _command_wait(vcr,
+                               poller,
+                               'eject',
+                               lambda state: state.vtr_mode == VTRMode.EJECT,
+                               cadence=None,
+                               settle=EJECT_SETTLE_TIME,
+                               timeout=timeout)
+
+
+def _wound_to(aim: float, *, forward: bool) -> Callable[[VTRModeResponse], bool]:
+    mode = VTRMode.FF if forward else VTRMode.REW
+
+    def predicate(state: VTRModeResponse) -> bool:
+        seconds = counter_seconds(state)
+        return state.vtr_mode != mode or (seconds >= aim if forward else seconds <= aim)
+
+    return predicate
+
+
+async def seek_wait(vcr: AsyncJLIPTransport | JLIPTransport,
+                    target: float,
+                    poller: DeckStatePoller | None = None,
+                    *,
+                    tolerance: float = DEFAULT_SEEK_TOLERANCE,
+                    attempts: int = DEFAULT_SEEK_ATTEMPTS,
+                    max_poll_interval: float = DEFAULT_REWIND_MAX_POLL_INTERVAL,
+                    timeout: float | None = DEFAULT_REWIND_TIMEOUT) -> VTRModeResponse:
+    """
+    Wind the tape until the counter is at most ``tolerance`` seconds before ``target``.
+
+    JLIP has no command to go to a counter position, so the deck fast-forwards or rewinds towards
+    the middle of that window and is stopped once a poll sees the counter pass it. The counter is
+    only read between polls, so the tape can overshoot; it is then wound back the other way, up to
+    ``attempts`` times.
+
+    Parameters
+    ----------
+    vcr : AsyncJLIPTransport | JLIPTransport
+        The deck.
+    target : float
+        Counter position in seconds.
+    poller : DeckStatePoller | None
+        Poller watching the deck. Defaults to the one from :py:func:`poller_for`.
+    tolerance : float
+        Seconds before ``target`` the tape may stop at.
+    attempts : int
+        Maximum number of times to wind the tape.
+    max_poll_interval : float
+        Longest delay between polls in seconds.
+    timeout : float | None
+        Maximum number of seconds each wind may take.
+
+    Returns
+    -------
+    VTRModeResponse
+        The state after the tape stopped in the window.
+
+    Raises
+    ------
+    TimeoutError
+        If the tape is not in the window after ``attempts`` winds, or a wind takes longer than
+        ``timeout``.
+    """
+    watcher = poller_for(vcr) if poller is None else poller
+    aim = target - tolerance / 2
+    state = await watcher.poll()
+    for attempt in range(attempts + 1):
+        position = counter_seconds(state)
+        if target - tolerance <= position <= target:
+            log.debug('Tape is at %.1f seconds, %.1f seconds before the target.', position,
+                      target - position)
+            return state
+        if attempt == attempts:
+            break
+        forward = position < aim
+        command = 'fast_forward' if forward else 'rewind'
+        log.debug('Winding the tape from %.1f to %.1f seconds with `%s`.', position, aim, command)
+        await _command_wait(vcr,
+                            watcher,
+                            command,
+                            _wound_to(aim, forward=forward),
+                            cadence=eta_cadence(target=aim, max_interval=max_poll_interval),
+                            settle=REWIND_SETTLE_TIME,
+                            timeout=timeout)
+        await watcher.command('stop')
+        state = await watcher.poll()
+    msg = (f'Tape did not stop within {tolerance} seconds before {target:.1f} seconds after '
+           f'{attempts} attempts.')
+    raise TimeoutError(msg)
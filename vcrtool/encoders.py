@@ -0,0 +1,150 @@
+"""Video encoder profiles for the capture commands."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+import os
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+__all__ = ('AUTO_ENCODER', 'DEFAULT_ENCODER', 'ENCODER_PROFILES', 'EncoderProfile',
+           'available_cores', 'cheaper_encoder', 'pick_encoder', 'resolve_encoder')
+
+AUTO_ENCODER = 'auto'
+"""Encoder name that picks a profile from the cores available."""
+DEFAULT_ENCODER = 'x265-lossless'
+"""Name of the profile used when none is chosen."""
+FFV1_SLICES = 16
+"""Slices per FFV1 frame. Each slice is encoded by its own thread."""
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """How to encode the captured video and what it costs."""
+    name: str
+    """Name used to select the profile."""
+    description: str
+    """Short description for help text."""
+    cores: float
+    """Expected number of CPU cores needed to encode 480i in real time."""
+    video_args: Callable[[int | None], tuple[str, ...]]
+    """Returns the ffmpeg output arguments for the video stream given a thread limit, or ``None``
+    for no limit."""
+
+
+def _thread_args(threads: int | None) -> tuple[str, ...]:
+    return ('-threads', str(threads)) if threads else ()
+
+
+def _x265_lossless(threads: int | None) -> tuple[str, ...]:
+    params = f'lossless=1:pools={threads}' if threads else 'lossless=1'
+    return ('-c:v', 'libx265', *_thread_args(threads), '-x265-params', params, '-preset',
+            'superfast', '-flags', '+ilme+ildct')
+
+
+def _ffv1(threads: int | None) -> tuple[str, ...]:
+    return ('-c:v', 'ffv1', *_thread_args(threads), '-level', '3', '-slices', str(FFV1_SLICES),
+            '-slicecrc', '1', '-g', '1')
+
+
+def _x264_lossless(threads: int | None) -> tuple[str, ...]:
+    return ('-c:v', 'libx264', *_thread_args(threads), '-qp', '0', '-preset', 'ultrafast', '-flags',
+            '+ilme+ildct')
+
+
+def _raw(_threads: int | None) -> tuple[str, ...]:
+    return ('-c:v', 'rawvideo')
+
+
+ENCODER_PROFILES = {
+    profile.name: profile
+    for profile in (
+        EncoderProfile('x265-lossless', 'Lossless H.265. Smallest files.', 4.0, _x265_lossless),
+        EncoderProfile('ffv1', 'FFV1 level 3 with multiple slices and slice CRCs.', 2.0, _ffv1),
+        EncoderProfile('x264-lossless', 'Lossless H.264 with the fastest preset.', 1.5,
+                       _x264_lossless),
+        EncoderProfile('raw', 'Uncompressed video. About 20 MB/s.', 0.25, _raw),
+    )
+}
+"""Encoder profiles by name, from the best compression to the cheapest."""
+
+
+def available_cores() -> int:
+    """
+    Count the CPU cores this process may run on.
+
+    Returns
+    -------
+    int
+        Number of cores.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def pick_encoder(
+    cores: float, profiles: Iterable[EncoderProfile] = ENCODER_PROFILES.values()) -> EncoderProfile:
+    """
+    Pick the first profile that can encode in real time on ``cores`` cores.
+
+    Parameters
+    ----------
+    cores : float
+        Cores available to the encoder.
+    profiles : Iterable[EncoderProfile]
+        Profiles in order of preference.
+
+    Returns
+    -------
+    EncoderProfile
+        The profile. If none fits, the cheapest.
+    """
+    profiles = tuple(profiles)
+    return next((profile for profile in profiles if profile.cores <= cores),
+                min(profiles, key=lambda profile: profile.cores))
+
+
+def resolve_encoder(name: str, cores: float | None = None) -> EncoderProfile:
+    """
+    Get a profile by name.
+
+    :py:class:`KeyError` is raised if there is no profile with that name.
+
+    Parameters
+    ----------
+    name : str
+        Name in :py:data:`ENCODER_PROFILES`, or :py:data:`AUTO_ENCODER` to pick with
+        :py:func:`pick_encoder`.
+    cores : float | None
+        Cores available to the encoder. Defaults to :py:func:`available_cores`.
+
+    Returns
+    -------
+    EncoderProfile
+        The profile.
+    """
+    if name == AUTO_ENCODER:
+        return pick_encoder(available_cores() if cores is None else cores)
+    return ENCODER_PROFILES[name]
+
+
+def cheaper_encoder(name: str, names: Iterable[str] = ENCODER_PROFILES) -> str:
+    """
+    Get the best profile that needs fewer cores than another.
+
+    Parameters
+    ----------
+    name : str
+        Name of the current profile, or :py:data:`AUTO_ENCODER`.
+    names : Iterable[str]
+        Names to choose from, in order of preference.
+
+    Returns
+    -------
+    str
+        Name of the first profile in ``names`` that needs fewer cores, or ``name`` if there is none.
+    """
+    cores = resolve_encoder(name).cores
+    return next((other for other in names if ENCODER_PROFILES[other].cores < cores), name)
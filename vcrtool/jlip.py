@@ -1,29 +1,102 @@
 """JLIP-specific functionality."""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from time import sleep
+from dataclasses import asdict, dataclass, is_dataclass
+from functools import cached_property
+from time import monotonic, sleep
+from types import MethodType
+from typing import TYPE_CHECKING, Any, Generic, TypeVar, cast, overload
+import asyncio
+import contextlib
 import enum
+import inspect
+import logging
 
 from pyrate_limiter import Duration, Limiter, Rate
 from typing_extensions import override
 import serial
 
-from .sansio import CommandStatus, JLIPCodec
+from .baud import (
+    BAUD_RATES,
+    DEFAULT_BAUD_RATE,
+    MAX_BAUD_RATE,
+    BaudRateError,
+    fastest_common_baud_rate,
+)
+from .sansio import CommandStatus, JLIPCodec, JLIPResponseFramer
 
-__all__ = ('BandInfo', 'CommandResponse', 'CommandResponseTuple', 'CommandStatus',
-           'DeviceNameResponse', 'JLIPTransport', 'PowerStateResponse', 'VTRMode',
-           'VTRModeResponse')
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine, Mapping
 
+    from typing_extensions import Self
 
-@dataclass
-class CommandResponseTuple:
-    """Lower-level command response information."""
-    jlip_id: int
+    from .baud import BaudRateStore
+    from .metrics import CaptureMetrics
+    from .traffic import TrafficRecorder
+
+__all__ = ('DEFAULT_RATE_LIMITS', 'AsyncJLIPTransport', 'BandInfo', 'CommandResponse',
+           'CommandResponseTuple', 'CommandStatus', 'DeviceNameResponse', 'JLIPCommand',
+           'JLIPCommands', 'JLIPRateLimits', 'JLIPTransport', 'PowerStateResponse',
+           'RateLimitExceeded', 'VTRMode', 'VTRModeResponse', 'to_jsonable')
+
+_T = TypeVar('_T')
+
+log = logging.getLogger(__name__)
+
+
+class _FrameField(Generic[_T]):
+    """Response field decoded from the raw frame each time it is read."""
+    __slots__ = ('_decode',)
+
+    def __init__(self, decode: Callable[[bytes], _T]) -> None:
+        self._decode = decode
+
+    @overload
+    def __get__(self, instance: None, owner: type[Any]) -> Self:
+        ...
+
+    @overload
+    def __get__(self, instance: _Frame, owner: type[Any]) -> _T:
+        ...
+
+    def __get__(self, instance: _Frame | None, owner: type[Any]) -> Self | _T:
+        """
+        Decode the field from the instance's raw frame.
+
+        Returns
+        -------
+        Self | _T
+            This descriptor for class access, otherwise the decoded value.
+        """
+        if instance is None:
+            return self
+        return self._decode(instance._raw)  # ruff:ignore[private-member-access]
+
+
+class _Frame:  # ruff:ignore[class-as-data-structure]
+    __slots__ = ('_raw',)
+
+    def __init__(self, resp: bytes) -> None:
+        self._raw = resp
+
+
+@dataclass(init=False)
+class CommandResponseTuple(_Frame):
+    """
+    Lower-level command response information.
+
+    Parameters
+    ----------
+    resp : bytes
+        Raw response bytes.
+    """
+    __slots__ = ()
+    jlip_id: _FrameField[int] = _FrameField(lambda resp: resp[2])
     """JLIP ID."""
-    command_status: CommandStatus
+    command_status: _FrameField[CommandStatus] = _FrameField(
+        lambda resp: CommandStatus(resp[3] & 0b111))
     """Command status."""
-    return_data: bytes
+    return_data: _FrameField[bytes] = _FrameField(lambda resp: resp[4:10])
     """Return data."""
     @override
     def __repr__(self) -> str:
@@ -32,21 +105,33 @@ class CommandResponseTuple:
                 f'return_data=[{", ".join(hex(n) for n in self.return_data[1:])}]>')
 
 
-@dataclass
-class CommandResponse:
-    """Command response information."""
-    checksum: int
+@dataclass(init=False)
+class CommandResponse(_Frame):
+    """
+    Command response information.
+
+    Responses only hold the raw frame and decode each field when it is read, so polling a deck
+    allocates one small object per response. They are still dataclasses:
+    :py:func:`dataclasses.asdict` decodes and returns every field.
+
+    Parameters
+    ----------
+    resp : bytes
+        Raw response bytes.
+    """
+    __slots__ = ()
+    checksum: _FrameField[int] = _FrameField(lambda resp: resp[10])
     """Checksum."""
-    raw: bytes
+    raw: _FrameField[bytes] = _FrameField(lambda resp: resp)
     """Raw response."""
-    return_data: bytes
+    return_data: _FrameField[bytes] = _FrameField(lambda resp: resp[3:10])
     """Return data."""
-    status: CommandStatus
+    status: _FrameField[CommandStatus] = _FrameField(lambda resp: CommandStatus(resp[3] & 0b111))
     """Command status."""
-    tuple: CommandResponseTuple
+    tuple: _FrameField[CommandResponseTuple] = _FrameField(CommandResponseTuple)
     """Lower-level command response information."""
-    @staticmethod
-    def from_bytes(resp: bytes) -> CommandResponse:
+    @classmethod
+    def from_bytes(cls, resp: bytes) -> Self:
         """
         Initialise from bytes.
 
@@ -57,12 +142,10 @@ class CommandResponse:
 
         Returns
         -------
-        CommandResponse
+        Self
             Parsed command response.
         """
-        return CommandResponse(
-            resp[10], resp, resp[3:10], CommandStatus(resp[3] & 0b111),
-            CommandResponseTuple(resp[2], CommandStatus(resp[3] & 0b111), resp[4:10]))
+        return cls(resp)
 
     @override
     def __repr__(self) -> str:
@@ -103,56 +186,36 @@ PAL_FRAMERATE = 25
 """PAL framerate."""
 
 
-@dataclass
+def _framerate(resp: bytes) -> int:
+    return PAL_FRAMERATE if ((resp[5] >> 2) & 1) == 1 else NTSC_FRAMERATE
+
+
+@dataclass(init=False)
 class VTRModeResponse(CommandResponse):
     """VTR mode response information."""
-    drop_frame_mode_enabled: bool
+    __slots__ = ()
+    drop_frame_mode_enabled: _FrameField[bool] = _FrameField(lambda resp: bool(resp[5] & 1))
     """Drop frame mode enabled."""
-    framerate: int
+    framerate: _FrameField[int] = _FrameField(_framerate)
     """Framerate."""
-    hour: int
+    hour: _FrameField[int] = _FrameField(lambda resp: resp[6])
     """Hour."""
-    minute: int
+    minute: _FrameField[int] = _FrameField(lambda resp: resp[7])
     """Minute."""
-    second: int
+    second: _FrameField[int] = _FrameField(lambda resp: resp[8])
     """Second."""
-    frame: int
+    frame: _FrameField[int] = _FrameField(lambda resp: resp[9])
     """Frame number."""
-    is_ntsc: bool
+    is_ntsc: _FrameField[bool] = _FrameField(lambda resp: _framerate(resp) == NTSC_FRAMERATE)
     """Is NTSC."""
-    is_pal: bool
+    is_pal: _FrameField[bool] = _FrameField(lambda resp: _framerate(resp) == PAL_FRAMERATE)
     """Is PAL."""
-    recordable: bool
+    recordable: _FrameField[bool] = _FrameField(lambda resp: not bool(resp[4] >> 5 & 1))
     """Recordable."""
-    tape_inserted: bool
+    tape_inserted: _FrameField[bool] = _FrameField(lambda resp: ((resp[4] >> 4) & 1) == 0)
     """Tape inserted."""
-    vtr_mode: VTRMode
+    vtr_mode: _FrameField[VTRMode] = _FrameField(lambda resp: VTRMode(resp[4] & 0b1111))
     """VTR mode."""
-    @override
-    @staticmethod
-    def from_bytes(resp: bytes) -> VTRModeResponse:
-        """
-        Initialise from bytes.
-
-        Parameters
-        ----------
-        resp : bytes
-            Raw response bytes.
-
-        Returns
-        -------
-        VTRModeResponse
-            Parsed VTR mode response.
-        """
-        parent = CommandResponse.from_bytes(resp)
-        framerate = PAL_FRAMERATE if ((resp[5] >> 2) & 1) == 1 else NTSC_FRAMERATE
-        return VTRModeResponse(parent.checksum,
-                               parent.raw, parent.return_data, parent.status, parent.tuple,
-                               bool(resp[5] & 1), framerate, resp[6], resp[7], resp[8], resp[9],
-                               framerate == NTSC_FRAMERATE, framerate == PAL_FRAMERATE,
-                               not bool(resp[4] >> 5 & 1), ((resp[4] >> 4) & 1) == 0,
-                               VTRMode((resp[4]) & 0b1111))
-
     @override
     def __repr__(self) -> str:
         return ('<VTRModeResponse '
@@ -181,28 +244,22 @@ class BandInfo(enum.IntEnum):
 BANK_NUMBER_NONE = 0x51
 
 
-@dataclass
+@dataclass(init=False)
 class VTUModeResponse(CommandResponse):
     """VTU mode response information."""
-    band_info: BandInfo
+    __slots__ = ()
+    band_info: _FrameField[BandInfo] = _FrameField(lambda resp: BandInfo(resp[4]))
     """Band information."""
-    bank_number: int | None
+    bank_number: _FrameField[int | None] = _FrameField(
+        lambda resp: None if resp[5] == BANK_NUMBER_NONE else resp[6] - 100)
     """Bank number."""
-    channel_number_by_bank: int | None
+    channel_number_by_bank: _FrameField[int | None] = _FrameField(
+        lambda resp: None if resp[5] == BANK_NUMBER_NONE else resp[7])
     """Channel number by bank."""
-    channel_number_non_bank: int
+    channel_number_non_bank: _FrameField[int] = _FrameField(lambda resp: resp[6] * 100 + resp[7])
     """Channel number non-bank."""
-    real_channel: int
+    real_channel: _FrameField[int] = _FrameField(lambda resp: resp[5])
     """Non-preset channel number."""
-    @staticmethod
-    @override
-    def from_bytes(resp: bytes) -> VTUModeResponse:
-        parent = CommandResponse.from_bytes(resp)
-        return VTUModeResponse(
-            parent.checksum, parent.raw, parent.return_data, parent.status, parent.tuple,
-            BandInfo(resp[4]), None if resp[5] == BANK_NUMBER_NONE else resp[6] - 100,
-            None if resp[5] == BANK_NUMBER_NONE else resp[7], (resp[6] * 100) + resp[7], resp[5])
-
     @override
     def __repr__(self) -> str:
         return ('<VTUModeResponse '
@@ -217,31 +274,12 @@ class VTUModeResponse(CommandResponse):
                 '>')
 
 
-@dataclass
+@dataclass(init=False)
 class PowerStateResponse(CommandResponse):
     """Power state response."""
-    is_on: bool
+    __slots__ = ()
+    is_on: _FrameField[bool] = _FrameField(lambda resp: bool(resp[4]))
     """If device is on."""
-    @staticmethod
-    @override
-    def from_bytes(resp: bytes) -> PowerStateResponse:
-        """
-        Initialise from bytes.
-
-        Parameters
-        ----------
-        resp : bytes
-            Raw response bytes.
-
-        Returns
-        -------
-        PowerStateResponse
-            Parsed power state response.
-        """
-        parent = CommandResponse.from_bytes(resp)
-        return PowerStateResponse(parent.checksum, parent.raw, parent.return_data, parent.status,
-                                  parent.tuple, bool(resp[4]))
-
     @override
     def __repr__(self) -> str:
         return ('<PowerStateResponse '
@@ -252,31 +290,12 @@ class PowerStateResponse(CommandResponse):
                 '>')
 
 
-@dataclass
+@dataclass(init=False)
 class DeviceNameResponse(CommandResponse):
     """Device name response."""
-    name: str
+    __slots__ = ()
+    name: _FrameField[str] = _FrameField(lambda resp: resp[4:10].decode('latin-1'))
     """Device name."""
-    @staticmethod
-    @override
-    def from_bytes(resp: bytes) -> DeviceNameResponse:
-        """
-        Initialise from bytes.
-
-        Parameters
-        ----------
-        resp : bytes
-            Raw response bytes.
-
-        Returns
-        -------
-        DeviceNameResponse
-            Parsed device name response.
-        """
-        parent = CommandResponse.from_bytes(resp)
-        return DeviceNameResponse(parent.checksum, parent.raw, parent.return_data, parent.status,
-                                  parent.tuple, ''.join(chr(x) for x in parent.return_data[1:]))
-
     @override
     def __repr__(self) -> str:
         return ('<DeviceNameResponse '
@@ -287,443 +306,775 @@ class DeviceNameResponse(CommandResponse):
                 '>')
 
 
-limiter = Limiter(Rate(2, Duration.SECOND))
-fast_limiter = Limiter(Rate(10, Duration.SECOND))
-
-
-class JLIPTransport:  # ruff:ignore[too-many-public-methods]
+def to_jsonable(value: Any) -> Any:
     """
-    Send commands to HR-S9600U VCRs and similar devices over JLIP.
+    Convert a command's return value into something :py:func:`json.dumps` accepts.
 
-    The serial port is the only I/O this class performs; the request framing and response
-    validation live in :py:class:`~vcrtool.sansio.JLIPCodec`.
+    Responses become dictionaries of their fields and bytes become hexadecimal strings.
 
-    References
+    Parameters
     ----------
-    - http://www.johnwillis.com/2018/09/jvc-jlip-joint-level-interface-protocol.html
-    - https://dragonminded.com/bemani/dvdemu/JLIPProtocolDocumentation.pdf
-    - https://github.com/yasdfgr/jlip
-    - https://jvc-america.com/english/download/mpverup114-e.html
-    - https://www.remotecentral.com/cgi-bin/forums/viewpost.cgi?1040370
-    """
-    def __init__(self,
-                 serial_path: str,
-                 *,
-                 jlip_id: int = 1,
-                 raise_on_error_response: bool = True) -> None:
-        """
-        Initialise the JLIP object.
+    value : Any
+        A response, raw response bytes or any JSON-compatible value.
 
-        Parameters
-        ----------
-        serial_path : str
-            Path to the serial port.
-        jlip_id : int
-            JLIP ID of the device.
-        raise_on_error_response : bool
-            If ``True``, raise an exception on error response.
-        """
-        self.codec = JLIPCodec()
-        """The sans-I/O codec used to build and validate frames."""
-        self.comm = serial.Serial(serial_path, parity=serial.PARITY_ODD, rtscts=True, timeout=2)
-        """Serial port object."""
-        self.jlip_id = jlip_id
-        """JLIP ID."""
-        self.raise_on_error_response = raise_on_error_response
-        """Raise on error response."""
-
-    def send_command_base(self, *args: int) -> bytes:
-        """
-        Send a command (base method).
+    Returns
+    -------
+    Any
+        The converted value.
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        value = asdict(value)
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
 
-        Parameters
-        ----------
-        *args : int
-            Command bytes to send.
 
-        Returns
-        -------
-        bytes
-            Raw response bytes.
-        """
-        self.comm.write(self.codec.build_command(self.jlip_id, *args))
-        sleep(0.1)
-        return self.codec.validate_response(self.comm.read(11),
-                                            raise_on_error=self.raise_on_error_response)
+@dataclass(frozen=True)
+class JLIPRateLimits:
+    """
+    Command rate limits for a JLIP device model.
 
-    def send_command(self, *args: int) -> bytes:
+    Each transport builds its own limiters from these values, so devices on separate ports never
+    throttle each other. Models that tolerate a different command rate can pass their own instance.
+    """
+    commands_per_second: int = 2
+    """Rate for regular commands."""
+    fast_commands_per_second: int = 10
+    """Rate for commands sent with the fast limit, such as status polls."""
+    def create_limiters(self) -> tuple[Limiter, Limiter]:
         """
-        Send a command at a slower rate limit.
-
-        This will raise pyrate_limiter's :py:class:`pyrate_limiter.BucketFullException` if the rate
-        limit is exceeded.
-
-        Parameters
-        ----------
-        *args : int
-            Command bytes to send.
+        Create a fresh pair of limiters for these rates.
 
         Returns
         -------
-        bytes
-            Raw response bytes.
+        tuple[Limiter, Limiter]
+            The regular and fast limiters.
         """
-        limiter.try_acquire('command')
-        return self.send_command_base(*args)
+        return (Limiter(Rate(self.commands_per_second, Duration.SECOND)),
+                Limiter(Rate(self.fast_commands_per_second, Duration.SECOND)))
 
-    def send_command_fast(self, *args: int) -> bytes:
-        """
-        Send a command with a faster rate limit.
 
-        This will raise pyrate_limiter's :py:class:`pyrate_limiter.BucketFullException` if the rate
-        limit is exceeded.
+DEFAULT_RATE_LIMITS = JLIPRateLimits()
+"""Rate limits known to work with the HR-S9600U."""
 
-        Parameters
-        ----------
-        *args : int
-            Command bytes to send.
 
-        Returns
-        -------
-        bytes
-            Raw response bytes.
-        """
-        fast_limiter.try_acquire('command_fast')
-        return self.send_command_base(*args)
+class RateLimitExceeded(RuntimeError):
+    """Raised when a command would exceed the rate limit and the transport is not waiting."""
 
-    def eject(self) -> CommandResponse:
-        """
-        Eject the tape.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x41, 0x60))
+_R = TypeVar('_R', bound=CommandResponse)
 
-    def eject_wait(self) -> CommandResponse:
-        """
-        Eject the tape and wait until it is done.
-
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        resp = self.stop()
-        sleep(0.5)
-        resp = self.eject()
-        while (resp := self.get_vtr_mode()).vtr_mode != VTRMode.EJECT:
-            sleep(0.25)
-        return resp
-
-    def fast_forward(self) -> CommandResponse:
-        """
-        Fast forward the tape.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x44, 0x75))
+def _switch_jlip_id(transport: JLIPCommands, n: int) -> None:
+    if n <= 0 or n > 99:  # ruff:ignore[magic-value-comparison]
+        raise ValueError(n)
+    transport.jlip_id = n
 
-    def fast_play_forward(self) -> CommandResponse:
-        """
-        Fast play forward.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x43, 0x21))
+def _check_baud_rate_code(_transport: JLIPCommands, n: int) -> None:
+    if n not in BAUD_RATES:
+        raise ValueError(n)
 
-    def fast_play_backward(self) -> CommandResponse:
-        """
-        Fast play backward.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x43, 0x25))
+class JLIPCommand(Generic[_R]):
+    """
+    Declaration of a JLIP command shared by both transports.
 
-    def frame_step(self) -> CommandResponse:
-        """
-        Move forward one frame.
+    The opcode bytes, response type, rate class and documentation are declared once on
+    :py:class:`JLIPCommands`. String entries in ``opcode`` name the method's parameters, in order of
+    appearance, and are replaced by the arguments at call time. Looked up on a transport, the
+    declaration becomes a regular method of that transport: blocking on :py:class:`JLIPTransport`
+    and a coroutine on :py:class:`AsyncJLIPTransport`.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x48, 0x46, 0x75, 0x01))
+    Commands without parameters always send the same frame for a given JLIP ID, so
+    :py:meth:`frame` builds it once per ID and reuses it.
+    """
+    def __init__(self,
+                 response_type: type[_R],
+                 summary: str,
+                 *opcode: int | str,
+                 fast: bool = False,
+                 params: Mapping[str, str] | None = None,
+                 notes: str = '',
+                 returns: str = 'Command response.',
+                 raises: Mapping[str, str] | None = None,
+                 prepare: Callable[..., None] | None = None) -> None:
+        """
+        Declare a command.
 
-    def frame_step_back(self) -> CommandResponse:
-        """
-        Move back one frame.
+        Parameters
+        ----------
+        response_type : type[_R]
+            Class the response bytes are parsed with.
+        summary : str
+            First line of the generated docstring.
+        *opcode : int | str
+            Command bytes. Strings are parameter names.
+        fast : bool
+            Use the faster rate limit by default.
+        params : Mapping[str, str] | None
+            Description of each parameter for the docstring.
+        notes : str
+            Extra paragraphs for the docstring.
+        returns : str
+            Description of the response for the docstring.
+        raises : Mapping[str, str] | None
+            Exceptions ``prepare`` may raise and when, for the docstring.
+        prepare : Callable[..., None] | None
+            Called with the transport and the arguments before the command is sent.
+        """
+        self.response_type = response_type
+        """Class the response bytes are parsed with."""
+        self.opcode = opcode
+        """Command bytes, with parameter names in place of the variable ones."""
+        self.fast = fast
+        """Use the faster rate limit by default."""
+        self.parameters = tuple(x for x in opcode if isinstance(x, str))
+        """Parameter names in call order."""
+        self.prepare = prepare
+        """Called with the transport and the arguments before the command is sent."""
+        self.name = ''
+        """Method name, set when the declaration is assigned in a class body."""
+        self.__doc__ = self._docstring(summary, notes, params or {}, returns, raises or {})
+        self._frames: dict[int, bytes] = {}
+        self._methods: dict[type, Callable[..., Any]] = {}
+
+    def _docstring(self, summary: str, notes: str, params: Mapping[str, str], returns: str,
+                   raises: Mapping[str, str]) -> str:
+        sections = [summary]
+        if notes:
+            sections.append(notes)
+        parameters = [
+            *(f'{name} : int\n    {params[name]}' for name in self.parameters),
+            'fast : bool | None\n    Use the faster rate limit. ``None`` uses the default.'
+        ]
+        sections.extend(('Parameters\n----------\n' + '\n'.join(parameters),
+                         f'Returns\n-------\n{self.response_type.__name__}\n    {returns}'))
+        if raises:
+            sections.append('Raises\n------\n' + '\n'.join(f'{name}\n    {why}'
+                                                           for name, why in raises.items()))
+        return '\n\n'.join(sections)
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        """
+        Record the attribute name as the method name.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+        Parameters
+        ----------
+        owner : type
+            Class the declaration is assigned in.
+        name : str
+            Attribute name.
         """
-        return CommandResponse.from_bytes(self.send_command(0x48, 0x46, 0x65, 0x01))
+        self.name = name
 
-    def get_baud_rate_supported(self) -> CommandResponse:
+    def frame_args(self, *args: int) -> tuple[int, ...]:
         """
-        Get the baud rate supported by the device.
+        Substitute the arguments into the opcode.
 
-        ``0x21`` is returned, meaning 19200 baud, but this cannot be trusted.
+        Parameters
+        ----------
+        *args : int
+            One value per parameter.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x7C, 0x48, 0x20))
+        tuple[int, ...]
+            The command bytes.
 
-    def get_device_code(self) -> CommandResponse:
+        Raises
+        ------
+        TypeError
+            If the number of arguments does not match the parameters.
         """
-        Get the device code.
+        if len(args) != len(self.parameters):
+            msg = (f'{self.name}() takes {len(self.parameters)} arguments but {len(args)} were '
+                   'given.')
+            raise TypeError(msg)
+        values = dict(zip(self.parameters, args, strict=True))
+        return tuple(values[x] if isinstance(x, str) else x for x in self.opcode)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    def frame(self, jlip_id: int, *args: int) -> bytes:
         """
-        return CommandResponse.from_bytes(self.send_command(0x7C, 0x49))
+        Build the request frame for this command.
 
-    def get_device_name(self) -> CommandResponse:
-        """
-        Get the device name.
+        Parameters
+        ----------
+        jlip_id : int
+            JLIP ID of the device.
+        *args : int
+            One value per parameter.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return DeviceNameResponse.from_bytes(self.send_command(0x7C, 0x4C))
-
-    def get_input(self) -> CommandResponse:
+        bytes
+            The eleven-byte frame, including its checksum.
         """
-        Get the input of the device.
+        if self.parameters or args:
+            return JLIPCodec.build_command(jlip_id, *self.frame_args(*args))
+        if (frame := self._frames.get(jlip_id)) is None:
+            frame = self._frames[jlip_id] = JLIPCodec.build_command(jlip_id, *self.frame_args())
+        return frame
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    def wrap(self, owner: type, function: Callable[..., Any]) -> Callable[..., Any]:
         """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x58, 0x20))
+        Give a generated method this command's name, docstring and signature.
 
-    def get_machine_code(self) -> CommandResponse:
-        """
-        Get the machine code.
+        Parameters
+        ----------
+        owner : type
+            Class the method belongs to.
+        function : Callable[..., Any]
+            The generated method.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x7C, 0x45))
-
-    def get_play_speed(self) -> CommandResponse:
-        """
-        Get playback speed.
-
-        Known responses in the first data field:
+        Callable[..., Any]
+            ``function``, updated in place.
+        """
+        function.__name__ = self.name
+        function.__qualname__ = f'{owner.__name__}.{self.name}'
+        function.__doc__ = self.__doc__
+        function.__signature__ = inspect.Signature(  # type: ignore[attr-defined]
+            [
+                inspect.Parameter('self', inspect.Parameter.POSITIONAL_OR_KEYWORD),
+                *(inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=int)
+                  for name in self.parameters),
+                inspect.Parameter(
+                    'fast', inspect.Parameter.KEYWORD_ONLY, default=None, annotation=bool | None)
+            ],
+            return_annotation=self.response_type)
+        return function
+
+    @overload
+    def __get__(self, instance: None, owner: type) -> Any:
+        ...
+
+    @overload
+    def __get__(self, instance: JLIPTransport, owner: type | None = None) -> Callable[..., _R]:
+        ...
+
+    @overload
+    def __get__(self,
+                instance: AsyncJLIPTransport,
+                owner: type | None = None) -> Callable[..., Coroutine[Any, Any, _R]]:
+        ...
+
+    def __get__(self, instance: JLIPCommands | None, owner: type | None = None) -> Any:
+        """
+        Return the method generated for the transport class.
 
-        - ``0x67`` means playing backward quickly.
-        - ``0x6D`` means paused or frame advancing.
-        - ``0x75`` means normal.
-        - ``0x77`` means playing forward quickly.
-        - ``0x7F`` is returned when inapplicable.
+        Parameters
+        ----------
+        instance : JLIPCommands | None
+            The transport, or ``None`` when looked up on the class.
+        owner : type | None
+            The transport class.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        Any
+            The bound method, the plain function when looked up on a transport class, or this
+            declaration when looked up on :py:class:`JLIPCommands`.
         """
-        return CommandResponse.from_bytes(self.send_command(0x48, 0x4E, 0x20))
+        owner = type(instance) if owner is None else owner
+        if (make_method := getattr(owner, '_command_method', None)) is None:
+            return self
+        if (function := self._methods.get(owner)) is None:
+            function = self._methods[owner] = make_method(self)
+        return function if instance is None else MethodType(function, instance)
 
-    def get_power_state(self) -> PowerStateResponse:
-        """
-        Get the power state of the device.
 
-        Returns
-        -------
-        PowerStateResponse
-            Power state response.
-        """
-        return PowerStateResponse.from_bytes(self.send_command(0x3E, 0x4E, 0x20))
+class JLIPCommands:
+    """
+    Commands understood by HR-S9600U VCRs and similar devices, and the state both transports share.
 
-    def get_tuner_mode(self) -> VTUModeResponse:
-        """
-        Get the tuner mode.
+    Each command is declared once here as a :py:class:`JLIPCommand`; :py:meth:`commands` returns
+    the whole table. Subclasses implement ``_command_method`` to turn a declaration into a blocking
+    or awaitable method and :py:meth:`_open_serial` to open the port.
 
-        Returns
-        -------
-        VTUModeResponse
-            Tuner mode response.
+    References
+    ----------
+    - http://www.johnwillis.com/2018/09/jvc-jlip-joint-level-interface-protocol.html
+    - https://dragonminded.com/bemani/dvdemu/JLIPProtocolDocumentation.pdf
+    - https://github.com/yasdfgr/jlip
+    - https://jvc-america.com/english/download/mpverup114-e.html
+    - https://www.remotecentral.com/cgi-bin/forums/viewpost.cgi?1040370
+    """
+    def __init__(self,
+                 serial_path: str,
+                 *,
+                 jlip_id: int = 1,
+                 raise_on_error_response: bool = True,
+                 response_timeout: float = 2,
+                 rate_limits: JLIPRateLimits = DEFAULT_RATE_LIMITS,
+                 limiter: Limiter | None = None,
+                 fast_limiter: Limiter | None = None,
+                 wait_for_rate_limit: bool = True,
+                 recorder: TrafficRecorder | None = None,
+                 baud_rate: int = DEFAULT_BAUD_RATE,
+                 metrics: CaptureMetrics | None = None) -> None:
         """
-        return VTUModeResponse.from_bytes(self.send_command(0xA, 0x4E, 0x20))
+        Initialise the JLIP object.
 
-    def get_vtr_mode(self, *, fast: bool = False) -> VTRModeResponse:
-        """
-        Get the VTR mode.
+        Parameters
+        ----------
+        serial_path : str
+            Path to the serial port.
+        jlip_id : int
+            JLIP ID of the device.
+        raise_on_error_response : bool
+            If ``True``, raise an exception on error response.
+        response_timeout : float
+            Maximum number of seconds to wait for a complete response frame.
+        rate_limits : JLIPRateLimits
+            Rates used to build this transport's own limiters.
+        limiter : Limiter | None
+            Limiter for regular commands. Overrides ``rate_limits``, for example to share a bucket.
+        fast_limiter : Limiter | None
+            Limiter for fast commands. Overrides ``rate_limits``.
+        wait_for_rate_limit : bool
+            If ``True``, wait for the limiter. Otherwise raise :py:class:`RateLimitExceeded`.
+        recorder : TrafficRecorder | None
+            Records every exchange to a traffic log. See :py:mod:`vcrtool.traffic`.
+        baud_rate : int
+            Baud rate to open the port at. The device must already be using it; see
+            ``negotiate_baud_rate``.
+        metrics : CaptureMetrics | None
+            Counts every exchange and rate limit wait. See :py:mod:`vcrtool.metrics`.
+        """
+        self.serial_path = serial_path
+        """Path to the serial port."""
+        self.baud_rate = baud_rate
+        """Baud rate of the serial port."""
+        self.codec = JLIPCodec()
+        """The sans-I/O codec used to build and validate frames."""
+        self.response_timeout = response_timeout
+        """Maximum number of seconds to wait for a complete response frame."""
+        self.comm = self._open_serial(serial_path)
+        """Serial port object."""
+        self.jlip_id = jlip_id
+        """JLIP ID."""
+        self.raise_on_error_response = raise_on_error_response
+        """Raise on error response."""
+        default_limiter, default_fast_limiter = rate_limits.create_limiters()
+        self.limiter = limiter or default_limiter
+        """Limiter for regular commands."""
+        self.fast_limiter = fast_limiter or default_fast_limiter
+        """Limiter for fast commands."""
+        self.wait_for_rate_limit = wait_for_rate_limit
+        """Wait for the limiter instead of raising."""
+        self.recorder = recorder
+        """Records every exchange to a traffic log."""
+        self.metrics = metrics
+        """Counts every exchange and rate limit wait."""
+
+    def _open_serial(self, serial_path: str) -> serial.Serial:
+        """
+        Open the serial port.
 
         Parameters
         ----------
-        fast : bool
-            Use faster rate limit.
+        serial_path : str
+            Path to the serial port.
 
         Returns
         -------
-        VTRModeResponse
-            VTR mode response.
+        serial.Serial
+            The open port.
+        """
+        return serial.Serial(serial_path,
+                             baudrate=self.baud_rate,
+                             parity=serial.PARITY_ODD,
+                             rtscts=True,
+                             timeout=self.response_timeout)
+
+    def _record(self, frame: bytes, response: bytes | None, sent_at: float) -> None:
+        if not self.recorder and not self.metrics:
+            return
+        received_at = monotonic()
+        if self.recorder:
+            self.recorder.record(frame, response, sent_at, received_at)
+        if self.metrics:
+            self.metrics.observe_exchange(self.serial_path, frame, response, sent_at, received_at)
+
+    def _observe_rate_limit(self, name: str, started_at: float, *, acquired: bool) -> None:
+        if self.metrics:
+            self.metrics.observe_rate_limit(self.serial_path,
+                                            name,
+                                            monotonic() - started_at,
+                                            acquired=acquired)
+
+    def _switch_baud_rate(self, baud_rate: int) -> None:
+        log.debug('Switching `%s` to %d baud.', self.serial_path, baud_rate)
+        self.comm.baudrate = self.baud_rate = baud_rate
+
+    def _stored_baud_rate(self, store: BaudRateStore | None, max_baud_rate: int) -> int | None:
+        if store is None or (baud_rate := store.get(self.serial_path, self.jlip_id)) is None:
+            return None
+        return baud_rate if self.baud_rate != baud_rate <= max_baud_rate else None
+
+    def _baud_rate_failed(self, baud_rate: int, previous: int) -> None:
+        log.warning('The device on `%s` does not answer at %d baud. Staying at %d baud.',
+                    self.serial_path, baud_rate, previous)
+        self._switch_baud_rate(previous)
+
+    eject = JLIPCommand(CommandResponse, 'Eject the tape.', 0x08, 0x41, 0x60)
+    fast_forward = JLIPCommand(CommandResponse, 'Fast forward the tape.', 0x08, 0x44, 0x75)
+    fast_play_forward = JLIPCommand(CommandResponse, 'Fast play forward.', 0x08, 0x43, 0x21)
+    fast_play_backward = JLIPCommand(CommandResponse, 'Fast play backward.', 0x08, 0x43, 0x25)
+    frame_step = JLIPCommand(CommandResponse, 'Move forward one frame.', 0x48, 0x46, 0x75, 0x01)
+    frame_step_back = JLIPCommand(CommandResponse, 'Move back one frame.', 0x48, 0x46, 0x65, 0x01)
+    get_baud_rate_supported = JLIPCommand(
+        CommandResponse,
+        'Get the baud rate supported by the device.',
+        0x7C,
+        0x48,
+        0x20,
+        notes=('The first data field is the code of the fastest rate in '
+               ':py:data:`vcrtool.baud.BAUD_RATES`. ``0x21`` is returned, meaning 19200 baud, but '
+               'this cannot be trusted.'))
+    get_device_code = JLIPCommand(CommandResponse, 'Get the device code.', 0x7C, 0x49)
+    get_device_name = JLIPCommand(DeviceNameResponse,
+                                  'Get the device name.',
+                                  0x7C,
+                                  0x4C,
+                                  returns='Device name response.')
+    get_input = JLIPCommand(CommandResponse, 'Get the input of the device.', 0x08, 0x58, 0x20)
+    get_machine_code = JLIPCommand(CommandResponse, 'Get the machine code.', 0x7C, 0x45)
+    get_play_speed = JLIPCommand(CommandResponse,
+                                 'Get playback speed.',
+                                 0x48,
+                                 0x4E,
+                                 0x20,
+                                 notes=('Known responses in the first data field:\n\n'
+                                        '- ``0x67`` means playing backward quickly.\n'
+                                        '- ``0x6D`` means paused or frame advancing.\n'
+                                        '- ``0x75`` means normal.\n'
+                                        '- ``0x77`` means playing forward quickly.\n'
+                                        '- ``0x7F`` is returned when inapplicable.'))
+    get_power_state = JLIPCommand(PowerStateResponse,
+                                  'Get the power state of the device.',
+                                  0x3E,
+                                  0x4E,
+                                  0x20,
+                                  returns='Power state response.')
+    get_tuner_mode = JLIPCommand(VTUModeResponse,
+                                 'Get the tuner mode.',
+                                 0x0A,
+                                 0x4E,
+                                 0x20,
+                                 returns='Tuner mode response.')
+    get_vtr_mode = JLIPCommand(VTRModeResponse,
+                               'Get the VTR mode.',
+                               0x08,
+                               0x4E,
+                               0x20,
+                               returns='VTR mode response.')
+    nop = JLIPCommand(CommandResponse, 'No operation command.', 0x7C, 0x4E, 0x20)
+    pause = JLIPCommand(CommandResponse, 'Pause playback.', 0x08, 0x43, 0x6D)
+    pause_recording = JLIPCommand(CommandResponse, 'Pause recording.', 0x08, 0x42, 0x6D)
+    play = JLIPCommand(CommandResponse, 'Start playback.', 0x08, 0x43, 0x75)
+    presence_check = JLIPCommand(CommandResponse, 'Check if the device is present and responding.',
+                                 0x7C, 0x4E, 0x20)
+    preset_channel_up = JLIPCommand(CommandResponse, 'Change to the next preset channel.', 0x0A,
+                                    0x44, 0x73, 0, 0, 0x7E)
+    preset_channel_down = JLIPCommand(CommandResponse, 'Change to the previous preset channel.',
+                                      0x0A, 0x44, 0x63, 0, 0, 0x7E)
+    real_channel_down = JLIPCommand(CommandResponse, 'Change to the previous channel.', 0x0A, 0x42,
+                                    0x63, 0, 0, 0x44)
+    real_channel_up = JLIPCommand(CommandResponse, 'Change to the next channel.', 0x0A, 0x42, 0x73,
+                                  0, 0, 0x44)
+    record = JLIPCommand(CommandResponse, 'Start recording.', 0x08, 0x42, 0x70)
+    reset_counter = JLIPCommand(CommandResponse, 'Reset the timecode counter.', 0x48, 0x4D, 0x20)
+    rewind = JLIPCommand(CommandResponse, 'Rewind the tape.', 0x08, 0x44, 0x65)
+    set_baud_rate = JLIPCommand(
+        CommandResponse,
+        'Switch the device to another baud rate.',
+        0x7C,
+        0x48,
+        'n',
+        params={'n': 'Code of the rate in :py:data:`vcrtool.baud.BAUD_RATES`.'},
+        raises={'ValueError': 'If the code is unknown.'},
+        prepare=_check_baud_rate_code,
+        notes=('The port is not switched; use ``negotiate_baud_rate``. ``0x20`` is the code of '
+               '``get_baud_rate_supported``, so a device cannot be switched back to 9600 baud '
+               'this way. Turn it off and on instead.'))
+    set_channel = JLIPCommand(CommandResponse,
+                              'Set the channel to a specific value.',
+                              0x0A,
+                              0x44,
+                              0x71,
+                              0,
+                              'channel',
+                              0x7E,
+                              params={'channel': 'Channel number.'})
+    set_jlip_id = JLIPCommand(CommandResponse,
+                              'Set the JLIP ID of the device.',
+                              0x7C,
+                              0x41,
+                              'n',
+                              params={'n': 'JLIP ID to set (1-99).'},
+                              raises={'ValueError': 'If the ID is not between 1 and 99.'},
+                              prepare=_switch_jlip_id)
+    set_input = JLIPCommand(CommandResponse,
+                            'Set the input to a specific value.',
+                            0x08,
+                            0x59,
+                            'n',
+                            'nn',
+                            0x7F,
+                            params={
+                                'n': 'Input number.',
+                                'nn': 'Input sub-number.'
+                            })
+    set_record_mode = JLIPCommand(CommandResponse,
+                                  'Set the recording mode.',
+                                  0x48,
+                                  0x43,
+                                  'n',
+                                  params={'n': 'Record mode value.'})
+    set_record_speed = JLIPCommand(CommandResponse,
+                                   'Set the recording speed.',
+                                   0x48,
+                                   0x42,
+                                   'n',
+                                   params={'n': 'Record speed value.'})
+    select_band = JLIPCommand(CommandResponse,
+                              'Select a band.',
+                              0x0A,
+                              0x40,
+                              0x71,
+                              'n',
+                              params={'n': 'Band value.'})
+    select_preset_channel = JLIPCommand(CommandResponse,
+                                        'Select a preset channel.',
+                                        0x0A,
+                                        0x44,
+                                        'n',
+                                        'nn',
+                                        'nnn',
+                                        0x7E,
+                                        params={
+                                            'n': 'First channel parameter.',
+                                            'nn': 'Second channel parameter.',
+                                            'nnn': 'Third channel parameter.'
+                                        })
+    select_real_channel = JLIPCommand(CommandResponse,
+                                      'Select a channel.',
+                                      0x0A,
+                                      0x42,
+                                      'n',
+                                      'nn',
+                                      'nnn',
+                                      0x44,
+                                      params={
+                                          'n': 'First channel parameter.',
+                                          'nn': 'Second channel parameter.',
+                                          'nnn': 'Third channel parameter.'
+                                      })
+    slow_play_backward = JLIPCommand(CommandResponse, 'Slow play backward.', 0x08, 0x43, 0x24)
+    slow_play_forward = JLIPCommand(CommandResponse, 'Slow play forward.', 0x08, 0x43, 0x20)
+    stop = JLIPCommand(CommandResponse, 'Stop playback or recording.', 0x08, 0x44, 0x60)
+    turn_off = JLIPCommand(CommandResponse, 'Turn the device off.', 0x3E, 0x40, 0x60)
+    turn_on = JLIPCommand(CommandResponse, 'Turn the device on.', 0x3E, 0x40, 0x70)
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """
+        Generate a transport's command methods when its class is defined.
+
+        Parameters
+        ----------
+        **kwargs : Any
+            Passed to :py:meth:`object.__init_subclass__`.
         """
-        return VTRModeResponse.from_bytes(
-            (self.send_command_fast if fast else self.send_command)(0x08, 0x4E, 0x20))
+        super().__init_subclass__(**kwargs)
+        for name in cls.commands():
+            getattr(cls, name)
 
-    def nop(self) -> CommandResponse:
+    @classmethod
+    def commands(cls) -> dict[str, JLIPCommand[Any]]:
         """
-        No operation command.
+        Get the command table.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        dict[str, JLIPCommand[Any]]
+            Every declared command by method name, in declaration order.
         """
-        return CommandResponse.from_bytes(self.send_command(0x7c, 0x4e, 0x20))
+        return {
+            name: value
+            for klass in reversed(cls.__mro__)
+            for name, value in vars(klass).items() if isinstance(value, JLIPCommand)
+        }
 
-    def pause(self) -> CommandResponse:
-        """
-        Pause playback.
+    @override
+    def __repr__(self) -> str:
+        return (f'<{type(self).__name__} jlip_id={self.jlip_id} '
+                f'raise_on_error={self.raise_on_error_response}>')
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x43, 0x6d))
 
-    def pause_recording(self) -> CommandResponse:
-        """
-        Pause recording.
+class JLIPTransport(JLIPCommands):
+    """
+    Send commands to HR-S9600U VCRs and similar devices over JLIP.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x42, 0x6d))
+    The serial port is the only I/O this class performs; the request framing and response
+    validation live in :py:class:`~vcrtool.sansio.JLIPCodec` and the commands are declared on
+    :py:class:`JLIPCommands`.
+    """
+    @classmethod
+    def _command_method(cls, command: JLIPCommand[_R]) -> Callable[..., _R]:
+        def method(self: JLIPTransport, *args: int, fast: bool | None = None) -> _R:
+            if command.prepare:
+                command.prepare(self, *args)
+            frame = command.frame(self.jlip_id, *args)
+            if not self._acquire(fast=command.fast if fast is None else fast):
+                msg = 'Rate limit exceeded.'
+                raise RateLimitExceeded(msg)
+            return command.response_type.from_bytes(self.send_frame(frame))
+
+        return command.wrap(cls, method)
+
+    def _acquire(self, *, fast: bool) -> bool:
+        limiter, name = (self.fast_limiter, 'command_fast') if fast else (self.limiter, 'command')
+        started_at = monotonic() if self.metrics else 0.0
+        acquired = cast('bool', limiter.try_acquire(name, blocking=self.wait_for_rate_limit))
+        self._observe_rate_limit(name, started_at, acquired=acquired)
+        return acquired
 
-    def play(self) -> CommandResponse:
+    def send_command_base(self, *args: int) -> bytes:
         """
-        Start playback.
+        Send a command (base method).
+
+        Parameters
+        ----------
+        *args : int
+            Command bytes to send.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        bytes
+            Raw response bytes.
         """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x43, 0x75))
+        return self.send_frame(self.codec.build_command(self.jlip_id, *args))
 
-    def presence_check(self) -> CommandResponse:
+    def send_frame(self, frame: bytes) -> bytes:
         """
-        Check if the device is present and responding.
+        Send a complete request frame without rate limiting.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x7C, 0x4E, 0x20))
+        The response is returned as soon as a complete frame has arrived rather than after a fixed
+        delay. Bytes preceding the frame header are discarded.
 
-    def preset_channel_up(self) -> CommandResponse:
-        """
-        Change to the next preset channel.
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x44, 0x73, 0, 0, 0x7E))
+        bytes
+            Raw response bytes.
 
-    def preset_channel_down(self) -> CommandResponse:
-        """
-        Change to the previous preset channel.
+        Raises
+        ------
+        TimeoutError
+            If no complete frame arrives within :py:attr:`response_timeout` seconds.
+        """
+        self.comm.reset_input_buffer()
+        self.comm.write(frame)
+        framer = JLIPResponseFramer()
+        sent_at = monotonic()
+        deadline = sent_at + self.response_timeout
+        while (response := framer.next_frame()) is None:
+            if (remaining := deadline - monotonic()) <= 0:
+                self._record(frame, None, sent_at)
+                msg = f'No response within {self.response_timeout} seconds.'
+                raise TimeoutError(msg)
+            self.comm.timeout = remaining
+            framer.feed(self.comm.read(framer.needed))
+        self._record(frame, response, sent_at)
+        return self.codec.validate_response(response, raise_on_error=self.raise_on_error_response)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    def send_command(self, *args: int) -> bytes:
         """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x44, 0x63, 0, 0, 0x7E))
+        Send a command at a slower rate limit.
 
-    def real_channel_down(self) -> CommandResponse:
-        """
-        Change to the previous channel.
+        Waits for the limiter unless :py:attr:`wait_for_rate_limit` is ``False``.
+
+        Parameters
+        ----------
+        *args : int
+            Command bytes to send.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x42, 0x63, 0, 0, 0x44))
+        bytes
+            Raw response bytes.
 
-    def real_channel_up(self) -> CommandResponse:
+        Raises
+        ------
+        RateLimitExceeded
+            If the rate limit is exceeded and the transport is not waiting.
         """
-        Change to the next channel.
+        if not self._acquire(fast=False):
+            msg = 'Rate limit exceeded.'
+            raise RateLimitExceeded(msg)
+        return self.send_command_base(*args)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    def send_command_fast(self, *args: int) -> bytes:
         """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x42, 0x73, 0, 0, 0x44))
+        Send a command with a faster rate limit.
 
-    def record(self) -> CommandResponse:
-        """
-        Start recording.
+        Waits for the limiter unless :py:attr:`wait_for_rate_limit` is ``False``.
+
+        Parameters
+        ----------
+        *args : int
+            Command bytes to send.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x42, 0x70))
+        bytes
+            Raw response bytes.
 
-    def reset_counter(self) -> CommandResponse:
+        Raises
+        ------
+        RateLimitExceeded
+            If the rate limit is exceeded and the transport is not waiting.
         """
-        Reset the timecode counter.
+        if not self._acquire(fast=True):
+            msg = 'Rate limit exceeded.'
+            raise RateLimitExceeded(msg)
+        return self.send_command_base(*args)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    def eject_wait(self) -> CommandResponse:
         """
-        return CommandResponse.from_bytes(self.send_command(0x48, 0x4D, 0x20))
+        Eject the tape and wait until it is done.
 
-    def rewind(self) -> CommandResponse:
-        """
-        Rewind the tape.
+        This blocks the calling thread. In asyncio code use
+        :py:func:`vcrtool.deck_state.eject_wait`.
 
         Returns
         -------
         CommandResponse
             Command response.
         """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x44, 0x65))
+        resp = self.stop()
+        sleep(0.5)
+        resp = self.eject()
+        while (resp := self.get_vtr_mode()).vtr_mode != VTRMode.EJECT:
+            sleep(0.25)
+        return resp
 
     def rewind_wait(self) -> CommandResponse:
         """
         Rewind the tape and wait until it is done.
 
+        This blocks the calling thread. In asyncio code use
+        :py:func:`vcrtool.deck_state.rewind_wait`.
+
         Returns
         -------
         CommandResponse
@@ -736,208 +1087,315 @@ class JLIPTransport:  # ruff:ignore[too-many-public-methods]
             sleep(1)
         return resp
 
-    def set_channel(self, channel: int) -> CommandResponse:
-        """
-        Set the channel to a specific value.
+    def _responds(self) -> bool:
+        try:
+            self.presence_check()
+        except (TimeoutError, ValueError):
+            return False
+        return True
 
-        Parameters
-        ----------
-        channel : int
-            Channel number.
-
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    def negotiate_baud_rate(self,
+                            max_baud_rate: int = MAX_BAUD_RATE,
+                            store: BaudRateStore | None = None) -> int:
         """
-        return CommandResponse.from_bytes(self.send_command(0x0a, 0x44, 0x71, 0, channel, 0x7E))
+        Switch the device and the port to the fastest baud rate both support.
 
-    def set_jlip_id(self, n: int) -> CommandResponse:
-        """
-        Set the JLIP ID of the device.
+        A rate stored for this port and JLIP ID is tried first. Otherwise the device is asked for
+        its rates, told to switch to the fastest one not above ``max_baud_rate`` and checked with a
+        presence check. If it does not answer, the port goes back to the previous rate.
 
         Parameters
         ----------
-        n : int
-            JLIP ID to set (1-99).
+        max_baud_rate : int
+            Fastest rate the serial adapter supports.
+        store : BaudRateStore | None
+            Where to look up and save the negotiated rate.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        int
+            The rate now in use.
 
         Raises
         ------
-        ValueError
-            If the ID is not between 1 and 99.
-        """
-        if n <= 0 or n > 99:  # ruff:ignore[magic-value-comparison]
-            raise ValueError(n)
-        self.jlip_id = n
-        return CommandResponse.from_bytes(self.send_command(0x7C, 0x41, n))
+        BaudRateError
+            If the device answers at neither rate after switching.
+        """
+        if (stored := self._stored_baud_rate(store, max_baud_rate)) is not None:
+            previous = self.baud_rate
+            self._switch_baud_rate(stored)
+            if self._responds():
+                return stored
+            self._switch_baud_rate(previous)
+        code, baud_rate = fastest_common_baud_rate(self.get_baud_rate_supported().return_data[1],
+                                                   max_baud_rate)
+        if baud_rate != (previous := self.baud_rate):
+            with contextlib.suppress(TimeoutError, ValueError):
+                # The device may switch before answering.
+                self.set_baud_rate(code)
+            self._switch_baud_rate(baud_rate)
+            if not self._responds():
+                self._baud_rate_failed(baud_rate, previous)
+                if not self._responds():
+                    msg = f'The device does not answer at {baud_rate} or {previous} baud.'
+                    raise BaudRateError(msg)
+                baud_rate = previous
+        if store is not None:
+            store.set(self.serial_path, self.jlip_id, baud_rate)
+        return baud_rate
+
+
+class AsyncJLIPTransport(JLIPCommands):
+    """
+    Asyncio counterpart of :py:class:`JLIPTransport`.
 
-    def set_input(self, n: int, nn: int) -> CommandResponse:
+    Every command is a coroutine. The serial port is opened in non-blocking mode and responses are
+    awaited through the event loop's reader callbacks, so a round trip never stalls other tasks.
+    Only one exchange is in flight at a time.
+    """
+    @cached_property
+    def _lock(self) -> asyncio.Lock:
+        # Serialises exchanges so only one frame is in flight.
+        return asyncio.Lock()
+
+    @override
+    def _open_serial(self, serial_path: str) -> serial.Serial:
+        # Reads never block; readiness is awaited through the event loop instead.
+        return serial.Serial(serial_path,
+                             baudrate=self.baud_rate,
+                             parity=serial.PARITY_ODD,
+                             rtscts=True,
+                             timeout=0)
+
+    @classmethod
+    def _command_method(cls, command: JLIPCommand[_R]) -> Callable[..., Coroutine[Any, Any, _R]]:
+        async def method(self: AsyncJLIPTransport, *args: int, fast: bool | None = None) -> _R:
+            if command.prepare:
+                command.prepare(self, *args)
+            frame = command.frame(self.jlip_id, *args)
+            if not await self._acquire(fast=command.fast if fast is None else fast):
+                msg = 'Rate limit exceeded.'
+                raise RateLimitExceeded(msg)
+            return command.response_type.from_bytes(await self.send_frame(frame))
+
+        return command.wrap(cls, method)
+
+    async def _read(self, size: int) -> bytes:
+        if data := self.comm.read(size):
+            return data
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self.comm.fileno()
+
+        def on_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+        return self.comm.read(size)
+
+    async def _read_frame(self) -> bytes:
+        framer = JLIPResponseFramer()
+        while (frame := framer.next_frame()) is None:
+            framer.feed(await self._read(framer.needed))
+        return frame
+
+    async def _acquire(self, *, fast: bool) -> bool:
+        limiter, name = (self.fast_limiter, 'command_fast') if fast else (self.limiter, 'command')
+        started_at = monotonic() if self.metrics else 0.0
+        acquired = await limiter.try_acquire_async(name, blocking=self.wait_for_rate_limit)
+        self._observe_rate_limit(name, started_at, acquired=acquired)
+        return acquired
+
+    async def send_command_base(self, *args: int) -> bytes:
         """
-        Set the input to a specific value.
+        Send a command (base method).
 
         Parameters
         ----------
-        n : int
-            Input number.
-        nn : int
-            Input sub-number.
+        *args : int
+            Command bytes to send.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        bytes
+            Raw response bytes.
         """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x59, n, nn, 0x7F))
+        return await self.send_frame(self.codec.build_command(self.jlip_id, *args))
 
-    def set_record_mode(self, n: int) -> CommandResponse:
+    async def send_frame(self, frame: bytes) -> bytes:
         """
-        Set the recording mode.
+        Send a complete request frame without rate limiting.
 
         Parameters
         ----------
-        n : int
-            Record mode value.
+        frame : bytes
+            The eleven-byte request frame.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x48, 0x43, n))
+        bytes
+            Raw response bytes.
 
-    def set_record_speed(self, n: int) -> CommandResponse:
+        Raises
+        ------
+        TimeoutError
+            If no complete frame arrives within :py:attr:`response_timeout` seconds.
+        """
+        async with self._lock:
+            self.comm.reset_input_buffer()
+            self.comm.write(frame)
+            sent_at = monotonic()
+            try:
+                response = await asyncio.wait_for(self._read_frame(), self.response_timeout)
+            except asyncio.TimeoutError as e:
+                self._record(frame, None, sent_at)
+                msg = f'No response within {self.response_timeout} seconds.'
+                raise TimeoutError(msg) from e
+        self._record(frame, response, sent_at)
+        return self.codec.validate_response(response, raise_on_error=self.raise_on_error_response)
+
+    async def send_command(self, *args: int) -> bytes:
         """
-        Set the recording speed.
+        Send a command at a slower rate limit.
+
+        The rate limit is awaited without blocking the event loop unless
+        :py:attr:`wait_for_rate_limit` is ``False``.
 
         Parameters
         ----------
-        n : int
-            Record speed value.
+        *args : int
+            Command bytes to send.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x48, 0x42, n))
+        bytes
+            Raw response bytes.
 
-    def select_band(self, n: int) -> CommandResponse:
+        Raises
+        ------
+        RateLimitExceeded
+            If the rate limit is exceeded and the transport is not waiting.
         """
-        Select a band.
-
-        Parameters
-        ----------
-        n : int
-            Band value.
+        if not await self._acquire(fast=False):
+            msg = 'Rate limit exceeded.'
+            raise RateLimitExceeded(msg)
+        return await self.send_command_base(*args)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    async def send_command_fast(self, *args: int) -> bytes:
         """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x40, 0x71, n))
+        Send a command with a faster rate limit.
 
-    def select_preset_channel(self, n: int, nn: int, nnn: int) -> CommandResponse:
-        """
-        Select a preset channel.
+        The rate limit is awaited without blocking the event loop unless
+        :py:attr:`wait_for_rate_limit` is ``False``.
 
         Parameters
         ----------
-        n : int
-            First channel parameter.
-        nn : int
-            Second channel parameter.
-        nnn : int
-            Third channel parameter.
+        *args : int
+            Command bytes to send.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        bytes
+            Raw response bytes.
+
+        Raises
+        ------
+        RateLimitExceeded
+            If the rate limit is exceeded and the transport is not waiting.
         """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x44, n, nn, nnn, 0x7E))
+        if not await self._acquire(fast=True):
+            msg = 'Rate limit exceeded.'
+            raise RateLimitExceeded(msg)
+        return await self.send_command_base(*args)
 
-    def select_real_channel(self, n: int, nn: int, nnn: int) -> CommandResponse:
+    async def eject_wait(self) -> VTRModeResponse:
         """
-        Select a channel.
+        Eject the tape and wait until it is done.
 
-        Parameters
-        ----------
-        n : int
-            First channel parameter.
-        nn : int
-            Second channel parameter.
-        nnn : int
-            Third channel parameter.
+        Shorthand for :py:func:`vcrtool.deck_state.eject_wait`.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        VTRModeResponse
+            The first state in eject mode.
         """
-        return CommandResponse.from_bytes(self.send_command(0x0A, 0x42, n, nn, nnn, 0x44))
+        from .deck_state import eject_wait  # ruff:ignore[import-outside-top-level]
 
-    def slow_play_backward(self) -> CommandResponse:
-        """
-        Slow play backward.
+        return await eject_wait(self)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
+    async def rewind_wait(self) -> VTRModeResponse:
         """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x43, 0x24))
+        Rewind the tape and wait until it is done.
 
-    def slow_play_forward(self) -> CommandResponse:
-        """
-        Slow play forward.
+        Shorthand for :py:func:`vcrtool.deck_state.rewind_wait`.
 
         Returns
         -------
-        CommandResponse
-            Command response.
+        VTRModeResponse
+            The first state after rewinding stopped.
         """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x43, 0x20))
+        from .deck_state import rewind_wait  # ruff:ignore[import-outside-top-level]
 
-    def stop(self) -> CommandResponse:
-        """
-        Stop playback or recording.
+        return await rewind_wait(self)
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x08, 0x44, 0x60))
+    async def _responds(self) -> bool:
+        try:
+            await self.presence_check()
+        except (TimeoutError, ValueError):
+            return False
+        return True
 
-    def turn_off(self) -> CommandResponse:
+    async def negotiate_baud_rate(self,
+                                  max_baud_rate: int = MAX_BAUD_RATE,
+                                  store: BaudRateStore | None = None) -> int:
         """
-        Turn the device off.
+        Switch the device and the port to the fastest baud rate both support.
 
-        Returns
-        -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x3E, 0x40, 0x60))
+        See :py:meth:`JLIPTransport.negotiate_baud_rate`. The store is read and written in a worker
+        thread.
 
-    def turn_on(self) -> CommandResponse:
-        """
-        Turn the device on.
+        Parameters
+        ----------
+        max_baud_rate : int
+            Fastest rate the serial adapter supports.
+        store : BaudRateStore | None
+            Where to look up and save the negotiated rate.
 
         Returns
         -------
-        CommandResponse
-            Command response.
-        """
-        return CommandResponse.from_bytes(self.send_command(0x3E, 0x40, 0x70))
+        int
+            The rate now in use.
 
-    @override
-    def __repr__(self) -> str:
-        return (f'<JLIPTransport jlip_id={self.jlip_id} '
-                f'raise_on_error={self.raise_on_error_response}>')
+        Raises
+        ------
+        BaudRateError
+            If the device answers at neither rate after switching.
+        """
+        stored = await asyncio.to_thread(self._stored_baud_rate, store, max_baud_rate)
+        if stored is not None:
+            previous = self.baud_rate
+            self._switch_baud_rate(stored)
+            if await self._responds():
+                return stored
+            self._switch_baud_rate(previous)
+        code, baud_rate = fastest_common_baud_rate(
+            (await self.get_baud_rate_supported()).return_data[1], max_baud_rate)
+        if baud_rate != (previous := self.baud_rate):
+            with contextlib.suppress(TimeoutError, ValueError):
+                # The device may switch before answering.
+                await self.set_baud_rate(code)
+            self._switch_baud_rate(baud_rate)
+            if not await self._responds():
+                self._baud_rate_failed(baud_rate, previous)
+                if not await self._responds():
+                    msg = f'The device does not answer at {baud_rate} or {previous} baud.'
+                    raise BaudRateError(msg)
+                baud_rate = previous
+        if store is not None:
+            await asyncio.to_thread(store.set, self.serial_path, self.jlip_id, baud_rate)
+        return baud_rate
@@ -2,31 +2,150 @@
 # ruff:file-ignore[docstring-missing-exception]
 from __future__ import annotations
 
-import dataclasses
-import inspect
-import json
+from typing import TYPE_CHECKING, Any, TextIO
 
-from bascom import setup_logging
 import click
 
-from .jlip import JLIPTransport
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
 __all__ = ('jlip',)
 
-DISALLOWED_COMMANDS = {'send_command_base', 'send_command_fast'}
-VALID_COMMANDS = [
-    name.replace('_', '-') for name, x in inspect.getmembers(JLIPTransport)
-    if callable(x) and not name.startswith('_') and name not in DISALLOWED_COMMANDS
-]
+EXTRA_COMMANDS = ('eject_wait', 'rewind_wait', 'send_command')
+"""Transport methods accepted by ``jlip`` that are not in the command table."""
+VALID_COMMANDS = (
+    'eject',
+    'eject-wait',
+    'fast-forward',
+    'fast-play-backward',
+    'fast-play-forward',
+    'frame-step',
+    'frame-step-back',
+    'get-baud-rate-supported',
+    'get-device-code',
+    'get-device-name',
+    'get-input',
+    'get-machine-code',
+    'get-play-speed',
+    'get-power-state',
+    'get-tuner-mode',
+    'get-vtr-mode',
+    'nop',
+    'pause',
+    'pause-recording',
+    'play',
+    'presence-check',
+    'preset-channel-down',
+    'preset-channel-up',
+    'real-channel-down',
+    'real-channel-up',
+    'record',
+    'reset-counter',
+    'rewind',
+    'rewind-wait',
+    'select-band',
+    'select-preset-channel',
+    'select-real-channel',
+    'send-command',
+    'set-baud-rate',
+    'set-channel',
+    'set-input',
+    'set-jlip-id',
+    'set-record-mode',
+    'set-record-speed',
+    'slow-play-backward',
+    'slow-play-forward',
+    'stop',
+    'turn-off',
+    'turn-on',
+)
+"""
+Commands accepted by ``jlip``.
+
+This is a static copy of the transport's command table so that checking arguments does not import
+the transport, pyserial or the rate limiter.
+"""
+
+
+def _caller(serial_device: str,
+            socket_path: str | None,
+            *,
+            debug: bool,
+            negotiate_baud_rate: bool = False) -> Callable[..., Any]:
+    if socket_path:
+        from .client import DaemonError, send_request  # ruff:ignore[import-outside-top-level]
+
+        def send(command: str, *args: int) -> Any:
+            try:
+                return send_request(socket_path, serial_device, command, *args)
+            except OSError as e:
+                msg = f'Cannot reach the daemon at `{socket_path}`: {e}'
+                raise DaemonError(msg) from e
+
+        return send
+    from bascom import setup_logging  # ruff:ignore[import-outside-top-level]
+
+    from .baud import BaudRateStore  # ruff:ignore[import-outside-top-level]
+    from .jlip import JLIPTransport, to_jsonable  # ruff:ignore[import-outside-top-level]
+
+    setup_logging(debug=debug, loggers={'vcrtool': {'handlers': ('console',), 'propagate': False}})
+    vcr = JLIPTransport(serial_device, raise_on_error_response=False)
+    if negotiate_baud_rate:
+        vcr.negotiate_baud_rate(store=BaudRateStore())
+
+    def call(command: str, *args: int) -> Any:
+        return to_jsonable(getattr(vcr, command.replace('-', '_'))(*args))
+
+    return call
 
 
 @click.command(context_settings={'help_option_names': ['-h', '--help']})
 @click.argument('serial_device')
 @click.argument('args', nargs=-1)
 @click.option('-d', '--debug', is_flag=True, help='Enable debug logging.')
-def jlip(serial_device: str, args: tuple[str, ...], *, debug: bool = False) -> None:
-    """Run JLIP commands."""
-    setup_logging(debug=debug, loggers={'vcrtool': {'handlers': ('console',), 'propagate': False}})
+@click.option('-s',
+              '--socket',
+              'socket_path',
+              envvar='JLIP_SOCKET',
+              help='Run the command through the daemon listening on this Unix socket (see jlipd).')
+@click.option('-f',
+              '--script',
+              type=click.File(),
+              help='Run the commands in this file, or standard input if -, and print JSON Lines.')
+@click.option('-B',
+              '--negotiate-baud-rate',
+              is_flag=True,
+              help='Switch to the fastest baud rate the device supports and remember it.')
+def jlip(serial_device: str,
+         args: tuple[str, ...],
+         socket_path: str | None = None,
+         script: TextIO | None = None,
+         *,
+         debug: bool = False,
+         negotiate_baud_rate: bool = False) -> None:
+    """
+    Run JLIP commands.
+
+    With ``--socket``, the command is sent to ``jlipd`` which keeps the serial port open between
+    commands.
+
+    With ``--negotiate-baud-rate``, the rate last negotiated with the device is tried first. It is
+    ignored with ``--socket``.
+
+    With ``--script``, commands are read one per line and run over a single connection. Lines may
+    also be ``wait SECONDS`` or ``until FIELD OP VALUE [timeout SECONDS]``, such as
+    ``until vtr_mode == STOP``. A JSON object is printed for each line as it completes.
+    """
+    if script is not None:
+        if args:
+            msg = 'Commands cannot be given with --script.'
+            raise click.BadArgumentUsage(msg)
+        _run_script(serial_device,
+                    script,
+                    socket_path,
+                    debug=debug,
+                    negotiate_baud_rate=negotiate_baud_rate)
+        return
     try:
         command = args[0]
     except IndexError as e:
@@ -35,8 +154,37 @@ def jlip(serial_device: str, args: tuple[str, ...], *, debug: bool = False) -> N
     if not command or command not in VALID_COMMANDS:
         msg = f'Invalid command `{command}`. Valid commands: {", ".join(VALID_COMMANDS)}.'
         raise click.BadArgumentUsage(msg)
-    vcr = JLIPTransport(serial_device, raise_on_error_response=False)
-    click.echo(
-        json.dumps(
-            dataclasses.asdict(
-                getattr(vcr, command.replace('-', '_'))(*(int(x) for x in args[1:])))))
+    # Deferred until a command actually runs so the checks above stay fast.
+    import json  # ruff:ignore[import-outside-top-level]
+
+    from .client import DaemonError  # ruff:ignore[import-outside-top-level]
+
+    call = _caller(serial_device, socket_path, debug=debug, negotiate_baud_rate=negotiate_baud_rate)
+    try:
+        result = call(command, *(int(x) for x in args[1:]))
+    except DaemonError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(json.dumps(result))
+
+
+def _run_script(serial_device: str,
+                source: TextIO,
+                socket_path: str | None,
+                *,
+                debug: bool,
+                negotiate_baud_rate: bool = False) -> None:
+    import json  # ruff:ignore[import-outside-top-level]
+
+    from . import script  # ruff:ignore[import-outside-top-level]
+    from .client import DaemonError  # ruff:ignore[import-outside-top-level]
+
+    try:
+        steps = script.parse_script(source)
+    except script.ScriptError as e:
+        raise click.BadParameter(str(e), param_hint='--script') from e
+    call = _caller(serial_device, socket_path, debug=debug, negotiate_baud_rate=negotiate_baud_rate)
+    try:
+        for record in script.run_script(steps, call):
+            click.echo(json.dumps(record))
+    except (DaemonError, script.ScriptError) as e:
+        raise click.ClickException(str(e)) from e
@@ -0,0 +1,653 @@
+"""
+Prometheus metrics for captures and JLIP traffic.
+
+Metrics are kept in a :py:class:`MetricsRegistry` and rendered in the Prometheus text exposition
+format, either served over HTTP by :py:func:`serve_metrics` or written for node_exporter's
+textfile collector by :py:meth:`MetricsRegistry.write_textfile`. :py:class:`CaptureMetrics`
+declares the metrics vcrtool exports. Pass it as ``metrics`` to a transport to count every JLIP
+exchange and rate limit wait.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache
+from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING
+import asyncio
+import bisect
+import logging
+import math
+import threading
+
+from .deck_state import counter_seconds
+from .jlip import JLIPCommands, VTRMode, VTRModeResponse
+from .sansio import checksum
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+    import os
+
+    from .progress import CaptureProgress
+
+__all__ = ('CONTENT_TYPE', 'DEFAULT_METRICS_HOST', 'DEFAULT_TEXTFILE_INTERVAL',
+           'JLIP_LATENCY_BUCKETS', 'CaptureMetrics', 'Counter', 'Gauge', 'Histogram',
+           'MetricsRegistry', 'export_metrics', 'serve_metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+"""Content type of the text exposition format."""
+DEFAULT_METRICS_HOST = '127.0.0.1'
+"""Address the HTTP endpoint listens on by default."""
+DEFAULT_TEXTFILE_INTERVAL = 15.0
+"""Seconds between writes of the textfile."""
+JLIP_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+"""Upper bounds in seconds of the JLIP round trip histogram buckets."""
+
+log = logging.getLogger(__name__)
+
+_REQUEST_LINE_PARTS = 3
+_Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True))
+    return f'{{{pairs}}}' if pairs else ''
+
+
+class _Metric(ABC):
+    type_ = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        """Metric name."""
+        self.documentation = documentation
+        """Help text."""
+        self.labelnames = tuple(labelnames)
+        """Names of the labels, in order."""
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> _Labels:
+        if set(labels) != set(self.labelnames):
+            msg = f'{self.name} takes labels {", ".join(self.labelnames)}.'
+            raise ValueError(msg)
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """
+        Get the samples to render.
+
+        Yields
+        ------
+        tuple[str, str, float]
+            Sample name, formatted labels and value.
+        """
+
+    def render(self) -> str:
+        lines = [
+            f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.type_}'
+        ]
+        lines.extend(
+            f'{name}{labels} {_format_value(value)}' for name, labels, value in self.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+    type_ = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        """
+        Declare a counter.
+
+        Parameters
+        ----------
+        name : str
+            Metric name. Should end in ``_total``.
+        documentation : str
+            Help text.
+        labelnames : Iterable[str]
+            Names of the labels.
+        """
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[_Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Add to the counter.
+
+        Parameters
+        ----------
+        amount : float
+            Amount to add.
+        **labels : str
+            Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        """
+        Get the current value.
+
+        Parameters
+        ----------
+        **labels : str
+            Label values.
+
+        Returns
+        -------
+        float
+            The value, ``0`` if it was never increased.
+        """
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """
+        Get the samples to render.
+
+        Yields
+        ------
+        tuple[str, str, float]
+            Sample name, formatted labels and value.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+    type_ = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        Set the gauge.
+
+        Parameters
+        ----------
+        value : float
+            The value.
+        **labels : str
+            Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, **labels: str) -> None:
+        """
+        Stop exporting a label set.
+
+        Parameters
+        ----------
+        **labels : str
+            Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class Histogram(_Metric):
+    """Observations counted in cumulative buckets."""
+    type_ = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = JLIP_LATENCY_BUCKETS) -> None:
+        """
+        Declare a histogram.
+
+        Parameters
+        ----------
+        name : str
+            Metric name.
+        documentation : str
+            Help text.
+        labelnames : Iterable[str]
+            Names of the labels.
+        buckets : Iterable[float]
+            Upper bounds of the buckets. ``+Inf`` is always added.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(set(buckets) - {math.inf}))
+        """Upper bounds of the buckets, without ``+Inf``."""
+        self._counts: dict[_Labels, list[int]] = {}
+        self._sums: dict[_Labels, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record an observation.
+
+        Parameters
+        ----------
+        value : float
+            The observed value.
+        **labels : str
+            Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        """
+        Get the samples to render.
+
+        Yields
+        ------
+        tuple[str, str, float]
+            Sample name, formatted labels and value.
+        """
+        with self._lock:
+            entries = sorted(
+                (key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        names = (*self.labelnames, 'le')
+        for key, counts, total in entries:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                yield (f'{self.name}_bucket', _format_labels(
+                    names, (*key, _format_value(bound))), cumulative)
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+def _collect(collector: Callable[[], None]) -> None:
+    try:
+        collector()
+    except Exception:
+        log.exception('Metrics collector failed.')
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together."""
+    def __init__(self) -> None:
+        """Initialise an empty registry."""
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Counter | Gauge | Histogram) -> None:
+        """
+        Add a metric.
+
+        Parameters
+        ----------
+        metric : Counter | Gauge | Histogram
+            The metric.
+
+        Raises
+        ------
+        ValueError
+            If a metric with the same name is already registered.
+        """
+        if metric.name in self._metrics:
+            msg = f'Metric {metric.name} is already registered.'
+            raise ValueError(msg)
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call ``collector`` before every render, for values that are cheaper to read on demand.
+
+        Parameters
+        ----------
+        collector : Callable[[], None]
+            Updates metrics of this registry.
+
+        Returns
+        -------
+        Callable[[], None]
+            Function that removes the collector.
+        """
+        self._collectors.append(collector)
+
+        def remove() -> None:
+            with suppress(ValueError):
+                self._collectors.remove(collector)
+
+        return remove
+
+    def render(self) -> str:
+        """
+        Render every metric in the text exposition format.
+
+        Returns
+        -------
+        str
+            The exposition.
+        """
+        for collector in tuple(self._collectors):
+            _collect(collector)
+        return ''.join(metric.render() for metric in self._metrics.values())
+
+    def write_textfile(self, path: str | os.PathLike[str]) -> None:
+        """
+        Write the exposition for node_exporter's textfile collector.
+
+        The file is replaced atomically so the collector never reads a partial file.
+
+        Parameters
+        ----------
+        path : str | os.PathLike[str]
+            File to write. The collector only reads files ending in ``.prom``.
+        """
+        path = Path(path)
+        partial = path.with_name(f'{path.name}.part')
+        partial.write_text(self.render(), encoding='utf-8')
+        partial.replace(path)
+
+
+@lru_cache(maxsize=256)
+def _command_name(opcode: bytes) -> str:
+    for name, command in JLIPCommands.commands().items():
+        if all(
+                isinstance(expected, str) or expected == actual
+                for expected, actual in zip(command.opcode, opcode, strict=False)):
+            return name
+    return opcode.hex(' ')
+
+
+class CaptureMetrics:
+    """The metrics vcrtool exports, in their own :py:class:`MetricsRegistry`."""
+    def __init__(self, registry: MetricsRegistry | None = None) -> None:
+        """
+        Declare the metrics.
+
+        Parameters
+        ----------
+        registry : MetricsRegistry | None
+            Registry to declare them in. Defaults to a new one.
+        """
+        self.registry = registry or MetricsRegistry()
+        """Registry holding the metrics."""
+        self.jlip_commands = Counter('vcrtool_jlip_commands_total', 'JLIP commands sent.',
+                                     ('port', 'command'))
+        self.jlip_latency = Histogram('vcrtool_jlip_command_duration_seconds',
+                                      'Seconds from writing a JLIP request to its response.',
+                                      ('port', 'command'))
+        self.jlip_timeouts = Counter('vcrtool_jlip_timeouts_total',
+                                     'JLIP requests that got no response.', ('port', 'command'))
+        self.jlip_checksum_failures = Counter('vcrtool_jlip_checksum_failures_total',
+                                              'JLIP responses with a bad checksum.', ('port',))
+        self.rate_limit_wait = Counter('vcrtool_jlip_rate_limit_wait_seconds_total',
+                                       'Seconds spent waiting for a JLIP rate limiter.',
+                                       ('port', 'limiter'))
+        self.rate_limit_rejections = Counter('vcrtool_jlip_rate_limit_rejections_total',
+                                             'JLIP commands refused by a rate limiter.',
+                                             ('port', 'limiter'))
+        self.vtr_mode = Gauge('vcrtool_deck_vtr_mode', '1 for the VTR mode a deck is in.',
+                              ('port', 'jlip_id', 'mode'))
+        self.tape_counter = Gauge('vcrtool_deck_counter_seconds', 'Tape counter of a deck.',
+                                  ('port', 'jlip_id'))
+        self.ffmpeg_fps = Gauge('vcrtool_ffmpeg_fps', 'Frames per second written by ffmpeg.',
+                                ('output',))
+        self.ffmpeg_speed = Gauge('vcrtool_ffmpeg_speed', 'Encoding speed relative to real time.',
+                                  ('output',))
+        self.ffmpeg_frames = Gauge('vcrtool_ffmpeg_frames', 'Frames written by ffmpeg.',
+                                   ('output',))
+        self.ffmpeg_dropped_frames = Gauge('vcrtool_ffmpeg_dropped_frames',
+                                           'Frames dropped by ffmpeg.', ('output',))
+        self.ffmpeg_duplicated_frames = Gauge('vcrtool_ffmpeg_duplicated_frames',
+                                              'Frames duplicated by ffmpeg.', ('output',))
+        self.written_bytes = Gauge('vcrtool_written_bytes', 'Bytes written by a capture process.',
+                                   ('output', 'process'))
+        for metric in (self.jlip_commands, self.jlip_latency, self.jlip_timeouts,
+                       self.jlip_checksum_failures, self.rate_limit_wait,
+                       self.rate_limit_rejections, self.vtr_mode, self.tape_counter,
+                       self.ffmpeg_fps, self.ffmpeg_speed, self.ffmpeg_frames,
+                       self.ffmpeg_dropped_frames, self.ffmpeg_duplicated_frames,
+                       self.written_bytes):
+            self.registry.register(metric)
+
+    def observe_exchange(self, port: str, request: bytes, response: bytes | None, sent_at: float,
+                         received_at: float) -> None:
+        """
+        Count a JLIP exchange. Transports call this for every frame they send.
+
+        Responses to ``get_vtr_mode`` also update the deck's mode and counter.
+
+        Parameters
+        ----------
+        port : str
+            Serial port of the transport.
+        request : bytes
+            The request frame.
+        response : bytes | None
+            The response frame, or ``None`` if none arrived.
+        sent_at : float
+            Monotonic time the request was written.
+        received_at : float
+            Monotonic time the response was complete or the wait gave up.
+        """
+        command = _command_name(request[3:10])
+        self.jlip_commands.inc(port=port, command=command)
+        if response is None:
+            self.jlip_timeouts.inc(port=port, command=command)
+            return
+        self.jlip_latency.observe(received_at - sent_at, port=port, command=command)
+        if response[10] != checksum(response):
+            self.jlip_checksum_failures.inc(port=port)
+        elif command == 'get_vtr_mode':
+            with suppress(ValueError):
+                self.observe_deck_state(port, request[2], VTRModeResponse.from_bytes(response))
+
+    def observe_deck_state(self, port: str, jlip_id: int, state: VTRModeResponse) -> None:
+        """
+        Export a deck's mode and tape counter.
+
+        Parameters
+        ----------
+        port : str
+            Serial port of the deck.
+        jlip_id : int
+            JLIP ID of the deck.
+        state : VTRModeResponse
+            Response to ``get_vtr_mode``.
+        """
+        vtr_mode = state.vtr_mode
+        for mode in VTRMode:
+            self.vtr_mode.set(int(mode == vtr_mode),
+                              port=port,
+                              jlip_id=str(jlip_id),
+                              mode=mode.name)
+        self.tape_counter.set(counter_seconds(state), port=port, jlip_id=str(jlip_id))
+
+    def observe_rate_limit(self, port: str, limiter: str, waited: float, *, acquired: bool) -> None:
+        """
+        Count a rate limiter acquisition.
+
+        Parameters
+        ----------
+        port : str
+            Serial port of the transport.
+        limiter : str
+            ``'command'`` or ``'command_fast'``.
+        waited : float
+            Seconds spent acquiring.
+        acquired : bool
+            Whether the limiter let the command through.
+        """
+        self.rate_limit_wait.inc(waited, port=port, limiter=limiter)
+        if not acquired:
+            self.rate_limit_rejections.inc(port=port, limiter=limiter)
+
+    def observe_progress(self, output: str, progress: CaptureProgress) -> None:
+        """
+        Export an ffmpeg progress report.
+
+        Parameters
+        ----------
+        output : str
+            The capture's output file.
+        progress : CaptureProgress
+            The report.
+        """
+        self.ffmpeg_fps.set(progress.fps, output=output)
+        self.ffmpeg_speed.set(progress.speed or 0.0, output=output)
+        self.ffmpeg_frames.set(progress.frame, output=output)
+        self.ffmpeg_dropped_frames.set(progress.drop_frames, output=output)
+        self.ffmpeg_duplicated_frames.set(progress.dup_frames, output=output)
+        self.written_bytes.set(progress.total_size, output=output, process='ffmpeg')
+
+    def track_file(self, output: str, process: str,
+                   path: str | os.PathLike[str]) -> Callable[[], None]:
+        """
+        Export the size of a file a process writes, read whenever the metrics are rendered.
+
+        Parameters
+        ----------
+        output : str
+            The capture's output file.
+        process : str
+            Name of the writing process, such as ``'zvbi2raw'``.
+        path : str | os.PathLike[str]
+            The file.
+
+        Returns
+        -------
+        Callable[[], None]
+            Function that stops tracking. The last size stays exported.
+        """
+        def collect() -> None:
+            with suppress(FileNotFoundError):
+                self.written_bytes.set(Path(path).stat().st_size, output=output, process=process)
+
+        return self.registry.add_collector(collect)
+
+
+def _response(registry: MetricsRegistry, request_line: list[str]) -> bytes:
+    if len(request_line) < _REQUEST_LINE_PARTS or request_line[0] not in {'GET', 'HEAD'}:
+        status, body = '405 Method Not Allowed', b''
+    elif request_line[1].split('?')[0] not in {'/', '/metrics'}:
+        status, body = '404 Not Found', b''
+    else:
+        status, body = '200 OK', registry.render().encode()
+    head = (f'HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n')
+    return head.encode() + (b'' if request_line[:1] == ['HEAD'] else body)
+
+
+async def _handle_request(registry: MetricsRegistry, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        while (await reader.readline()).strip():
+            pass
+        writer.write(_response(registry, request_line))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        with suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def serve_metrics(registry: MetricsRegistry,
+                        port: int,
+                        host: str = DEFAULT_METRICS_HOST) -> asyncio.Server:
+    """
+    Serve the metrics over HTTP at ``/metrics``.
+
+    Parameters
+    ----------
+    registry : MetricsRegistry
+        Metrics to serve.
+    port : int
+        TCP port. ``0`` picks a free one.
+    host : str
+        Address to listen on.
+
+    Returns
+    -------
+    asyncio.Server
+        The running server.
+    """
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_request(registry, reader, writer), host, port)
+    log.info(
+        'Serving metrics on %s.',
+        ', '.join(f'http://{sock.getsockname()[0]}:{sock.getsockname()[1]}/metrics'
+                  for sock in server.sockets))
+    return server
+
+
+async def _write_textfile_periodically(registry: MetricsRegistry, path: str | os.PathLike[str],
+                                       interval: float) -> None:
+    while True:
+        started = monotonic()
+        try:
+            await asyncio.to_thread(registry.write_textfile, path)
+        except OSError:
+            log.exception('Writing metrics to `%s` failed.', path)
+        await asyncio.sleep(max(0, interval - (monotonic() - started)))
+
+
+@asynccontextmanager
+async def export_metrics(registry: MetricsRegistry,
+                         *,
+                         port: int | None = None,
+                         host: str = DEFAULT_METRICS_HOST,
+                         textfile: str | os.PathLike[str] | None = None,
+                         interval: float = DEFAULT_TEXTFILE_INTERVAL) -> AsyncIterator[None]:
+    """
+    Export metrics for the duration of the context.
+
+    Without ``port`` or ``textfile`` nothing is exported. The textfile is written once more on exit
+    so it holds the final values.
+
+    Parameters
+    ----------
+    registry : MetricsRegistry
+        Metrics to export.
+    port : int | None
+        Serve the metrics over HTTP on this port.
+    host : str
+        Address the HTTP endpoint listens on.
+    textfile : str | os.PathLike[str] | None
+        Write the metrics to this file every ``interval`` seconds.
+    interval : float
+        Seconds between writes of the textfile.
+
+    Yields
+    ------
+    None
+        Nothing.
+    """
+    server = await serve_metrics(registry, port, host) if port is not None else None
+    writer = (asyncio.create_task(_write_textfile_periodically(registry, textfile, interval))
+              if textfile is not None else None)
+    try:
+        yield
+    finally:
+        if writer and textfile is not None:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            with suppress(OSError):
+                registry.write_textfile(textfile)
+        if server:
+            server.close()
+            await server.wait_closed()
@@ -0,0 +1,259 @@
+"""Pipelined JLIP exchanges with several requests in flight on one serial line."""
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import TYPE_CHECKING
+import asyncio
+import contextlib
+import logging
+
+from .jlip import RateLimitExceeded
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+    from .jlip import AsyncJLIPTransport, CommandResponse
+
+__all__ = ('DEFAULT_HISTORY', 'DEFAULT_MAX_IN_FLIGHT', 'DEFAULT_MAX_IN_FLIGHT_PER_ID',
+           'JLIPPipeline', 'Turnaround')
+
+DEFAULT_HISTORY = 256
+"""Default number of turnaround measurements kept."""
+DEFAULT_MAX_IN_FLIGHT = 4
+"""Default number of requests awaiting a response on the line at once."""
+DEFAULT_MAX_IN_FLIGHT_PER_ID = 1
+"""Default number of requests awaiting a response from one JLIP ID at once."""
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Turnaround:
+    """Time between writing a request and receiving the last byte of its response."""
+    jlip_id: int
+    """JLIP ID the request was addressed to."""
+    request: bytes
+    """The request frame."""
+    seconds: float
+    """Turnaround in seconds."""
+
+
+@dataclass
+class _InFlight:
+    frame: bytes
+    future: asyncio.Future[bytes]
+    sent_at: float = field(default_factory=monotonic)
+
+
+class JLIPPipeline:
+    """
+    Send requests on an :py:class:`vcrtool.jlip.AsyncJLIPTransport` without waiting for each reply.
+
+    A plain transport writes a frame and reads its response before the next frame goes out, so the
+    line sits idle for every device round trip. The pipeline writes up to ``max_in_flight`` frames
+    ahead and a single reader task matches each response to the oldest outstanding request with
+    the same JLIP ID. This mostly pays off on a multi-drop line where several devices with different
+    IDs can work at the same time; ``max_in_flight_per_id`` bounds how far a single device is
+    pushed.
+
+    Each exchange is timed from the moment its request is written until its response frame is
+    complete, and the most recent measurements are kept in :py:attr:`history`.
+
+    While the pipeline is running it owns the serial port and holds the transport's exchange lock,
+    so the transport's own command methods wait until the pipeline stops.
+    """
+    def __init__(self,
+                 vcr: AsyncJLIPTransport,
+                 *,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_in_flight_per_id: int = DEFAULT_MAX_IN_FLIGHT_PER_ID,
+                 history: int = DEFAULT_HISTORY) -> None:
+        """
+        Initialise the pipeline.
+
+        Parameters
+        ----------
+        vcr : AsyncJLIPTransport
+            Transport whose serial port is shared.
+        max_in_flight : int
+            Maximum number of requests awaiting a response on the line.
+        max_in_flight_per_id : int
+            Maximum number of requests awaiting a response from one JLIP ID.
+        history : int
+            Number of turnaround measurements kept.
+        """
+        self.vcr = vcr
+        self.max_in_flight_per_id = max_in_flight_per_id
+        self.history: deque[Turnaround] = deque(maxlen=history)
+        """Most recent turnaround measurements, oldest first."""
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._id_slots: defaultdict[int, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.max_in_flight_per_id))
+        self._pending: defaultdict[int, deque[_InFlight]] = defaultdict(deque)
+        self._reader: asyncio.Task[None] | None = None
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests awaiting a response, not counting those that timed out."""
+        return sum(
+            not request.future.done() for pending in self._pending.values() for request in pending)
+
+    @property
+    def running(self) -> bool:
+        """Whether the reader task is running."""
+        return self._reader is not None
+
+    async def start(self) -> None:
+        """Take over the serial port and start matching responses."""
+        if self._reader is None:
+            await self.vcr._lock.acquire()  # ruff:ignore[private-member-access]
+            self.vcr.comm.reset_input_buffer()
+            self._reader = asyncio.create_task(self._read_responses())
+
+    async def stop(self) -> None:
+        """Stop matching responses, fail outstanding requests and release the serial port."""
+        if (reader := self._reader) is None:
+            return
+        self._reader = None
+        reader.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await reader
+        for pending in self._pending.values():
+            for request in pending:
+                if not request.future.done():
+                    request.future.cancel()
+        self._pending.clear()
+        self.vcr._lock.release()  # ruff:ignore[private-member-access]
+
+    async def __aenter__(self) -> Self:
+        """
+        Start the pipeline.
+
+        Returns
+        -------
+        Self
+            This pipeline.
+        """
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None,
+                        tb: TracebackType | None) -> None:
+        """Stop the pipeline."""
+        await self.stop()
+
+    def mean_turnaround(self, jlip_id: int | None = None) -> float | None:
+        """
+        Get the mean of the kept turnaround measurements.
+
+        Parameters
+        ----------
+        jlip_id : int | None
+            Only include exchanges with this JLIP ID.
+
+        Returns
+        -------
+        float | None
+            Mean turnaround in seconds, or ``None`` if nothing was measured.
+        """
+        seconds = [t.seconds for t in self.history if jlip_id is None or t.jlip_id == jlip_id]
+        return sum(seconds) / len(seconds) if seconds else None
+
+    async def _read_responses(self) -> None:
+        while True:
+            frame = await self.vcr._read_frame()  # ruff:ignore[private-member-access]
+            received_at = monotonic()
+            if not (pending := self._pending.get(frame[2])):
+                log.debug('Dropping a response from JLIP ID %d that nothing is waiting for.',
+                          frame[2])
+                continue
+            request = pending.popleft()
+            self.history.append(Turnaround(frame[2], request.frame, received_at - request.sent_at))
+            if not request.future.done():
+                request.future.set_result(frame)
+
+    async def send_frame(self, frame: bytes) -> bytes:
+        """
+        Write a request frame and wait for its response.
+
+        Waits first if the line or the frame's JLIP ID already has the maximum number of requests
+        in flight.
+
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
+
+        Returns
+        -------
+        bytes
+            The validated response frame.
+
+        Raises
+        ------
+        RuntimeError
+            If the pipeline is not running.
+        TimeoutError
+            If no response arrives within the transport's response timeout.
+        """
+        if self._reader is None:
+            msg = 'The pipeline is not running.'
+            raise RuntimeError(msg)
+        jlip_id = frame[2]
+        async with self._slots, self._id_slots[jlip_id]:
+            self.vcr.comm.write(frame)
+            request = _InFlight(frame, asyncio.get_running_loop().create_future())
+            self._pending[jlip_id].append(request)
+            try:
+                response = await asyncio.wait_for(request.future, self.vcr.response_timeout)
+            except asyncio.TimeoutError as e:
+                # The request stays queued with its future cancelled so a late response is matched
+                # to it and dropped instead of being handed to the next request for this ID.
+                msg = f'No response within {self.vcr.response_timeout} seconds.'
+                raise TimeoutError(msg) from e
+        return self.vcr.codec.validate_response(response,
+                                                raise_on_error=self.vcr.raise_on_error_response)
+
+    async def command(self,
+                      name: str,
+                      *args: int,
+                      jlip_id: int | None = None,
+                      fast: bool | None = None) -> CommandResponse:
+        """
+        Run a command from the transport's command table through the pipeline.
+
+        Parameters
+        ----------
+        name : str
+            Name of the command, such as ``get_vtr_mode``.
+        *args : int
+            Command arguments.
+        jlip_id : int | None
+            Device to address. Defaults to the transport's JLIP ID.
+        fast : bool | None
+            Use the faster rate limit. Defaults to the command's own rate class.
+
+        Returns
+        -------
+        CommandResponse
+            The parsed response, of the command's response type.
+
+        Raises
+        ------
+        RateLimitExceeded
+            If the rate limit is exceeded and the transport is not waiting.
+        """
+        command = self.vcr.commands()[name]
+        if command.prepare:
+            command.prepare(self.vcr, *args)
+        frame = command.frame(self.vcr.jlip_id if jlip_id is None else jlip_id, *args)
+        if not await self.vcr._acquire(  # ruff:ignore[private-member-access]
+                fast=command.fast if fast is None else fast):
+            msg = 'Rate limit exceeded.'
+            raise RateLimitExceeded(msg)
+        response: CommandResponse = command.response_type.from_bytes(await self.send_frame(frame))
+        return response
@@ -0,0 +1,256 @@
+"""
+Capture health from ffmpeg progress reports.
+
+ffmpeg run with ``-progress pipe:1`` writes a block of ``key=value`` lines to standard output about
+twice a second, each ending with ``progress=continue`` or, for the last, ``progress=end``.
+:py:class:`ProgressParser` turns the blocks into :py:class:`CaptureProgress` snapshots and
+:py:class:`CaptureMonitor` checks them against :py:class:`ProgressThresholds` while a capture runs.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import monotonic
+from typing import TYPE_CHECKING
+import logging
+import math
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterable, Callable, Mapping
+
+__all__ = ('DEFAULT_ALERT_INTERVAL', 'DEFAULT_MAX_DROP_FRAMES', 'DEFAULT_MIN_SPEED',
+           'DEFAULT_SLOW_GRACE', 'CaptureFellBehindError', 'CaptureMonitor', 'CaptureProgress',
+           'ProgressParser', 'ProgressThresholds')
+
+DEFAULT_ALERT_INTERVAL = 60.0
+"""Seconds between repeated alerts of the same kind."""
+DEFAULT_MAX_DROP_FRAMES = 30
+"""Dropped frames after which a capture counts as falling behind. One second of NTSC video."""
+DEFAULT_MIN_SPEED = 0.98
+"""Slowest encoding speed, relative to real time, that a capture can keep up with."""
+DEFAULT_SLOW_GRACE = 30.0
+"""Seconds the speed may stay below the minimum before the capture counts as falling behind."""
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CaptureProgress:
+    """One progress report of a running ffmpeg."""
+    frame: int = 0
+    """Frames written."""
+    fps: float = 0.0
+    """Frames written per second."""
+    bitrate: float | None = None
+    """Output bitrate in kbit/s, or ``None`` if ffmpeg does not know it yet."""
+    total_size: int = 0
+    """Bytes written."""
+    out_time: float = 0.0
+    """Seconds of output written."""
+    dup_frames: int = 0
+    """Frames duplicated to keep a constant frame rate."""
+    drop_frames: int = 0
+    """Frames dropped, usually because the encoder could not keep up."""
+    speed: float | None = None
+    """Seconds of output written per second of real time, or ``None`` if not known yet."""
+    finished: bool = False
+    """Whether this is the last report."""
+
+
+def _number(value: str | None, default: float | None) -> float | None:
+    if value is None:
+        return default
+    try:
+        number = float(value.strip().removesuffix('kbits/s').removesuffix('x'))
+    except ValueError:
+        return default
+    return number if math.isfinite(number) else default
+
+
+class ProgressParser:
+    """Assembles the lines of ffmpeg's ``-progress`` output into :py:class:`CaptureProgress`."""
+    def __init__(self) -> None:
+        """Initialise the parser."""
+        self._fields: dict[str, str] = {}
+        self.progress = CaptureProgress()
+        """The latest complete report."""
+
+    @staticmethod
+    def parse(fields: Mapping[str, str], previous: CaptureProgress) -> CaptureProgress:
+        """
+        Build a report from the fields of one block.
+
+        Fields that are missing or ``N/A`` keep their previous value, except ``bitrate`` and
+        ``speed`` which become ``None``.
+
+        Parameters
+        ----------
+        fields : Mapping[str, str]
+            Keys and values of the block.
+        previous : CaptureProgress
+            The report before this one.
+
+        Returns
+        -------
+        CaptureProgress
+            The report.
+        """
+        out_time_us = _number(fields.get('out_time_us'), None)
+        return CaptureProgress(
+            frame=int(_number(fields.get('frame'), previous.frame) or 0),
+            fps=_number(fields.get('fps'), previous.fps) or 0.0,
+            bitrate=_number(fields.get('bitrate'), None),
+            total_size=int(_number(fields.get('total_size'), previous.total_size) or 0),
+            out_time=previous.out_time if out_time_us is None else out_time_us / 1e6,
+            dup_frames=int(_number(fields.get('dup_frames'), previous.dup_frames) or 0),
+            drop_frames=int(_number(fields.get('drop_frames'), previous.drop_frames) or 0),
+            speed=_number(fields.get('speed'), None),
+            finished=fields.get('progress') == 'end')
+
+    def feed(self, line: str) -> CaptureProgress | None:
+        """
+        Parse a line.
+
+        Parameters
+        ----------
+        line : str
+            A line of ffmpeg's ``-progress`` output.
+
+        Returns
+        -------
+        CaptureProgress | None
+            The report if the line ended a block, otherwise ``None``.
+        """
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return None
+        self._fields[key] = value.strip()
+        if key != 'progress':
+            return None
+        self.progress = self.parse(self._fields, self.progress)
+        self._fields = {}
+        return self.progress
+
+
+@dataclass(frozen=True)
+class ProgressThresholds:
+    """Limits a healthy capture stays within."""
+    min_speed: float = DEFAULT_MIN_SPEED
+    """Slowest encoding speed, relative to real time, that a capture can keep up with."""
+    slow_grace: float = DEFAULT_SLOW_GRACE
+    """Seconds the speed may stay below ``min_speed`` before the capture is falling behind."""
+    max_drop_frames: int = DEFAULT_MAX_DROP_FRAMES
+    """Dropped frames after which the capture is falling behind."""
+    alert_interval: float = DEFAULT_ALERT_INTERVAL
+    """Seconds between repeated alerts of the same kind."""
+
+
+class CaptureFellBehindError(Exception):
+    """Raised when a capture was stopped because it could not keep up."""
+
+
+class CaptureMonitor:
+    """
+    Watches the progress reports of a capture.
+
+    Every dropped or duplicated frame and any speed below the minimum is logged as a warning, at
+    most once per ``alert_interval`` for each kind. Once the speed has stayed below the minimum for
+    the grace period or more frames than allowed have been dropped, the capture is falling behind:
+    this is logged as an error, recorded in :py:attr:`fell_behind` and ``on_behind`` is called
+    once.
+    """
+    def __init__(self,
+                 thresholds: ProgressThresholds | None = None,
+                 *,
+                 on_behind: Callable[[], None] | None = None,
+                 on_update: Callable[[CaptureProgress], None] | None = None) -> None:
+        """
+        Initialise the monitor.
+
+        Parameters
+        ----------
+        thresholds : ProgressThresholds | None
+            Limits to check. Defaults to :py:class:`ProgressThresholds` defaults.
+        on_behind : Callable[[], None] | None
+            Called once when the capture starts falling behind, for example to stop it.
+        on_update : Callable[[CaptureProgress], None] | None
+            Called with every report, for example to export it.
+        """
+        self.thresholds = thresholds or ProgressThresholds()
+        """Limits to check."""
+        self.on_behind = on_behind
+        """Called once when the capture starts falling behind."""
+        self.on_update = on_update
+        """Called with every report."""
+        self.progress = CaptureProgress()
+        """The latest report."""
+        self.updates = 0
+        """Number of reports received."""
+        self.fell_behind: str | None = None
+        """Why the capture fell behind, or ``None`` if it has kept up."""
+        self._last_alerts: dict[str, float] = {}
+        self._slow_since: float | None = None
+
+    def _alert(self, kind: str, now: float, msg: str, *args: object) -> None:
+        if now - self._last_alerts.get(kind, -math.inf) >= self.thresholds.alert_interval:
+            self._last_alerts[kind] = now
+            log.warning(msg, *args)
+
+    def _behind(self, reason: str) -> None:
+        if self.fell_behind is not None:
+            return
+        self.fell_behind = reason
+        log.error('Capture is falling behind: %s', reason)
+        if self.on_behind:
+            self.on_behind()
+
+    def update(self, progress: CaptureProgress) -> None:
+        """
+        Check a report.
+
+        Parameters
+        ----------
+        progress : CaptureProgress
+            The report.
+        """
+        now = monotonic()
+        previous, self.progress = self.progress, progress
+        self.updates += 1
+        if self.on_update:
+            self.on_update(progress)
+        if (dropped := progress.drop_frames - previous.drop_frames) > 0:
+            self._alert('drop', now, 'ffmpeg dropped %d frames (%d in total).', dropped,
+                        progress.drop_frames)
+        if (duplicated := progress.dup_frames - previous.dup_frames) > 0:
+            self._alert('dup', now, 'ffmpeg duplicated %d frames (%d in total).', duplicated,
+                        progress.dup_frames)
+        if progress.speed is not None and progress.speed < self.thresholds.min_speed:
+            if self._slow_since is None:
+                self._slow_since = now
+            self._alert('speed', now, 'ffmpeg is running at %.3fx, below %.3fx.', progress.speed,
+                        self.thresholds.min_speed)
+            if now - self._slow_since >= self.thresholds.slow_grace:
+                self._behind(f'speed has been below {self.thresholds.min_speed:.3f}x for '
+                             f'{now - self._slow_since:.0f} seconds.')
+        else:
+            self._slow_since = None
+        if progress.drop_frames > self.thresholds.max_drop_frames:
+            self._behind(f'{progress.drop_frames} frames dropped.')
+
+    async def run(self, stream: AsyncIterable[bytes]) -> None:
+        """
+        Check every report read from ffmpeg until the stream ends.
+
+        Parameters
+        ----------
+        stream : AsyncIterable[bytes]
+            ffmpeg's standard output, such as :py:attr:`asyncio.subprocess.Process.stdout`.
+        """
+        parser = ProgressParser()
+        async for line in stream:
+            if (progress := parser.feed(line.decode(errors='replace'))) is not None:
+                self.update(progress)
+        if self.updates:
+            progress = self.progress
+            log.debug('ffmpeg wrote %d frames (%d dropped, %d duplicated), %.1f s, %d bytes.',
+                      progress.frame, progress.drop_frames, progress.dup_frames, progress.out_time,
+                      progress.total_size)
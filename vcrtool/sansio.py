@@ -4,7 +4,8 @@ Sans-I/O protocol layer for the devices this package controls.
 The classes here contain pure framing logic and perform no input or output. :py:class:`SIRCSCodec`
 turns a :py:class:`SIRCSCommand` into a tuple of :py:class:`Pulse` intervals (the modulated carrier
 "marks" and silent "spaces" of an infrared frame) and reverses the process, while
-:py:class:`JLIPCodec` builds JLIP request frames and validates response frames. The transport
+:py:class:`JLIPCodec` builds JLIP request frames and validates response frames, with
+:py:class:`JLIPResponseFramer` reassembling responses from the raw byte stream. The transport
 classes in :py:mod:`vcrtool.sircs` and :py:mod:`vcrtool.jlip` drive the actual hardware using the
 bytes and pulses produced here, which keeps the protocol logic trivially testable without devices
 or real-time sleeping.
@@ -17,12 +18,15 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, NamedTuple
 import enum
+import importlib
 
 from .utils import pad_right
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Sequence
 
+    from typing_extensions import Buffer
+
 __all__ = (
     'CARRIER_FREQUENCY_HZ',
     'FRAME_DURATION_US',
@@ -32,7 +36,9 @@ __all__ = (
     'UNIT_US',
     'ZERO_MARK_US',
     'CommandStatus',
+    'FrameChecks',
     'JLIPCodec',
+    'JLIPResponseFramer',
     'Pulse',
     'SIRCSCodec',
     'SIRCSCommand',
@@ -80,6 +86,13 @@ _TOLERANCE = 0.3
 """Fractional tolerance applied when matching a received mark against its nominal duration."""
 _JLIP_FRAME_LENGTH = 10
 """Number of payload bytes a JLIP frame is checksummed over."""
+_JLIP_HEADER = b'\xff\xff'
+"""Two-byte header that begins every JLIP frame."""
+_JLIP_RESPONSE_LENGTH = 11
+"""Total length of a JLIP response frame, including its trailing checksum."""
+_LOW_7_BITS = bytes(b & 0x7F for b in range(256))
+_LOW_4_BITS = bytes(b & 0xF for b in range(256))
+_LOW_3_BITS = bytes(b & 0b111 for b in range(256))
 
 
 class Pulse(NamedTuple):
@@ -172,6 +185,20 @@ class CommandStatus(enum.IntEnum):
     """Command not possible."""
 
 
+class FrameChecks(NamedTuple):
+    """
+    Per-frame results of :py:meth:`JLIPCodec.validate_frames`.
+
+    Each field has one entry per frame. They are NumPy arrays when NumPy was used.
+    """
+    valid: Sequence[bool]
+    """Whether the frame starts with the ``FF FF`` header and its checksum matches."""
+    status: Sequence[int]
+    """Command status code. See :py:class:`CommandStatus`."""
+    vtr_mode: Sequence[int]
+    """VTR mode code. Only meaningful for responses to ``get_vtr_mode``."""
+
+
 def checksum(vals: Sequence[int]) -> int:
     """
     Compute the checksum for a JLIP frame.
@@ -351,7 +378,7 @@ class JLIPCodec:
             If the checksum does not match or, when ``raise_on_error`` is ``True``, the command
             status is not accepted.
         """
-        if data[10] != (actual := checksum(list(data)[:_JLIP_FRAME_LENGTH])):
+        if data[10] != (actual := checksum(data)):
             msg = f'Checksum did not match. Expected {actual} but received {data[10]}.'
             raise ValueError(msg)
         status = data[3] & 0b111
@@ -361,3 +388,122 @@ class JLIPCodec:
             msg = f'Command status: {CommandStatus(status)!s}'
             raise ValueError(msg)
         return data
+
+    @staticmethod
+    def validate_frames(data: Buffer, *, use_numpy: bool | None = None) -> FrameChecks:
+        """
+        Check many back-to-back JLIP frames at once.
+
+        ``data`` can be any buffer, including a capture file mapped with :py:mod:`mmap`. With NumPy,
+        the buffer is viewed as an array without copying and every checksum is computed in one
+        vectorised pass. Without it, the masks are applied to the whole buffer with
+        :py:meth:`bytes.translate` and only the sums are done per frame. Unlike
+        :py:meth:`validate_response`, this never raises for a bad frame or an unaccepted status.
+
+        Parameters
+        ----------
+        data : Buffer
+            Frames of eleven bytes each, with nothing in between.
+        use_numpy : bool | None
+            Use NumPy. Defaults to using it if it is installed.
+
+        Returns
+        -------
+        FrameChecks
+            Validity, command status and VTR mode of each frame.
+
+        Raises
+        ------
+        ImportError
+            If ``use_numpy`` is ``True`` and NumPy is not installed.
+        ValueError
+            If the length of ``data`` is not a multiple of eleven.
+        """
+        view = memoryview(data).cast('B')
+        if len(view) % _JLIP_RESPONSE_LENGTH:
+            msg = f'{len(view)} bytes is not a whole number of {_JLIP_RESPONSE_LENGTH}-byte frames.'
+            raise ValueError(msg)
+        if use_numpy is not False:
+            try:
+                np = importlib.import_module('numpy')
+            except ImportError:
+                if use_numpy:
+                    raise
+            else:
+                frames = np.frombuffer(view, dtype=np.uint8).reshape(-1, _JLIP_RESPONSE_LENGTH)
+                expected = (0x80 - (frames[:, :_JLIP_FRAME_LENGTH] & 0x7F).sum(axis=1)) & 0x7F
+                header = (frames[:, :2] == np.frombuffer(_JLIP_HEADER, dtype=np.uint8)).all(axis=1)
+                return FrameChecks(header & (frames[:, _JLIP_FRAME_LENGTH] == expected),
+                                   frames[:, 3] & 0b111, frames[:, 4] & 0xF)
+        raw = bytes(view)
+        masked = raw.translate(_LOW_7_BITS)
+        valid = [
+            raw.startswith(_JLIP_HEADER, i)
+            and raw[i + _JLIP_FRAME_LENGTH] == (0x80 - sum(masked[i:i + _JLIP_FRAME_LENGTH])) & 0x7F
+            for i in range(0, len(raw), _JLIP_RESPONSE_LENGTH)
+        ]
+        return FrameChecks(valid, raw[3::_JLIP_RESPONSE_LENGTH].translate(_LOW_3_BITS),
+                           raw[4::_JLIP_RESPONSE_LENGTH].translate(_LOW_4_BITS))
+
+
+class JLIPResponseFramer:
+    """
+    Sans-I/O reassembler for JLIP response frames arriving from a byte stream.
+
+    Bytes are fed in as they are read from the line. Anything before a ``FF FF`` header is discarded
+    so a stray byte left over from an earlier exchange cannot shift the frame boundaries. A frame is
+    returned as soon as eleven bytes starting at a header are buffered. If its checksum does not
+    match and another header starts inside it, the first header was most likely a stray ``0xFF``
+    followed by the real one, so the framer resynchronises on the later header. Otherwise the frame
+    is returned as is and the checksum and status checks are left to
+    :py:meth:`JLIPCodec.validate_response`.
+    """
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    @property
+    def needed(self) -> int:
+        """
+        Number of bytes still required to complete the frame being assembled.
+
+        Returns
+        -------
+        int
+        """
+        return max(1, _JLIP_RESPONSE_LENGTH - len(self._buffer))
+
+    def feed(self, data: bytes) -> None:
+        """
+        Append bytes received from the line.
+
+        Parameters
+        ----------
+        data : bytes
+            The received bytes. May be empty.
+        """
+        self._buffer += data
+
+    def next_frame(self) -> bytes | None:
+        """
+        Pop the next complete frame from the buffer.
+
+        Returns
+        -------
+        bytes | None
+            The eleven-byte frame, or ``None`` if more bytes are needed.
+        """
+        while True:
+            if (start := self._buffer.find(_JLIP_HEADER)) < 0:
+                # Keep a trailing 0xFF as it may be the first half of a header.
+                del self._buffer[:-1 if self._buffer.endswith(_JLIP_HEADER[:1]) else None]
+                return None
+            del self._buffer[:start]
+            if len(self._buffer) < _JLIP_RESPONSE_LENGTH:
+                return None
+            frame = bytes(self._buffer[:_JLIP_RESPONSE_LENGTH])
+            if (frame[_JLIP_FRAME_LENGTH] != checksum(frame)
+                    and 0 < self._buffer.find(_JLIP_HEADER, 1) < _JLIP_RESPONSE_LENGTH):
+                del self._buffer[:1]
+                continue
+            del self._buffer[:_JLIP_RESPONSE_LENGTH]
+            return frame
@@ -0,0 +1,235 @@
+"""Scripts of JLIP commands, waits and conditions run by ``jlip --script``."""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any
+import operator
+import shlex
+
+from typing_extensions import override
+
+from .jlip import JLIPCommands, VTRMode, VTRModeResponse
+from .main import VALID_COMMANDS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+__all__ = ('UNTIL_POLL_INTERVAL', 'Command', 'ScriptError', 'Step', 'Until', 'Wait', 'parse_script',
+           'run_script')
+
+UNTIL_POLL_INTERVAL = 0.5
+"""Seconds between ``get-vtr-mode`` requests while an ``until`` condition does not hold."""
+_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+_UNTIL_FIELDS = frozenset(f.name for f in fields(VTRModeResponse))
+
+
+class ScriptError(Exception):
+    """Raised when a script line cannot be parsed or a step fails."""
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f'Line {line}: {message}')
+        self.line = line
+        """Line number of the step, starting at 1."""
+
+
+@dataclass(frozen=True)
+class Command:
+    """Run a ``jlip`` command."""
+    line: int
+    """Line number in the script."""
+    name: str
+    """Command name as given to ``jlip``, such as ``set-input``."""
+    args: tuple[int, ...] = ()
+    """Integer arguments."""
+
+
+@dataclass(frozen=True)
+class Wait:
+    """Sleep for a number of seconds."""
+    line: int
+    """Line number in the script."""
+    seconds: float
+    """Seconds to sleep."""
+
+
+@dataclass(frozen=True)
+class Until:
+    """Poll ``get-vtr-mode`` until one of its fields compares true against a value."""
+    line: int
+    """Line number in the script."""
+    field: str
+    """Field of :py:class:`vcrtool.jlip.VTRModeResponse` to compare."""
+    op: str
+    """Comparison operator, such as ``==``."""
+    value: int
+    """Value to compare against. VTR mode names and ``true``/``false`` are converted to integers."""
+    timeout: float | None = None
+    """Seconds to wait before failing, or ``None`` to wait forever."""
+    def holds(self, state: dict[str, Any]) -> bool:
+        """
+        Check the condition against a ``get-vtr-mode`` result.
+
+        Parameters
+        ----------
+        state : dict[str, Any]
+            The result as returned by :py:func:`vcrtool.jlip.to_jsonable`.
+
+        Returns
+        -------
+        bool
+            Whether the condition holds.
+        """
+        return _OPERATORS[self.op](state[self.field], self.value)
+
+    @override
+    def __str__(self) -> str:
+        return f'{self.field} {self.op} {self.value}'
+
+
+Step = Command | Wait | Until
+"""A single parsed script line."""
+
+
+def _parse_value(word: str) -> int:
+    if word.upper() in VTRMode.__members__:
+        return VTRMode[word.upper()].value
+    if word.lower() in {'true', 'false'}:
+        return int(word.lower() == 'true')
+    return int(word, 0)
+
+
+def _argument_count(keyword: str) -> int | None:
+    if (declared := JLIPCommands.commands().get(keyword.replace('-', '_'))) is not None:
+        return len(declared.parameters)
+    # `send-command` takes any number of command bytes; the other extra commands take none.
+    return None if keyword == 'send-command' else 0
+
+
+def _parse_line(line: int, words: list[str]) -> Step:
+    keyword, *rest = words
+    if keyword == 'wait':
+        match rest:
+            case [seconds]:
+                return Wait(line, float(seconds))
+            case _:
+                msg = 'Expected `wait SECONDS`.'
+                raise ValueError(msg)
+    if keyword == 'until':
+        match rest:
+            case [field, op, value]:
+                timeout = None
+            case [field, op, value, 'timeout', seconds]:
+                timeout = float(seconds)
+            case _:
+                msg = 'Expected `until FIELD OP VALUE [timeout SECONDS]`.'
+                raise ValueError(msg)
+        if field not in _UNTIL_FIELDS:
+            msg = f'Unknown field `{field}`.'
+            raise ValueError(msg)
+        if op not in _OPERATORS:
+            msg = f'Unknown operator `{op}`.'
+            raise ValueError(msg)
+        return Until(line, field, op, _parse_value(value), timeout)
+    if keyword not in VALID_COMMANDS:
+        msg = f'Invalid command `{keyword}`.'
+        raise ValueError(msg)
+    if (expected := _argument_count(keyword)) is not None and len(rest) != expected:
+        msg = f'`{keyword}` takes {expected} arguments but {len(rest)} were given.'
+        raise ValueError(msg)
+    return Command(line, keyword, tuple(int(x, 0) for x in rest))
+
+
+def parse_script(lines: Iterable[str]) -> list[Step]:
+    """
+    Parse a script.
+
+    Each line holds one step. Blank lines and text after ``#`` are ignored.
+
+    - ``COMMAND [ARG ...]`` runs a ``jlip`` command with integer arguments.
+    - ``wait SECONDS`` sleeps.
+    - ``until FIELD OP VALUE [timeout SECONDS]`` polls ``get-vtr-mode`` until the condition holds,
+      for example ``until vtr_mode == STOP timeout 600``. ``OP`` is one of ``==``, ``!=``, ``<``,
+      ``<=``, ``>`` and ``>=``. ``VALUE`` is an integer, ``true``, ``false`` or a
+      :py:class:`vcrtool.jlip.VTRMode` name.
+
+    The whole script is parsed before anything runs, so a typo does not leave the deck half way
+    through a routine.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Lines of the script.
+
+    Returns
+    -------
+    list[Step]
+        The parsed steps.
+
+    Raises
+    ------
+    ScriptError
+        If a line is invalid.
+    """
+    steps: list[Step] = []
+    for line, text in enumerate(lines, 1):
+        try:
+            if not (words := shlex.split(text, comments=True)):
+                continue
+            steps.append(_parse_line(line, words))
+        except ValueError as e:
+            raise ScriptError(line, str(e)) from e
+    return steps
+
+
+def run_script(steps: Iterable[Step],
+               call: Callable[..., Any],
+               poll_interval: float = UNTIL_POLL_INTERVAL) -> Iterator[dict[str, Any]]:
+    """
+    Run parsed steps in order, yielding one record per step as it completes.
+
+    Parameters
+    ----------
+    steps : Iterable[Step]
+        Steps from :py:func:`parse_script`.
+    call : Callable[..., Any]
+        Runs a command given its ``jlip`` name and integer arguments and returns the result in the
+        form returned by :py:func:`vcrtool.jlip.to_jsonable`.
+    poll_interval : float
+        Seconds between polls while waiting for an ``until`` condition.
+
+    Yields
+    ------
+    dict[str, Any]
+        A JSON-compatible record with the step's line number and its result.
+
+    Raises
+    ------
+    ScriptError
+        If an ``until`` condition times out.
+    """
+    for step in steps:
+        if isinstance(step, Wait):
+            sleep(step.seconds)
+            yield {'line': step.line, 'wait': step.seconds}
+        elif isinstance(step, Until):
+            deadline = None if step.timeout is None else monotonic() + step.timeout
+            while not step.holds(state := call('get-vtr-mode')):
+                if deadline is not None and monotonic() >= deadline:
+                    msg = f'Timed out waiting for `{step}`.'
+                    raise ScriptError(step.line, msg)
+                sleep(poll_interval)
+            yield {'line': step.line, 'until': str(step), 'result': state}
+        else:
+            yield {
+                'line': step.line,
+                'command': step.name,
+                'args': list(step.args),
+                'result': call(step.name, *step.args)
+            }
@@ -0,0 +1,371 @@
+"""
+Segmented capture output that survives a crash.
+
+A segmented capture is written by ffmpeg's segment muxer as a series of short files in a
+``.segments`` directory next to the output instead of one file. ffmpeg adds every segment to a CSV
+index once the segment is complete, so after a crash every listed segment is intact and only the
+one being written is lost. Each ffmpeg process is a run with its own index. Once playback is seen,
+the tape counter relative to ffmpeg's output time is saved for the run, which maps every segment to
+a position on the tape. A failed capture is resumed by winding the tape back to the end of the last
+complete segment and starting a new run. When the capture is done, the runs are joined into the
+output and the tape the runs recorded twice is cut from the later run.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+import asyncio.subprocess as asp
+import csv
+import json
+import logging
+import re
+import shutil
+
+import anyio
+import anyio.to_thread
+
+from .utils import adebug_create_subprocess_exec
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    import os
+
+__all__ = ('DEFAULT_SEGMENT_LENGTH', 'CaptureRun', 'Segment', 'SegmentError', 'SegmentedOutput')
+
+DEFAULT_SEGMENT_LENGTH = 300.0
+"""Seconds of video in each segment."""
+
+log = logging.getLogger(__name__)
+
+_SEGMENT_RE = re.compile(r'^segment-(\d+)\.')
+
+
+class SegmentError(Exception):
+    """Raised when segments cannot be read or joined."""
+
+
+@dataclass
+class CaptureRun:
+    """One ffmpeg process writing segments."""
+    index: int
+    """Number of the run, from 0."""
+    first_segment: int
+    """Number of the first segment the run writes."""
+    offset: float | None = None
+    """Tape counter in seconds minus ffmpeg's output time, or ``None`` until playback was seen."""
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A complete segment and where it is on the tape."""
+    path: Path
+    """The segment file."""
+    run: int
+    """Number of the run that wrote it."""
+    start: float
+    """Tape counter in seconds at the start of the segment."""
+    end: float
+    """Tape counter in seconds at the end of the segment."""
+
+
+class SegmentedOutput:
+    """The segments, indexes and runs of one segmented capture."""
+    def __init__(self,
+                 output: str | os.PathLike[str],
+                 segment_length: float = DEFAULT_SEGMENT_LENGTH) -> None:
+        """
+        Open a segmented output. Runs saved by an earlier capture of the same output are loaded.
+
+        Parameters
+        ----------
+        output : str | os.PathLike[str]
+            File the segments are joined into.
+        segment_length : float
+            Seconds of video in each segment.
+        """
+        self.output = Path(output)
+        """File the segments are joined into."""
+        self.segment_length = segment_length
+        """Seconds of video in each segment."""
+        self.directory = self.output.with_name(f'{self.output.name}.segments')
+        """Directory holding the segments."""
+        self.runs = self._load_runs()
+        """Runs so far, in order."""
+
+    @property
+    def runs_path(self) -> Path:
+        """File the runs are saved to."""
+        return self.directory / 'runs.json'
+
+    def _load_runs(self) -> list[CaptureRun]:
+        """
+        Load the saved runs.
+
+        Returns
+        -------
+        list[CaptureRun]
+            The runs, or an empty list if none were saved.
+
+        Raises
+        ------
+        SegmentError
+            If the file is not valid.
+        """
+        try:
+            data = json.loads(self.runs_path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return []
+        except ValueError as e:
+            msg = f'`{self.runs_path}` is not valid JSON.'
+            raise SegmentError(msg) from e
+        try:
+            return [CaptureRun(**run) for run in data]
+        except TypeError as e:
+            msg = f'`{self.runs_path}` does not list runs.'
+            raise SegmentError(msg) from e
+
+    def _save_runs(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial_path = self.runs_path.with_name(f'{self.runs_path.name}.part')
+        partial_path.write_text(json.dumps([asdict(run) for run in self.runs], indent=2),
+                                encoding='utf-8')
+        partial_path.replace(self.runs_path)
+
+    def index_path(self, run: CaptureRun) -> Path:
+        """
+        Get the path of a run's segment index.
+
+        Parameters
+        ----------
+        run : CaptureRun
+            The run.
+
+        Returns
+        -------
+        Path
+            The CSV file ffmpeg lists the run's complete segments in.
+        """
+        return self.directory / f'run-{run.index:03d}.csv'
+
+    def vbi_path(self, run: CaptureRun) -> Path:
+        """
+        Get the path of a run's VBI data.
+
+        Parameters
+        ----------
+        run : CaptureRun
+            The run.
+
+        Returns
+        -------
+        Path
+            The file zvbi2raw writes during the run.
+        """
+        return self.directory / f'run-{run.index:03d}.vbi'
+
+    def start_run(self) -> CaptureRun:
+        """
+        Start a new run and save it.
+
+        Its segments are numbered after every segment file already in the directory, including
+        incomplete ones, so nothing is overwritten.
+
+        Returns
+        -------
+        CaptureRun
+            The run.
+        """
+        existing = (int(match[1]) for path in self.directory.glob('segment-*')
+                    if (match := _SEGMENT_RE.match(path.name)))
+        run = CaptureRun(len(self.runs), max(existing, default=-1) + 1)
+        self.runs.append(run)
+        self._save_runs()
+        return run
+
+    def ffmpeg_args(self, run: CaptureRun) -> tuple[str, ...]:
+        """
+        Get the ffmpeg output arguments that write a run's segments.
+
+        Parameters
+        ----------
+        run : CaptureRun
+            The run.
+
+        Returns
+        -------
+        tuple[str, ...]
+            Arguments to use in place of the output file.
+        """
+        return ('-f', 'segment', '-segment_time', f'{self.segment_length:.3f}',
+                '-segment_start_number', str(run.first_segment), '-segment_list',
+                str(self.index_path(run)), '-segment_list_type', 'csv', '-reset_timestamps', '1',
+                str(self.directory / f'segment-%05d{self.output.suffix}'))
+
+    def anchor(self, run: CaptureRun, out_time: float, counter: float) -> None:
+        """
+        Map a run to the tape from the counter at a point in ffmpeg's output.
+
+        Only the first call for a run has an effect.
+
+        Parameters
+        ----------
+        run : CaptureRun
+            The run.
+        out_time : float
+            Seconds of output ffmpeg has written.
+        counter : float
+            Tape counter in seconds at the same moment.
+        """
+        if run.offset is not None:
+            return
+        run.offset = counter - out_time
+        log.debug('Run %d starts at tape position %.3f seconds.', run.index, run.offset)
+        self._save_runs()
+
+    def _read_index(self, run: CaptureRun, offset: float) -> list[Segment]:
+        try:
+            with self.index_path(run).open(encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f))
+        except FileNotFoundError:
+            return []
+        segments = []
+        for row in rows:
+            try:
+                name, start, end = row
+                segment = Segment(self.directory / name, run.index,
+                                  float(start) + offset,
+                                  float(end) + offset)
+            except ValueError:
+                log.warning('Ignoring invalid line in `%s`: %s', self.index_path(run), row)
+                continue
+            if segment.path.exists():
+                segments.append(segment)
+        return segments
+
+    def segments(self) -> list[Segment]:
+        """
+        Get the complete segments of every run that was mapped to the tape.
+
+        Returns
+        -------
+        list[Segment]
+            The segments in the order they were written.
+        """
+        return [
+            segment for run in self.runs if run.offset is not None
+            for segment in self._read_index(run, run.offset)
+        ]
+
+    def resume_position(self) -> float | None:
+        """
+        Get the tape position to resume from.
+
+        Returns
+        -------
+        float | None
+            Tape counter in seconds at the end of the last complete segment, or ``None`` if there
+            is none.
+        """
+        return max((segment.end for segment in self.segments()), default=None)
+
+    def clear(self) -> None:
+        """Delete every segment and run."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.runs = []
+
+    @staticmethod
+    def concat_list(segments: Iterable[Segment]) -> str:
+        """
+        Build the concat demuxer list that joins segments.
+
+        Where a run starts before the end of the tape already recorded, its start is cut with an
+        ``inpoint``. Segments entirely before that point are left out. Stream copy can only cut at
+        a key frame, so the cut is frame accurate for intra-only encoders and approximate
+        otherwise.
+
+        Parameters
+        ----------
+        segments : Iterable[Segment]
+            Segments in the order they were written.
+
+        Returns
+        -------
+        str
+            The list. Paths are relative to the segment directory.
+        """
+        lines = []
+        covered: float | None = None
+        previous_run = None
+        for segment in segments:
+            inpoint = 0.0
+            if covered is not None and segment.run != previous_run:
+                if segment.end <= covered:
+                    continue
+                inpoint = covered - segment.start
+            lines.append(f"file '{segment.path.name}'")
+            if inpoint > 0:
+                lines.append(f'inpoint {inpoint:.3f}')
+            covered, previous_run = segment.end, segment.run
+        return ''.join(f'{line}\n' for line in lines)
+
+    def _join_vbi(self, vbi: Path) -> None:
+        with vbi.open('wb') as out:
+            for run in self.runs:
+                if (path := self.vbi_path(run)).exists():
+                    with path.open('rb') as f:
+                        shutil.copyfileobj(f, out)
+
+    async def join(self, *, vbi: str | os.PathLike[str] | None = None) -> None:
+        """
+        Join the complete segments into the output and delete the segment directory.
+
+        If joining fails the segments are kept.
+
+        Parameters
+        ----------
+        vbi : str | os.PathLike[str] | None
+            Also concatenate the VBI data of the runs into this file. VBI data is not cut where
+            runs overlap.
+
+        Raises
+        ------
+        SegmentError
+            If there are no complete segments or ffmpeg fails.
+        """
+        segments = await anyio.to_thread.run_sync(self.segments)
+        if not segments:
+            msg = f'No complete segments in `{self.directory}`.'
+            raise SegmentError(msg)
+        log.info('Joining %d segments into `%s`.', len(segments), self.output)
+        concat_list = anyio.Path(self.directory / 'concat.txt')
+        await concat_list.write_text(self.concat_list(segments), encoding='utf-8')
+        proc = await adebug_create_subprocess_exec('ffmpeg',
+                                                   '-hide_banner',
+                                                   '-loglevel',
+                                                   'error',
+                                                   '-y',
+                                                   '-f',
+                                                   'concat',
+                                                   '-safe',
+                                                   '0',
+                                                   '-i',
+                                                   str(concat_list),
+                                                   '-map',
+                                                   '0',
+                                                   '-c',
+                                                   'copy',
+                                                   str(self.output),
+                                                   stdin=asp.DEVNULL,
+                                                   stdout=asp.DEVNULL,
+                                                   stderr=asp.PIPE)
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            msg = (f'Joining segments failed with code {proc.returncode}: '
+                   f'{stderr.decode(errors="replace").strip()}')
+            raise SegmentError(msg)
+        if vbi is not None:
+            await anyio.to_thread.run_sync(self._join_vbi, Path(vbi))
+        await anyio.to_thread.run_sync(partial(shutil.rmtree, self.directory, ignore_errors=True))
+        self.runs = []
@@ -0,0 +1,344 @@
+"""Simulated JLIP deck that answers on a pseudo-terminal."""
+from __future__ import annotations
+
+from time import monotonic, sleep
+from typing import TYPE_CHECKING
+import contextlib
+import logging
+import os
+import random
+import select
+import threading
+import tty
+
+import click
+
+from .jlip import NTSC_FRAMERATE, JLIPCommands, VTRMode
+from .sansio import CommandStatus, JLIPCodec, JLIPResponseFramer
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+__all__ = ('DEFAULT_TAPE_LENGTH', 'SPEEDS', 'DeckSimulator', 'PtySimulator', 'main')
+
+DEFAULT_TAPE_LENGTH = 7200.0
+"""Default tape length in seconds."""
+SPEEDS = {
+    'eject': (VTRMode.EJECT, 0.0),
+    'fast_forward': (VTRMode.FF, 40.0),
+    'fast_play_backward': (VTRMode.PLAY_BWD, -5.0),
+    'fast_play_forward': (VTRMode.PLAY_FWD, 5.0),
+    'pause': (VTRMode.PAUSE, 0.0),
+    'pause_recording': (VTRMode.REC_PAUSE, 0.0),
+    'play': (VTRMode.PLAY_FWD, 1.0),
+    'record': (VTRMode.REC, 1.0),
+    'rewind': (VTRMode.REW, -40.0),
+    'slow_play_backward': (VTRMode.PLAY_BWD, -0.2),
+    'slow_play_forward': (VTRMode.PLAY_FWD, 0.2),
+    'stop': (VTRMode.STOP, 0.0),
+}
+"""Mode the deck enters for each transport command and how fast the tape then moves, in seconds of
+tape per second."""
+
+log = logging.getLogger(__name__)
+
+
+def _matches(opcode: tuple[int | str, ...], frame: bytes) -> bool:
+    return all(isinstance(x, str) or frame[3 + i] == x for i, x in enumerate(opcode))
+
+
+class DeckSimulator:
+    """
+    Sans-I/O model of an HR-S9600U-like deck.
+
+    :py:meth:`handle` takes a request frame and returns the response frame. Transport commands
+    move the deck between modes and the tape counter runs in real time at the speed listed in
+    :py:data:`SPEEDS`; rewinding or fast forwarding stops at either end of the tape. Commands the
+    model does not track are accepted without side effects.
+
+    Faults can be injected for stress tests: ``drop_rate`` is the chance a request gets no answer,
+    ``corrupt_rate`` the chance the answer has a bad checksum and ``reject_rate`` the chance the
+    deck answers that the command is not possible.
+    """
+    def __init__(self,
+                 jlip_id: int = 1,
+                 *,
+                 name: str = 'HR-S96',
+                 tape_length: float = DEFAULT_TAPE_LENGTH,
+                 drop_rate: float = 0,
+                 corrupt_rate: float = 0,
+                 reject_rate: float = 0,
+                 seed: int | None = None,
+                 clock: Callable[[], float] = monotonic) -> None:
+        """
+        Initialise the deck, switched on with a rewound tape inserted.
+
+        Parameters
+        ----------
+        jlip_id : int
+            JLIP ID the deck answers to.
+        name : str
+            Device name, up to six characters.
+        tape_length : float
+            Tape length in seconds.
+        drop_rate : float
+            Probability that a request is not answered.
+        corrupt_rate : float
+            Probability that a response has a bad checksum.
+        reject_rate : float
+            Probability that a request is answered with
+            :py:attr:`~vcrtool.sansio.CommandStatus.COMMAND_NOT_POSSIBLE`.
+        seed : int | None
+            Seed for the fault injection.
+        clock : Callable[[], float]
+            Monotonic clock in seconds.
+        """
+        self.jlip_id = jlip_id
+        """JLIP ID the deck answers to."""
+        self.name = name
+        """Device name."""
+        self.tape_length = tape_length
+        """Tape length in seconds."""
+        self.drop_rate = drop_rate
+        """Probability that a request is not answered."""
+        self.corrupt_rate = corrupt_rate
+        """Probability that a response has a bad checksum."""
+        self.reject_rate = reject_rate
+        """Probability that a request is rejected."""
+        self.clock = clock
+        """Monotonic clock in seconds."""
+        self.is_on = True
+        """Power state."""
+        self.tape_inserted = True
+        """Whether a tape is in the deck."""
+        self.mode = VTRMode.STOP
+        """Current VTR mode."""
+        self.requests = 0
+        """Number of valid requests addressed to this deck."""
+        self._random = random.Random(seed)  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+        self._position = 0.0
+        self._counter_origin = 0.0
+        self._speed = 0.0
+        self._since = clock()
+        self._commands = tuple(JLIPCommands.commands().items())
+
+    @property
+    def position(self) -> float:
+        """Tape position in seconds from the start of the tape."""
+        self._settle()
+        return self._position
+
+    def insert_tape(self, position: float = 0) -> None:
+        """
+        Insert a tape.
+
+        Parameters
+        ----------
+        position : float
+            Tape position in seconds.
+        """
+        self._settle()
+        self.tape_inserted = True
+        self._position = self._counter_origin = position
+        self._set_mode(VTRMode.STOP, 0)
+
+    def _set_mode(self, mode: VTRMode, speed: float) -> None:
+        self._settle()
+        self.mode = mode
+        self._speed = speed
+
+    def _settle(self) -> None:
+        now = self.clock()
+        position = self._position + self._speed * (now - self._since)
+        self._since = now
+        if not 0 <= position <= self.tape_length:
+            position = min(max(position, 0), self.tape_length)
+            self.mode, self._speed = VTRMode.STOP, 0
+        self._position = position
+
+    def _vtr_mode(self) -> tuple[int, ...]:
+        self._settle()
+        counter = abs(self._position - self._counter_origin)
+        seconds = int(counter)
+        return (self.mode | (0 if self.tape_inserted else 0x10), 0, seconds // 3600,
+                seconds // 60 % 60, seconds % 60, int(counter % 1 * NTSC_FRAMERATE))
+
+    def _command_name(self, frame: bytes) -> str | None:
+        return next((name for name, command in self._commands if _matches(command.opcode, frame)),
+                    None)
+
+    def _run(self, name: str, frame: bytes) -> tuple[CommandStatus, tuple[int, ...]]:
+        if name in SPEEDS:
+            if not (self.is_on and self.tape_inserted):
+                return CommandStatus.COMMAND_NOT_POSSIBLE, ()
+            mode, speed = SPEEDS[name]
+            self._set_mode(mode, speed)
+            if name == 'eject':
+                self.tape_inserted = False
+        elif name == 'get_vtr_mode':
+            return CommandStatus.COMMAND_ACCEPTED, self._vtr_mode()
+        elif name == 'get_power_state':
+            return CommandStatus.COMMAND_ACCEPTED, (int(self.is_on),)
+        elif name == 'get_device_name':
+            return CommandStatus.COMMAND_ACCEPTED, tuple(self.name[:6].encode('latin-1'))
+        elif name in {'turn_on', 'turn_off'}:
+            self._set_mode(VTRMode.STOP, 0)
+            self.is_on = name == 'turn_on'
+        elif name == 'reset_counter':
+            self._counter_origin = self.position
+        elif name == 'set_jlip_id':
+            self.jlip_id = frame[5]
+        return CommandStatus.COMMAND_ACCEPTED, ()
+
+    def handle(self, frame: bytes) -> bytes | None:
+        """
+        Answer a request frame.
+
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
+
+        Returns
+        -------
+        bytes | None
+            The response frame, or ``None`` if the frame is invalid, addressed to another deck or
+            dropped on purpose.
+        """
+        try:
+            JLIPCodec.validate_response(frame, raise_on_error=False)
+        except ValueError:
+            log.debug('Ignoring a frame with a bad checksum.')
+            return None
+        if frame[2] != self.jlip_id:
+            return None
+        self.requests += 1
+        jlip_id = self.jlip_id
+        if self._random.random() < self.drop_rate:
+            return None
+        data: tuple[int, ...] = ()
+        if self._random.random() < self.reject_rate:
+            status = CommandStatus.COMMAND_NOT_POSSIBLE
+        elif (name := self._command_name(frame)) is None:
+            status = CommandStatus.COMMAND_NOT_IMPLEMENTED
+        else:
+            status, data = self._run(name, frame)
+        response = JLIPCodec.build_command(jlip_id, status, *data)
+        if self._random.random() < self.corrupt_rate:
+            response = response[:-1] + bytes(((response[-1] + 1) % 256,))
+        return response
+
+
+class PtySimulator:
+    """
+    Serve a :py:class:`DeckSimulator` on a pseudo-terminal from a background thread.
+
+    Open :py:attr:`path` with :py:class:`vcrtool.jlip.AsyncJLIPTransport` as if it were the deck's
+    serial port. Answers are delayed by ``latency`` seconds.
+
+    Pseudo-terminals do not support parity. Linux drops the odd parity flag when the port is opened
+    and may then refuse to reconfigure it, which :py:class:`vcrtool.jlip.JLIPTransport` does to
+    apply each read timeout. The asyncio transport configures the port once and is unaffected.
+    """
+    def __init__(self, deck: DeckSimulator | None = None, *, latency: float = 0) -> None:
+        """
+        Open the pseudo-terminal.
+
+        Parameters
+        ----------
+        deck : DeckSimulator | None
+            Deck to serve. Defaults to a new :py:class:`DeckSimulator`.
+        latency : float
+            Seconds to wait before each answer.
+        """
+        self.deck = deck or DeckSimulator()
+        """Simulated deck."""
+        self.latency = latency
+        """Seconds to wait before each answer."""
+        self._controller, self._device = os.openpty()
+        tty.setraw(self._controller)
+        self.path = os.ttyname(self._device)
+        """Path of the pseudo-terminal to open as the serial port."""
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name='jlip-simulator', daemon=True)
+
+    def _serve(self) -> None:
+        framer = JLIPResponseFramer()
+        poller = select.poll()
+        poller.register(self._controller, select.POLLIN)
+        while not self._stopping.is_set():
+            if not poller.poll(50):
+                continue
+            try:
+                framer.feed(os.read(self._controller, 64))
+            except OSError:
+                return
+            while (frame := framer.next_frame()) is not None:
+                if (response := self.deck.handle(frame)) is not None:
+                    sleep(self.latency)
+                    os.write(self._controller, response)
+
+    def start(self) -> None:
+        """Start answering."""
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop answering and close the pseudo-terminal."""
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        for fd in (self._controller, self._device):
+            with contextlib.suppress(OSError):
+                os.close(fd)
+
+    def __enter__(self) -> Self:
+        """
+        Start answering.
+
+        Returns
+        -------
+        Self
+            This simulator.
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None,
+                 tb: TracebackType | None) -> None:
+        """Stop answering and close the pseudo-terminal."""
+        self.close()
+
+
+@click.command(context_settings={'help_option_names': ['-h', '--help']})
+@click.option('-i', '--jlip-id', default=1, type=click.IntRange(1, 99), help='JLIP ID to answer.')
+@click.option('-l', '--latency', default=0.0, type=float, help='Seconds to wait before answering.')
+@click.option('--drop-rate', default=0.0, type=click.FloatRange(0, 1), help='Chance of no answer.')
+@click.option('--corrupt-rate',
+              default=0.0,
+              type=click.FloatRange(0, 1),
+              help='Chance of a bad checksum.')
+@click.option('--reject-rate',
+              default=0.0,
+              type=click.FloatRange(0, 1),
+              help='Chance of answering that the command is not possible.')
+@click.option('--seed', type=int, help='Seed for the fault injection.')
+def main(jlip_id: int, latency: float, drop_rate: float, corrupt_rate: float, reject_rate: float,
+         seed: int | None) -> None:
+    """
+    Simulate a JLIP deck on a pseudo-terminal.
+
+    Prints the path of the pseudo-terminal, then answers until interrupted. Pass the path to
+    ``jlipd``, ``capture-stereo`` or ``capture-batch`` instead of a serial port.
+    """
+    deck = DeckSimulator(jlip_id,
+                         drop_rate=drop_rate,
+                         corrupt_rate=corrupt_rate,
+                         reject_rate=reject_rate,
+                         seed=seed)
+    with PtySimulator(deck, latency=latency) as simulator:
+        click.echo(simulator.path)
+        with contextlib.suppress(KeyboardInterrupt):
+            threading.Event().wait()
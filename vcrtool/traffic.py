@@ -0,0 +1,327 @@
+"""
+Recording and replay of JLIP traffic.
+
+A log starts with :py:data:`TRAFFIC_MAGIC` and a version byte followed by one record per exchange.
+Each record holds the nanoseconds from the start of the recording to the request, the microseconds
+until the response arrived or the wait gave up, a flags byte, the request frame and, if one
+arrived, the response frame. The layout is described in
+``ksy/jlip_traffic.ksy``; frames follow ``ksy/jlip_command.ksy`` and ``ksy/jlip_response.ksy``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic, sleep
+from typing import IO, TYPE_CHECKING, Any
+import asyncio
+import os
+import struct
+
+from typing_extensions import override
+import serial
+
+from .jlip import AsyncJLIPTransport, JLIPTransport
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+__all__ = ('TRAFFIC_MAGIC', 'TRAFFIC_VERSION', 'AsyncReplayTransport', 'ReplayError',
+           'ReplayTransport', 'TrafficRecord', 'TrafficRecorder', 'read_traffic')
+
+TRAFFIC_MAGIC = b'JLIPTRAF'
+"""First bytes of a traffic log."""
+TRAFFIC_VERSION = 1
+"""Version of the log layout written by :py:class:`TrafficRecorder`."""
+_FRAME_LENGTH = 11
+_HAS_RESPONSE = 1
+_MAX_TURNAROUND_US = 0xFFFFFFFF
+_HEADER = struct.Struct('>8sB')
+_RECORD = struct.Struct(f'>QIB{_FRAME_LENGTH}s')
+
+
+@dataclass(frozen=True)
+class TrafficRecord:
+    """One recorded exchange."""
+    timestamp: float
+    """Seconds from the start of the recording until the request was written."""
+    request: bytes
+    """The request frame."""
+    response: bytes | None
+    """The response frame, or ``None`` if none arrived."""
+    turnaround: float
+    """Seconds from writing the request until the response was complete or the wait gave up."""
+
+
+class TrafficRecorder:
+    """
+    Append JLIP exchanges to a traffic log.
+
+    Pass an instance as ``recorder`` to :py:class:`vcrtool.jlip.JLIPTransport` or
+    :py:class:`vcrtool.jlip.AsyncJLIPTransport` to record every frame it sends. Several transports
+    may share one recorder. Each record is flushed as it is written so a crash loses nothing.
+    """
+    def __init__(self, file: str | os.PathLike[str] | IO[bytes]) -> None:
+        """
+        Start a log.
+
+        Parameters
+        ----------
+        file : str | os.PathLike[str] | IO[bytes]
+            Path to create, or a binary file open for writing.
+        """
+        self._owns_file = isinstance(file, (str, os.PathLike))
+        self.file = (
+            Path(file).open('wb')  # ruff:ignore[open-file-with-context-handler]
+            if isinstance(file, (str, os.PathLike)) else file)
+        """File the log is written to."""
+        self.started_at = monotonic()
+        """Monotonic time the recording started."""
+        self.file.write(_HEADER.pack(TRAFFIC_MAGIC, TRAFFIC_VERSION))
+        self.file.flush()
+
+    def record(self, request: bytes, response: bytes | None, sent_at: float,
+               received_at: float) -> None:
+        """
+        Append an exchange.
+
+        Parameters
+        ----------
+        request : bytes
+            The request frame.
+        response : bytes | None
+            The response frame, or ``None`` if none arrived.
+        sent_at : float
+            Monotonic time the request was written.
+        received_at : float
+            Monotonic time the response was complete or the wait gave up.
+        """
+        timestamp = max(0, round((sent_at - self.started_at) * 1e9))
+        turnaround = min(_MAX_TURNAROUND_US, max(0, round((received_at - sent_at) * 1e6)))
+        flags = 0 if response is None else _HAS_RESPONSE
+        self.file.write(_RECORD.pack(timestamp, turnaround, flags, request) + (response or b''))
+        self.file.flush()
+
+    def close(self) -> None:
+        """Close the log if the recorder opened it."""
+        if self._owns_file:
+            self.file.close()
+
+    def __enter__(self) -> Self:
+        """
+        Use the recorder as a context that closes it on exit.
+
+        Returns
+        -------
+        Self
+            This recorder.
+        """
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None,
+                 tb: TracebackType | None) -> None:
+        """Close the log."""
+        self.close()
+
+
+def read_traffic(file: str | os.PathLike[str] | IO[bytes]) -> Iterator[TrafficRecord]:
+    """
+    Read the records of a traffic log.
+
+    Parameters
+    ----------
+    file : str | os.PathLike[str] | IO[bytes]
+        Path of the log, or a binary file open for reading.
+
+    Yields
+    ------
+    TrafficRecord
+        Each record in order.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a traffic log of a supported version or ends inside a record.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with Path(file).open('rb') as f:
+            yield from read_traffic(f)
+        return
+    magic, version = _HEADER.unpack(file.read(_HEADER.size).ljust(_HEADER.size, b'\0'))
+    if magic != TRAFFIC_MAGIC or version != TRAFFIC_VERSION:
+        msg = 'Not a supported JLIP traffic log.'
+        raise ValueError(msg)
+    truncated = 'Traffic log ends inside a record.'
+    while head := file.read(_RECORD.size):
+        if len(head) < _RECORD.size:
+            raise ValueError(truncated)
+        timestamp, turnaround, flags, request = _RECORD.unpack(head)
+        response = None
+        if flags & _HAS_RESPONSE and len(response := file.read(_FRAME_LENGTH)) < _FRAME_LENGTH:
+            raise ValueError(truncated)
+        yield TrafficRecord(timestamp / 1e9, request, response, turnaround / 1e6)
+
+
+class ReplayError(Exception):
+    """Raised when a replay is sent a frame the log does not expect or has no records left."""
+
+
+class _Replay:
+    def __init__(self, records: Iterable[TrafficRecord] | str | os.PathLike[str], *,
+                 strict: bool) -> None:
+        self.records = iter(
+            read_traffic(records) if isinstance(records, (str, os.PathLike)) else records)
+        self.strict = strict
+
+    def next(self, frame: bytes) -> TrafficRecord:
+        if (record := next(self.records, None)) is None:
+            msg = 'The traffic log has no more records.'
+            raise ReplayError(msg)
+        if self.strict and record.request != frame:
+            msg = f'Expected request {record.request.hex(" ")} but got {frame.hex(" ")}.'
+            raise ReplayError(msg)
+        return record
+
+
+class ReplayTransport(JLIPTransport):
+    """
+    A :py:class:`vcrtool.jlip.JLIPTransport` that answers from a traffic log instead of a deck.
+
+    Each frame sent gets the next recorded response, or :py:class:`TimeoutError` where none was
+    recorded. Replays are not rate limited and by default do not wait for the recorded turnaround,
+    so code that polls a deck can be tested faster than real time.
+    """
+    def __init__(self,
+                 records: Iterable[TrafficRecord] | str | os.PathLike[str],
+                 *,
+                 strict: bool = True,
+                 time_scale: float = 0,
+                 **kwargs: Any) -> None:
+        """
+        Initialise the replay.
+
+        Parameters
+        ----------
+        records : Iterable[TrafficRecord] | str | os.PathLike[str]
+            Records to serve, or the path of a traffic log.
+        strict : bool
+            Raise :py:class:`ReplayError` if a frame sent differs from the recorded request.
+        time_scale : float
+            Multiplier for the recorded turnaround to wait before answering. ``1`` replays in real
+            time.
+        **kwargs : Any
+            Other keyword arguments for :py:class:`vcrtool.jlip.JLIPTransport`.
+        """
+        self._replay = _Replay(records, strict=strict)
+        self.time_scale = time_scale
+        """Multiplier for the recorded turnaround to wait before answering."""
+        super().__init__('loop://', **kwargs)
+
+    @override
+    def _open_serial(self, serial_path: str) -> serial.Serial:
+        return serial.serial_for_url(serial_path, timeout=0)
+
+    @override
+    def _acquire(self, *, fast: bool) -> bool:
+        return True
+
+    @override
+    def send_frame(self, frame: bytes) -> bytes:
+        """
+        Answer a frame with the next recorded response.
+
+        :py:class:`ReplayError` is raised if the log has no records left or, when strict, the frame
+        is not the recorded request.
+
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
+
+        Returns
+        -------
+        bytes
+            The recorded response.
+
+        Raises
+        ------
+        TimeoutError
+            If no response was recorded.
+        """
+        record = self._replay.next(frame)
+        sleep(record.turnaround * self.time_scale)
+        if record.response is None:
+            msg = f'No response within {self.response_timeout} seconds.'
+            raise TimeoutError(msg)
+        return self.codec.validate_response(record.response,
+                                            raise_on_error=self.raise_on_error_response)
+
+
+class AsyncReplayTransport(AsyncJLIPTransport):
+    """Asyncio counterpart of :py:class:`ReplayTransport`."""
+    def __init__(self,
+                 records: Iterable[TrafficRecord] | str | os.PathLike[str],
+                 *,
+                 strict: bool = True,
+                 time_scale: float = 0,
+                 **kwargs: Any) -> None:
+        """
+        Initialise the replay.
+
+        Parameters
+        ----------
+        records : Iterable[TrafficRecord] | str | os.PathLike[str]
+            Records to serve, or the path of a traffic log.
+        strict : bool
+            Raise :py:class:`ReplayError` if a frame sent differs from the recorded request.
+        time_scale : float
+            Multiplier for the recorded turnaround to wait before answering. ``1`` replays in real
+            time.
+        **kwargs : Any
+            Other keyword arguments for :py:class:`vcrtool.jlip.AsyncJLIPTransport`.
+        """
+        self._replay = _Replay(records, strict=strict)
+        self.time_scale = time_scale
+        """Multiplier for the recorded turnaround to wait before answering."""
+        super().__init__('loop://', **kwargs)
+
+    @override
+    def _open_serial(self, serial_path: str) -> serial.Serial:
+        return serial.serial_for_url(serial_path, timeout=0)
+
+    @override
+    async def _acquire(self, *, fast: bool) -> bool:
+        return True
+
+    @override
+    async def send_frame(self, frame: bytes) -> bytes:
+        """
+        Answer a frame with the next recorded response.
+
+        :py:class:`ReplayError` is raised if the log has no records left or, when strict, the frame
+        is not the recorded request.
+
+        Parameters
+        ----------
+        frame : bytes
+            The eleven-byte request frame.
+
+        Returns
+        -------
+        bytes
+            The recorded response.
+
+        Raises
+        ------
+        TimeoutError
+            If no response was recorded.
+        """
+        record = self._replay.next(frame)
+        await asyncio.sleep(record.turnaround * self.time_scale)
+        if record.response is None:
+            msg = f'No response within {self.response_timeout} seconds.'
+            raise TimeoutError(msg)
+        return self.codec.validate_response(record.response,
+                                            raise_on_error=self.raise_on_error_response)
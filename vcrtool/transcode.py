@@ -0,0 +1,286 @@
+"""
+Background transcoding of intermediate captures.
+
+A capture can be written with a cheap intra-only profile and transcoded to the final profile once
+the tape has finished. Because every frame of the intermediate is a key frame, it is split into
+segments by stream copy without losing or repeating frames. The segments are encoded by a pool of
+ffmpeg processes at a lower CPU priority, joined again with the audio of the intermediate and the
+result is checked against the intermediate before the intermediate is deleted.
+"""
+from __future__ import annotations
+
+from contextlib import suppress
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
+import asyncio
+import asyncio.subprocess as asp
+import logging
+import shutil
+
+import anyio
+import anyio.to_thread
+
+from .encoders import DEFAULT_ENCODER, available_cores, resolve_encoder
+from .utils import adebug_create_subprocess_exec
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Iterable
+    import os
+
+__all__ = ('DEFAULT_NICENESS', 'DURATION_TOLERANCE', 'INTERMEDIATE_ENCODERS', 'MIN_SEGMENT_LENGTH',
+           'TranscodeError', 'TranscodeJob', 'intermediate_path', 'probe_duration', 'transcode')
+
+DEFAULT_NICENESS = 10
+"""Niceness added to the ffmpeg processes of a transcode."""
+DURATION_TOLERANCE = 1.0
+"""Seconds the duration of a transcode may differ from its intermediate."""
+INTERMEDIATE_ENCODERS = ('ffv1', 'raw')
+"""Profiles that code every frame on its own, so an intermediate can be split at any frame."""
+MIN_SEGMENT_LENGTH = 30.0
+"""Shortest segment in seconds an intermediate is split into."""
+_SEGMENTS_PER_WORKER = 4
+
+T = TypeVar('T')
+
+log = logging.getLogger(__name__)
+
+
+class TranscodeError(Exception):
+    """Raised when a step of a transcode fails or its output does not match the intermediate."""
+
+
+@dataclass(frozen=True)
+class TranscodeJob:
+    """An intermediate to transcode."""
+    source: Path
+    """The intermediate. It is deleted once the output is verified."""
+    output: Path
+    """File to write."""
+    encoder: str = DEFAULT_ENCODER
+    """Name of the encoder profile for the output."""
+    extra_args: tuple[str, ...] = ()
+    """Other ffmpeg output arguments for the video stream."""
+
+
+def intermediate_path(output: str | os.PathLike[str]) -> Path:
+    """
+    Get the path of the intermediate for an output file.
+
+    Parameters
+    ----------
+    output : str | os.PathLike[str]
+        The final output file.
+
+    Returns
+    -------
+    Path
+        ``<stem>.intermediate.mkv`` next to the output.
+    """
+    path = Path(output)
+    return path.with_name(f'{path.stem}.intermediate.mkv')
+
+
+async def _run(*args: str, niceness: int) -> str:
+    """
+    Run a command with its niceness raised.
+
+    Returns
+    -------
+    str
+        The standard output of the command.
+
+    Raises
+    ------
+    TranscodeError
+        If the command fails.
+    asyncio.CancelledError
+        If the wait is cancelled. The command is killed first.
+    """
+    proc = await adebug_create_subprocess_exec('nice',
+                                               '-n',
+                                               str(niceness),
+                                               *args,
+                                               stdin=asp.DEVNULL,
+                                               stdout=asp.PIPE,
+                                               stderr=asp.PIPE)
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        with suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        msg = (f'`{args[0]}` exited with code {proc.returncode}: '
+               f'{stderr.decode(errors="replace").strip()}')
+        raise TranscodeError(msg)
+    return stdout.decode()
+
+
+async def _gather_or_cancel(awaitables: Iterable[Awaitable[T]]) -> list[T]:
+    """
+    Run awaitables concurrently, cancelling the rest as soon as one fails.
+
+    Returns
+    -------
+    list[T]
+        The results in order.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def probe_duration(path: str | os.PathLike[str],
+                         *,
+                         niceness: int = DEFAULT_NICENESS) -> float:
+    """
+    Get the duration of a media file with ffprobe.
+
+    Parameters
+    ----------
+    path : str | os.PathLike[str]
+        The file.
+    niceness : int
+        Niceness added to ffprobe.
+
+    Returns
+    -------
+    float
+        Duration in seconds.
+
+    Raises
+    ------
+    TranscodeError
+        If ffprobe fails or reports no duration.
+    """
+    output = await _run('ffprobe',
+                        '-v',
+                        'error',
+                        '-show_entries',
+                        'format=duration',
+                        '-of',
+                        'default=noprint_wrappers=1:nokey=1',
+                        str(path),
+                        niceness=niceness)
+    try:
+        return float(output.strip())
+    except ValueError as e:
+        msg = f'No duration for `{path}`.'
+        raise TranscodeError(msg) from e
+
+
+async def transcode(job: TranscodeJob,
+                    *,
+                    workers: int | None = None,
+                    niceness: int = DEFAULT_NICENESS) -> None:
+    """
+    Transcode an intermediate, verify the output and delete the intermediate.
+
+    The video of the intermediate is split into segments in a ``.parts`` directory next to the
+    output and each segment is encoded by its own ffmpeg process, at most ``workers`` at a time.
+    The encoded segments are joined with the audio of the intermediate. If any step fails, the
+    intermediate is kept. The segments are always deleted.
+
+    Parameters
+    ----------
+    job : TranscodeJob
+        The job.
+    workers : int | None
+        Number of ffmpeg processes encoding at once. Defaults to the number of cores available.
+        The cores are shared evenly between them.
+    niceness : int
+        Niceness added to every ffmpeg process.
+
+    Raises
+    ------
+    TranscodeError
+        If an ffmpeg process fails or the duration of the output differs from the intermediate by
+        more than :py:data:`DURATION_TOLERANCE`.
+    """
+    cores = available_cores()
+    workers = max(1, workers or cores)
+    threads = max(1, cores // workers)
+    profile = resolve_encoder(job.encoder, threads * workers)
+    duration = await probe_duration(job.source, niceness=niceness)
+    segment_length = max(MIN_SEGMENT_LENGTH, duration / (workers * _SEGMENTS_PER_WORKER))
+    log.info('Transcoding `%s` to `%s` with `%s` using %d workers of %d threads.', job.source,
+             job.output, profile.name, workers, threads)
+    parts = anyio.Path(job.output.with_name(f'{job.output.name}.parts'))
+    await anyio.to_thread.run_sync(partial(shutil.rmtree, parts, ignore_errors=True))
+    await parts.mkdir(parents=True)
+    ffmpeg = ('ffmpeg', '-hide_banner', '-loglevel', 'error', '-y')
+    semaphore = asyncio.Semaphore(workers)
+
+    async def _encode(segment: anyio.Path) -> anyio.Path:
+        encoded = segment.with_name(f'encoded-{segment.name}')
+        async with semaphore:
+            log.debug('Encoding segment `%s`.', segment)
+            await _run(*ffmpeg,
+                       '-i',
+                       str(segment),
+                       '-map',
+                       '0:v',
+                       *profile.video_args(threads),
+                       *job.extra_args,
+                       str(encoded),
+                       niceness=niceness)
+        await segment.unlink()
+        return encoded
+
+    try:
+        await _run(*ffmpeg,
+                   '-i',
+                   str(job.source),
+                   '-map',
+                   '0:v',
+                   '-c',
+                   'copy',
+                   '-f',
+                   'segment',
+                   '-segment_time',
+                   f'{segment_length:.3f}',
+                   '-reset_timestamps',
+                   '1',
+                   str(parts / 'segment-%05d.mkv'),
+                   niceness=niceness)
+        segments = sorted([segment async for segment in parts.glob('segment-*.mkv')])
+        log.debug('Split `%s` into %d segments.', job.source, len(segments))
+        encoded = await _gather_or_cancel(_encode(segment) for segment in segments)
+        # Paths in a concat list are relative to the list.
+        concat_list = parts / 'concat.txt'
+        await concat_list.write_text(''.join(f"file '{path.name}'\n" for path in encoded),
+                                     encoding='utf-8')
+        await _run(*ffmpeg,
+                   '-f',
+                   'concat',
+                   '-safe',
+                   '0',
+                   '-i',
+                   str(concat_list),
+                   '-i',
+                   str(job.source),
+                   '-map',
+                   '0:v',
+                   '-map',
+                   '1:a?',
+                   '-c',
+                   'copy',
+                   str(job.output),
+                   niceness=niceness)
+        output_duration = await probe_duration(job.output, niceness=niceness)
+        if abs(output_duration - duration) > DURATION_TOLERANCE:
+            msg = (f'Duration of `{job.output}` is {output_duration:.3f} seconds but the '
+                   f'intermediate is {duration:.3f} seconds.')
+            raise TranscodeError(msg)
+    finally:
+        await anyio.to_thread.run_sync(partial(shutil.rmtree, parts, ignore_errors=True))
+    log.info('Transcoded `%s`. Deleting the intermediate.', job.output)
+    await anyio.Path(job.source).unlink()